@@ -2,3 +2,6 @@
 
 from .calc_zmag import calc_zmag
 from .detect_sources_photutils import detect_sources_photutils
+from .ref_catalog import ReferenceCatalog
+from .star_finder import extract_stars, median_fwhm, median_hfd
+from .zeropoint import solve_zero_points, write_zero_points
@@ -4,15 +4,15 @@ import os
 import click
 import matplotlib.pyplot as plt
 import numpy as np
-import tqdm
 from astropy import units as u
 from astropy import wcs
 from astropy.io import fits
-from astroquery import sdss
 
 from pyscope.analysis import detect_sources_photutils
 
 from ..reduction import astrometry_net_wcs
+from .ref_catalog import ReferenceCatalog
+from .zeropoint import solve_zero_points, write_zero_points
 
 logger = logging.getLogger(__name__)
 
@@ -117,6 +117,57 @@ logger = logging.getLogger(__name__)
     help="""Radius to search for nearby
                 sources in the SDSS catalog [arcsec].""",
 )
+@click.option(
+    "--catalog",
+    "ref_catalog",
+    type=click.Path(exists=True),
+    default=None,
+    help="""Reference catalog file (FITS, ECSV, CSV, ...) with ra and
+                dec columns in degrees and one magnitude column per filter.
+                If not given, the SDSS catalog is fetched once per field and
+                cached on disk.""",
+)
+@click.option(
+    "--cache-dir",
+    "cache_dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="""Directory of the SDSS catalog cache [default: ~/.pyscope/catalogs].""",
+)
+@click.option(
+    "--color",
+    nargs=2,
+    type=(
+        click.Choice(["u", "g", "r", "i", "z"]),
+        click.Choice(["u", "g", "r", "i", "z"]),
+    ),
+    default=None,
+    help="""Fit a color term with the reference catalog color
+                between two filters, e.g. --color g r.""",
+)
+@click.option(
+    "--extinction",
+    is_flag=True,
+    default=False,
+    help="""Fit the extinction coefficient from the zero points
+                and AIRMASS of all images of each filter.""",
+)
+@click.option(
+    "--clip-sigma",
+    "clip_sigma",
+    type=float,
+    default=3.0,
+    show_default=True,
+    help="""Sigma clipping threshold of the zero-point fit.""",
+)
+@click.option(
+    "--clip-maxiters",
+    "clip_maxiters",
+    type=int,
+    default=5,
+    show_default=True,
+    help="""Maximum number of sigma clipping iterations.""",
+)
 @click.option(
     "-w",
     "--write",
@@ -148,6 +199,12 @@ def calc_zmag_cli(
     nlevels=32,
     deblend_contrast=0.005,
     search_radius=3,
+    ref_catalog=None,
+    cache_dir=None,
+    color=None,
+    extinction=False,
+    clip_sigma=3.0,
+    clip_maxiters=5,
     write=False,
     plot=False,
     verbose=False,
@@ -166,15 +223,21 @@ def calc_zmag_cli(
                     effective_gain={effective_gain}, connectivity={connectivity},
                     npixels={npixels}, levels={nlevels},
                     deblend_contrast={deblend_contrast}, search_radius={search_radius},
-                    write={write}, plot={plot}, verbose={verbose})"""
+                    ref_catalog={ref_catalog}, cache_dir={cache_dir},
+                    color={color}, extinction={extinction}, clip_sigma={clip_sigma},
+                    clip_maxiters={clip_maxiters}, write={write}, plot={plot}, verbose={verbose})"""
     )
     logger.info("Starting calc_zmag")
 
     if isinstance(images, str):
         images = [images]
 
+    if ref_catalog is not None:
+        ref_catalog = ReferenceCatalog.from_file(ref_catalog)
+
     zmags = []
     zmags_err = []
+    fields = []
     fig = None
     ax0 = None
     ax1 = None
@@ -189,17 +252,14 @@ def calc_zmag_cli(
             exp = hdr["EXPTIME"]
         except BaseException:
             exp = hdr["EXPOSURE"]
-        im_filt = hdr["FILTER"]
 
         w = wcs.WCS(hdr)
 
         # Get header filter or override with CLI option
-        if filt is None:
-            filt = im_filt
-        filt = filt.lower()
-        logger.info("Filter: %s" % filt)
+        im_filt = (filt or hdr["FILTER"]).lower()
+        logger.info("Filter: %s" % im_filt)
 
-        if filt not in ["u", "g", "r", "i", "z"]:
+        if im_filt not in ["u", "g", "r", "i", "z"]:
             logger.error("Invalid filter, continuing to next image...")
             continue
 
@@ -246,74 +306,132 @@ def calc_zmag_cli(
 
         logger.info("Found %d sources." % len(catalog))
 
-        catalog["SDSS"] = [None for i in range(len(catalog))]
-
-        # SDSS lookup
-        logger.info("Looking up corresponding SDSS sources...")
-        for source in tqdm.tqdm(catalog):
-            logger.debug("Source:\n%s" % source)
-
-            potential_matches = sdss.SDSS.query_region(
-                source["sky_centroid_icrs"],
-                radius=search_radius * u.arcsec,
-                cache=True,
-                fields=["ra", "dec", "clean", filt],
+        # Reference catalog lookup
+        if ref_catalog is None:
+            ny, nx = data.shape
+            center = w.pixel_to_world(nx / 2, ny / 2)
+            corners = w.pixel_to_world([0, 0, nx, nx], [0, ny, 0, ny])
+            radius = (
+                np.max(center.separation(corners)) + search_radius * u.arcsec
             )
-
             try:
-                for match in potential_matches:
-                    if match["clean"] and match[filt] < 24:
-                        source["SDSS"] = float(match[filt])
-                        logger.debug("Match found:\n%s" % match)
-                        break
+                field_catalog = ReferenceCatalog.from_sdss(
+                    center, radius, cache_dir=cache_dir
+                )
             except BaseException:
-                logger.debug(
-                    "No SDSS matches found, continuing to next source..."
+                logger.exception(
+                    "Failed to get the SDSS catalog, continuing to next image if present..."
                 )
                 continue
+        else:
+            field_catalog = ref_catalog
 
-        catalog.remove_rows(catalog["SDSS"] is None)
+        logger.info("Looking up corresponding SDSS sources...")
+        rows = field_catalog.match(
+            catalog["sky_centroid_icrs"],
+            im_filt,
+            max_sep=search_radius * u.arcsec,
+        )
+        catalog["SDSS"] = field_catalog.column(im_filt, rows)
+        if color is not None:
+            catalog["COLOR"] = field_catalog.column(
+                color[0], rows
+            ) - field_catalog.column(color[1], rows)
+        catalog = catalog[np.isfinite(catalog["SDSS"])]
+        catalog = catalog[catalog["segment_flux"] > 0]
 
         logger.info("Found %d SDSS matches." % len(catalog))
 
-        # Compute zero-point magnitude
-        logger.info("Computing zero-point magnitude...")
+        catalog["FLUX"] = catalog["segment_flux"].data / exp
+        catalog["FLUXERR"] = catalog["segment_fluxerr"].data / exp
+        # Keep the image data only if it is needed for the plots
+        fields.append(
+            (
+                im,
+                data if plot else None,
+                w,
+                im_filt,
+                hdr.get("AIRMASS", np.nan),
+                catalog,
+            )
+        )
 
+    # Solve all zero points of each filter in one pass
+    logger.info("Computing zero-point magnitudes...")
+    solutions = {}
+    for im_filt in sorted({field[3] for field in fields}):
+        members = [i for i, field in enumerate(fields) if field[3] == im_filt]
+        tables = [fields[i][5] for i in members]
+        image_index = np.repeat(
+            np.arange(len(members)), [len(t) for t in tables]
+        )
+        mag = np.concatenate(
+            [np.asarray(t["SDSS"], dtype=float) for t in tables]
+        )
+        flux = np.concatenate(
+            [np.asarray(t["FLUX"], dtype=float) for t in tables]
+        )
+        flux_err = np.concatenate(
+            [np.asarray(t["FLUXERR"], dtype=float) for t in tables]
+        )
+
+        solution = solve_zero_points(
+            image_index,
+            mag + 2.5 * np.log10(flux),
+            delta_mag_err=2.5 / np.log(10) * flux_err / flux,
+            color=(
+                np.concatenate(
+                    [np.asarray(t["COLOR"], dtype=float) for t in tables]
+                )
+                if color is not None
+                else None
+            ),
+            airmass=(
+                np.array([fields[i][4] for i in members], dtype=float)
+                if extinction
+                else None
+            ),
+            nimages=len(members),
+            sigma=clip_sigma,
+            maxiters=clip_maxiters,
+        )
+        if color is not None:
+            logger.info(
+                "%s color term (%s-%s): %.3f"
+                % (im_filt, color[0], color[1], solution["color_term"])
+            )
+        if extinction:
+            logger.info(
+                "%s extinction: %.3f mag/airmass, zero point above the atmosphere: %.3f"
+                % (im_filt, solution["extinction"], solution["zmag0"])
+            )
+
+        if write:
+            logger.info("Writing to headers...")
+            write_zero_points([fields[i][0] for i in members], solution)
+
+        offsets = np.concatenate(([0], np.cumsum([len(t) for t in tables])))
+        for j, i in enumerate(members):
+            used = solution["used"][offsets[j] : offsets[j + 1]]
+            fields[i][5].remove_rows(np.flatnonzero(~used))
+            solutions[i] = (solution["zmag"][j], solution["zmag_err"][j])
+
+    for i, (im, data, w, im_filt, airmass, catalog) in enumerate(fields):
+        mean_zmag, mean_zmag_err = solutions[i]
         mag = catalog["SDSS"].data
-        flux = catalog["segment_flux"].data / exp
-        flux_err = catalog["segment_fluxerr"].data / exp
+        flux = catalog["FLUX"].data
+        flux_err = catalog["FLUXERR"].data
 
         zmag = mag + 2.5 * np.log10(flux)
         zmag_err = 2.5 * np.log10(1 + flux_err / flux)
-
-        clip_array = (zmag < np.mean(zmag) + 2 * np.std(zmag)) & (
-            zmag > np.mean(zmag) - 2 * np.std(zmag)
-        )
-        zmag = zmag[clip_array]
-        zmag_err = zmag_err[clip_array]
-        mag = mag[clip_array]
-        flux = flux[clip_array]
-        flux_err = flux_err[clip_array]
-
         zmags.append(zmag)
         zmags_err.append(zmag_err)
 
-        mean_zmag = np.mean(zmag)
-        mean_zmag_err = np.sqrt(np.sum(zmag_err**2)) / len(zmag)
-
         logger.info(
-            "Mean zero-point magnitude: %.3f +/- %.3f"
-            % (mean_zmag, mean_zmag_err)
+            "%s zero-point magnitude: %.3f +/- %.3f"
+            % (im, mean_zmag, mean_zmag_err)
         )
 
-        if write:
-            logger.info("Writing to header...")
-            hdr["ZMAG"] = mean_zmag
-            hdr["ZPMAG"] = mean_zmag
-            hdr["ZMAGERR"] = mean_zmag_err
-            hdr["ZPMAGERR"] = mean_zmag_err
-            fits.writeto(im, data=data, header=hdr, overwrite=True)
-
         fig = None
         ax0 = None
         ax1 = None
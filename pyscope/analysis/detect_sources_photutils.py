@@ -1,15 +1,108 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import click
+import numpy as np
 import photutils.background as photbackground
 import photutils.segmentation as photsegmentation
 from astropy import convolution, wcs
 from astropy.io import fits
-from astropy.stats import SigmaClip
+from astropy.stats import SigmaClip, gaussian_fwhm_to_sigma
 from photutils.utils import calc_total_error
+from scipy import ndimage, signal
 
 logger = logging.getLogger(__name__)
 
+# Kernels at least this large are convolved by FFT rather than by 1-D passes
+_FFT_KERNEL_SIZE = 31
+
+
+def _convolve_gaussian(image, fwhm, size):
+    """Convolves an image with the kernel of
+    `~photutils.segmentation.make_2dgaussian_kernel`, which is separable, as
+    two 1-D passes, or by FFT for large kernels. Pixels outside of the image
+    are zero, as in `~astropy.convolution.convolve`."""
+    kernel = convolution.Gaussian1DKernel(
+        fwhm * gaussian_fwhm_to_sigma, x_size=size, mode="oversample"
+    ).array
+    kernel = (kernel / kernel.sum()).astype(image.dtype)
+    if size >= _FFT_KERNEL_SIZE:
+        return signal.oaconvolve(
+            image, np.outer(kernel, kernel), mode="same"
+        ).astype(image.dtype, copy=False)
+    convolved = ndimage.convolve1d(image, kernel, axis=0, mode="constant")
+    return ndimage.convolve1d(
+        convolved, kernel, axis=1, mode="constant", output=convolved
+    )
+
+
+class _SeparableZoomInterpolator(photbackground.BkgZoomInterpolator):
+    """`~photutils.background.BkgZoomInterpolator` computed as products of
+    the mesh with the 1-D interpolation matrices of its rows and columns.
+
+    Spline interpolation is linear and separable, so this gives the same
+    result as the 2-D `scipy.ndimage.zoom`, which evaluates
+    ``(order + 1) ** 2`` spline coefficients per pixel, at the cost of a
+    matrix product."""
+
+    def _weights(self, n, factor):
+        # Interpolating each unit vector gives the weights of the samples
+        return ndimage.zoom(
+            np.eye(n),
+            (factor, 1),
+            order=self.order,
+            mode=self.mode,
+            cval=self.cval,
+            grid_mode=self.grid_mode,
+        )
+
+    def __call__(self, mesh, bkg2d_obj):
+        mesh = np.asanyarray(mesh)
+        if bkg2d_obj.edge_method != "pad" or np.ptp(mesh) == 0:
+            return super().__call__(mesh, bkg2d_obj)
+
+        ny, nx = bkg2d_obj.data.shape
+        row_weights = self._weights(mesh.shape[0], bkg2d_obj.box_size[0])
+        column_weights = self._weights(mesh.shape[1], bkg2d_obj.box_size[1])
+        result = row_weights[:ny] @ mesh @ column_weights[:nx].T
+        if self.clip:
+            np.clip(result, np.min(mesh), np.max(mesh), out=result)
+        return result
+
+
+def _background(image, box_size, nthreads=1, **kwargs):
+    """Estimates the background and its RMS with
+    `~photutils.background.Background2D`, in bands of rows processed by
+    `nthreads` threads. The bands are aligned on the boxes and overlap by a
+    few boxes, which are cropped, so that the filtering and interpolation
+    of the box statistics are continuous across the bands."""
+    ny_boxes = image.shape[0] // box_size
+    overlap = kwargs.get("filter_size", (3, 3))[0] // 2 + 2
+    band_boxes = -(-ny_boxes // nthreads)
+    if nthreads <= 1 or band_boxes <= 2 * overlap:
+        bkg = photbackground.Background2D(image, box_size, **kwargs)
+        return bkg.background, bkg.background_rms
+
+    def estimate(start):
+        # Rows of the band, and of its margins of overlapping boxes
+        stop = start + band_boxes
+        lo = max(start - overlap, 0)
+        hi = min(stop + overlap, ny_boxes)
+        rows = slice(lo * box_size, None if hi == ny_boxes else hi * box_size)
+        bkg = photbackground.Background2D(image[rows], box_size, **kwargs)
+        keep = slice(
+            (start - lo) * box_size,
+            None if stop >= ny_boxes else (stop - lo) * box_size,
+        )
+        return bkg.background[keep], bkg.background_rms[keep]
+
+    with ThreadPoolExecutor(max_workers=nthreads) as executor:
+        bands = list(executor.map(estimate, range(0, ny_boxes, band_boxes)))
+    return (
+        np.concatenate([band[0] for band in bands]),
+        np.concatenate([band[1] for band in bands]),
+    )
+
 
 @click.command(
     epilog="""Check out the documentation at
@@ -149,6 +242,23 @@ logger = logging.getLogger(__name__)
     default=1,
     help="""Number of processes to use for deblending""",
 )
+@click.option(
+    "--deblend-min-density",
+    default=0.0,
+    help="""Minimum number of sources per million pixels for which sources
+    are deblended. Sparse fields are not deblended""",
+)
+@click.option(
+    "--fast/--no-fast",
+    default=False,
+    help="""Whether to process the image in float32, convolve it with
+    separable 1-D kernels, and estimate the background in parallel bands""",
+)
+@click.option(
+    "--nthreads",
+    default=1,
+    help="""Number of threads used to estimate the background with --fast""",
+)
 @click.option(
     "--tbl-save-path",
     type=click.Path(),
@@ -185,17 +295,25 @@ def detect_sources_photutils_cli(
     contrast=0.001,
     mode="exponential",
     nproc=1,
+    deblend_min_density=0.0,
+    fast=False,
+    nthreads=1,
     tbl_save_path=None,
     progress_bar=True,
     verbose=0,
 ):
     """Finds sources in an image and returns a catalog of their positions
     along with other properties. See https://photutils.readthedocs.io/en/stable/api/photutils.segmentation.SourceCatalog.html for more information.
+
+    With `fast`, the image is processed in float32, convolved with two 1-D
+    Gaussian passes instead of a 2-D kernel (or by FFT for kernels of at
+    least 31 pixels), and its background is estimated in bands by
+    `nthreads` threads, with the mesh interpolated by matrix products.
     """
 
     fname = str(fname[0])
     image, hdr = fits.getdata(fname, header=True)
-    image = image.astype("float64")
+    image = image.astype("float32" if fast else "float64")
 
     # Set up sigma clipping
     sigma_clip = SigmaClip(
@@ -232,33 +350,51 @@ def detect_sources_photutils_cli(
         bkgrms_estimator = photbackground.StdBackgroundRMS()
 
     logger.info("Estimating background...")
-    bkg = photbackground.Background2D(
+    background, background_rms = _background(
         image,
-        (box_size, box_size),
+        box_size,
+        nthreads=nthreads if fast else 1,
         filter_size=(filter_size, filter_size),
         sigma_clip=sigma_clip,
         bkg_estimator=bkg_estimator,
         bkgrms_estimator=bkgrms_estimator,
+        interpolator=(
+            _SeparableZoomInterpolator()
+            if fast
+            else photbackground.BkgZoomInterpolator()
+        ),
     )
-    image -= bkg.background
+    image -= background
     logger.info("Estimating background... Done")
 
     logger.info("Convolving image with a 2D Gaussian kernel...")
-    kernel = photsegmentation.make_2dgaussian_kernel(
-        kernel_fwhm, size=kernel_size
-    )
-    convolved_image = convolution.convolve(image, kernel)
+    if fast:
+        convolved_image = _convolve_gaussian(image, kernel_fwhm, kernel_size)
+    else:
+        kernel = photsegmentation.make_2dgaussian_kernel(
+            kernel_fwhm, size=kernel_size
+        )
+        convolved_image = convolution.convolve(image, kernel)
     logger.info("Convolving image with a 2D Gaussian kernel... Done")
 
     logger.info("Detecting sources...")
     segment_map = photsegmentation.detect_sources(
         convolved_image,
-        detect_threshold * bkg.background_rms,
+        detect_threshold * background_rms,
         npixels=npixels,
         connectivity=connectivity,
     )
     logger.info("Detecting sources... Done")
 
+    if deblend and segment_map is not None:
+        density = segment_map.nlabels / (image.size / 1e6)
+        if density < deblend_min_density:
+            logger.info(
+                f"{density:.1f} sources per million pixels, below "
+                f"{deblend_min_density}, skipping deblending"
+            )
+            deblend = False
+
     if deblend:
         logger.info("Deblending sources...")
         segment_map = photsegmentation.deblend_sources(
@@ -275,7 +411,7 @@ def detect_sources_photutils_cli(
         logger.info("Deblending sources... Done")
 
     logger.info("Calculating total error...")
-    err = calc_total_error(image, bkg.background_rms, effective_gain)
+    err = calc_total_error(image, background_rms, effective_gain)
     logger.info("Calculating total error... Done")
 
     logger.info("Creating source catalog...")
@@ -284,7 +420,7 @@ def detect_sources_photutils_cli(
         segment_map,
         convolved_data=convolved_image,
         error=err,
-        background=bkg.background,
+        background=background,
         wcs=wcs.WCS(hdr),
         localbkg_width=localbkg_width,
         apermask_method=apermask_method,
@@ -0,0 +1,251 @@
+import logging
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import SkyCoord
+from astropy.table import Table
+
+logger = logging.getLogger(__name__)
+
+SDSS_FILTERS = ("u", "g", "r", "i", "z")
+
+_CACHE_NAME = re.compile(
+    r"sdss_(?P<ra>[\d.]+)_(?P<dec>[+-][\d.]+)_(?P<radius>[\d.]+)\.fits$"
+)
+
+
+def default_cache_dir():
+    """Default directory for cached reference catalogs."""
+    return Path(os.path.expanduser("~")) / ".pyscope" / "catalogs"
+
+
+class ReferenceCatalog:
+    def __init__(self, table, ra_col="ra", dec_col="dec"):
+        """
+        A reference star catalog held in memory for fast crossmatching.
+
+        The catalog positions are stored as a single `~astropy.coordinates.SkyCoord`
+        so that whole source lists are matched at once with a KD-tree
+        (`~astropy.coordinates.SkyCoord.match_to_catalog_sky`) instead of
+        querying the catalog once per source.
+
+        Parameters
+        ----------
+        table : `~astropy.table.Table`
+            Catalog with right ascension and declination columns in degrees and
+            one magnitude column per filter, named after the filter. An
+            optional boolean `clean` column flags reliable photometry.
+        ra_col : `str`, default : `"ra"`, optional
+            Name of the right ascension column.
+        dec_col : `str`, default : `"dec"`, optional
+            Name of the declination column.
+        """
+        self.table = table
+        self.coords = SkyCoord(
+            ra=np.asarray(table[ra_col], dtype=float) * u.deg,
+            dec=np.asarray(table[dec_col], dtype=float) * u.deg,
+        )
+        self._filtered = {}
+
+    def __len__(self):
+        return len(self.table)
+
+    @classmethod
+    def from_file(cls, path, ra_col="ra", dec_col="dec", **kwargs):
+        """
+        Load a reference catalog from any file readable by
+        `~astropy.table.Table.read` (FITS, ECSV, CSV, ...).
+
+        Parameters
+        ----------
+        path : `str` or `~pathlib.Path`
+            Path to the catalog file.
+        ra_col : `str`, default : `"ra"`, optional
+            Name of the right ascension column.
+        dec_col : `str`, default : `"dec"`, optional
+            Name of the declination column.
+        **kwargs
+            Passed to `~astropy.table.Table.read`.
+
+        Returns
+        -------
+        `ReferenceCatalog`
+        """
+        logger.info(f"Loading reference catalog from {path}")
+        return cls(Table.read(path, **kwargs), ra_col=ra_col, dec_col=dec_col)
+
+    @classmethod
+    def from_sdss(cls, center, radius, cache_dir=None):
+        """
+        Fetch the SDSS photometric catalog around a field with a single query.
+
+        The result is cached on disk as a FITS binary table. Later calls for a
+        field that lies inside a cached cone load the cached table and do not
+        touch the network.
+
+        Parameters
+        ----------
+        center : `~astropy.coordinates.SkyCoord`
+            Center of the field.
+        radius : `~astropy.units.Quantity`
+            Radius of the cone to fetch.
+        cache_dir : `str` or `~pathlib.Path`, optional
+            Directory of the catalog cache. Defaults to
+            `~/.pyscope/catalogs`.
+
+        Returns
+        -------
+        `ReferenceCatalog`
+        """
+        cache_dir = Path(cache_dir or default_cache_dir())
+        center = center.icrs
+        radius = radius.to(u.arcmin)
+
+        cached = cls._find_cached(cache_dir, center, radius)
+        if cached is not None:
+            logger.info(f"Using cached SDSS catalog {cached}")
+            return cls.from_file(cached)
+
+        from astroquery import sdss
+
+        logger.info(
+            f"Querying SDSS for sources within {radius:.2f} of {center.to_string('hmsdms')}"
+        )
+        table = sdss.SDSS.query_sql(
+            f"""SELECT p.ra, p.dec, p.clean, p.u, p.g, p.r, p.i, p.z
+            FROM dbo.fGetNearbyObjEq({center.ra.deg}, {center.dec.deg}, {radius.value}) AS n
+            JOIN PhotoPrimary AS p ON n.objID = p.objID""",
+            timeout=120,
+        )
+        if table is None:
+            table = Table(
+                names=("ra", "dec", "clean") + SDSS_FILTERS,
+                dtype=(float, float, bool) + (np.float32,) * 5,
+            )
+        table["clean"] = np.asarray(table["clean"], dtype=bool)
+        for filt in SDSS_FILTERS:
+            table[filt] = np.asarray(table[filt], dtype=np.float32)
+        logger.info(f"Found {len(table)} SDSS sources")
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        path = cache_dir / (
+            f"sdss_{center.ra.deg:.5f}_{center.dec.deg:+.5f}_{radius.value:.3f}.fits"
+        )
+        table.write(path, overwrite=True)
+        logger.debug(f"Cached SDSS catalog to {path}")
+        return cls(table)
+
+    @staticmethod
+    def _find_cached(cache_dir, center, radius):
+        """Return a cached catalog whose cone contains the requested one."""
+        if not cache_dir.is_dir():
+            return None
+        for path in sorted(cache_dir.glob("sdss_*.fits")):
+            match = _CACHE_NAME.match(path.name)
+            if match is None:
+                continue
+            cached_center = SkyCoord(
+                float(match["ra"]) * u.deg, float(match["dec"]) * u.deg
+            )
+            cached_radius = float(match["radius"]) * u.arcmin
+            if center.separation(cached_center) + radius <= cached_radius:
+                return path
+        return None
+
+    def _usable(self, filt, max_mag):
+        """Indices and coordinates of clean catalog sources brighter than
+        `max_mag` in a filter."""
+        key = (filt, max_mag)
+        if key not in self._filtered:
+            mags = np.asarray(self.table[filt], dtype=float)
+            usable = np.isfinite(mags) & (mags < max_mag)
+            if "clean" in self.table.colnames:
+                usable &= np.asarray(self.table["clean"], dtype=bool)
+            idx = np.flatnonzero(usable)
+            self._filtered[key] = (idx, self.coords[idx])
+        return self._filtered[key]
+
+    def match(self, coords, filt, max_sep=3 * u.arcsec, max_mag=24):
+        """
+        Match a list of positions to the catalog in one vectorized pass.
+
+        Each position is matched to the nearest clean catalog source brighter
+        than `max_mag` in `filt`.
+
+        Parameters
+        ----------
+        coords : `~astropy.coordinates.SkyCoord`
+            Positions to match.
+        filt : `str`
+            Name of the magnitude column used to select usable sources.
+        max_sep : `~astropy.units.Quantity`, default : 3 arcsec, optional
+            Maximum separation of a match.
+        max_mag : `float`, default : 24, optional
+            Faintest usable catalog magnitude.
+
+        Returns
+        -------
+        `~numpy.ndarray` of `int`
+            Catalog row of the match of each position, `-1` where there is no
+            match.
+        """
+        rows = np.full(len(coords), -1)
+        idx, catalog = self._usable(filt, max_mag)
+        if len(catalog) == 0 or len(coords) == 0:
+            return rows
+        nearest, sep, _ = coords.match_to_catalog_sky(catalog)
+        matched = sep < max_sep
+        rows[matched] = idx[nearest[matched]]
+        return rows
+
+    def crossmatch(self, coords, filt, max_sep=3 * u.arcsec, max_mag=24):
+        """
+        Look up the catalog magnitudes of a list of positions.
+
+        See `match` for the matching rules.
+
+        Parameters
+        ----------
+        coords : `~astropy.coordinates.SkyCoord`
+            Positions to match.
+        filt : `str`
+            Name of the magnitude column to return.
+        max_sep : `~astropy.units.Quantity`, default : 3 arcsec, optional
+            Maximum separation of a match.
+        max_mag : `float`, default : 24, optional
+            Faintest usable catalog magnitude.
+
+        Returns
+        -------
+        `~numpy.ndarray`
+            Catalog magnitude of the match of each position, `nan` where there
+            is no match.
+        """
+        return self.column(filt, self.match(coords, filt, max_sep, max_mag))
+
+    def column(self, name, rows):
+        """
+        Values of a catalog column at the rows returned by `match`, `nan`
+        where the row is `-1`.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the column.
+        rows : `~numpy.ndarray` of `int`
+            Catalog rows.
+
+        Returns
+        -------
+        `~numpy.ndarray`
+        """
+        rows = np.asarray(rows)
+        values = np.full(len(rows), np.nan)
+        matched = rows >= 0
+        values[matched] = np.asarray(self.table[name], dtype=float)[
+            rows[matched]
+        ]
+        return values
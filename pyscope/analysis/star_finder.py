@@ -0,0 +1,306 @@
+import logging
+
+import numpy as np
+from astropy.stats import gaussian_sigma_to_fwhm
+from astropy.table import Table
+
+logger = logging.getLogger(__name__)
+
+
+def _sky(data, samples=250000):
+    """Sigma-clipped median and standard deviation of a subsample of the
+    image, from the median absolute deviation."""
+    step = max(int(np.sqrt(data.size / samples)), 1)
+    sample = data[::step, ::step].ravel()
+    for _ in range(3):
+        median = np.median(sample)
+        noise = 1.4826 * np.median(np.abs(sample - median))
+        if noise <= 0:
+            break
+        sample = sample[np.abs(sample - median) < 3 * noise]
+    return float(median), float(noise) if noise > 0 else 1.0
+
+
+def _peaks(data, level, half, max_candidates):
+    """Local maxima above `level` in their `2 * half + 1` box, at least
+    `half` pixels away from the edges, as (y, x) index arrays."""
+    ny, nx = data.shape
+    inner = data[half : ny - half, half : nx - half]
+    y, x = np.nonzero(inner > level)
+    values = inner[y, x]
+    if len(values) > max_candidates:
+        keep = np.argpartition(values, -max_candidates)[-max_candidates:]
+        y, x, values = y[keep], x[keep], values[keep]
+    y += half
+    x += half
+
+    # Compare each candidate to its neighbours, in rows of the box to
+    # bound the memory used
+    is_peak = np.ones(len(values), dtype=bool)
+    offsets = np.arange(-half, half + 1)
+    for dy in offsets:
+        neighbours = data[(y + dy)[:, None], x[:, None] + offsets]
+        if dy < 0:
+            is_peak &= np.all(values[:, None] > neighbours, axis=1)
+        elif dy > 0:
+            is_peak &= np.all(values[:, None] >= neighbours, axis=1)
+        else:
+            # Ties on the row of the peak go to the leftmost pixel
+            is_peak &= np.all(values[:, None] > neighbours[:, :half], axis=1)
+            is_peak &= np.all(values[:, None] >= neighbours[:, half:], axis=1)
+    return y[is_peak], x[is_peak]
+
+
+def _fit_gaussians(cutouts, x, y, sigma, amplitude, background, iterations):
+    """Fits circular Gaussians plus a constant to all cutouts at once with
+    damped Gauss-Newton iterations. Returns the fitted x, y and sigma, with
+    NaN where a fit failed."""
+    n, size, _ = cutouts.shape
+    grid_y, grid_x = np.mgrid[:size, :size].astype(np.float64)
+    grid_x = grid_x.ravel()
+    grid_y = grid_y.ravel()
+    values = cutouts.reshape(n, -1).astype(np.float64)
+    params = np.stack([amplitude, x, y, sigma, background], axis=1)
+
+    for _ in range(iterations):
+        a, x0, y0, s, b = params.T[:, :, None]
+        dx = grid_x - x0
+        dy = grid_y - y0
+        r2 = dx**2 + dy**2
+        g = np.exp(-r2 / (2 * s**2))
+        residuals = values - (a * g + b)
+        jacobian = np.stack(
+            [
+                g,
+                a * g * dx / s**2,
+                a * g * dy / s**2,
+                a * g * r2 / s**3,
+                np.ones_like(g),
+            ],
+            axis=2,
+        )
+        normal = np.einsum("npi,npj->nij", jacobian, jacobian)
+        normal += (
+            1e-3
+            * np.eye(5)
+            * np.diagonal(normal, axis1=1, axis2=2)[:, None, :].clip(1e-12)
+        )
+        gradient = np.einsum("npi,np->ni", jacobian, residuals)
+        try:
+            step = np.linalg.solve(normal, gradient[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            return np.full((3, n), np.nan)
+        params = params + step
+
+    a, x0, y0, s, _ = params.T
+    s = np.abs(s)
+    failed = (
+        ~np.isfinite(params).all(axis=1)
+        | (a <= 0)
+        | (x0 < 0)
+        | (x0 > size - 1)
+        | (y0 < 0)
+        | (y0 > size - 1)
+        | (s > size)
+    )
+    x0[failed] = y0[failed] = s[failed] = np.nan
+    return x0, y0, s
+
+
+def extract_stars(
+    data,
+    threshold=5,
+    box_size=11,
+    max_stars=100,
+    saturation=None,
+    min_fwhm=1.0,
+    fit=True,
+    iterations=6,
+):
+    """
+    Finds stars and measures their centroids and FWHM in an image.
+
+    This is a light alternative to `detect_sources_photutils` for loops
+    that only need positions and sizes, like focusing and centering, and
+    which take the image in memory, e.g. from `Camera.ImageArray`. The
+    background and noise are estimated from a subsample of the image, the
+    stars are the local maxima above the detection threshold, and their
+    centroids and widths are measured on small cutouts, all stars at once,
+    from their moments and optionally refined by fitting circular Gaussians.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        The image.
+    threshold : `float`, default : 5, optional
+        Detection threshold of the peaks, in units of the background noise.
+    box_size : `int`, default : 11, optional
+        Size of the cutouts in pixels, which should be about three times
+        the largest expected FWHM. Peaks closer than half of the box to
+        the edges or to a brighter peak are ignored.
+    max_stars : `int`, default : 100, optional
+        Maximum number of stars measured, brightest first.
+    saturation : `float`, optional
+        Peaks at or above this value are ignored.
+    min_fwhm : `float`, default : 1.0, optional
+        Minimum FWHM in pixels, to reject hot pixels and cosmic rays.
+    fit : `bool`, default : `True`, optional
+        Whether to fit Gaussians to the stars. Otherwise, the centroids and
+        FWHM are computed from the moments of the cutouts.
+    iterations : `int`, default : 6, optional
+        Number of iterations of the Gaussian fits.
+
+    Returns
+    -------
+    `~astropy.table.Table`
+        The zero-based pixel coordinates `x` and `y` of the stars, their
+        background-subtracted `peak` and `flux`, `fwhm` and half-flux
+        diameter `hfd` in pixels and `ellipticity` from the moments,
+        brightest first.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    half = box_size // 2
+    size = 2 * half + 1
+    background, noise = _sky(data)
+
+    y, x = _peaks(data, background + threshold * noise, half, 50 * max_stars)
+    peaks = data[y, x]
+    if saturation is not None:
+        unsaturated = peaks < saturation
+        y, x, peaks = y[unsaturated], x[unsaturated], peaks[unsaturated]
+    order = np.argsort(peaks)[::-1][: 2 * max_stars]
+    y, x = y[order], x[order]
+
+    # Cutouts of all stars, minus the median of their border
+    offsets = np.arange(-half, half + 1)
+    cutouts = data[
+        (y[:, None] + offsets)[:, :, None], (x[:, None] + offsets)[:, None, :]
+    ]
+    border = np.concatenate(
+        [
+            cutouts[:, 0, :],
+            cutouts[:, -1, :],
+            cutouts[:, 1:-1, 0],
+            cutouts[:, 1:-1, -1],
+        ],
+        axis=1,
+    )
+    local_background = np.median(border, axis=1)
+    weights = np.clip(cutouts - local_background[:, None, None], 0, None)
+
+    # Moments
+    flux = weights.sum(axis=(1, 2))
+    flux[flux <= 0] = np.nan
+    grid = np.arange(size, dtype=np.float32)
+    xc = (weights.sum(axis=1) @ grid) / flux
+    yc = (weights.sum(axis=2) @ grid) / flux
+    dx = grid[None, :] - xc[:, None]
+    dy = grid[None, :] - yc[:, None]
+    mxx = (weights.sum(axis=1) * dx**2).sum(axis=1) / flux
+    myy = (weights.sum(axis=2) * dy**2).sum(axis=1) / flux
+    mxy = np.einsum("nij,ni,nj->n", weights, dy, dx) / flux
+    trace = (mxx + myy) / 2
+    spread = np.sqrt(((mxx - myy) / 2) ** 2 + mxy**2)
+    major = trace + spread
+    minor = np.clip(trace - spread, 0, None)
+    ellipticity = 1 - np.sqrt(minor / major)
+    sigma = np.sqrt(trace)
+
+    if fit and len(y) > 0:
+        xc, yc, sigma = _fit_gaussians(
+            cutouts,
+            xc,
+            yc,
+            sigma,
+            cutouts[:, half, half] - local_background,
+            local_background,
+            iterations,
+        )
+
+    # Half-flux diameters, from the pixels sorted by distance to the
+    # centroid and interpolated between pixels
+    grid_y, grid_x = np.mgrid[:size, :size]
+    radii = np.hypot(
+        grid_x.ravel()[None, :] - xc[:, None],
+        grid_y.ravel()[None, :] - yc[:, None],
+    )
+    order = np.argsort(radii, axis=1)
+    radii = np.take_along_axis(radii, order, axis=1)
+    enclosed = np.cumsum(
+        np.take_along_axis(weights.reshape(len(y), size**2), order, axis=1),
+        axis=1,
+    ) / (flux[:, None])
+    half_index = np.clip(np.argmax(enclosed >= 0.5, axis=1), 1, None)
+    rows = np.arange(len(y))
+    r0, r1 = radii[rows, half_index - 1], radii[rows, half_index]
+    e0, e1 = enclosed[rows, half_index - 1], enclosed[rows, half_index]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hfd = 2 * (r0 + (0.5 - e0) / (e1 - e0) * (r1 - r0))
+
+    fwhm = gaussian_sigma_to_fwhm * sigma
+    good = np.isfinite(fwhm) & (fwhm >= min_fwhm)
+    keep = np.flatnonzero(good)
+    keep = keep[np.argsort(flux[keep])[::-1][:max_stars]]
+    logger.debug(f"Found {len(keep)} stars out of {len(y)} peaks")
+
+    return Table(
+        {
+            "x": x[keep] - half + xc[keep],
+            "y": y[keep] - half + yc[keep],
+            "peak": cutouts[keep, half, half] - local_background[keep],
+            "flux": flux[keep],
+            "fwhm": fwhm[keep],
+            "hfd": hfd[keep],
+            "ellipticity": ellipticity[keep],
+        }
+    )
+
+
+def median_fwhm(data, **kwargs):
+    """
+    Median FWHM of the stars of an image in pixels, or NaN if there are no
+    stars.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        The image.
+    **kwargs
+        Parameters of `extract_stars`.
+
+    Returns
+    -------
+    `float`
+    """
+    stars = extract_stars(data, **kwargs)
+    if len(stars) == 0:
+        return np.nan
+    return float(np.median(stars["fwhm"]))
+
+
+def median_hfd(data, **kwargs):
+    """
+    Median half-flux diameter of the stars of an image in pixels, or NaN if
+    there are no stars.
+
+    Unlike the FWHM, the half-flux diameter is defined for the ring-shaped
+    images of defocused stars, and grows linearly with the defocus. By
+    default the stars are not fitted, since Gaussians do not fit defocused
+    stars.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        The image.
+    **kwargs
+        Parameters of `extract_stars`.
+
+    Returns
+    -------
+    `float`
+    """
+    kwargs.setdefault("fit", False)
+    stars = extract_stars(data, **kwargs)
+    if len(stars) == 0:
+        return np.nan
+    return float(np.median(stars["hfd"]))
@@ -0,0 +1,196 @@
+import logging
+
+import numpy as np
+from astropy.io import fits
+
+logger = logging.getLogger(__name__)
+
+_MIN_COLOR_VARIANCE = 1e-6
+
+
+def solve_zero_points(
+    image_index,
+    delta_mag,
+    delta_mag_err=None,
+    color=None,
+    airmass=None,
+    nimages=None,
+    sigma=3.0,
+    maxiters=5,
+):
+    """
+    Fit the photometric zero points of many images at once.
+
+    The matched stars of all images are given as flat arrays, with
+    `image_index` telling which image each star belongs to. The model for
+    star `j` of image `i` is
+
+    .. math::
+
+        m_{ref,j} - m_{inst,j} = Z_i + c \\, (color_j)
+
+    with one free zero point :math:`Z_i` per image and a color term
+    :math:`c` shared by all images. The weighted least-squares solution is
+    computed in closed form with `numpy.bincount`, and stars further than
+    `sigma` standard deviations of their image's residuals are rejected
+    until no more stars are rejected or `maxiters` is reached.
+
+    If `airmass` is given, the zero points are then fit with
+    :math:`Z_i = Z_0 - k X_i` to estimate the extinction coefficient
+    :math:`k`.
+
+    Parameters
+    ----------
+    image_index : `~numpy.ndarray` of `int`
+        Index of the image of each star.
+    delta_mag : `~numpy.ndarray`
+        Reference catalog magnitude minus instrumental magnitude
+        (:math:`-2.5 \\log_{10}` of the flux in counts per second) of each star.
+    delta_mag_err : `~numpy.ndarray`, optional
+        Uncertainty of `delta_mag`. If given, stars are weighted by the
+        inverse variance.
+    color : `~numpy.ndarray`, optional
+        Reference catalog color of each star. If `None`, no color term is fit.
+    airmass : `~numpy.ndarray`, optional
+        Airmass of each image.
+    nimages : `int`, optional
+        Number of images. Defaults to `image_index.max() + 1`.
+    sigma : `float`, default : 3.0, optional
+        Rejection threshold in standard deviations.
+    maxiters : `int`, default : 5, optional
+        Maximum number of clipping iterations.
+
+    Returns
+    -------
+    `dict`
+        Dictionary with the per-image arrays `zmag`, `zmag_err` and `nstars`
+        (`nan` zero point for images without usable stars), the boolean star
+        mask `used`, the `color_term` (`0` if no color was given) and, if
+        `airmass` was given, the extinction fit `zmag0` and `extinction`.
+    """
+    image_index = np.asarray(image_index, dtype=int)
+    y = np.asarray(delta_mag, dtype=float)
+    if nimages is None:
+        nimages = image_index.max() + 1 if len(image_index) else 0
+
+    if delta_mag_err is not None:
+        err = np.asarray(delta_mag_err, dtype=float)
+        with np.errstate(divide="ignore"):
+            weights = 1 / err**2
+    else:
+        weights = np.ones_like(y)
+
+    valid = np.isfinite(y) & np.isfinite(weights) & (weights > 0)
+    if color is not None:
+        color = np.asarray(color, dtype=float)
+        valid &= np.isfinite(color)
+        col = np.where(valid, color, 0)
+    else:
+        col = np.zeros_like(y)
+    y = np.where(valid, y, 0)
+    weights = np.where(valid, weights, 0)
+
+    def per_image(values):
+        return np.bincount(image_index, values, minlength=nimages)
+
+    used = valid.copy()
+    color_term = 0.0
+    for i in range(maxiters + 1):
+        w = weights * used
+        wsum = per_image(w)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ybar = per_image(w * y) / wsum
+            if color is not None:
+                cbar = per_image(w * col) / wsum
+                dc = col - np.nan_to_num(cbar)[image_index]
+                dy = y - np.nan_to_num(ybar)[image_index]
+                denom = np.sum(w * dc**2)
+                # No color spread within the images: the color term is
+                # undetermined and is left at zero
+                if denom > _MIN_COLOR_VARIANCE * np.sum(w):
+                    color_term = np.sum(w * dc * dy) / denom
+                else:
+                    color_term = 0.0
+                zmag = ybar - color_term * cbar
+            else:
+                zmag = ybar
+
+            resid = y - np.nan_to_num(zmag)[image_index] - color_term * col
+            nstars = per_image(used.astype(float))
+            std = np.sqrt(per_image(used * resid**2) / nstars)
+
+        if i == maxiters:
+            break
+        clipped = valid & (np.abs(resid) <= sigma * std[image_index])
+        if np.array_equal(clipped, used):
+            break
+        used = clipped
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if delta_mag_err is not None:
+            zmag_err = 1 / np.sqrt(wsum)
+        else:
+            zmag_err = std / np.sqrt(nstars)
+
+    result = {
+        "zmag": zmag,
+        "zmag_err": zmag_err,
+        "nstars": nstars.astype(int),
+        "used": used,
+        "color_term": color_term,
+    }
+
+    if airmass is not None:
+        airmass = np.asarray(airmass, dtype=float)
+        good = np.isfinite(zmag) & np.isfinite(airmass) & (zmag_err > 0)
+        if np.count_nonzero(good) >= 2 and np.ptp(airmass[good]) > 0:
+            slope, zmag0 = np.polyfit(
+                airmass[good], zmag[good], 1, w=1 / zmag_err[good]
+            )
+            result["zmag0"] = zmag0
+            result["extinction"] = -slope
+        else:
+            logger.warning(
+                "Not enough images at different airmasses to fit the extinction"
+            )
+            result["zmag0"] = np.nan
+            result["extinction"] = np.nan
+
+    return result
+
+
+def write_zero_points(fnames, solution):
+    """
+    Write the zero points of a `solve_zero_points` solution to the image
+    headers.
+
+    The headers are updated in place without rewriting the image data.
+
+    Parameters
+    ----------
+    fnames : `list` of `str`
+        Paths to the images, in the order of the solution.
+    solution : `dict`
+        Result of `solve_zero_points`.
+    """
+    for i, fname in enumerate(fnames):
+        if not np.isfinite(solution["zmag"][i]):
+            logger.warning(f"No zero point for {fname}, header not updated")
+            continue
+        with fits.open(fname, mode="update") as hdul:
+            hdr = hdul[0].header
+            hdr["ZMAG"] = solution["zmag"][i]
+            hdr["ZPMAG"] = solution["zmag"][i]
+            hdr["ZMAGERR"] = solution["zmag_err"][i]
+            hdr["ZPMAGERR"] = solution["zmag_err"][i]
+            hdr["ZMAGNSTR"] = (
+                solution["nstars"][i],
+                "Number of stars used for ZMAG",
+            )
+            if solution["color_term"]:
+                hdr["ZCOLTERM"] = (solution["color_term"], "ZMAG color term")
+            if np.isfinite(solution.get("extinction", np.nan)):
+                hdr["ZEXTCOEF"] = (
+                    solution["extinction"],
+                    "Extinction coefficient [mag/airmass]",
+                )
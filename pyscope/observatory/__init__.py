@@ -50,7 +50,12 @@ from .pwi4_focuser import PWI4Focuser
 
 from .simulator_server import SimulatorServer
 
+from .device_snapshot import DeviceSnapshot
+from .ephemeris_cache import EphemerisCache
 from .observatory_exception import ObservatoryException
+from .sky_flat_exposure import SkyFlatExposure
+from .waiter import Waiter
+from .vcurve_autofocus import VCurveAutofocus
 from .observatory import Observatory
 
 from .pwi_autofocus import PWIAutofocus
@@ -59,6 +64,7 @@ from .zwo_camera import ZWOCamera
 
 # from .skyx import SkyX
 
+from .calibration_plan import plan_calibration_set
 from .collect_calibration_set import collect_calibration_set
 
 __all__ = [
@@ -76,7 +82,9 @@ __all__ = [
     "Camera",
     "CoverCalibrator",
     "Device",
+    "DeviceSnapshot",
     "Dome",
+    "EphemerisCache",
     "FilterWheel",
     "Focuser",
     "HTMLObservingConditions",
@@ -91,8 +99,12 @@ __all__ = [
     "PWIAutofocus",
     "Rotator",
     "SafetyMonitor",
+    "SkyFlatExposure",
     "Switch",
     "Telescope",
+    "VCurveAutofocus",
+    "Waiter",
     "collect_calibration_set",
+    "plan_calibration_set",
     "SimulatorServer",
 ]
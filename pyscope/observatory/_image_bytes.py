@@ -0,0 +1,168 @@
+"""
+Reads camera images from Alpaca devices with the ImageBytes protocol.
+
+The ImageBytes protocol transfers the image array as a 44-byte header
+followed by the raw little-endian pixel values, instead of the JSON nested
+list of the standard imagearray response. The pixels are read directly
+into a buffer and wrapped by a numpy array without any conversion.
+
+See the `Alpaca API reference <https://ascom-standards.org/api/>`_.
+"""
+
+import itertools
+import json
+import logging
+import random
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+from .observatory_exception import ObservatoryException
+
+logger = logging.getLogger(__name__)
+
+_HEADER_SIZE = 44
+
+# ImageBytes element type codes
+_ELEMENT_TYPES = {
+    1: np.dtype("<i2"),
+    2: np.dtype("<i4"),
+    3: np.dtype("<f8"),
+    4: np.dtype("<f4"),
+    6: np.dtype("u1"),
+    7: np.dtype("<i8"),
+    8: np.dtype("<u2"),
+    9: np.dtype("<u4"),
+    10: np.dtype("<u8"),
+}
+
+_client_id = random.randint(1, 65535)
+_transaction_ids = itertools.count(1)
+
+
+def decode_image_bytes(buffer):
+    """
+    Decodes an ImageBytes response.
+
+    Parameters
+    ----------
+    buffer : `bytes`, `bytearray` or `memoryview`
+        The response body. The returned array shares its memory, and is
+        writable if `buffer` is.
+
+    Returns
+    -------
+    `numpy.ndarray`
+        The image array, indexed like the ASCOM ImageArray (column first),
+        with the transmitted data type.
+
+    Raises
+    ------
+    `ObservatoryException`
+        If the response holds an Alpaca error or is malformed.
+    """
+    header = np.frombuffer(buffer, dtype="<i4", count=_HEADER_SIZE // 4)
+    (
+        version,
+        error_number,
+        _,
+        _,
+        data_start,
+        _,
+        element_type,
+        rank,
+        *dimensions,
+    ) = header.tolist()
+    if version != 1:
+        raise ObservatoryException(
+            f"Unsupported ImageBytes metadata version {version}"
+        )
+    if error_number != 0:
+        message = bytes(buffer[data_start:]).decode("utf-8", "replace")
+        raise ObservatoryException(
+            f"Alpaca error {error_number:#x}: {message}"
+        )
+    if element_type not in _ELEMENT_TYPES:
+        raise ObservatoryException(
+            f"Unsupported ImageBytes element type {element_type}"
+        )
+    shape = tuple(dimensions[:rank])
+    return np.frombuffer(
+        buffer,
+        dtype=_ELEMENT_TYPES[element_type],
+        count=int(np.prod(shape)),
+        offset=data_start,
+    ).reshape(shape)
+
+
+def read_image_array(address, device_number=0, protocol="http", timeout=None):
+    """
+    Reads the image array of an Alpaca camera.
+
+    The ImageBytes format is requested; servers which do not support it
+    answer with the JSON format, which is decoded instead.
+
+    Parameters
+    ----------
+    address : `str`
+        The host and port of the Alpaca server, e.g. "127.0.0.1:11111".
+    device_number : `int`, default : 0, optional
+        The device number of the camera.
+    protocol : `str`, default : "http", optional
+        The protocol of the Alpaca server.
+    timeout : `float`, optional
+        The timeout of the request in seconds.
+
+    Returns
+    -------
+    `numpy.ndarray`
+        The writable image array, indexed like the ASCOM ImageArray (column
+        first), with the transmitted data type.
+
+    Raises
+    ------
+    `ObservatoryException`
+        If the server returns an Alpaca error.
+    """
+    query = urlencode(
+        {
+            "ClientID": _client_id,
+            "ClientTransactionID": next(_transaction_ids),
+        }
+    )
+    url = (
+        f"{protocol}://{address}/api/v1/camera/{device_number}/imagearray"
+        f"?{query}"
+    )
+    request = Request(
+        url, headers={"Accept": "application/imagebytes, application/json"}
+    )
+    with urlopen(request, timeout=timeout) as response:
+        content_type = response.headers.get("Content-Type", "")
+        length = response.headers.get("Content-Length")
+        if length is not None:
+            buffer = bytearray(int(length))
+            view = memoryview(buffer)
+            received = 0
+            while received < len(buffer):
+                n = response.readinto(view[received:])
+                if not n:
+                    raise ObservatoryException(
+                        "Incomplete image array from the Alpaca server"
+                    )
+                received += n
+        else:
+            buffer = bytearray(response.read())
+
+    if content_type.startswith("application/imagebytes"):
+        return decode_image_bytes(buffer)
+
+    logger.debug("Alpaca server did not return ImageBytes, decoding JSON")
+    result = json.loads(buffer)
+    if result.get("ErrorNumber", 0) != 0:
+        raise ObservatoryException(
+            f"Alpaca error {result['ErrorNumber']:#x}: "
+            f"{result.get('ErrorMessage', '')}"
+        )
+    return np.array(result["Value"])
@@ -9,6 +9,7 @@ Credit: Kevin Ivarsen, PlaneWave Instruments
 
 try:
     # Python 3.x version
+    from http.client import HTTPConnection, HTTPException
     from urllib.error import HTTPError
     from urllib.parse import urlencode
     from urllib.request import urlopen
@@ -16,6 +17,7 @@ except ImportError:
     # Python 2.7 version
     from urllib import urlencode
 
+    from httplib import HTTPConnection, HTTPException
     from urllib2 import HTTPError, urlopen
 
 try:
@@ -23,29 +25,86 @@ try:
 except ImportError:
     pass
 
+import socket
+import threading
 import time
 
 
 class _PWI4:
-    def __init__(self, host="localhost", port=8220):
+    _clients = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, host="localhost", port=8220, status_ttl=0.2):
         """
         Client to the PWI4 telescope control application.
 
+        Status responses are cached for `status_ttl` seconds, so that the
+        devices reading several properties in a row, or several threads
+        polling PWI4 at once, share a single /status request. The responses
+        of commands, which also carry the full status, refresh the cache.
+
         Parameters
         ----------
         host : `str`, default : "localhost", optional
             The hostname or IP address of the computer running PWI4.
         port : `int`, default : 8220, optional
             The port number on which PWI4 is listening for HTTP requests.
+        status_ttl : `float`, default : 0.2, optional
+            Maximum age in seconds of a cached status. Set to 0 to request
+            the status on every call.
         """
         self.host = host
         self.port = port
+        self.status_ttl = status_ttl
         self.comm = _PWI4HttpCommunicator(host, port)
 
+        self._status = None
+        self._status_time = None
+        self._status_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, host="localhost", port=8220):
+        """
+        Returns the client shared by all devices using the PWI4 instance at
+        `host` and `port`, so that they share its status cache and
+        connections.
+        """
+        with cls._clients_lock:
+            client = cls._clients.get((host, port))
+            if client is None:
+                client = cls._clients[(host, port)] = cls(host=host, port=port)
+            return client
+
     ### High-level methods #################################
 
-    def status(self):
-        return self.request_with_status("/status")
+    def status(self, max_age=None):
+        """
+        Returns the status of PWI4, from the cache if it is at most
+        `max_age` seconds old (`status_ttl` by default). Concurrent calls
+        wait for a single request instead of issuing one each.
+        """
+        if max_age is None:
+            max_age = self.status_ttl
+        status = self._cached_status(max_age)
+        if status is not None:
+            return status
+        with self._status_lock:
+            # Another thread may have refreshed the status while this one
+            # waited for the lock
+            status = self._cached_status(max_age)
+            if status is None:
+                status = self.request_with_status("/status")
+            return status
+
+    def _cached_status(self, max_age):
+        status, status_time = self._status, self._status_time
+        if status is None or time.monotonic() - status_time > max_age:
+            return None
+        return status
+
+    def invalidate_status(self):
+        """Discards the cached status."""
+        self._status = None
 
     def mount_connect(self):
         return self.request_with_status("/mount/connect")
@@ -497,8 +556,12 @@ class _PWI4:
         return self.comm.request(command, **kwargs)
 
     def request_with_status(self, command, **kwargs):
+        request_time = time.monotonic()
         response_text = self.request(command, **kwargs)
-        return self.parse_status(response_text)
+        status = self.parse_status(response_text)
+        # The status is at least as recent as the request
+        self._status, self._status_time = status, request_time
+        return status
 
     ### Status parsing utilities ################################
 
@@ -872,6 +935,11 @@ class _PWI4HttpCommunicator:
         self.use_requests_lib = False
         self.requests_session = None
 
+        # Reuse a keep-alive connection per thread, since HTTPConnection
+        # objects cannot be shared between threads
+        self.keep_alive = True
+        self._local = threading.local()
+
     def make_url(self, path, **kwargs):
         """
         Utility function that takes a set of keyword=value arguments
@@ -936,6 +1004,8 @@ class _PWI4HttpCommunicator:
 
         if self.use_requests_lib:
             payload = self.perform_request_with_requests(url, postdata)
+        elif self.keep_alive:
+            payload = self.perform_request_with_connection(url, postdata)
         else:
             payload = self.perform_request_with_urllib(url, postdata)
 
@@ -946,6 +1016,30 @@ class _PWI4HttpCommunicator:
 
         return payload
 
+    def request_error(self, status, reason, error_details=None):
+        """
+        Returns the exception to raise for an HTTP error status returned by
+        PWI, including the error details of the response payload, if any.
+        """
+        if status == 404:
+            error_message = "Command not found"
+        elif status == 400:
+            error_message = "Bad request"
+        elif status == 500:
+            error_message = "Internal server error (possibly a bug in PWI)"
+        else:
+            error_message = "HTTP Error %i: %s" % (status, reason)
+
+        # In Python 3, the response is returned as bytes rather than a string,
+        # so we need to decode it into a string
+        if isinstance(error_details, bytes):
+            error_details = error_details.decode("utf-8", "replace")
+        if error_details:
+            error_message = error_message + ": " + error_details
+
+        # TODO: Consider a custom exception here
+        return Exception(error_message)
+
     def perform_request_with_urllib(self, url, postdata=None):
         # Open a connection to the server, issue the request, and try to receive the response.
         # The server will return an HTTP Status Code as part of the response.
@@ -955,29 +1049,14 @@ class _PWI4HttpCommunicator:
                 url, data=postdata, timeout=self.timeout_seconds
             )
         except HTTPError as e:
-            if e.code == 404:
-                error_message = "Command not found"
-            elif e.code == 400:
-                error_message = "Bad request"
-            elif e.code == 500:
-                error_message = "Internal server error (possibly a bug in PWI)"
-            else:
-                error_message = str(e)
-
             try:
                 # Try to read the payload of the response for error information
                 error_details = e.read()
-
-                # In Python 3, the response is returned as bytes rather than a string,
-                # so we need to decode it into a string
-                if isinstance(error_details, bytes):
-                    error_details = error_details.decode("utf-8")
-                error_message = error_message + ": " + error_details
             except BaseException:
-                pass  # If that failed, we won't include any further details
+                # If that failed, we won't include any further details
+                error_details = None
 
-            # TODO: Consider a custom exception here
-            raise Exception(error_message)
+            raise self.request_error(e.code, e.reason, error_details)
 
         except Exception as e:
             # This will often be a urllib2.URLError to indicate that a connection
@@ -989,6 +1068,47 @@ class _PWI4HttpCommunicator:
 
         return payload
 
+    def perform_request_with_connection(self, url, postdata=None):
+        # Send the request on the connection kept open by this thread,
+        # reconnecting once if the server closed it since the last request
+        path = url[len("http://" + self.host + ":" + str(self.port)) :]
+        for attempt in range(2):
+            connection = getattr(self._local, "connection", None)
+            if connection is None:
+                connection = HTTPConnection(
+                    self.host, self.port, timeout=self.timeout_seconds
+                )
+                self._local.connection = connection
+            try:
+                if postdata is None:
+                    connection.request("GET", path)
+                else:
+                    connection.request(
+                        "POST",
+                        path,
+                        body=postdata,
+                        headers={
+                            "Content-Type": "application/x-www-form-urlencoded"
+                        },
+                    )
+                response = connection.getresponse()
+                payload = response.read()
+                break
+            except (OSError, HTTPException) as e:
+                connection.close()
+                self._local.connection = None
+                if attempt == 1 or isinstance(e, socket.timeout):
+                    raise
+
+        if response.will_close:
+            connection.close()
+            self._local.connection = None
+
+        if response.status >= 400:
+            raise self.request_error(response.status, response.reason, payload)
+
+        return payload
+
     def perform_request_with_requests(self, url, postdata=None):
         if self.requests_session is None:
             self.requests_session = requests.Session()
@@ -3,6 +3,7 @@ import logging
 import numpy as np
 from astropy.time import Time
 
+from ._image_bytes import read_image_array
 from .ascom_device import ASCOMDevice
 from .camera import Camera
 
@@ -39,6 +40,10 @@ class ASCOMCamera(ASCOMDevice, Camera):
         self._image_data_type = None
         self._DoTranspose = True
         self._camera_time = True
+        self._alpaca = alpaca
+        self._device_number = device_number
+        self._protocol = protocol
+        self._image_bytes = alpaca
 
     def AbortExposure(self):
         logger.debug(f"ASCOMCamera.AbortExposure() called")
@@ -345,6 +350,11 @@ class ASCOMCamera(ASCOMDevice, Camera):
         returned by the pyscope ASCOM driver is transposed to match the FITS
         standard.
 
+        Alpaca cameras transfer the image with the ImageBytes protocol (if
+        `_image_bytes` is `True`), which is decoded without copies when the
+        transmitted data type is the data type of the array. The transposed
+        array is then a view of the received buffer.
+
         Parameters
         ----------
         None
@@ -357,11 +367,19 @@ class ASCOMCamera(ASCOMDevice, Camera):
 
         """
         logger.debug(f"ASCOMCamera.ImageArray property called")
-        img_array = self._device.ImageArray
-        # Convert to numpy array and check if it is the correct data type
         if self._image_data_type is None:
             self.SetImageDataType()
-        img_array = np.array(img_array, dtype=self._image_data_type)
+        if self._image_bytes:
+            img_array = read_image_array(
+                self._identifier,
+                device_number=self._device_number,
+                protocol=self._protocol,
+            ).astype(self._image_data_type, copy=False)
+        else:
+            # Convert to numpy array and check if it is the correct data type
+            img_array = np.array(
+                self._device.ImageArray, dtype=self._image_data_type
+            )
         if self._DoTranspose:
             img_array = np.transpose(img_array)
         return img_array
@@ -0,0 +1,153 @@
+import collections
+import logging
+import math
+import os
+from pathlib import Path
+
+from ..reduction.fits_index import FitsIndex
+
+logger = logging.getLogger(__name__)
+
+_BLOCK_SIZE = 2880
+
+CalibrationFrame = collections.namedtuple(
+    "CalibrationFrame",
+    ["frametyp", "exposure", "readout", "binning", "index", "path"],
+)
+CalibrationFrame.__doc__ = """A frame of a calibration set, see
+`plan_calibration_set`."""
+
+
+def calibration_frame_path(save_path, exposure, readout, binning, index):
+    """
+    Path of a dark or bias frame in a calibration set.
+
+    Parameters
+    ----------
+    save_path : `str` or `~pathlib.Path`
+        Directory of the calibration set.
+    exposure : `float`
+        Exposure time in seconds, 0 for a bias frame.
+    readout : `int`
+        Readout mode.
+    binning : `str`
+        Binning, e.g. "1x1".
+    index : `int`
+        Index of the frame among its repeats.
+
+    Returns
+    -------
+    `~pathlib.Path`
+    """
+    kind, kinds = ("bias", "biases") if exposure == 0 else ("dark", "darks")
+    directory = f"{kinds}_{binning}_Readout{readout}_{exposure}s"
+    name = f"{kind}_{binning}_Readout{readout}_{exposure}s_{index}"
+    return (
+        Path(save_path)
+        / directory.replace(".", "p").replace(" ", "")
+        / (name.replace(".", "p").replace(" ", "") + ".fts")
+    )
+
+
+def _is_complete(index, path):
+    """Whether a FITS file is indexed and holds all of its data."""
+    if path not in index:
+        return False
+    header = index.header(path)
+    data_size = (
+        abs(header.get("BITPIX", 8))
+        // 8
+        * math.prod(
+            header.get(f"NAXIS{i}", 0)
+            for i in range(1, header.get("NAXIS", 0) + 1)
+        )
+    )
+    # Headers and data are both padded to whole blocks, and headers of
+    # hundreds of cards span several blocks
+    header_size = len(header.tostring())
+    size = -(-header_size // _BLOCK_SIZE) + -(-data_size // _BLOCK_SIZE)
+    return os.path.getsize(path) >= size * _BLOCK_SIZE
+
+
+def plan_calibration_set(
+    save_path,
+    exposures,
+    readouts,
+    binnings,
+    repeat=1,
+    frametyp="Dark",
+    skip_existing=False,
+):
+    """
+    Orders the acquisition of a set of dark and bias frames.
+
+    Changing the readout mode or the binning of a camera can take seconds,
+    and may disturb the first frames after it, so the frames are grouped by
+    readout mode and binning, and within them by exposure time, so that each
+    mode is set once.
+
+    Parameters
+    ----------
+    save_path : `str` or `~pathlib.Path`
+        Directory of the calibration set.
+    exposures : `list` of `float`
+        Exposure times in seconds. Frames of 0 seconds are bias frames.
+    readouts : `list` of `int`
+        Readout modes.
+    binnings : `list` of `str`
+        Binnings, e.g. "1x1".
+    repeat : `int`, default : 1, optional
+        Number of frames of each exposure time, readout mode and binning.
+    frametyp : `str`, default : "Dark", optional
+        Frame type of the frames which are not bias frames.
+    skip_existing : `bool`, default : `False`, optional
+        Whether to leave out the frames already in `save_path`, to resume an
+        interrupted acquisition. The headers of the files in `save_path`
+        are read with a `~pyscope.reduction.FitsIndex` kept in memory, and
+        only files with a readable header and all of their data count as
+        acquired.
+
+    Returns
+    -------
+    `list` of `CalibrationFrame`
+        The frames to acquire, in order.
+    """
+    # Repeated values would only overwrite frames
+    exposures = list(dict.fromkeys(exposures))
+    readouts = list(dict.fromkeys(readouts))
+    binnings = list(dict.fromkeys(binnings))
+
+    index = None
+    if skip_existing and Path(save_path).is_dir():
+        # Kept in memory, so that no index file is left in the calibration
+        # set
+        index = FitsIndex(save_path, index_file=":memory:")
+        index.update()
+
+    frames = []
+    skipped = 0
+    for readout in readouts:
+        for binning in binnings:
+            for exposure in exposures:
+                for i in range(repeat):
+                    path = calibration_frame_path(
+                        save_path, exposure, readout, binning, i
+                    )
+                    if index is not None and _is_complete(index, path):
+                        skipped += 1
+                        continue
+                    frames.append(
+                        CalibrationFrame(
+                            "Bias" if exposure == 0 else frametyp,
+                            exposure,
+                            readout,
+                            binning,
+                            i,
+                            path,
+                        )
+                    )
+    if index is not None:
+        index.close()
+    if skipped:
+        logger.info(f"Skipping {skipped} frames already in {save_path}")
+    return frames
@@ -92,6 +92,14 @@ logger = logging.getLogger(__name__)
     show_default=True,
     help="Create a new directory for the calibration set.",
 )
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="""Skip the darks and biases already in the save path, to resume
+    an interrupted calibration set. Flats are always taken again. Implies
+    --new-dir False.""",
+)
 @click.option(
     "-v",
     "--verbose",
@@ -116,6 +124,7 @@ def collect_calibration_set_cli(
     dither_radius=0,  # arcseconds
     save_path="./temp/",
     new_dir=True,
+    resume=False,
     verbose=0,
 ):
     """
@@ -158,6 +167,11 @@ def collect_calibration_set_cli(
         The path to save the calibration set.
     new_dir : `bool`, default : `True`
         Whether to create a new directory for the calibration set.
+    resume : `bool`, default : `False`
+        Whether to skip the darks and biases already in `save_path`, to
+        resume an interrupted calibration set. No new directory is created.
+        Flats are always taken again, since their exposure times, which
+        are part of their file names, depend on the sky brightness.
     verbose : `int`, default : 0
         The verbosity of the output.
     """
@@ -180,7 +194,7 @@ def collect_calibration_set_cli(
         )
         return
 
-    if new_dir:
+    if new_dir and not resume:
         save_path = Path(save_path) / obs.observatory_time.strftime(
             "%Y-%m-%d_%H-%M-%S"
         )
@@ -188,6 +202,7 @@ def collect_calibration_set_cli(
         os.makedirs(save_path)
     logger.info(f"Saving calibration set to {save_path}")
 
+    dark_exposures = list(dark_exposures)
     if len(filter_exposures) > 0:
         logger.info("Collecting flats")
         success = obs.take_flats(
@@ -209,19 +224,19 @@ def collect_calibration_set_cli(
             logger.error("Failed to collect flats")
 
         if camera == "cmos":
-            logger.info("Collecting flat-darks")
-            success = obs.take_darks(
-                exposures=list(set(filter_exposures)),
-                readouts=readouts,
-                binnings=binnings,
-                repeat=repeat,
-                save_path=save_path,
-            )
-            if not success:
-                logger.error("Failed to collect flat-darks")
+            logger.info("Adding flat-darks to the darks")
+            dark_exposures += list(filter_exposures)
         else:
             logger.warning("Skipping flat-dark collection for non-CMOS camera")
 
+    if camera == "ccd":
+        logger.info("Adding biases to the darks")
+        dark_exposures.append(0)
+    else:
+        logger.warning("Skipping bias collection for non-CCD camera")
+
+    # Darks, flat-darks and biases are taken in one sequence, ordered to set
+    # each readout mode and binning once
     if len(dark_exposures) > 0:
         logger.info("Collecting darks")
         success = obs.take_darks(
@@ -230,25 +245,11 @@ def collect_calibration_set_cli(
             binnings=binnings,
             repeat=repeat,
             save_path=save_path,
+            skip_existing=resume,
         )
         if not success:
             logger.error("Failed to collect darks")
 
-    if camera == "ccd":
-        logger.info("Collecting biases")
-        success = obs.take_darks(
-            exposures=[0],
-            readouts=readouts,
-            binnings=binnings,
-            repeat=repeat,
-            save_path=save_path,
-            frametyp="Bias",
-        )
-        if not success:
-            logger.error("Failed to collect biases")
-    else:
-        logger.warning("Skipping bias collection for non-CCD camera")
-
     logger.info("Collection complete.")
 
 
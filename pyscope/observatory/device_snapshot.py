@@ -0,0 +1,308 @@
+import contextlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+STATIC_PROPERTIES = frozenset(
+    (
+        "Absolute",
+        "AlignmentMode",
+        "ApertureArea",
+        "ApertureDiameter",
+        "BayerOffsetX",
+        "BayerOffsetY",
+        "CameraXSize",
+        "CameraYSize",
+        "CanAbortExposure",
+        "CanAsymmetricBin",
+        "CanFastReadout",
+        "CanFindHome",
+        "CanGetCoolerPower",
+        "CanPark",
+        "CanPulseGuide",
+        "CanReverse",
+        "CanSetAltitude",
+        "CanSetAzimuth",
+        "CanSetCCDTemperature",
+        "CanSetDeclinationRate",
+        "CanSetGuideRates",
+        "CanSetPark",
+        "CanSetPierSide",
+        "CanSetRightAscensionRate",
+        "CanSetShutter",
+        "CanSetTracking",
+        "CanSlave",
+        "CanSlew",
+        "CanSlewAltAz",
+        "CanSlewAltAzAsync",
+        "CanSlewAsync",
+        "CanStopExposure",
+        "CanSync",
+        "CanSyncAltAz",
+        "CanSyncAzimuth",
+        "CanUnpark",
+        "Description",
+        "DriverInfo",
+        "DriverVersion",
+        "ElectronsPerADU",
+        "EquatorialSystem",
+        "ExposureMax",
+        "ExposureMin",
+        "ExposureResolution",
+        "FocalLength",
+        "FocusOffsets",
+        "FullWellCapacity",
+        "GainMax",
+        "GainMin",
+        "Gains",
+        "GetSwitchDescription",
+        "GetSwitchName",
+        "HasShutter",
+        "InterfaceVersion",
+        "MaxADU",
+        "MaxBinX",
+        "MaxBinY",
+        "MaxIncrement",
+        "MaxStep",
+        "MaxSwitch",
+        "MaxSwitchValue",
+        "MinSwitchValue",
+        "Name",
+        "Names",
+        "OffsetMax",
+        "OffsetMin",
+        "Offsets",
+        "ReadoutModes",
+        "SensorDescription",
+        "SensorName",
+        "SensorType",
+        "StepSize",
+        "SupportedActions",
+        "SwitchStep",
+        "TempCompAvailable",
+        "TrackingRates",
+    )
+)
+"""Properties and methods that do not change while a device is connected."""
+
+PROPERTY_TTL = {
+    "AveragePeriod": 10,
+    "CCDTemperature": 5,
+    "CMOSTemperature": 5,
+    "CloudCover": 10,
+    "Connected": 30,
+    "CoolerOn": 5,
+    "CoolerPower": 5,
+    "DewPoint": 10,
+    "HeatSinkTemperature": 5,
+    "Humidity": 10,
+    "Pressure": 10,
+    "RainRate": 10,
+    "SetCCDTemperature": 5,
+    "SkyBrightness": 10,
+    "SkyQuality": 10,
+    "SkyTemperature": 10,
+    "StarFWHM": 10,
+    "Temperature": 10,
+    "TimeSinceLastUpdate": 10,
+    "WindDirection": 10,
+    "WindGust": 10,
+    "WindSpeed": 10,
+}
+"""Time in seconds during which a slowly varying property is reused."""
+
+
+class DeviceSnapshot:
+    def __init__(self, device, ttl=None, static=None, error_ttl=300):
+        """
+        Caching proxy of a device used to generate image headers.
+
+        Reading a property of the proxy reads the property of the device,
+        unless a cached value can be reused:
+
+        - properties and methods in `static` are read once per session,
+          methods being cached per arguments,
+        - the other properties are reused for `ttl` seconds, zero by default,
+        - within a snapshot (see `snapshot`), every property is read at most
+          once. The dynamic properties read by the previous snapshot are
+          fetched concurrently when it starts.
+
+        Exceptions raised by the device are cached like values, so that
+        properties a driver does not implement are not queried for every
+        image. Exceptions raised by static properties are only reused for
+        `error_ttl` seconds, in case they were caused by a transient error.
+
+        Setting a property of the proxy sets the property of the device,
+        unless the cached value is valid and equal to the new value.
+
+        Methods are only cached when they are listed in `static` or `ttl`.
+
+        Parameters
+        ----------
+        device : `~pyscope.observatory.Device`
+            The device to wrap.
+        ttl : `dict`, optional
+            Time in seconds during which each property or method is reused,
+            updating `PROPERTY_TTL`.
+        static : `set` of `str`, optional
+            Names of the static properties and methods. Defaults to
+            `STATIC_PROPERTIES`.
+        error_ttl : `float`, default : 300, optional
+            Time in seconds during which an exception raised by a static
+            property is reused.
+        """
+        object.__setattr__(self, "_device", device)
+        object.__setattr__(self, "_ttl", {**PROPERTY_TTL, **(ttl or {})})
+        object.__setattr__(
+            self,
+            "_static",
+            STATIC_PROPERTIES if static is None else frozenset(static),
+        )
+        object.__setattr__(self, "_error_ttl", error_ttl)
+        object.__setattr__(self, "_cache", {})
+        object.__setattr__(self, "_epoch", None)
+        object.__setattr__(self, "_read_keys", set())
+        object.__setattr__(self, "_prefetch_keys", ())
+        object.__setattr__(self, "_lock", threading.RLock())
+        object.__setattr__(self, "last_duration", None)
+
+    @property
+    def device(self):
+        """The wrapped device."""
+        return self._device
+
+    def _is_valid(self, key, entry, now):
+        _, error, timestamp, epoch = entry
+        if self._epoch is not None and epoch is self._epoch:
+            return True
+        if key[0] in self._static:
+            return error is None or now - timestamp < self._error_ttl
+        return now - timestamp < self._ttl.get(key[0], 0)
+
+    def _get(self, key, read):
+        with self._lock:
+            now = time.monotonic()
+            entry = self._cache.get(key)
+            if entry is None or not self._is_valid(key, entry, now):
+                try:
+                    value, error = read(), None
+                except Exception as e:
+                    value, error = None, e
+                entry = (value, error, now, self._epoch)
+                self._cache[key] = entry
+            if self._epoch is not None:
+                self._read_keys.add(key)
+        if entry[1] is not None:
+            raise entry[1]
+        return entry[0]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if callable(getattr(type(self._device), name, None)):
+            method = getattr(self._device, name)
+            if name not in self._static and name not in self._ttl:
+                return method
+            return lambda *args: self._get(
+                (name,) + args, lambda: method(*args)
+            )
+        return self._get((name,), lambda: getattr(self._device, name))
+
+    def __setattr__(self, name, value):
+        with self._lock:
+            entry = self._cache.get((name,))
+            if (
+                entry is not None
+                and entry[1] is None
+                and entry[0] == value
+                and self._is_valid((name,), entry, time.monotonic())
+            ):
+                return
+            setattr(self._device, name, value)
+            self._cache[(name,)] = (value, None, time.monotonic(), self._epoch)
+
+    def invalidate(self, name=None):
+        """
+        Drop cached values.
+
+        Parameters
+        ----------
+        name : `str`, optional
+            Name of the property or method to drop. Defaults to all of them.
+        """
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[0] == name]:
+                    del self._cache[key]
+
+    def _prefetch(self, executor):
+        now = time.monotonic()
+        names = [
+            key[0]
+            for key in self._prefetch_keys
+            if key not in self._cache
+            or not self._is_valid(key, self._cache[key], now)
+        ]
+        futures = [
+            executor.submit(getattr, self._device, name) for name in names
+        ]
+        for name, future in zip(names, futures):
+            try:
+                value, error = future.result(), None
+            except Exception as e:
+                value, error = None, e
+            self._cache[(name,)] = (value, error, now, self._epoch)
+
+    @contextlib.contextmanager
+    def snapshot(self, executor=None):
+        """
+        Context manager within which each property is read at most once.
+
+        Its duration is stored in `last_duration`, in seconds.
+
+        Parameters
+        ----------
+        executor : `~concurrent.futures.Executor`, optional
+            Executor used to fetch concurrently the dynamic properties read
+            by the previous snapshot. They are fetched serially when they are
+            read if `None`.
+        """
+        with self._lock:
+            object.__setattr__(self, "_epoch", object())
+            self._read_keys.clear()
+            t0 = time.perf_counter()
+            try:
+                if executor is not None:
+                    self._prefetch(executor)
+                yield self
+            finally:
+                object.__setattr__(
+                    self,
+                    "_prefetch_keys",
+                    tuple(
+                        key
+                        for key in self._read_keys
+                        if len(key) == 1
+                        and key[0] not in self._static
+                        and not callable(
+                            getattr(type(self._device), key[0], None)
+                        )
+                    ),
+                )
+                object.__setattr__(self, "_epoch", None)
+                object.__setattr__(
+                    self, "last_duration", time.perf_counter() - t0
+                )
+
+
+def thread_safe(device):
+    """Whether `device` may be used from another thread than its creator,
+    i.e. it does not hold a COM object."""
+    return not any(
+        type(value).__module__.startswith("win32com")
+        for value in getattr(device, "__dict__", {}).values()
+    )
@@ -0,0 +1,407 @@
+import collections
+import logging
+import math
+import threading
+
+import numpy as np
+from astropy import constants as const
+from astropy import coordinates as coord
+from astropy import time as astrotime
+from astropy import units as u
+
+logger = logging.getLogger(__name__)
+
+# Frames in which the position of a fixed target does not depend on the time
+_FIXED_FRAMES = ("icrs", "fk5", "fk4", "fk4noeterms", "galactic")
+
+
+class EphemerisCache:
+    def __init__(
+        self,
+        location,
+        resolution=5 * u.minute,
+        span=12 * u.hour,
+        max_buckets=4,
+    ):
+        """
+        Sidereal time, Sun and Moon ephemerides of a site, precomputed in
+        buckets of time and interpolated.
+
+        The first lookup in a bucket of `span` computes the local apparent
+        sidereal time, the apparent positions of the Sun and the Moon and
+        the illumination of the Moon every `resolution` with astropy. Later
+        lookups in the same bucket are linear interpolations in these
+        tables, and altitudes and azimuths follow from the hour angle and the
+        latitude, so that repeated calls, like those of the status loop of
+        `~pyscope.telrun.TelrunOperator`, take microseconds instead of a full
+        frame transformation each.
+
+        The apparent places of fixed targets use the precession, nutation
+        and aberration of the middle of their bucket. The positions are
+        apparent positions without refraction, like those of an
+        `~astropy.coordinates.AltAz` frame without pressure, and agree with
+        astropy to about an arcsecond, and the sidereal time to a few
+        milliseconds.
+
+        Parameters
+        ----------
+        location : `~astropy.coordinates.EarthLocation`
+            Location of the site.
+        resolution : `~astropy.units.Quantity`, default : 5 min, optional
+            Time resolution of the tables.
+        span : `~astropy.units.Quantity`, default : 12 h, optional
+            Time span of a bucket.
+        max_buckets : `int`, default : 4, optional
+            Number of buckets kept in memory, most recently used first.
+        """
+        self.location = location
+        latitude = location.lat.to_value(u.rad)
+        self._sin_lat, self._cos_lat = np.sin(latitude), np.cos(latitude)
+        self._resolution = resolution.to_value(u.day)
+        self._span = span.to_value(u.day)
+        self._max_buckets = max_buckets
+        self._buckets = collections.OrderedDict()
+        self._frames = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def _bucket(self, index):
+        with self._lock:
+            if index in self._buckets:
+                self._buckets.move_to_end(index)
+                return self._buckets[index]
+            table = self._compute(index)
+            self._buckets[index] = table
+            if len(self._buckets) > self._max_buckets:
+                self._buckets.popitem(last=False)
+            return table
+
+    def _compute(self, index):
+        logger.debug(f"Computing ephemeris table {index}")
+        start = index * self._span
+        n = int(np.ceil(self._span / self._resolution)) + 2
+        jd = start + self._resolution * np.arange(n)
+        times = astrotime.Time(jd, format="jd", scale="utc")
+
+        last = np.unwrap(
+            times.sidereal_time(
+                "apparent", longitude=self.location.lon
+            ).to_value(u.rad)
+        )
+        hadec = coord.HADec(obstime=times, location=self.location)
+        sun = coord.get_sun(times)
+        moon = coord.get_body("moon", times, location=self.location)
+        table = {"jd": jd, "last": last}
+        for name, body in (("sun", sun), ("moon", moon)):
+            apparent = body.transform_to(hadec)
+            table[name] = _unit_vectors(
+                last - apparent.ha.to_value(u.rad),
+                apparent.dec.to_value(u.rad),
+            )
+
+        # Geocentric, like Observatory.moon_illumination
+        moon = coord.get_body("moon", times)
+        elongation = sun.separation(moon)
+        phase_angle = np.arctan2(
+            sun.distance * np.sin(elongation),
+            moon.distance - sun.distance * np.cos(elongation),
+        )
+        table["moon_illumination"] = (1.0 + np.cos(phase_angle.value)) / 2.0
+
+        # Velocity of the Earth in units of the speed of light, and rotation
+        # from GCRS to the true equator and equinox, at the middle of the
+        # bucket, for the apparent places of fixed targets
+        middle = astrotime.Time(
+            start + self._span / 2, format="jd", scale="utc"
+        )
+        _, velocity = coord.get_body_barycentric_posvel("earth", middle)
+        table["beta"] = (velocity.xyz / const.c).to_value(u.one)
+        axes = coord.GCRS(
+            coord.CartesianRepresentation(np.eye(3) * u.one), obstime=middle
+        ).transform_to(coord.TETE(obstime=middle))
+        table["npb"] = axes.cartesian.xyz.to_value(u.one)
+        return table
+
+    def _lookup(self, t, name):
+        """Values of a table interpolated at times `t`, with the times along
+        the first axis."""
+        jd = _utc_jd(t)
+        if np.ndim(jd) == 0:
+            # Scalar times are the common case, interpolated without the
+            # overhead of array operations
+            table = self._bucket(int(jd // self._span))
+            i = min(
+                int((jd - table["jd"][0]) / self._resolution),
+                len(table["jd"]) - 2,
+            )
+            f = (jd - table["jd"][i]) / self._resolution
+            column = table[name]
+            return (column[i] + f * (column[i + 1] - column[i]))[np.newaxis]
+
+        jd = np.ravel(jd)
+        index = np.floor(jd / self._span).astype(int)
+        values = None
+        for i in np.unique(index):
+            table = self._bucket(int(i))
+            rows = index == i
+            column = table[name]
+            interpolated = (
+                np.interp(jd[rows], table["jd"], column)
+                if column.ndim == 1
+                else np.stack(
+                    [
+                        np.interp(jd[rows], table["jd"], column[:, k])
+                        for k in range(column.shape[1])
+                    ],
+                    axis=1,
+                )
+            )
+            if values is None:
+                values = np.empty((len(jd),) + column.shape[1:])
+            values[rows] = interpolated
+        return values
+
+    def _altaz(self, t, ra, dec):
+        """Altitude and azimuth in degrees of apparent positions in radians
+        at times `t`."""
+        ha = self._lookup(t, "last") - ra
+        if t.isscalar:
+            ha, ra, dec = (
+                float(ha[0]),
+                float(np.ravel(ra)[0]),
+                float(np.ravel(dec)[0]),
+            )
+            sin, cos = math.sin, math.cos
+            alt = math.asin(
+                max(
+                    min(
+                        self._sin_lat * sin(dec)
+                        + self._cos_lat * cos(dec) * cos(ha),
+                        1,
+                    ),
+                    -1,
+                )
+            )
+            az = math.atan2(
+                -cos(dec) * sin(ha),
+                sin(dec) * self._cos_lat - cos(dec) * cos(ha) * self._sin_lat,
+            )
+            return math.degrees(alt), math.degrees(az) % 360
+
+        alt = np.arcsin(
+            np.clip(
+                self._sin_lat * np.sin(dec)
+                + self._cos_lat * np.cos(dec) * np.cos(ha),
+                -1,
+                1,
+            )
+        )
+        az = np.arctan2(
+            -np.cos(dec) * np.sin(ha),
+            np.sin(dec) * self._cos_lat
+            - np.cos(dec) * np.cos(ha) * self._sin_lat,
+        )
+        return np.degrees(alt), np.degrees(az) % 360
+
+    def _body_altaz(self, t, name):
+        vectors = self._lookup(t, name)
+        return self._altaz(t, *_spherical(vectors))
+
+    def lst(self, t):
+        """
+        Local apparent sidereal time.
+
+        Parameters
+        ----------
+        t : `~astropy.time.Time`
+
+        Returns
+        -------
+        `~astropy.coordinates.Longitude`
+        """
+        last = self._lookup(t, "last") * u.rad
+        return coord.Longitude(_scalar(t, last)).to(u.hourangle)
+
+    def sun_altaz(self, t):
+        """Altitude and azimuth of the Sun in degrees at times `t`."""
+        return self._body_altaz(t, "sun")
+
+    def moon_altaz(self, t):
+        """Altitude and azimuth of the Moon in degrees at times `t`."""
+        return self._body_altaz(t, "moon")
+
+    def moon_illumination(self, t):
+        """Illuminated fraction of the Moon at times `t`."""
+        return _scalar(t, self._lookup(t, "moon_illumination"))
+
+    def _apparent(self, obj, t):
+        """Unit vector of the apparent place of a fixed target at the scalar
+        time `t`, in the true equator and equinox of date."""
+        table = self._bucket(int(_utc_jd(t) // self._span))
+        if obj.frame.name != "icrs":
+            obj = obj.icrs
+        p = _unit_vectors(obj)[0]
+        # Annual aberration to first order, then precession and nutation
+        beta = table["beta"]
+        p = p + beta - np.dot(p, beta) * p
+        return table["npb"] @ (p / np.linalg.norm(p))
+
+    def cacheable(self, obj, t):
+        """
+        Whether the position of a target at `t` can be served by the cache:
+        a single target in a fixed frame, at a single time.
+
+        Parameters
+        ----------
+        obj : `~astropy.coordinates.SkyCoord`
+        t : `~astropy.time.Time`
+
+        Returns
+        -------
+        `bool`
+        """
+        return (
+            isinstance(obj, coord.SkyCoord)
+            and obj.isscalar
+            and obj.frame.name in _FIXED_FRAMES
+            and isinstance(t, astrotime.Time)
+            and t.isscalar
+        )
+
+    def altaz(self, obj, t):
+        """
+        Altitude and azimuth of a fixed target in degrees.
+
+        Parameters
+        ----------
+        obj : `~astropy.coordinates.SkyCoord`
+            The target, see `cacheable`.
+        t : `~astropy.time.Time`
+            A single time.
+
+        Returns
+        -------
+        `tuple` of `float`
+        """
+        return self._altaz(t, *_spherical(self._apparent(obj, t)[np.newaxis]))
+
+    def apparent(self, obj, t):
+        """
+        Apparent geocentric right ascension and declination of a fixed
+        target in degrees, in the true equator and equinox of date.
+
+        Parameters
+        ----------
+        obj : `~astropy.coordinates.SkyCoord`
+            The target, see `cacheable`.
+        t : `~astropy.time.Time`
+            A single time.
+
+        Returns
+        -------
+        `tuple` of `float`
+        """
+        ra, dec = _spherical(self._apparent(obj, t)[np.newaxis])
+        return float(np.degrees(ra[0]) % 360), float(np.degrees(dec[0]))
+
+    def icrs(self, ra, dec, t):
+        """
+        ICRS right ascension and declination of an apparent geocentric
+        position, the inverse of `apparent`.
+
+        Parameters
+        ----------
+        ra : `float`
+            Apparent right ascension in degrees.
+        dec : `float`
+            Apparent declination in degrees.
+        t : `~astropy.time.Time`
+            A single time.
+
+        Returns
+        -------
+        `tuple` of `float`
+        """
+        table = self._bucket(int(_utc_jd(t) // self._span))
+        p = table["npb"].T @ _unit_vectors(np.radians(ra), np.radians(dec))[0]
+        beta = table["beta"]
+        p = p - beta + np.dot(p, beta) * p
+        ra, dec = _spherical(p[np.newaxis])
+        return float(np.degrees(ra[0]) % 360), float(np.degrees(dec[0]))
+
+    def moon_separation(self, obj, t):
+        """
+        Angular separation between a fixed target and the Moon in degrees.
+
+        Parameters
+        ----------
+        obj : `~astropy.coordinates.SkyCoord`
+            The target, see `cacheable`.
+        t : `~astropy.time.Time`
+            A single time.
+
+        Returns
+        -------
+        `float`
+        """
+        moon = self._lookup(t, "moon")[0]
+        cos_sep = np.dot(moon, self._apparent(obj, t)) / np.linalg.norm(moon)
+        return float(np.degrees(np.arccos(np.clip(cos_sep, -1, 1))))
+
+    def altaz_frame(self, t):
+        """
+        `~astropy.coordinates.AltAz` frame of the site at a single time,
+        reused by consecutive calls with the same time.
+
+        Parameters
+        ----------
+        t : `~astropy.time.Time`
+
+        Returns
+        -------
+        `~astropy.coordinates.AltAz`
+        """
+        key = (t.scale, t.jd1, t.jd2)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                frame = coord.AltAz(obstime=t, location=self.location)
+                self._frames[key] = frame
+                if len(self._frames) > 16:
+                    self._frames.popitem(last=False)
+            return frame
+
+
+def _utc_jd(t):
+    if t.scale != "utc":
+        t = t.utc
+    if t.isscalar:
+        return float(t.jd1) + float(t.jd2)
+    return t.jd1 + t.jd2
+
+
+def _scalar(t, values):
+    return values[0] if t.isscalar else values
+
+
+def _unit_vectors(ra, dec=None):
+    """Cartesian unit vectors of positions in radians, or of the positions of
+    a `~astropy.coordinates.SkyCoord`, one row per position."""
+    if dec is None:
+        spherical = ra.spherical
+        ra = spherical.lon.to_value(u.rad)
+        dec = spherical.lat.to_value(u.rad)
+    ra, dec = np.ravel(ra), np.ravel(dec)
+    return np.stack(
+        [np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)],
+        axis=1,
+    )
+
+
+def _spherical(vectors):
+    """Right ascension and declination in radians of vectors."""
+    return (
+        np.arctan2(vectors[:, 1], vectors[:, 0]),
+        np.arcsin(
+            np.clip(vectors[:, 2] / np.linalg.norm(vectors, axis=1), -1, 1)
+        ),
+    )
@@ -0,0 +1,167 @@
+import logging
+import os
+import shutil
+import threading
+
+import numpy as np
+from astropy.io import fits
+
+logger = logging.getLogger(__name__)
+
+_BLOCK_SIZE = 2880
+
+_buffers = threading.local()
+
+
+def _buffer(size):
+    """Returns a buffer of at least `size` bytes, reused by each thread."""
+    buffer = getattr(_buffers, "buffer", None)
+    if buffer is None or len(buffer) < size:
+        buffer = _buffers.buffer = bytearray(size)
+    return buffer
+
+
+def _stored_dtype(data):
+    """
+    Returns the big-endian data type of the FITS data and the offset
+    XOR-ed into unsigned values, or `None` if astropy must write the data.
+    """
+    dtype = data.dtype
+    if dtype.kind == "u" and dtype.itemsize > 1:
+        # Unsigned values are stored as signed values minus BZERO, the sign
+        # bit, which only flips the sign bit
+        return dtype.newbyteorder(">"), 1 << (8 * dtype.itemsize - 1)
+    if dtype == np.int8:
+        return np.dtype("u1"), 0x80
+    if dtype.kind in "iuf":
+        return dtype.newbyteorder(">"), None
+    return None
+
+
+class SavedImage:
+    def __init__(self, path, header):
+        """
+        An image already saved to a FITS file, e.g. by MaxIm DL, with the
+        header it should have.
+
+        The data stays in the file: it is only read if `data` is accessed,
+        and the file is closed again afterwards. `write_fits` to `path`
+        only updates the header of the file.
+
+        Parameters
+        ----------
+        path : `str` or `~pathlib.Path`
+            The path of the FITS file.
+        header : `~astropy.io.fits.Header`
+            The header to write to the file.
+        """
+        self._path = path
+        self._data = None
+        self.header = header
+
+    @property
+    def path(self):
+        """The path of the FITS file."""
+        return self._path
+
+    @property
+    def data(self):
+        """The data of the image, read from the file on first access."""
+        if self._data is None:
+            self._data = fits.getdata(self._path, memmap=False)
+        return self._data
+
+
+def _same_file(filename, source):
+    try:
+        return os.path.samefile(filename, source)
+    except OSError:
+        return False
+
+
+def _write_saved_image(filename, image, overwrite):
+    """Updates the header of a `SavedImage`, copied to `filename` unless
+    it is already there."""
+    if not _same_file(filename, image.path):
+        if os.path.exists(filename) and not overwrite:
+            raise FileExistsError(f"{filename} already exists")
+        shutil.copyfile(image.path, filename)
+    logger.debug(f"Updating the header of {filename} in place")
+    with fits.open(filename, mode="update", memmap=False) as hdul:
+        # Replacing the header object would not be written back, so its
+        # cards are replaced instead
+        header = hdul[0].header
+        header.clear()
+        header.extend(image.header, strip=False)
+
+
+def write_fits(filename, hdu, overwrite=False, chunk_size=4 * 2**20):
+    """
+    Writes a primary HDU to a FITS file, streaming the data from its array.
+
+    `~astropy.io.fits.HDUList.writeto` scales unsigned integer data into a
+    full-size copy and byte-swaps it into another before writing. Here the
+    header is written as is and the data converted to its big-endian,
+    offset representation in chunks of `chunk_size` bytes through a buffer
+    reused between images, so that the data is read once, in any memory
+    layout (e.g. a transposed view), and no full-size copy is made. Data
+    which is already big-endian and signed is written directly.
+
+    A `SavedImage` is copied to `filename`, unless it is already there, and
+    only its header is updated.
+
+    Parameters
+    ----------
+    filename : `str` or `~pathlib.Path`
+        The path of the FITS file.
+    hdu : `~astropy.io.fits.PrimaryHDU` or `SavedImage`
+        The image and its header.
+    overwrite : `bool`, default : `False`, optional
+        Whether to overwrite an existing file.
+    chunk_size : `int`, default : 4 MiB, optional
+        Size in bytes of the chunks of data converted at once.
+
+    Raises
+    ------
+    `OSError`
+        If the file exists and `overwrite` is `False`.
+    """
+    if isinstance(hdu, SavedImage):
+        _write_saved_image(filename, hdu, overwrite)
+        return
+
+    data = hdu.data
+    stored = None if data is None else _stored_dtype(data)
+    if stored is None:
+        hdu.writeto(filename, overwrite=overwrite)
+        return
+
+    hdu.verify("exception")
+    header = hdu.header.tostring().encode("ascii")
+    stored_dtype, offset = stored
+
+    with open(filename, "wb" if overwrite else "xb") as f:
+        f.write(header)
+        if (
+            offset is None
+            and data.dtype == stored_dtype
+            and data.flags.c_contiguous
+        ):
+            f.write(data.data)
+        elif data.size > 0:
+            row_size = data[0].nbytes if data.ndim > 1 else data.itemsize
+            rows = max(chunk_size // row_size, 1)
+            buffer = _buffer(rows * row_size)
+            for start in range(0, len(data), rows):
+                chunk = data[start : start + rows]
+                out = np.frombuffer(
+                    buffer, dtype=stored_dtype, count=chunk.size
+                ).reshape(chunk.shape)
+                if offset is None:
+                    np.copyto(out, chunk)
+                else:
+                    if chunk.dtype == np.int8:
+                        chunk = chunk.view(np.uint8)
+                    np.bitwise_xor(chunk, offset, out=out)
+                f.write(out.data)
+        f.write(bytes(-data.nbytes % _BLOCK_SIZE))
@@ -1,6 +1,7 @@
+import concurrent.futures
 import configparser
+import contextlib
 import datetime
-import glob
 import importlib
 import json
 import logging
@@ -25,11 +26,18 @@ from astroquery.mpc import MPC
 from scipy.optimize import curve_fit
 
 from .. import __version__, observatory
-from ..analysis import detect_sources_photutils
+from ..analysis import detect_sources_photutils, median_hfd
 from ..utils import _kwargs_to_config, airmass
 from . import ObservatoryException
 from .ascom_device import ASCOMDevice
+from .calibration_plan import plan_calibration_set
 from .device import Device
+from .device_snapshot import DeviceSnapshot, thread_safe
+from .ephemeris_cache import EphemerisCache
+from .fits_writer import SavedImage, write_fits
+from .sky_flat_exposure import SkyFlatExposure
+from .vcurve_autofocus import VCurveAutofocus
+from .waiter import Waiter
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +71,8 @@ class Observatory:
         self._latitude = "00d00m00.00000s"
         self._longitude = "00d00m00.00000s"
         self._elevation = 0.0
+        self._location = None
+        self._ephemerides = None
         self._diameter = 0.0
         self._focal_length = 0.0
 
@@ -668,6 +678,16 @@ class Observatory:
         self._derotation_thread = None
         self._derotation_event = None
 
+        # Device snapshots used to generate headers
+        self._snapshots = {}
+        self._snapshots_lock = threading.Lock()
+        self._snapshot_timings = {}
+        self._snapshot_executor = None
+        self._prefetch_executor = None
+
+        # Shared by all waits for device operations to learn their durations
+        self._waiter = Waiter()
+
         logger.debug("Config:")
         logger.debug(self._config)
 
@@ -763,6 +783,8 @@ class Observatory:
         """Disconnects from the observatory"""
 
         logger.debug("Observatory.disconnect_all() called")
+        with self._snapshots_lock:
+            self._snapshots.clear()
         # TODO: Implement safe warmup procedure
         if self.camera.CoolerOn:
             self.camera.CoolerOn = False
@@ -856,8 +878,7 @@ class Observatory:
         logger.info("Attempting to take a dark exposure to close camera shutter...")
         try:
             self.camera.StartExposure(0, False)
-            while self.camera.ImageReady is False:
-                time.sleep(0.1)
+            self.wait_for_image()
             logger.info("Dark exposure complete")
         except:
             logger.exception("Error closing camera shutter during shutdown")
@@ -971,7 +992,7 @@ class Observatory:
             t = self.observatory_time
         else:
             t = astrotime.Time(t)
-        return t.sidereal_time("apparent", self.observatory_location).to("hourangle")
+        return self.ephemerides.lst(t)
 
     def sun_altaz(self, t=None):
         """Returns the altitude of the sun"""
@@ -983,11 +1004,7 @@ class Observatory:
         else:
             t = astrotime.Time(t)
 
-        sun = coord.get_sun(t).transform_to(
-            coord.AltAz(obstime=t, location=self.observatory_location)
-        )
-
-        return (sun.alt.deg, sun.az.deg)
+        return self.ephemerides.sun_altaz(t)
 
     def moon_altaz(self, t=None):
         """Returns the current altitude of the moon"""
@@ -999,11 +1016,7 @@ class Observatory:
         else:
             t = astrotime.Time(t)
 
-        moon = coord.get_body("moon", t).transform_to(
-            coord.AltAz(obstime=t, location=self.observatory_location)
-        )
-
-        return (moon.alt.deg, moon.az.deg)
+        return self.ephemerides.moon_altaz(t)
 
     def moon_illumination(self, t=None):
         """Returns the current illumination of the moon"""
@@ -1015,14 +1028,7 @@ class Observatory:
         else:
             t = astrotime.Time(t)
 
-        sun = coord.get_sun(t)
-        moon = coord.get_body("moon", t)
-        elongation = sun.separation(moon)
-        phase_angle = np.arctan2(
-            sun.distance * np.sin(elongation),
-            moon.distance - sun.distance * np.cos(elongation),
-        )
-        return (1.0 + np.cos(phase_angle.value)) / 2.0
+        return self.ephemerides.moon_illumination(t)
 
     # def get_object_altaz(
     #     self, obj=None, ra=None, dec=None, unit=("hr", "deg"), frame="icrs", t=None
@@ -1055,7 +1061,7 @@ class Observatory:
         if obj is None:
             try:
                 ra_unit, dec_unit = (u.hourangle if unit[0] == "hr" else u.deg, u.deg)
-                obj = SkyCoord(ra=ra, dec=dec, unit=(ra_unit, dec_unit), frame=frame)
+                obj = coord.SkyCoord(ra=ra, dec=dec, unit=(ra_unit, dec_unit), frame=frame)
             except ValueError as e:
                 logger.error(f"Invalid coordinate values or units: {e}")
                 return None
@@ -1069,6 +1075,12 @@ class Observatory:
                 logger.error(f"Invalid time value: {e}")
                 return None
 
+        if self.ephemerides.cacheable(obj, t):
+            alt, az = self.ephemerides.altaz(obj, t)
+            return coord.SkyCoord(
+                alt=alt * u.deg, az=az * u.deg, frame=self.ephemerides.altaz_frame(t)
+            )
+
         altaz_frame = coord.AltAz(obstime=t, location=self.observatory_location)
         try:
             altaz = obj.transform_to(altaz_frame)
@@ -1100,7 +1112,15 @@ class Observatory:
             )
             eq_system = 1
 
-        if eq_system == 1:
+        if eq_system == 1 and self.ephemerides.cacheable(obj, t):
+            logger.debug("Converting object to TETE")
+            ra, dec = self.ephemerides.apparent(obj, t)
+            obj_slew = coord.SkyCoord(
+                ra=ra * u.deg,
+                dec=dec * u.deg,
+                frame=coord.TETE(obstime=t, location=self.observatory_location),
+            )
+        elif eq_system == 1:
             logger.debug("Converting object to TETE")
             obj_slew = obj.transform_to(
                 coord.TETE(obstime=t, location=self.observatory_location)
@@ -1120,55 +1140,188 @@ class Observatory:
 
         logger.debug("Observatory.get_current_object() called")
 
-        eq_system = self.telescope.EquatorialSystem
+        telescope = self._snapshot(self.telescope)
+        eq_system = telescope.EquatorialSystem
         if eq_system in (0, 1):
-            obj = self._parse_obj_ra_dec(
-                ra=self.telescope.RightAscension,
-                dec=self.telescope.Declination,
-                frame=coord.TETE(
-                    obstime=self.observatory_time, location=self.observatory_location
-                ),
+            ra, dec = self.ephemerides.icrs(
+                telescope.RightAscension * 15,
+                telescope.Declination,
+                self.observatory_time,
             )
+            obj = coord.SkyCoord(ra=ra, dec=dec, unit=u.deg, frame="icrs")
         elif eq_system == 2:
             obj = self._parse_obj_ra_dec(
-                ra=self.telescope.RightAscension, dec=self.telescope.Declination
+                ra=telescope.RightAscension, dec=telescope.Declination
             )
         elif eq_system == 3:
             obj = self._parse_obj_ra_dec(
-                ra=self.telescope.RightAscension,
-                dec=self.telescope.Declination,
+                ra=telescope.RightAscension,
+                dec=telescope.Declination,
                 frame=coord.FK5(equinox="J2050"),
             )
         elif eq_system == 4:
             obj = self._parse_obj_ra_dec(
-                ra=self.telescope.RightAscension,
-                dec=self.telescope.Declination,
+                ra=telescope.RightAscension,
+                dec=telescope.Declination,
                 frame=coord.FK4(equinox="B1950"),
             )
         return obj
 
+    @property
+    def waiter(self):
+        """Returns the `Waiter` used to wait for device operations"""
+        return self._waiter
+
+    def wait_for_image(self, exposure=0, timeout=None):
+        """Waits for the camera image of an exposure of `exposure` seconds,
+        predicted from the exposure time and the previous readout times.
+        Returns the time waited in seconds, and raises `TimeoutError` after
+        `timeout` seconds."""
+        logger.debug(f"Observatory.wait_for_image({exposure}, {timeout}) called")
+        return self._waiter.wait(
+            lambda: self.camera.ImageReady,
+            timeout=timeout,
+            expected=exposure,
+            key="camera",
+            description="the camera image",
+        )
+
+    def wait_for_focuser(self, timeout=None):
+        """Waits for the focuser to stop moving. Returns the time waited in
+        seconds, and raises `TimeoutError` after `timeout` seconds."""
+        logger.debug(f"Observatory.wait_for_focuser({timeout}) called")
+        return self._waiter.wait(
+            lambda: not self.focuser.IsMoving,
+            timeout=timeout,
+            key="focuser",
+            description="the focuser",
+        )
+
+    def wait_for_filter_wheel(self, position, timeout=None):
+        """Waits for the filter wheel to reach `position`. Returns the time
+        waited in seconds, and raises `TimeoutError` after `timeout`
+        seconds."""
+        logger.debug(
+            f"Observatory.wait_for_filter_wheel({position}, {timeout}) called"
+        )
+        return self._waiter.wait(
+            lambda: self.filter_wheel.Position == position,
+            timeout=timeout,
+            key="filter_wheel",
+            description="the filter wheel",
+        )
+
+    def wait_for_slew(self, control_dome=False, control_rotator=False, timeout=None):
+        """Waits for the telescope, and optionally the dome and rotator, to
+        stop moving. Returns the time waited in seconds, and raises
+        `TimeoutError` after `timeout` seconds."""
+        logger.debug(
+            f"Observatory.wait_for_slew({control_dome}, {control_rotator}, {timeout}) called"
+        )
+
+        def complete():
+            if self.telescope.Slewing:
+                return False
+            if control_dome and self.dome is not None and self.dome.Slewing:
+                return False
+            if control_rotator and self.rotator is not None:
+                return not self.rotator.IsMoving
+            return True
+
+        return self._waiter.wait(
+            complete, timeout=timeout, key="slew", description="the slew"
+        )
+
+    def _snapshot(self, device):
+        """Returns the `DeviceSnapshot` proxy of a device, or `None`"""
+        if device is None:
+            return None
+        with self._snapshots_lock:
+            entry = self._snapshots.get(id(device))
+            if entry is None or entry.device is not device:
+                entry = DeviceSnapshot(device)
+                self._snapshots[id(device)] = entry
+            return entry
+
+    def _header_group(self, devices, properties, executor=None):
+        t0 = time.perf_counter()
+        info = {}
+        with contextlib.ExitStack() as stack:
+            for device in devices:
+                stack.enter_context(self._snapshot(device).snapshot(executor))
+            for name in properties:
+                group_info = getattr(self, name)
+                if isinstance(group_info, list):
+                    for i in group_info:
+                        info.update(i)
+                else:
+                    info.update(group_info)
+        return info, time.perf_counter() - t0
+
     def generate_header_dict(self):
         """Generates the header information for the observatory as a dictionary
 
+        Static device properties are read once per session and slowly varying
+        ones are reused for a few seconds (see `DeviceSnapshot`). The devices
+        and their dynamic properties are read concurrently, except for those
+        driven through COM which must stay in the calling thread. The time
+        taken by each device is available in `snapshot_timings`.
+
         Returns
         -------
         dict
             The header information
         """
+        groups = {
+            "camera": ("camera", ("observatory_info", "camera_info")),
+            "telescope": ("telescope", ("telescope_info",)),
+            "cover_calibrator": ("cover_calibrator", ("cover_calibrator_info",)),
+            "dome": ("dome", ("dome_info",)),
+            "filter_wheel": ("filter_wheel", ("filter_wheel_info",)),
+            "focuser": ("focuser", ("focuser_info",)),
+            "observing_conditions": (
+                "observing_conditions",
+                ("observing_conditions_info",),
+            ),
+            "rotator": ("rotator", ("rotator_info",)),
+            "safety_monitor": ("safety_monitor", ("safety_monitor_info",)),
+            "switch": ("switch", ("switch_info",)),
+            "threads": (None, ("threads_info", "autofocus_info")),
+        }
+
+        if self._snapshot_executor is None:
+            self._snapshot_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(groups), thread_name_prefix="pyscope-header"
+            )
+            self._prefetch_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=32, thread_name_prefix="pyscope-prefetch"
+            )
+
+        results = {}
+        for name, (attr, properties) in groups.items():
+            devices = getattr(self, attr) if attr is not None else None
+            if devices is None:
+                devices = []
+            elif not isinstance(devices, list):
+                devices = [devices]
+            devices = [d for d in devices if d is not None]
+            if all(thread_safe(d) for d in devices):
+                results[name] = self._snapshot_executor.submit(
+                    self._header_group,
+                    devices,
+                    properties,
+                    self._prefetch_executor,
+                )
+            else:
+                results[name] = self._header_group(devices, properties)
+
         hdr_dict = {}
-        hdr_dict.update(self.observatory_info)
-        hdr_dict.update(self.camera_info)
-        hdr_dict.update(self.telescope_info)
-        hdr_dict.update(self.cover_calibrator_info)
-        hdr_dict.update(self.dome_info)
-        hdr_dict.update(self.filter_wheel_info)
-        hdr_dict.update(self.focuser_info)
-        hdr_dict.update(self.observing_conditions_info)
-        hdr_dict.update(self.rotator_info)
-        hdr_dict.update(self.safety_monitor_info)
-        hdr_dict.update(self.switch_info)
-        hdr_dict.update(self.threads_info)
-        hdr_dict.update(self.autofocus_info)
+        for name, result in results.items():
+            if isinstance(result, concurrent.futures.Future):
+                result = result.result()
+            info, self._snapshot_timings[name] = result
+            hdr_dict.update(info)
+        logger.debug(f"Header snapshot timings: {self._snapshot_timings}")
 
         return hdr_dict
 
@@ -1259,25 +1412,49 @@ class Observatory:
             logger.error(f"Failed to update FITS header: {e}")
             logger.error(f"hdr_dict: {hdr_dict}")
 
-    def save_last_image(
+    def read_last_image(
         self,
         filename,
         frametyp=None,
-        overwrite=False,
         custom_header=None,
         history=None,
         allowed_overwrite=[],
-        # **kwargs,
     ):
-        """Saves the current image"""
+        """Reads out the current image and its header without writing it
+
+        The camera is free to start the next exposure once this returns, so
+        that the image can be written by another thread while it exposes.
+
+        Parameters
+        ----------
+        filename : `str`
+            The path the image will be saved to. MaxIm DL saves the image
+            there itself.
+        frametyp : `str`, optional
+            The frame type, see `generate_header_info`.
+        custom_header : `dict`, optional
+            Additional header keywords.
+        history : `str` or `list` of `str`, optional
+            History lines of the header.
+        allowed_overwrite : `list` of `str`, optional
+            Header keywords that may overwrite those set by MaxIm DL.
+
+        Returns
+        -------
+        `~astropy.io.fits.PrimaryHDU`, `SavedImage` or `None`
+            The image, or `None` if no image is available. For MaxIm DL, a
+            `SavedImage` whose data is only read from the saved file if it
+            is accessed, and for which `write_image` to `filename` only
+            updates the header of the file.
+        """
 
         logger.debug(
-            f"Observatory.save_last_image({filename}, {frametyp}, {overwrite}, {custom_header}, {history}) called"
+            f"Observatory.read_last_image({filename}, {frametyp}, {custom_header}, {history}) called"
         )
 
         if not self.camera.ImageReady:
             logger.exception("Image is not ready, cannot be saved")
-            return False
+            return None
 
         maxim = self.camera_driver.lower() in ("maxim", "maximdl", "_maximcamera")
         # print(self.camera_driver.lower())
@@ -1291,7 +1468,7 @@ class Observatory:
 
             if img_array is None or len(img_array) == 0 or len(img_array) == 0:
                 logger.exception("Image array is empty, cannot be saved")
-                return False
+                return None
         else:
             # print("Using Maxim to save image")
             logger.info("Using Maxim to save image")
@@ -1307,7 +1484,6 @@ class Observatory:
             # TODO: Below should be updated to the filepath we want to save to
             filepath = os.path.join(os.getcwd(), filename)
             self.camera.SaveImageAsFits(filepath)
-            img_array = fits.getdata(filename)
         try:
             hdr = self.generate_header_info(
                 filename, frametyp, custom_header, history, maxim, allowed_overwrite
@@ -1316,12 +1492,65 @@ class Observatory:
             if "RADECSYS" in hdr:
                 hdr["RADECSYSa"] = hdr["RADECSYS"]
                 hdr.pop("RADECSYS", None)
-            hdu = fits.PrimaryHDU(img_array, header=hdr)
         except Exception as e:
             logger.exception(f"Error generating header information: {e}")
-            hdu = fits.PrimaryHDU(img_array)
+            hdr = None
+
+        if maxim:
+            # Leave the data in the saved file rather than reading it back
+            if hdr is None:
+                hdr = fits.getheader(filepath)
+            hdu = SavedImage(filepath, hdr)
+        else:
+            hdu = fits.PrimaryHDU(img_array, header=hdr)
+
+        return hdu
+
+    def write_image(self, hdu, filename, overwrite=False):
+        """Writes an image returned by `read_last_image`
+
+        The data is streamed from the camera array to the file without
+        intermediate copies, see `write_fits`.
+
+        Parameters
+        ----------
+        hdu : `~astropy.io.fits.PrimaryHDU` or `SavedImage`
+            The image.
+        filename : `str`
+            The path of the FITS file.
+        overwrite : `bool`, default : `False`, optional
+            Whether to overwrite an existing file.
+        """
+        logger.debug(f"Observatory.write_image({filename}, {overwrite}) called")
+        write_fits(filename, hdu, overwrite=overwrite)
+
+    def save_last_image(
+        self,
+        filename,
+        frametyp=None,
+        overwrite=False,
+        custom_header=None,
+        history=None,
+        allowed_overwrite=[],
+        # **kwargs,
+    ):
+        """Saves the current image"""
+
+        logger.debug(
+            f"Observatory.save_last_image({filename}, {frametyp}, {overwrite}, {custom_header}, {history}) called"
+        )
+
+        hdu = self.read_last_image(
+            filename,
+            frametyp=frametyp,
+            custom_header=custom_header,
+            history=history,
+            allowed_overwrite=allowed_overwrite,
+        )
+        if hdu is None:
+            return False
 
-        hdu.writeto(filename, overwrite=overwrite)
+        self.write_image(hdu, filename, overwrite=overwrite)
 
         return True
 
@@ -1377,8 +1606,7 @@ class Observatory:
                         self.focuser.Move(
                             int(self.focuser.Position + self.current_focus_offset)
                         )
-                        while self.focuser.IsMoving:
-                            time.sleep(0.1)
+                        self.wait_for_focuser()
                         logger.info("Focuser moved")
                         return True
                     else:
@@ -1391,8 +1619,7 @@ class Observatory:
                         % self.current_focus_offset
                     )
                     self.focuser.Move(int(self.current_focus_offset))
-                    while self.focuser.IsMoving:
-                        time.sleep(0.1)
+                    self.wait_for_focuser()
                     logger.info("Focuser moved")
                     return True
             elif self.focuser.Connected and self.filter_focus_offsets[filter_name] == 0:
@@ -1401,8 +1628,7 @@ class Observatory:
                 time.sleep(1)
                 if self.focuser.IsMoving:
                     logger.info("Focuser is moving, waiting...")
-                    while self.focuser.IsMoving:
-                        time.sleep(0.1)
+                    self.wait_for_focuser()
                     logger.info("Focuser stopped.")
                 logger.info("Focuser at postion %i" % self.focuser.Position)
                 return True
@@ -1543,17 +1769,12 @@ class Observatory:
             self.rotator.MoveAbsolute(rotation_angle)
             logger.info("Rotated.")
 
-        condition = wait_for_slew
-        while condition:
-            condition = self.telescope.Slewing
-            if control_dome and self.dome is not None:
-                condition = condition or self.dome.Slewing
-            if control_rotator and self.rotator is not None:
-                condition = condition or self.rotator.IsMoving
-            time.sleep(0.1)
-        else:
-            logger.info("Settling for %.2f seconds..." % self.settle_time)
-            time.sleep(self.settle_time)
+        if wait_for_slew:
+            self.wait_for_slew(
+                control_dome=control_dome, control_rotator=control_rotator
+            )
+        logger.info("Settling for %.2f seconds..." % self.settle_time)
+        time.sleep(self.settle_time)
 
         return True
 
@@ -1761,14 +1982,57 @@ class Observatory:
         self,
         exposure=3,
         midpoint=0,
-        nsteps=5,
+        nsteps=3,
         step_size=500,
         use_current_pointing=False,
         save_images=False,
         save_path=None,
         binning=2,  # HOTFIX for 6200
+        max_exposures=10,
+        tolerance=None,
+        backlash=0,
     ):
-        """Runs the autofocus routine"""
+        """Runs the autofocus routine
+
+        If an autofocus driver is configured, its routine is run. Otherwise,
+        the best focus position is found by `VCurveAutofocus` from the median
+        half-flux diameter of the stars, measured on each image in memory.
+
+        Parameters
+        ----------
+        exposure : `float`, default : 3, optional
+            Exposure time of the images in seconds.
+        midpoint : `int`, default : 0, optional
+            Starting position of the search. Relative focusers start from
+            their current position.
+        nsteps : `int`, default : 3, optional
+            Number of the first positions measured, `step_size` apart and
+            centered on `midpoint`.
+        step_size : `int`, default : 500, optional
+            Spacing of the first positions in focuser steps.
+        use_current_pointing : `bool`, default : `False`, optional
+            Whether to focus at the current pointing instead of the zenith.
+        save_images : `bool`, default : `False`, optional
+            Whether to save the images.
+        save_path : `str` or `~pathlib.Path`, optional
+            Directory of the saved images, by default a new directory in
+            images/autofocus of the working directory.
+        binning : `int`, default : 2, optional
+            Binning of the images.
+        max_exposures : `int`, default : 10, optional
+            Maximum number of images.
+        tolerance : `float`, optional
+            Uncertainty of the best focus position at which the search stops,
+            in focuser steps. Default is a tenth of `step_size`.
+        backlash : `int`, default : 0, optional
+            Backlash of the focuser in steps. Positions are approached from
+            below, moving `backlash` steps further first if needed.
+
+        Returns
+        -------
+        `float` or `None`
+            The best focus position, or `None` if no stars were measured.
+        """
 
         if self.autofocus is not None:
             logger.info("Using %s to run autofocus..." % self.autofocus_driver)
@@ -1796,144 +2060,70 @@ class Observatory:
 
             logger.info("Starting autofocus routine...")
 
-            test_positions = np.linspace(
-                midpoint - step_size * (nsteps // 2),
-                midpoint + step_size * (nsteps // 2),
-                nsteps,
-                endpoint=True,
-            )
-            test_positions = test_positions.astype(int)
-
             autofocus_time = self.observatory_time.isot.replace(":", "-")
-
-            if save_path is None:
-                save_path = Path(
-                    os.getcwd(), "images", "autofocus", f"{autofocus_time}"
-                ).resolve()
-
-            focus_values = []
-            for i, position in enumerate(test_positions):
-                logger.info("Moving focuser to %s..." % position)
-                if self.focuser.Absolute:
+            if not save_images:
+                # MaxIm DL still saves the images itself
+                save_path = Path(tempfile.gettempdir(), f"{autofocus_time}")
+            elif save_path is None:
+                save_path = Path(os.getcwd(), "images", "autofocus", f"{autofocus_time}")
+            save_path = Path(save_path).resolve()
+            save_path.mkdir(parents=True, exist_ok=True)
+
+            # Relative focusers are moved by the difference to the last
+            # position, counted from their starting position
+            absolute = self.focuser.Absolute
+            if not absolute:
+                midpoint = 0
+            current = 0
+
+            def move(position):
+                nonlocal current
+                if absolute:
                     self.focuser.Move(int(position))
-                    while self.focuser.IsMoving:
-                        time.sleep(0.1)
-                elif i == 0:
-                    self.focuser.Move(-int(position[0]))
-                    while self.focuser.IsMoving:
-                        time.sleep(0.1)
                 else:
-                    self.focuser.Move(int(step_size))
-                    while self.focuser.IsMoving:
-                        time.sleep(0.1)
-                logger.info("Focuser moved.")
+                    self.focuser.Move(int(position - current))
+                current = position
+                self.wait_for_focuser()
 
-                # Set binning
-                self.camera.BinX = binning
+            self.camera.BinX = binning
 
+            def measure():
                 logger.info("Taking %s second exposure..." % exposure)
                 self.camera.StartExposure(exposure, True)
-                while not self.camera.ImageReady:
-                    time.sleep(0.1)
-                logger.info("Exposure complete.")
-
-                logger.info("Calculating mean star fwhm...")
-                if not save_images:
-                    save_path = Path(
-                        tempfile.gettempdir(), f"{autofocus_time}"
-                    ).resolve()
-                if not save_path.exists():
-                    save_path.mkdir(parents=True)
-                fname = save_path / f"FOCUS{int(position)}.fit"
-
-                self.save_last_image(fname, frametyp="Focus", overwrite=True)
-
-                # Removed for hotfix for PlateSolve2
-                # cat = detect_sources_photutils(
-                #     fname,
-                #     threshold=100,
-                #     deblend=False,
-                #     tbl_save_path=Path(str(fname).replace(".fts", ".ecsv")),
-                # )
-                # focus_values.append(np.mean(cat.fwhm.value))
-                # logger.info("FWHM = %.1f pixels" % focus_values[-1])
-
-            # fit hyperbola to focus values
-
-            # Removed for hotfix for PlateSolve2
-            # popt, pcov = curve_fit(
-            #     lambda x, x0, a, b, c: a / b * np.sqrt(b**2 + (x - x0) ** 2) + c,
-            #     test_positions,
-            #     focus_values,
-            #     p0=[midpoint, 1, 1, 0],
-            #     bounds=(
-            #         [midpoint - n_steps * step_size, 0, 0, -1e6],
-            #         [midpoint + n_steps * step_size, 1e6, 1e6, 1e6],
-            #     ),
-            # )
-            #
-            # result = popt[0]
-            # result_err = np.sqrt(np.diag(pcov))[0]
-
-            # Run platesolve 2 from cmd line
-            platesolve2_path = Path(
-                r"C:\Program Files (x86)\PlaneWave Instruments\PlaneWave Interface 4\PlateSolve2\PlateSolve2.exe"
-            ).resolve()
-            # print(platesolve2_path)
-            results_path = Path(save_path / "results.txt").resolve()
-            # print(f"Results path: {results_path}")
-            image_path = glob.glob(str(save_path / "*.fit"))[0]
-            # print(f"Image path: {image_path}")
-            logger.info("Running PlateSolve2...")
-            procid = os.spawnv(
-                os.P_NOWAIT,
-                platesolve2_path,
-                [f'"{platesolve2_path}" {image_path},{results_path},180'],
+                self.wait_for_image(exposure)
+                fname = save_path / f"FOCUS{int(current)}.fit"
+                hdu = self.read_last_image(fname, frametyp="Focus")
+                if hdu is None:
+                    logger.warning("No image available at this position.")
+                    return np.nan
+
+                # The box fits moderately defocused stars
+                value = median_hfd(hdu.data, box_size=31)
+                logger.info("HFD = %.1f pixels" % value)
+
+                if save_images:
+                    self.write_image(hdu, fname, overwrite=True)
+                return value
+
+            autofocus = VCurveAutofocus(
+                move,
+                measure,
+                step_size,
+                tolerance=tolerance,
+                max_exposures=max_exposures,
+                backlash=backlash,
+                min_position=0 if absolute else None,
+                max_position=self.focuser.MaxStep if absolute else None,
             )
+            result = autofocus.run(midpoint, nsteps=nsteps)
 
-            while results_path.exists() == False:
-                time.sleep(0.1)
-            # Read results
-            with open(results_path, "r") as f:
-                results = f.read()
-            while results == "":
-                time.sleep(0.1)
-                with open(results_path, "r") as f:
-                    results = f.read()
-
-            print(f"Results path: {results_path}")
-            print(results)
-            results = results.split(",")
-            # Remove whitespace
-            results = [x.strip() for x in results]
-            print(results)
-            result, fwhm, result_err = (
-                float(results[0]),
-                float(results[1]),
-                float(results[2]),
-            )
-            print(f"Best focus: {result}")
-            print(f"FWHM: {fwhm}")
-            print(f"Focus error: {result_err}")
-
-            logger.info(f"Best focus position is {result} +/- {result_err}")
-
-            if result < test_positions[0] or result > test_positions[-1]:
-                logger.warning("Best focus position is outside the test range.")
-                logger.warning(
-                    "Using the midpoint of the test range as the best focus position."
-                )
-                result = midpoint
+            if result is None:
+                logger.warning("Autofocus failed, moving focuser back to the midpoint...")
+                autofocus.move(midpoint)
+                return None
 
             logger.info("Moving focuser to best focus position...")
-            if self.focuser.Absolute:
-                self.focuser.Move(int(result))
-                while self.focuser.IsMoving:
-                    time.sleep(0.1)
-            else:
-                self.focuser.Move(int(test_positions[-1] - result))
-                while self.focuser.IsMoving:
-                    time.sleep(0.1)
+            autofocus.move(int(round(result)))
             logger.info("Focuser moved.")
             logger.info("Autofocus routine complete.")
 
@@ -1999,7 +2189,7 @@ class Observatory:
         save_path="./",
         settle_time=5,
         do_initial_slew=True,
-        solver="astrometry_net_wcs",  # or "maxim_pinpoint_wcs"
+        solver="astrometry_net_wcs",  # or "local_wcs" or "maxim_pinpoint_wcs"
     ):
         """Attempts to place the requested right ascension and declination at the requested pixel location
         on the detector.
@@ -2049,6 +2239,10 @@ class Observatory:
         do_initial_slew : `bool`, optional
             Whether or not to do the initial slew to the target. Default is `True`. If `False`, the current
             telescope position will be used as the starting point for the centering routine.
+        solver : `str`, optional
+            The WCS solver, `astrometry_net_wcs`, `local_wcs` or `maxim_pinpoint_wcs`. Default is
+            `astrometry_net_wcs`. `local_wcs` solves offline against a local star index, using the target
+            position and the pixel scale as hints.
 
         Returns
         -------
@@ -2120,8 +2314,7 @@ class Observatory:
             self.camera.ReadoutMode = readout
             self.camera.BinX = binning
             self.camera.StartExposure(exposure, True)
-            while not self.camera.ImageReady:
-                time.sleep(0.1)
+            self.wait_for_image(exposure)
             logger.info("Exposure complete")
 
             temp_image = Path(
@@ -2154,6 +2347,15 @@ class Observatory:
                     # crpix_center=True,
                     # solve_timeout=300,
                 )
+            elif solver.lower() == "local_wcs":
+                from ..reduction import local_wcs
+
+                solution_found = local_wcs(
+                    temp_image,
+                    ra=slew_obj.ra.deg,
+                    dec=slew_obj.dec.deg,
+                    scale=self.pixel_scale[0] * binning,
+                )
             elif solver.lower() == "maxim_pinpoint_wcs":
                 from ..reduction import maxim_pinpoint_wcs
 
@@ -2253,8 +2455,23 @@ class Observatory:
         tracking=True,
         dither_radius=0,  # arcseconds
         final_telescope_position="no change",
+        counts_tolerance=0.25,
+        min_exposure=1,
+        max_exposure=60,
+        bias_level=0,
     ):
-        """Takes a sequence of flat frames"""
+        """Takes a sequence of flat frames
+
+        If `target_counts` is given, the exposure times after the first flat
+        of each sequence are predicted by `SkyFlatExposure` from the median
+        counts of the previous flats and, for sky flats, the altitude of the
+        Sun. Flats whose counts are not within `counts_tolerance` of
+        `target_counts` are discarded, and no flat is taken while the
+        predicted exposure time is not between `min_exposure` and
+        `max_exposure` seconds: the routine waits for the sky, or skips the
+        remaining flats of the sequence if the sky is getting further from
+        the target.
+        """
 
         logger.info("Taking flat frames")
 
@@ -2309,8 +2526,7 @@ class Observatory:
                 )
             )
             self.telescope.SlewToCoordinates(obj.ra.hour, obj.dec.deg)
-        while self.telescope.Slewing:
-            time.sleep(0.1)
+        self.wait_for_slew()
         logger.info("Slew complete")
 
         dither_center = self.get_current_object()
@@ -2337,6 +2553,15 @@ class Observatory:
             self.camera.Gain = gain
             logger.info("Camera gain set")
 
+        sky_flats = self.cover_calibrator is None or type(filter_brightness) is not list
+
+        def sun_altitude():
+            # Altitude of the Sun and its change per second
+            now = self.observatory_time
+            altitude = float(self.sun_altaz(now)[0])
+            later = float(self.sun_altaz(now + 60 * u.s)[0])
+            return altitude, (later - altitude) / 60
+
         for filt, filt_exp, idx in zip(filters, filter_exposures, range(len(filters))):
 
             # skip filters with 0 exposure time
@@ -2346,8 +2571,7 @@ class Observatory:
             # set filter wheel position
             logger.info("Setting the filter wheel to %s" % filt)
             self.filter_wheel.Position = self.filters.index(filt)
-            while self.filter_wheel.Position != self.filters.index(filt):
-                time.sleep(0.1)
+            self.wait_for_filter_wheel(self.filters.index(filt))
             logger.info("Filter wheel in position")
 
             # set cover calibrator brightness
@@ -2379,7 +2603,44 @@ class Observatory:
                         iter_save_path.mkdir()
 
                     real_exp = filt_exp
-                    for j in tqdm.tqdm(range(repeat)):
+                    controller = None
+                    if target_counts is not None:
+                        # The brightness of a calibrator panel is constant
+                        controller = SkyFlatExposure(
+                            target_counts,
+                            tolerance=counts_tolerance,
+                            min_exposure=min_exposure,
+                            max_exposure=max_exposure,
+                            bias_level=bias_level,
+                            slope=0.4 if sky_flats else 0,
+                            slope_weight=1 if sky_flats else 1e6,
+                        )
+
+                    progress = tqdm.tqdm(total=repeat)
+                    j = 0
+                    attempts = 0
+                    while j < repeat and attempts < 3 * repeat:
+                        if controller is not None and controller.frames > 0:
+                            altitude, altitude_rate = sun_altitude()
+                            wait = controller.wait_time(altitude, altitude_rate)
+                            if wait is None or wait > 3600:
+                                logger.warning(
+                                    "Flats would be outside of the counts window, skipping the remaining %i flats"
+                                    % (repeat - j)
+                                )
+                                break
+                            if wait > 0:
+                                logger.info(
+                                    "Waiting %i seconds for the sky brightness to reach the counts window"
+                                    % wait
+                                )
+                                time.sleep(min(wait, 60))
+                                continue
+                            real_exp = round(
+                                controller.exposure(altitude, altitude_rate), 3
+                            )
+                            logger.info("Predicted exposure time: %.3f" % real_exp)
+
                         if (
                             self.camera.CanSetCCDTemperature
                             and self.cooler_setpoint is not None
@@ -2395,10 +2656,7 @@ class Observatory:
                         if self.filter_wheel.Position != self.filters.index(filt):
                             logger.info("Setting the filter wheel to %s" % filt)
                             self.filter_wheel.Position = self.filters.index(filt)
-                            while self.filter_wheel.Position != self.filters.index(
-                                filt
-                            ):
-                                time.sleep(0.1)
+                            self.wait_for_filter_wheel(self.filters.index(filt))
                             logger.info("Filter wheel in position")
 
                         if dither_radius > 0:
@@ -2409,7 +2667,10 @@ class Observatory:
                             )
 
                         logger.info("Starting %s exposure" % real_exp)
+                        if controller is not None:
+                            altitude, altitude_rate = sun_altitude()
                         self.camera.StartExposure(real_exp, True)
+                        attempts += 1
 
                         iter_save_name = iter_save_path / (
                             f"flat_{filt}_{self.camera.BinX}x{self.camera.BinY}_Readout{self.camera.ReadoutMode}"
@@ -2424,34 +2685,35 @@ class Observatory:
                             )
                         else:
                             iter_save_name = Path((str(iter_save_name) + f"_{j}.fts"))
-                        while not self.camera.ImageReady:
-                            time.sleep(1)
-
-                        self.save_last_image(
-                            iter_save_name, frametyp="Flat", overwrite=True
-                        )
-                        logger.info("Flat %i of %i complete" % (j + 1, repeat))
-                        logger.info("Saved flat frame to %s" % iter_save_name)
-
-                        if target_counts is not None:
-                            logger.info(
-                                "Adjusting exposure time to match mean counts to target"
+                        self.wait_for_image(real_exp)
+
+                        # The counts are measured on the downloaded image
+                        hdu = self.read_last_image(iter_save_name, frametyp="Flat")
+                        if hdu is None:
+                            logger.warning("No image available, retrying")
+                            continue
+
+                        if controller is not None:
+                            counts = controller.statistic(hdu.data)
+                            logger.info("Mean counts: %i" % counts)
+                            controller.record(
+                                real_exp, counts, altitude, altitude_rate
                             )
-
-                            # get the mean counts
-                            mean_counts = np.mean(self.camera.ImageArray)
-                            logger.info("Mean counts: %i" % mean_counts)
-
-                            # calculate the new exposure time
-                            m_ratio = target_counts / mean_counts
-                            logger.info(
-                                "Ratio of desired brightness to mean counts: %.2f"
-                                % m_ratio
-                            )
-                            real_exp = real_exp * m_ratio
-                            logger.info("New exposure time: %.2f" % real_exp)
-                        else:
-                            real_exp = filt_exp
+                            if not controller.accept(counts):
+                                logger.warning(
+                                    "Counts are outside of the counts window, discarding the flat"
+                                )
+                                with contextlib.suppress(OSError):
+                                    # MaxIm DL saves the image itself
+                                    iter_save_name.unlink(missing_ok=True)
+                                continue
+
+                        self.write_image(hdu, iter_save_name, overwrite=True)
+                        j += 1
+                        progress.update(1)
+                        logger.info("Flat %i of %i complete" % (j, repeat))
+                        logger.info("Saved flat frame to %s" % iter_save_name)
+                    progress.close()
 
         if self.cover_calibrator is not None:
             if (
@@ -2498,8 +2760,20 @@ class Observatory:
         repeat=1,
         save_path="./",
         frametyp="Dark",
+        skip_existing=False,
     ):
-        """Takes a sequence of dark frames"""
+        """Takes a sequence of dark frames
+
+        The frames are ordered by `plan_calibration_set` so that each readout
+        mode and binning is set once, and each frame is written to disk while
+        the next one is exposed. Frames of 0 seconds are bias frames.
+
+        Parameters
+        ----------
+        skip_existing : `bool`, default : `False`, optional
+            Whether to skip the frames already in `save_path`, to resume an
+            interrupted sequence.
+        """
 
         save_path = Path(save_path)
 
@@ -2510,65 +2784,77 @@ class Observatory:
             self.camera.Gain = gain
             logger.info("Camera gain set")
 
-        for exposure in exposures:
-            for readout in readouts:
-                if readout is not None:
-                    self.camera.ReadoutMode = readout
-                for binning in binnings:
-                    if binning is not None:
-                        self.camera.BinX = binning.split("x")[0]
-                        self.camera.BinY = binning.split("x")[1]
-                    iter_save_path = save_path / (
-                        f"darks_{self.camera.BinX}x{self.camera.BinY}_Readout{self.camera.ReadoutMode}"
-                        + f"_{exposure}s"
-                    ).replace(".", "p").replace(" ", "")
-                    if exposure == 0:
-                        iter_save_path = save_path / (
-                            f"biases_{self.camera.BinX}x{self.camera.BinY}_Readout{self.camera.ReadoutMode}"
-                            + f"_{exposure}s"
-                        ).replace(".", "p").replace(" ", "")
-                    if not iter_save_path.exists():
-                        iter_save_path.mkdir()
-                    for j in tqdm.tqdm(range(repeat)):
-                        if (
-                            self.camera.CanSetCCDTemperature
-                            and self.cooler_setpoint is not None
+        # Unspecified modes are the current ones
+        readouts = [
+            self.camera.ReadoutMode if readout is None else readout
+            for readout in readouts or [None]
+        ]
+        binnings = [
+            f"{self.camera.BinX}x{self.camera.BinY}" if binning is None else binning
+            for binning in binnings or [None]
+        ]
+        frames = plan_calibration_set(
+            save_path,
+            exposures,
+            readouts,
+            binnings,
+            repeat=repeat,
+            frametyp=frametyp,
+            skip_existing=skip_existing,
+        )
+
+        mode = None
+        group = None
+        writing = None
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="take_darks"
+        ) as writer:
+            for frame in tqdm.tqdm(frames):
+                if (frame.readout, frame.binning) != mode:
+                    mode = (frame.readout, frame.binning)
+                    logger.info(
+                        "Setting readout mode %s and binning %s" % mode
+                    )
+                    self.camera.ReadoutMode = frame.readout
+                    self.camera.BinX = frame.binning.split("x")[0]
+                    self.camera.BinY = frame.binning.split("x")[1]
+
+                # The cooler is checked when the mode or exposure changes
+                if (mode, frame.exposure) != group:
+                    group = (mode, frame.exposure)
+                    frame.path.parent.mkdir(parents=True, exist_ok=True)
+                    if (
+                        self.camera.CanSetCCDTemperature
+                        and self.cooler_setpoint is not None
+                    ):
+                        while self.camera.CCDTemperature > (
+                            self.cooler_setpoint + self.cooler_tolerance
                         ):
-                            while self.camera.CCDTemperature > (
-                                self.cooler_setpoint + self.cooler_tolerance
-                            ):
-                                logger.warning(
-                                    "Cooler is not at setpoint, waiting 10 seconds..."
-                                )
-                                time.sleep(10)
-                        logger.info("Starting %4.4gs dark exposure" % exposure)
-                        self.camera.StartExposure(exposure, False)
-                        iter_save_name = iter_save_path / (
-                            (
-                                f"dark_{self.camera.BinX}x{self.camera.BinY}_Readout{self.camera.ReadoutMode}"
-                                + f"_{exposure}s_{j}"
+                            logger.warning(
+                                "Cooler is not at setpoint, waiting 10 seconds..."
                             )
-                            .replace(".", "p")
-                            .replace(" ", "")
-                            + ".fts"
-                        )
-                        if exposure == 0:
-                            iter_save_name = iter_save_path / (
-                                (
-                                    f"bias_{self.camera.BinX}x{self.camera.BinY}_Readout{self.camera.ReadoutMode}"
-                                    + f"_{exposure}s_{j}"
-                                )
-                                .replace(".", "p")
-                                .replace(" ", "")
-                                + ".fts"
-                            )
-                        while not self.camera.ImageReady:
-                            time.sleep(0.1)
-                        self.save_last_image(
-                            iter_save_name, frametyp=frametyp, overwrite=True
-                        )
-                        logger.info("%i of %i complete" % (j, repeat))
-                        logger.info("Saved dark frame to %s" % iter_save_name)
+                            time.sleep(10)
+
+                logger.info("Starting %4.4gs dark exposure" % frame.exposure)
+                self.camera.StartExposure(frame.exposure, False)
+                self.wait_for_image(frame.exposure)
+                hdu = self.read_last_image(frame.path, frametyp=frame.frametyp)
+                if hdu is None:
+                    logger.warning("No image available for %s" % frame.path)
+                    continue
+
+                # At most one frame is written while the next one exposes
+                if writing is not None:
+                    writing.result()
+                writing = writer.submit(
+                    self.write_image, hdu, frame.path, overwrite=True
+                )
+                logger.info(
+                    "%i of %i complete" % (frame.index + 1, repeat)
+                )
+                logger.info("Saving dark frame to %s" % frame.path)
+            if writing is not None:
+                writing.result()
 
         logger.info("Darks complete")
 
@@ -2695,15 +2981,16 @@ class Observatory:
     @property
     def camera_info(self):
         logger.debug("Observatory.camera_info() called")
+        camera = self._snapshot(self.camera)
         try:
-            self.camera.Connected = True
+            camera.Connected = True
         except:
             return {"CONNECT": (False, "Camera connection")}
         info = {
             "CAMCON": (True, "Camera connection"),
-            "CAMREADY": (self.camera.ImageReady, "Image ready"),
+            "CAMREADY": (camera.ImageReady, "Image ready"),
             "CAMSTATE": (
-                self.camera.CameraState,
+                camera.CameraState,
                 "Camera state",
             ),
             "PCNTCOMP": (None, "Function percent completed"),
@@ -2715,12 +3002,12 @@ class Observatory:
             "EXPTIME": (None, "Exposure time [seconds]"),
             "EXPOSURE": (None, "Exposure time [seconds]"),
             "SUBEXP": (None, "Subexposure time [seconds]"),
-            "XBINNING": (self.camera.BinX, "Image binning factor in width"),
-            "YBINNING": (self.camera.BinY, "Image binning factor in height"),
-            "XORGSUBF": (self.camera.StartX, "Subframe X position"),
-            "YORGSUBF": (self.camera.StartY, "Subframe Y position"),
-            "XPOSSUBF": (self.camera.NumX, "Subframe X dimension"),
-            "YPOSSUBF": (self.camera.NumY, "Subframe Y dimension"),
+            "XBINNING": (camera.BinX, "Image binning factor in width"),
+            "YBINNING": (camera.BinY, "Image binning factor in height"),
+            "XORGSUBF": (camera.StartX, "Subframe X position"),
+            "YORGSUBF": (camera.StartY, "Subframe Y position"),
+            "XPOSSUBF": (camera.NumX, "Subframe X dimension"),
+            "YPOSSUBF": (camera.NumY, "Subframe Y dimension"),
             "READOUT": (None, "Image readout mode"),
             "READOUTM": (None, "Image readout mode"),
             "FASTREAD": (None, "Fast readout mode"),
@@ -2737,23 +3024,23 @@ class Observatory:
             "SET-TEMP": (None, "Camera temperature setpoint [C]"),
             "CCD-TEMP": (None, "Camera temperature [C]"),
             "CMOS-TMP": (None, "Camera temperature [C]"),
-            "CAMNAME": (self.camera.Name, "Name of camera"),
-            "CAMERA": (self.camera.Name, "Name of camera"),
-            "CAMDRVER": (self.camera.DriverVersion, "Camera driver version"),
-            "CAMDRV": (self.camera.DriverInfo[0], "Camera driver info"),
+            "CAMNAME": (camera.Name, "Name of camera"),
+            "CAMERA": (camera.Name, "Name of camera"),
+            "CAMDRVER": (camera.DriverVersion, "Camera driver version"),
+            "CAMDRV": (camera.DriverInfo[0], "Camera driver info"),
             "CAMINTF": (None, "Camera interface version"),
-            "CAMDESC": (self.camera.Description, "Camera description"),
+            "CAMDESC": (camera.Description, "Camera description"),
             "SENSOR": (None, "Name of sensor"),
-            "WIDTH": (self.camera.CameraXSize, "Width of sensor in pixels"),
-            "HEIGHT": (self.camera.CameraYSize, "Height of sensor in pixels"),
-            "XPIXSIZE": (self.camera.PixelSizeX, "Pixel width in microns"),
-            "YPIXSIZE": (self.camera.PixelSizeY, "Pixel height in microns"),
+            "WIDTH": (camera.CameraXSize, "Width of sensor in pixels"),
+            "HEIGHT": (camera.CameraYSize, "Height of sensor in pixels"),
+            "XPIXSIZE": (camera.PixelSizeX, "Pixel width in microns"),
+            "YPIXSIZE": (camera.PixelSizeY, "Pixel height in microns"),
             "MECHSHTR": (
-                self.camera.HasShutter,
+                camera.HasShutter,
                 "Whether a camera mechanical shutter is present",
             ),
             "ISSHUTTR": (
-                self.camera.HasShutter,
+                camera.HasShutter,
                 "Whether a camera mechanical shutter is present",
             ),
             "MINEXP": (None, "Minimum exposure time [seconds]"),
@@ -2762,17 +3049,17 @@ class Observatory:
                 None,
                 "Exposure time resolution [seconds]",
             ),
-            "MAXBINSX": (self.camera.MaxBinX, "Maximum binning factor in width"),
-            "MAXBINSY": (self.camera.MaxBinY, "Maximum binning factor in height"),
-            "CANASBIN": (self.camera.CanAsymmetricBin, "Can asymmetric bin"),
-            "CANABRT": (self.camera.CanAbortExposure, "Can abort exposures"),
-            "CANSTP": (self.camera.CanStopExposure, "Can stop exposures"),
-            "CANCOOLP": (self.camera.CanGetCoolerPower, "Can get cooler power"),
+            "MAXBINSX": (camera.MaxBinX, "Maximum binning factor in width"),
+            "MAXBINSY": (camera.MaxBinY, "Maximum binning factor in height"),
+            "CANASBIN": (camera.CanAsymmetricBin, "Can asymmetric bin"),
+            "CANABRT": (camera.CanAbortExposure, "Can abort exposures"),
+            "CANSTP": (camera.CanStopExposure, "Can stop exposures"),
+            "CANCOOLP": (camera.CanGetCoolerPower, "Can get cooler power"),
             "CANSETTE": (
-                self.camera.CanSetCCDTemperature,
+                camera.CanSetCCDTemperature,
                 "Can camera set temperature",
             ),
-            "CANPULSE": (self.camera.CanPulseGuide, "Can camera pulse guide"),
+            "CANPULSE": (camera.CanPulseGuide, "Can camera pulse guide"),
             "FULLWELL": (None, "Full well capacity [e-]"),
             "MAXADU": (None, "Camera maximum ADU value possible"),
             "E-ADU": (None, "Gain [e- per ADU]"),
@@ -2788,147 +3075,147 @@ class Observatory:
             "CAMSUPAC": (None, "Camera supported actions"),
         }
         try:
-            info["PCNTCOMP"] = (self.camera.PercentCompleted, info["PCNTCOMP"][1])
+            info["PCNTCOMP"] = (camera.PercentCompleted, info["PCNTCOMP"][1])
         except:
             pass
         try:
-            info["DATE-OBS"] = (self.camera.LastExposureStartTime, info["DATE-OBS"][1])
+            info["DATE-OBS"] = (camera.LastExposureStartTime, info["DATE-OBS"][1])
             info["JD"] = (
-                astrotime.Time(self.camera.LastExposureStartTime).jd,
+                astrotime.Time(camera.LastExposureStartTime).jd,
                 info["JD"][1],
             )
             info["MJD"] = (
-                astrotime.Time(self.camera.LastExposureStartTime).mjd,
+                astrotime.Time(camera.LastExposureStartTime).mjd,
                 info["MJD"][1],
             )
             info["MJD-OBS"] = (
-                astrotime.Time(self.camera.LastExposureStartTime).mjd,
+                astrotime.Time(camera.LastExposureStartTime).mjd,
                 info["MJD-OBS"][1],
             )
         except:
             pass
         try:
-            last_exposure_duration = self.camera.LastExposureDuration
+            last_exposure_duration = camera.LastExposureDuration
             info["EXPTIME"] = (last_exposure_duration, info["EXPTIME"][1])
             info["EXPOSURE"] = (last_exposure_duration, info["EXPOSURE"][1])
         except:
             logger.debug("Could not get last exposure duration")
             pass
         try:
-            info["CAMTIME"] = (self.camera.CameraTime, info["CAMTIME"][1])
+            info["CAMTIME"] = (camera.CameraTime, info["CAMTIME"][1])
         except:
             pass
         try:
-            info["SUBEXP"] = (self.camera.SubExposureDuration, info["SUBEXP"][1])
+            info["SUBEXP"] = (camera.SubExposureDuration, info["SUBEXP"][1])
         except:
             pass
-        info["CANFASTR"] = (self.camera.CanFastReadout, info["CANFASTR"][1])
-        if self.camera.CanFastReadout:
+        info["CANFASTR"] = (camera.CanFastReadout, info["CANFASTR"][1])
+        if camera.CanFastReadout:
             info["READOUT"] = (
-                self.camera.ReadoutModes[self.camera.ReadoutMode],
+                camera.ReadoutModes[camera.ReadoutMode],
                 info["READOUT"][1],
             )
             info["READOUTM"] = (
-                self.camera.ReadoutModes[self.camera.ReadoutMode],
+                camera.ReadoutModes[camera.ReadoutMode],
                 info["READOUTM"][1],
             )
-            info["FASTREAD"] = (self.camera.FastReadout, info["FASTREAD"][1])
-            info["READMDS"] = (self.camera.ReadoutModes, info["READMDS"][1])
+            info["FASTREAD"] = (camera.FastReadout, info["FASTREAD"][1])
+            info["READMDS"] = (camera.ReadoutModes, info["READMDS"][1])
             info["SENSTYP"] = (
                 [
                     "Monochrome, Color, \
                 RGGB, CMYG, CMYG2, LRGB"
-                ][self.camera.SensorType],
+                ][camera.SensorType],
                 info["SENSTYP"][1],
             )
-            if not self.camera.SensorType in (0, 1):
-                info["BAYERPAT"] = (self.camera.SensorType, info["BAYERPAT"][1])
-                info["BAYOFFX"] = (self.camera.BayerOffsetX, info["BAYOFFX"][1])
-                info["BAYOFFY"] = (self.camera.BayerOffsetY, info["BAYOFFY"][1])
+            if not camera.SensorType in (0, 1):
+                info["BAYERPAT"] = (camera.SensorType, info["BAYERPAT"][1])
+                info["BAYOFFX"] = (camera.BayerOffsetX, info["BAYOFFX"][1])
+                info["BAYOFFY"] = (camera.BayerOffsetY, info["BAYOFFY"][1])
         try:
-            info["HSINKT"] = (self.camera.HeatSinkTemperature, info["HSINKT"][1])
+            info["HSINKT"] = (camera.HeatSinkTemperature, info["HSINKT"][1])
         except:
             pass
         try:
-            info["GAINS"] = (self.camera.Gains, info["GAINS"][1])
-            info["GAIN"] = (self.camera.Gains[self.camera.Gain], info["GAIN"][1])
+            info["GAINS"] = (camera.Gains, info["GAINS"][1])
+            info["GAIN"] = (camera.Gains[camera.Gain], info["GAIN"][1])
         except:
             try:
-                info["GAINMIN"] = (self.camera.GainMin, info["GAINMIN"][1])
-                info["GAINMAX"] = (self.camera.GainMax, info["GAINMAX"][1])
-                info["GAIN"] = (self.camera.Gain, info["GAIN"][1])
+                info["GAINMIN"] = (camera.GainMin, info["GAINMIN"][1])
+                info["GAINMAX"] = (camera.GainMax, info["GAINMAX"][1])
+                info["GAIN"] = (camera.Gain, info["GAIN"][1])
             except:
                 pass
         try:
-            info["OFFSETS"] = (self.camera.Offsets, info["OFFSETS"][1])
+            info["OFFSETS"] = (camera.Offsets, info["OFFSETS"][1])
             info["OFFSET"] = (
-                self.camera.Offsets[self.camera.Offset],
+                camera.Offsets[camera.Offset],
                 info["OFFSET"][1],
             )
         except:
             try:
-                info["OFFSETMN"] = (self.camera.OffsetMin, info["OFFSETMN"][1])
-                info["OFFSETMX"] = (self.camera.OffsetMax, info["OFFSETMX"][1])
-                info["OFFSET"] = (self.camera.Offset, info["OFFSET"][1])
+                info["OFFSETMN"] = (camera.OffsetMin, info["OFFSETMN"][1])
+                info["OFFSETMX"] = (camera.OffsetMax, info["OFFSETMX"][1])
+                info["OFFSET"] = (camera.Offset, info["OFFSET"][1])
             except:
                 pass
-        info["CANPULSE"] = (self.camera.CanPulseGuide, info["CANPULSE"][1])
-        if self.camera.CanPulseGuide:
-            info["PULSGUID"] = (self.camera.IsPulseGuiding, info["PULSGUID"][1])
+        info["CANPULSE"] = (camera.CanPulseGuide, info["CANPULSE"][1])
+        if camera.CanPulseGuide:
+            info["PULSGUID"] = (camera.IsPulseGuiding, info["PULSGUID"][1])
         try:
-            info["COOLERON"] = (self.camera.CoolerOn, info["COOLERON"][1])
+            info["COOLERON"] = (camera.CoolerOn, info["COOLERON"][1])
         except:
             pass
-        info["CANCOOLP"] = (self.camera.CanGetCoolerPower, info["CANCOOLP"][1])
-        if self.camera.CanGetCoolerPower:
-            info["COOLPOWR"] = (self.camera.CoolerPower, info["COOLPOWR"][1])
-        info["CANSETTE"] = (self.camera.CanSetCCDTemperature, info["CANSETTE"][1])
-        if self.camera.CanSetCCDTemperature:
-            info["SET-TEMP"] = (self.camera.SetCCDTemperature, info["SET-TEMP"][1])
+        info["CANCOOLP"] = (camera.CanGetCoolerPower, info["CANCOOLP"][1])
+        if camera.CanGetCoolerPower:
+            info["COOLPOWR"] = (camera.CoolerPower, info["COOLPOWR"][1])
+        info["CANSETTE"] = (camera.CanSetCCDTemperature, info["CANSETTE"][1])
+        if camera.CanSetCCDTemperature:
+            info["SET-TEMP"] = (camera.SetCCDTemperature, info["SET-TEMP"][1])
         try:
-            info["CCD-TEMP"] = (self.camera.CCDTemperature, info["CCD-TEMP"][1])
-            info["CMOS-TMP"] = (self.camera.CMOSTemperature, info["CMOS-TMP"][1])
+            info["CCD-TEMP"] = (camera.CCDTemperature, info["CCD-TEMP"][1])
+            info["CMOS-TMP"] = (camera.CMOSTemperature, info["CMOS-TMP"][1])
         except:
             pass
         try:
-            info["CANINTF"] = (self.camera.InterfaceVersion, info["CANINTF"][1])
+            info["CANINTF"] = (camera.InterfaceVersion, info["CANINTF"][1])
         except:
             pass
         try:
-            info["SENSOR"] = (self.camera.SensorName, info["SENSOR"][1])
+            info["SENSOR"] = (camera.SensorName, info["SENSOR"][1])
         except:
             pass
         try:
-            info["MINEXP"] = (self.camera.ExposureMin, info["MINEXP"][1])
-            info["MAXEXP"] = (self.camera.ExposureMax, info["MAXEXP"][1])
+            info["MINEXP"] = (camera.ExposureMin, info["MINEXP"][1])
+            info["MAXEXP"] = (camera.ExposureMax, info["MAXEXP"][1])
         except:
             pass
         try:
-            info["EXPRESL"] = (self.camera.ExposureResolution, info["EXPRESL"][1])
+            info["EXPRESL"] = (camera.ExposureResolution, info["EXPRESL"][1])
         except:
             pass
         try:
-            info["FULLWELL"] = (self.camera.FullWellCapacity, info["FULLWELL"][1])
+            info["FULLWELL"] = (camera.FullWellCapacity, info["FULLWELL"][1])
         except:
             pass
         try:
-            info["MAXADU"] = (self.camera.MaxADU, info["MAXADU"][1])
+            info["MAXADU"] = (camera.MaxADU, info["MAXADU"][1])
         except:
             pass
         try:
-            info["E-ADU"] = (self.camera.ElectronsPerADU, info["E-ADU"][1])
+            info["E-ADU"] = (camera.ElectronsPerADU, info["E-ADU"][1])
         except:
             pass
         try:
-            info["EGAIN"] = (self.camera.Gain, info["EGAIN"][1])
+            info["EGAIN"] = (camera.Gain, info["EGAIN"][1])
         except:
             pass
         try:
-            info["CANFASTR"] = (self.camera.CanFastReadout, info["CANFASTR"][1])
+            info["CANFASTR"] = (camera.CanFastReadout, info["CANFASTR"][1])
         except:
             pass
         try:
-            info["CAMSUPAC"] = (str(self.camera.SupportedActions), info["CAMSUPAC"][1])
+            info["CAMSUPAC"] = (str(camera.SupportedActions), info["CAMSUPAC"][1])
         except:
             pass
 
@@ -2937,45 +3224,46 @@ class Observatory:
     @property
     def cover_calibrator_info(self):
         logger.debug("Observatory.cover_calibrator_info() called")
-        if self.cover_calibrator is not None:
+        cover_calibrator = self._snapshot(self.cover_calibrator)
+        if cover_calibrator is not None:
             try:
-                self.cover_calibrator.Connected = True
+                cover_calibrator.Connected = True
             except:
                 return {"CCALCONN": (False, "Cover calibrator connected")}
             info = {
                 "CCALCONN": (True, "Cover calibrator connected"),
-                "CALSTATE": (self.cover_calibrator.CalibratorState, "Calibrator state"),
-                "COVSTATE": (self.cover_calibrator.CoverState, "Cover state"),
+                "CALSTATE": (cover_calibrator.CalibratorState, "Calibrator state"),
+                "COVSTATE": (cover_calibrator.CoverState, "Cover state"),
                 "BRIGHT": (None, "Brightness of cover calibrator"),
-                # "CCNAME": (self.cover_calibrator.Name, "Cover calibrator name"),
-                # "COVCAL": (self.cover_calibrator.Name, "Cover calibrator name"),
+                # "CCNAME": (cover_calibrator.Name, "Cover calibrator name"),
+                # "COVCAL": (cover_calibrator.Name, "Cover calibrator name"),
                 # "CCDRVER": (
-                #     self.cover_calibrator.DriverVersion,
+                #     cover_calibrator.DriverVersion,
                 #     "Cover calibrator driver version",
                 # ),
                 # "CCDRV": (
-                #     str(self.cover_calibrator.DriverInfo),
+                #     str(cover_calibrator.DriverInfo),
                 #     "Cover calibrator driver info",
                 # ),
                 # "CCINTF": (
-                #     self.cover_calibrator.InterfaceVersion,
+                #     cover_calibrator.InterfaceVersion,
                 #     "Cover calibrator interface version",
                 # ),
                 # "CCDESC": (
-                #     self.cover_calibrator.Description,
+                #     cover_calibrator.Description,
                 #     "Cover calibrator description",
                 # ),
                 # "MAXBRITE": (
-                #     self.cover_calibrator.MaxBrightness,
+                #     cover_calibrator.MaxBrightness,
                 #     "Cover calibrator maximum possible brightness",
                 # ),
                 # "CCSUPAC": (
-                #     str(self.cover_calibrator.SupportedActions),
+                #     str(cover_calibrator.SupportedActions),
                 #     "Cover calibrator supported actions",
                 # ),
             }
             try:
-                info["BRIGHT"] = (self.cover_calibrator.Brightness, info["BRIGHT"][1])
+                info["BRIGHT"] = (cover_calibrator.Brightness, info["BRIGHT"][1])
             except:
                 pass
             return info
@@ -2985,9 +3273,10 @@ class Observatory:
     @property
     def dome_info(self):
         logger.debug("Observatory.dome_info() called")
-        if self.dome is not None:
+        dome = self._snapshot(self.dome)
+        if dome is not None:
             try:
-                self.dome.Connected = True
+                dome.Connected = True
             except:
                 return {"DOMECONN": (False, "Dome connected")}
             info = {
@@ -2995,50 +3284,50 @@ class Observatory:
                 "DOMEALT": (None, "Dome altitude [deg]"),
                 "DOMEAZ": (None, "Dome azimuth [deg]"),
                 "DOMESHUT": (None, "Dome shutter status"),
-                "DOMESLEW": (self.dome.Slewing, "Dome slew status"),
+                "DOMESLEW": (dome.Slewing, "Dome slew status"),
                 "DOMESLAV": (None, "Dome slave status"),
                 "DOMEHOME": (None, "Dome home status"),
                 "DOMEPARK": (None, "Dome park status"),
-                "DOMENAME": (self.dome.Name, "Dome name"),
-                "DOMDRVER": (self.dome.DriverVersion, "Dome driver version"),
-                "DOMEDRV": (str(self.dome.DriverInfo), "Dome driver info"),
-                "DOMEINTF": (self.dome.InterfaceVersion, "Dome interface version"),
-                "DOMEDESC": (self.dome.Description, "Dome description"),
-                "DOMECALT": (self.dome.CanSetAltitude, "Can dome set altitude"),
-                "DOMECAZ": (self.dome.CanSetAzimuth, "Can dome set azimuth"),
-                "DOMECSHT": (self.dome.CanSetShutter, "Can dome set shutter"),
-                "DOMECSLV": (self.dome.CanSlave, "Can dome slave to mount"),
+                "DOMENAME": (dome.Name, "Dome name"),
+                "DOMDRVER": (dome.DriverVersion, "Dome driver version"),
+                "DOMEDRV": (str(dome.DriverInfo), "Dome driver info"),
+                "DOMEINTF": (dome.InterfaceVersion, "Dome interface version"),
+                "DOMEDESC": (dome.Description, "Dome description"),
+                "DOMECALT": (dome.CanSetAltitude, "Can dome set altitude"),
+                "DOMECAZ": (dome.CanSetAzimuth, "Can dome set azimuth"),
+                "DOMECSHT": (dome.CanSetShutter, "Can dome set shutter"),
+                "DOMECSLV": (dome.CanSlave, "Can dome slave to mount"),
                 "DCANSYNC": (
-                    self.dome.CanSyncAzimuth,
+                    dome.CanSyncAzimuth,
                     "Can dome sync to azimuth value",
                 ),
-                "DCANHOME": (self.dome.CanFindHome, "Can dome home"),
-                "DCANPARK": (self.dome.CanPark, "Can dome park"),
-                "DCANSPRK": (self.dome.CanSetPark, "Can dome set park"),
-                "DOMSUPAC": (str(self.dome.SupportedActions), "Dome supported actions"),
+                "DCANHOME": (dome.CanFindHome, "Can dome home"),
+                "DCANPARK": (dome.CanPark, "Can dome park"),
+                "DCANSPRK": (dome.CanSetPark, "Can dome set park"),
+                "DOMSUPAC": (str(dome.SupportedActions), "Dome supported actions"),
             }
             try:
-                info["DOMEALT"] = (self.dome.Altitude, info["DOMEALT"][1])
+                info["DOMEALT"] = (dome.Altitude, info["DOMEALT"][1])
             except:
                 pass
             try:
-                info["DOMEAZ"] = (self.dome.Azimuth, info["DOMEAZ"][1])
+                info["DOMEAZ"] = (dome.Azimuth, info["DOMEAZ"][1])
             except:
                 pass
             try:
-                info["DOMESHUT"] = (self.dome.ShutterStatus, info["DOMESHUT"][1])
+                info["DOMESHUT"] = (dome.ShutterStatus, info["DOMESHUT"][1])
             except:
                 pass
             try:
-                info["DOMESLAV"] = (self.dome.Slaved, info["DOMESLAV"][1])
+                info["DOMESLAV"] = (dome.Slaved, info["DOMESLAV"][1])
             except:
                 pass
             try:
-                info["DOMEHOME"] = (self.dome.AtHome, info["DOMEHOME"][1])
+                info["DOMEHOME"] = (dome.AtHome, info["DOMEHOME"][1])
             except:
                 pass
             try:
-                info["DOMEPARK"] = (self.dome.AtPark, info["DOMEPARK"][1])
+                info["DOMEPARK"] = (dome.AtPark, info["DOMEPARK"][1])
             except:
                 pass
             return info
@@ -3048,27 +3337,28 @@ class Observatory:
     @property
     def filter_wheel_info(self):
         logger.debug("Observatory.filter_wheel_info() called")
-        if self.filter_wheel is not None:
+        filter_wheel = self._snapshot(self.filter_wheel)
+        if filter_wheel is not None:
             try:
-                self.filter_wheel.Connected = True
+                filter_wheel.Connected = True
             except:
                 return {"FWCONN": (False, "Filter wheel connected")}
             info = {
                 "FWCONN": (True, "Filter wheel connected"),
-                "FWPOS": (self.filter_wheel.Position, "Filter wheel position"),
+                "FWPOS": (filter_wheel.Position, "Filter wheel position"),
                 "FWNAME": (
-                    self.filter_wheel.Names[self.filter_wheel.Position],
+                    filter_wheel.Names[filter_wheel.Position],
                     "Filter wheel name (from filter wheel object configuration)",
                 ),
                 "FILTER": (
-                    self.filters[self.filter_wheel.Position],
+                    self.filters[filter_wheel.Position],
                     "Filter name (from pyscope observatory object configuration)",
                 ),
                 "FOCOFFCG": (
                     None,
                     "Filter focus offset (from filter wheel object configuration)",
                 ),
-                "FWNAME": (self.filter_wheel.Name, "Filter wheel name"),
+                "FWNAME": (filter_wheel.Name, "Filter wheel name"),
                 "FWDRVER": (
                     None,
                     "Filter wheel driver version",
@@ -3082,7 +3372,7 @@ class Observatory:
                     "Filter wheel interface version",
                 ),
                 "FWDESC": (None, "Filter wheel description"),
-                "FWALLNAM": (str(self.filter_wheel.Names), "Filter wheel names"),
+                "FWALLNAM": (str(filter_wheel.Names), "Filter wheel names"),
                 "FWALLOFF": (
                     None,
                     "Filter wheel focus offsets",
@@ -3094,49 +3384,49 @@ class Observatory:
             }
             try:
                 info["FOCOFFCG"] = (
-                    self.filter_wheel.FocusOffsets[self.filter_wheel.Position],
+                    filter_wheel.FocusOffsets[filter_wheel.Position],
                     info["FOCOFFCG"][1],
                 )
             except:
                 pass
             try:
                 info["FWDRVER"] = (
-                    self.filter_wheel.DriverVersion,
+                    filter_wheel.DriverVersion,
                     info["FWDRVER"][1],
                 )
             except:
                 pass
             try:
                 info["FWDRV"] = (
-                    str(self.filter_wheel.DriverInfo),
+                    str(filter_wheel.DriverInfo),
                     info["FWDRV"][1],
                 )
             except:
                 pass
             try:
                 info["FWINTF"] = (
-                    self.filter_wheel.InterfaceVersion,
+                    filter_wheel.InterfaceVersion,
                     info["FWINTF"][1],
                 )
             except:
                 pass
             try:
                 info["FWDESC"] = (
-                    self.filter_wheel.Description,
+                    filter_wheel.Description,
                     info["FWDESC"][1],
                 )
             except:
                 pass
             try:
                 info["FWSUPAC"] = (
-                    str(self.filter_wheel.SupportedActions),
+                    str(filter_wheel.SupportedActions),
                     info["FWSUPAC"][1],
                 )
             except:
                 pass
             try:
                 info["FWALLOFF"] = (
-                    str(self.filter_wheel.FocusOffsets),
+                    str(filter_wheel.FocusOffsets),
                     info["FWALLOFF"][1],
                 )
             except:
@@ -3148,25 +3438,26 @@ class Observatory:
     @property
     def focuser_info(self):
         logger.debug("Observatory.focuser_info() called")
-        if self.focuser is not None:
+        focuser = self._snapshot(self.focuser)
+        if focuser is not None:
             try:
-                self.focuser.Connected = True
+                focuser.Connected = True
             except:
                 return {"FOCCONN": (False, "Focuser connected")}
             info = {
                 "FOCCONN": (True, "Focuser connected"),
                 "FOCPOS": (None, "Focuser position"),
-                "FOCMOV": (self.focuser.IsMoving, "Focuser moving"),
+                "FOCMOV": (focuser.IsMoving, "Focuser moving"),
                 "TEMPCOMP": (None, "Focuser temperature compensation"),
                 "FOCTEMP": (None, "Focuser temperature"),
-                "FOCNAME": (self.focuser.Name, "Focuser name"),
-                "FOCDRVER": (self.focuser.DriverVersion, "Focuser driver version"),
-                "FOCDRV": (str(self.focuser.DriverInfo), "Focuser driver info"),
-                "FOCINTF": (self.focuser.InterfaceVersion, "Focuser interface version"),
-                "FOCDESC": (self.focuser.Description, "Focuser description"),
+                "FOCNAME": (focuser.Name, "Focuser name"),
+                "FOCDRVER": (focuser.DriverVersion, "Focuser driver version"),
+                "FOCDRV": (str(focuser.DriverInfo), "Focuser driver info"),
+                "FOCINTF": (focuser.InterfaceVersion, "Focuser interface version"),
+                "FOCDESC": (focuser.Description, "Focuser description"),
                 "FOCSTEP": (None, "Focuser step size"),
                 "FOCABSOL": (
-                    self.focuser.Absolute,
+                    focuser.Absolute,
                     "Can focuser move to absolute position",
                 ),
                 "FOCMAXIN": (None, "Focuser maximum increment"),
@@ -3177,27 +3468,27 @@ class Observatory:
                 ),
             }
             try:
-                info["FOCMAXIN"] = (self.focuser.MaxIncrement, info["FOCMAXIN"][1])
+                info["FOCMAXIN"] = (focuser.MaxIncrement, info["FOCMAXIN"][1])
             except:
                 pass
             try:
-                info["FOCMAXST"] = (self.focuser.MaxStep, info["FOCMAXST"][1])
+                info["FOCMAXST"] = (focuser.MaxStep, info["FOCMAXST"][1])
             except:
                 pass
             try:
-                info["FOCPOS"] = (self.focuser.Position, info["FOCPOS"][1])
+                info["FOCPOS"] = (focuser.Position, info["FOCPOS"][1])
             except:
                 pass
             try:
-                info["TEMPCOMP"] = (self.focuser.TempComp, info["TEMPCOMP"][1])
+                info["TEMPCOMP"] = (focuser.TempComp, info["TEMPCOMP"][1])
             except:
                 pass
             try:
-                info["FOCTEMP"] = (self.focuser.Temperature, info["FOCTEMP"][1])
+                info["FOCTEMP"] = (focuser.Temperature, info["FOCTEMP"][1])
             except:
                 pass
             try:
-                info["FOCSTEP"] = (self.focuser.StepSize, info["FOCSTEP"][1])
+                info["FOCSTEP"] = (focuser.StepSize, info["FOCSTEP"][1])
             except:
                 pass
             return info
@@ -3207,6 +3498,11 @@ class Observatory:
     @property
     def observatory_info(self):
         logger.debug("Observatory.observatory_info() called")
+        camera = self._snapshot(self.camera)
+        pixel_scale = (
+            self.plate_scale * camera.PixelSizeX * 1e-6,
+            self.plate_scale * camera.PixelSizeY * 1e-6,
+        )
         info = {
             "OBSNAME": (self.site_name, "Observatory name"),
             "OBSINSTN": (self.instrument_name, "Instrument name"),
@@ -3216,23 +3512,24 @@ class Observatory:
             "OBSELEV": (self.elevation, "Observatory altitude"),
             "OBSDIA": (self.diameter, "Observatory diameter"),
             "OBSFL": (self.focal_length, "Observatory focal length"),
-            "XPIXSCAL": (self.pixel_scale[0], "Observatory x-pixel scale"),
-            "YPIXSCAL": (self.pixel_scale[1], "Observatory y-pixel scale"),
+            "XPIXSCAL": (pixel_scale[0], "Observatory x-pixel scale"),
+            "YPIXSCAL": (pixel_scale[1], "Observatory y-pixel scale"),
         }
         return info
 
     @property
     def observing_conditions_info(self):
         logger.debug("Observatory.observing_conditions_info() called")
-        if self.observing_conditions is not None:
+        observing_conditions = self._snapshot(self.observing_conditions)
+        if observing_conditions is not None:
             try:
-                self.observing_conditions.Connected = True
+                observing_conditions.Connected = True
             except:
                 return {"WXCONN": (False, "Observing conditions connected")}
             info = {
                 "WXCONN": (True, "Observing conditions connected"),
                 "WXAVGTIM": (
-                    self.observing_conditions.AveragePeriod,
+                    observing_conditions.AveragePeriod,
                     "Observing conditions average period",
                 ),
                 "WXCLD": (None, "Observing conditions cloud cover"),
@@ -3292,207 +3589,207 @@ class Observatory:
                 ),
                 "WXWGDUPD": (None, "Observing conditions wind gust last updated"),
                 "WXWGDSTD": (None, "Observing conditions wind gust sensor description"),
-                "WXNAME": (self.observing_conditions.Name, "Observing conditions name"),
+                "WXNAME": (observing_conditions.Name, "Observing conditions name"),
                 "WXDRVER": (
-                    self.observing_conditions.DriverVersion,
+                    observing_conditions.DriverVersion,
                     "Observing conditions driver version",
                 ),
                 "WXDRIV": (
-                    str(self.observing_conditions.DriverInfo),
+                    str(observing_conditions.DriverInfo),
                     "Observing conditions driver info",
                 ),
                 "WXINTF": (
-                    self.observing_conditions.InterfaceVersion,
+                    observing_conditions.InterfaceVersion,
                     "Observing conditions interface version",
                 ),
                 "WXDESC": (
-                    self.observing_conditions.Description,
+                    observing_conditions.Description,
                     "Observing conditions description",
                 ),
             }
             try:
-                info["WXCLD"] = (self.observing_conditions.CloudCover, info["WXCLD"][1])
+                info["WXCLD"] = (observing_conditions.CloudCover, info["WXCLD"][1])
                 info["WXCLDUPD"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("CloudCover"),
+                    observing_conditions.TimeSinceLastUpdate("CloudCover"),
                     info["WXCLDUPD"][1],
                 )
                 info["WXCLDD"] = (
-                    self.observing_conditions.SensorDescription("CloudCover"),
+                    observing_conditions.SensorDescription("CloudCover"),
                     info["WXCLDD"][1],
                 )
             except:
                 pass
             try:
-                info["WXDEW"] = (self.observing_conditions.DewPoint, info["WXDEW"][1])
+                info["WXDEW"] = (observing_conditions.DewPoint, info["WXDEW"][1])
                 info["WXDEWUPD"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("DewPoint"),
+                    observing_conditions.TimeSinceLastUpdate("DewPoint"),
                     info["WXDEWUPD"][1],
                 )
                 info["WXDEWD"] = (
-                    self.observing_conditions.SensorDescription("DewPoint"),
+                    observing_conditions.SensorDescription("DewPoint"),
                     info["WXDEWD"][1],
                 )
             except:
                 pass
             try:
-                info["WXHUM"] = (self.observing_conditions.Humidity, info["WXHUM"][1])
+                info["WXHUM"] = (observing_conditions.Humidity, info["WXHUM"][1])
                 info["WXHUMUPD"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("Humidity"),
+                    observing_conditions.TimeSinceLastUpdate("Humidity"),
                     info["WXHUMUPD"][1],
                 )
                 info["WXHUMD"] = (
-                    self.observing_conditions.SensorDescription("Humidity"),
+                    observing_conditions.SensorDescription("Humidity"),
                     info["WXHUMD"][1],
                 )
             except:
                 pass
             try:
-                info["WXPRES"] = (self.observing_conditions.Pressure, info["WXPRES"][1])
+                info["WXPRES"] = (observing_conditions.Pressure, info["WXPRES"][1])
                 info["WXPREUPD"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("Pressure"),
+                    observing_conditions.TimeSinceLastUpdate("Pressure"),
                     info["WXPREUPD"][1],
                 )
                 info["WXPRESD"] = (
-                    self.observing_conditions.SensorDescription("Pressure"),
+                    observing_conditions.SensorDescription("Pressure"),
                     info["WXPRESD"][1],
                 )
             except:
                 pass
             try:
-                info["WXRAIN"] = (self.observing_conditions.RainRate, info["WXRAIN"][1])
+                info["WXRAIN"] = (observing_conditions.RainRate, info["WXRAIN"][1])
                 info["WXRAIUPD"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("RainRate"),
+                    observing_conditions.TimeSinceLastUpdate("RainRate"),
                     info["WXRAIUPD"][1],
                 )
                 info["WXRAIND"] = (
-                    self.observing_conditions.SensorDescription("RainRate"),
+                    observing_conditions.SensorDescription("RainRate"),
                     info["WXRAIND"][1],
                 )
             except:
                 pass
             try:
                 info["WXSKY"] = (
-                    self.observing_conditions.SkyBrightness,
+                    observing_conditions.SkyBrightness,
                     info["WXSKY"][1],
                 )
                 info["WXSKYUPD"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("SkyBrightness"),
+                    observing_conditions.TimeSinceLastUpdate("SkyBrightness"),
                     info["WXSKYUPD"][1],
                 )
                 info["WXSKYD"] = (
-                    self.observing_conditions.SensorDescription("SkyBrightness"),
+                    observing_conditions.SensorDescription("SkyBrightness"),
                     info["WXSKYD"][1],
                 )
             except:
                 pass
             try:
                 info["WXSKYQ"] = (
-                    self.observing_conditions.SkyQuality,
+                    observing_conditions.SkyQuality,
                     info["WXSKYQ"][1],
                 )
                 info["WXSKYQUP"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("SkyQuality"),
+                    observing_conditions.TimeSinceLastUpdate("SkyQuality"),
                     info["WXSKYQUP"][1],
                 )
                 info["WXSKYQD"] = (
-                    self.observing_conditions.SensorDescription("SkyQuality"),
+                    observing_conditions.SensorDescription("SkyQuality"),
                     info["WXSKYQD"][1],
                 )
             except:
                 pass
             try:
                 info["WXSKYTMP"] = (
-                    self.observing_conditions.SkyTemperature,
+                    observing_conditions.SkyTemperature,
                     info["WXSKYTMP"][1],
                 )
                 info["WXSKTUPD"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("SkyTemperature"),
+                    observing_conditions.TimeSinceLastUpdate("SkyTemperature"),
                     info["WXSKTUPD"][1],
                 )
                 info["WXSKTD"] = (
-                    self.observing_conditions.SensorDescription("SkyTemperature"),
+                    observing_conditions.SensorDescription("SkyTemperature"),
                     info["WXSKTD"][1],
                 )
             except:
                 pass
             try:
                 info["WXFWHM"] = (
-                    self.observing_conditions.WindSpeed,
+                    observing_conditions.WindSpeed,
                     info["WXFWHM"][1],
                 )
                 info["WXFWHUP"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("WindSpeed"),
+                    observing_conditions.TimeSinceLastUpdate("WindSpeed"),
                     info["WXFWHUP"][1],
                 )
                 info["WXFWHMD"] = (
-                    self.observing_conditions.SensorDescription("WindSpeed"),
+                    observing_conditions.SensorDescription("WindSpeed"),
                     info["WXFWHMD"][1],
                 )
             except:
                 pass
             try:
                 info["WXTEMP"] = (
-                    self.observing_conditions.Temperature,
+                    observing_conditions.Temperature,
                     info["WXTEMP"][1],
                 )
                 info["WXTEMUPD"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("Temperature"),
+                    observing_conditions.TimeSinceLastUpdate("Temperature"),
                     info["WXTEMUPD"][1],
                 )
                 info["WXTEMPD"] = (
-                    self.observing_conditions.SensorDescription("Temperature"),
+                    observing_conditions.SensorDescription("Temperature"),
                     info["WXTEMPD"][1],
                 )
             except:
                 pass
             try:
                 info["WXWIND"] = (
-                    self.observing_conditions.WindSpeed,
+                    observing_conditions.WindSpeed,
                     info["WXWIND"][1],
                 )
                 info["WXWINUPD"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("WindSpeed"),
+                    observing_conditions.TimeSinceLastUpdate("WindSpeed"),
                     info["WXWINUPD"][1],
                 )
                 info["WXWINDD"] = (
-                    self.observing_conditions.SensorDescription("WindSpeed"),
+                    observing_conditions.SensorDescription("WindSpeed"),
                     info["WXWINDD"][1],
                 )
             except:
                 pass
             try:
                 info["WXWINDIR"] = (
-                    self.observing_conditions.WindDirection,
+                    observing_conditions.WindDirection,
                     info["WXWINDIR"][1],
                 )
                 info["WXWDIRUP"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("WindDirection"),
+                    observing_conditions.TimeSinceLastUpdate("WindDirection"),
                     info["WXWDIRUP"][1],
                 )
                 info["WXWDIRD"] = (
-                    self.observing_conditions.SensorDescription("WindDirection"),
+                    observing_conditions.SensorDescription("WindDirection"),
                     info["WXWDIRD"][1],
                 )
             except:
                 pass
             try:
                 info["WXWDGST"] = (
-                    self.observing_conditions.WindGust,
+                    observing_conditions.WindGust,
                     info["WXWDGST"][1],
                 )
                 info["WXWGDUPD"] = (
-                    self.observing_conditions.TimeSinceLastUpdate("WindGust"),
+                    observing_conditions.TimeSinceLastUpdate("WindGust"),
                     info["WXWGDUPD"][1],
                 )
                 info["WXWGDSTD"] = (
-                    self.observing_conditions.SensorDescription("WindGust"),
+                    observing_conditions.SensorDescription("WindGust"),
                     info["WXWGDSTD"][1],
                 )
             except:
                 pass
             try:
                 info["WXAVGTIM"] = (
-                    self.observing_conditions.AveragePeriod,
+                    observing_conditions.AveragePeriod,
                     info["WXAVGTIM"][1],
                 )
             except:
@@ -3504,38 +3801,39 @@ class Observatory:
     @property
     def rotator_info(self):
         logger.debug("Observatory.rotator_info() called")
-        if self.rotator is not None:
+        rotator = self._snapshot(self.rotator)
+        if rotator is not None:
             try:
-                self.rotator.Connected = True
+                rotator.Connected = True
             except:
                 return {"ROTCONN": (False, "Rotator connected")}
             info = {
                 "ROTCONN": (True, "Rotator connected"),
-                "ROTPOS": (self.rotator.Position, "Rotator position"),
+                "ROTPOS": (rotator.Position, "Rotator position"),
                 "ROTMECHP": (
-                    self.rotator.MechanicalPosition,
+                    rotator.MechanicalPosition,
                     "Rotator mechanical position",
                 ),
-                "ROTTARGP": (self.rotator.TargetPosition, "Rotator target position"),
-                "ROTMOV": (self.rotator.IsMoving, "Rotator moving"),
-                "ROTREVSE": (self.rotator.Reverse, "Rotator reverse"),
-                "ROTNAME": (self.rotator.Name, "Rotator name"),
-                "ROTDRVER": (self.rotator.DriverVersion, "Rotator driver version"),
-                "ROTDRV": (str(self.rotator.DriverInfo), "Rotator driver name"),
+                "ROTTARGP": (rotator.TargetPosition, "Rotator target position"),
+                "ROTMOV": (rotator.IsMoving, "Rotator moving"),
+                "ROTREVSE": (rotator.Reverse, "Rotator reverse"),
+                "ROTNAME": (rotator.Name, "Rotator name"),
+                "ROTDRVER": (rotator.DriverVersion, "Rotator driver version"),
+                "ROTDRV": (str(rotator.DriverInfo), "Rotator driver name"),
                 "ROTINTFC": (
-                    self.rotator.InterfaceVersion,
+                    rotator.InterfaceVersion,
                     "Rotator interface version",
                 ),
-                "ROTDESC": (self.rotator.Description, "Rotator description"),
+                "ROTDESC": (rotator.Description, "Rotator description"),
                 "ROTSTEP": (None, "Rotator step size [degrees]"),
-                "ROTCANRV": (self.rotator.CanReverse, "Can rotator reverse"),
+                "ROTCANRV": (rotator.CanReverse, "Can rotator reverse"),
                 "ROTSUPAC": (
-                    str(self.rotator.SupportedActions),
+                    str(rotator.SupportedActions),
                     "Rotator supported actions",
                 ),
             }
             try:
-                info["ROTSTEP"] = (self.rotator.StepSize, info["ROTSTEP"][1])
+                info["ROTSTEP"] = (rotator.StepSize, info["ROTSTEP"][1])
             except:
                 pass
             return info
@@ -3548,37 +3846,38 @@ class Observatory:
         if self.safety_monitor is not None:
             all_info = []
             for i in range(len(self.safety_monitor)):
+                safety_monitor = self._snapshot(self.safety_monitor[i])
                 try:
-                    self.safety_monitor[i].Connected = True
+                    safety_monitor.Connected = True
                     # Should likely be broken into multiple try/except blocks
                     info = {
                         ("SM%iCONN" % i): (True, "Safety monitor connected"),
                         ("SM%iISSAF" % i): (
-                            self.safety_monitor[i].IsSafe,
+                            safety_monitor.IsSafe,
                             "Safety monitor safe",
                         ),
                         ("SM%iNAME" % i): (
-                            self.safety_monitor[i].Name,
+                            safety_monitor.Name,
                             "Safety monitor name",
                         ),
                         ("SM%iDRVER" % i): (
-                            self.safety_monitor[i].DriverVersion,
+                            safety_monitor.DriverVersion,
                             "Safety monitor driver version",
                         ),
                         ("SM%iDRV" % i): (
-                            str(self.safety_monitor[i].DriverInfo),
+                            str(safety_monitor.DriverInfo),
                             "Safety monitor driver name",
                         ),
                         ("SM%iINTF" % i): (
-                            self.safety_monitor[i].InterfaceVersion,
+                            safety_monitor.InterfaceVersion,
                             "Safety monitor interface version",
                         ),
                         ("SM%iDESC" % i): (
-                            self.safety_monitor[i].Description,
+                            safety_monitor.Description,
                             "Safety monitor description",
                         ),
                         ("SM%iSUPAC" % i): (
-                            str(self.safety_monitor[i].SupportedActions),
+                            str(safety_monitor.SupportedActions),
                             "Safety monitor supported actions",
                         ),
                     }
@@ -3602,61 +3901,62 @@ class Observatory:
         if self.switch is not None:
             all_info = []
             for i in range(len(self.switch)):
+                switch = self._snapshot(self.switch[i])
                 try:
-                    self.switch.Connected = True
+                    switch.Connected = True
                     try:
                         info = {
                             ("SW%iCONN" % i): (True, "Switch connected"),
-                            ("SW%iNAME" % i): (self.switch[i].Name, "Switch name"),
+                            ("SW%iNAME" % i): (switch.Name, "Switch name"),
                             ("SW%iDRVER" % i): (
-                                self.switch[i].DriverVersion,
+                                switch.DriverVersion,
                                 "Switch driver version",
                             ),
                             ("SW%iDRV" % i): (
-                                str(self.switch[i].DriverInfo),
+                                str(switch.DriverInfo),
                                 "Switch driver name",
                             ),
                             ("SW%iINTF" % i): (
-                                self.switch[i].InterfaceVersion,
+                                switch.InterfaceVersion,
                                 "Switch interface version",
                             ),
                             ("SW%iDESC" % i): (
-                                self.switch[i].Description,
+                                switch.Description,
                                 "Switch description",
                             ),
                             ("SW%iSUPAC" % i): (
-                                str(self.switch[i].SupportedActions),
+                                str(switch.SupportedActions),
                                 "Switch supported actions",
                             ),
                             ("SW%iMAXSW" % i): (
-                                self.switch[i].MaxSwitch,
+                                switch.MaxSwitch,
                                 "Switch maximum switch",
                             ),
                         }
-                        for j in range(self.switch[i].MaxSwitch):
+                        for j in range(switch.MaxSwitch):
                             try:
                                 info[("SW%iSW%iNM" % (i, j))] = (
-                                    self.switch[i].GetSwitchName(j),
+                                    switch.GetSwitchName(j),
                                     "Switch %i Device %i name" % (i, j),
                                 )
                                 info[("SW%iSW%iDS" % (i, j))] = (
-                                    self.switch[i].GetSwitchDescription(j),
+                                    switch.GetSwitchDescription(j),
                                     "Switch %i Device %i description" % (i, j),
                                 )
                                 info[("SW%iSW%i" % (i, j))] = (
-                                    self.switch[i].GetSwitch(j),
+                                    switch.GetSwitch(j),
                                     "Switch %i Device %i state" % (i, j),
                                 )
                                 info[("SW%iSW%iMN" % (i, j))] = (
-                                    self.switch[i].MinSwitchValue(j),
+                                    switch.MinSwitchValue(j),
                                     "Switch %i Device %i minimum value" % (i, j),
                                 )
                                 info[("SW%iSW%iMX" % (i, j))] = (
-                                    self.switch[i].MaxSwitchValue(j),
+                                    switch.MaxSwitchValue(j),
                                     "Switch %i Device %i maximum value" % (i, j),
                                 )
                                 info[("SW%iSW%iST" % (i, j))] = (
-                                    self.switch[i].SwitchStep(j),
+                                    switch.SwitchStep(j),
                                     "Switch %i Device %i step" % (i, j),
                                 )
                             except Exception as e:
@@ -3682,25 +3982,26 @@ class Observatory:
     @property
     def telescope_info(self):
         logger.debug("Observatory.telescope_info() called")
+        telescope = self._snapshot(self.telescope)
         try:
-            self.telescope.Connected = True
+            telescope.Connected = True
         except:
             return {"TELCONN": (False, "Telescope connected")}
         info = {
             "TELCONN": (True, "Telescope connected"),
-            "TELHOME": (self.telescope.AtHome, "Is telescope at home position"),
-            "TELPARK": (self.telescope.AtPark, "Is telescope at park position"),
+            "TELHOME": (telescope.AtHome, "Is telescope at home position"),
+            "TELPARK": (telescope.AtPark, "Is telescope at park position"),
             "TELALT": (None, "Telescope altitude [degrees]"),
             "TELAZ": (
                 None,
                 "Telescope azimuth North-referenced positive East (clockwise) [degrees]",
             ),
             "TELRA": (
-                self.telescope.RightAscension,
+                telescope.RightAscension,
                 "Telescope right ascension in TELEQSYS coordinate frame [hours]",
             ),
             "TELDEC": (
-                self.telescope.Declination,
+                telescope.Declination,
                 "Telescope declination in TELEQSYS coordinate frame [degrees]",
             ),
             "TELRAIC": (
@@ -3746,15 +4047,15 @@ class Observatory:
             "TELGUIDD": (None, "Telescope pulse guiding DEC rate [arcseconds/sec]"),
             "TELDOREF": (None, "Does telescope do refraction"),
             "TELLST": (
-                self.telescope.SiderealTime,
+                telescope.SiderealTime,
                 "Telescope local sidereal time [hours]",
             ),
             "TELUT": (None, "Telescope UTC date"),
-            "TELNAME": (self.telescope.Name, "Telescope name"),
-            "TELDRVER": (self.telescope.DriverVersion, "Telescope driver version"),
-            "TELDRV": (str(self.telescope.DriverInfo), "Telescope driver name"),
-            "TELINTF": (self.telescope.InterfaceVersion, "Telescope interface version"),
-            "TELDESC": (self.telescope.Description, "Telescope description"),
+            "TELNAME": (telescope.Name, "Telescope name"),
+            "TELDRVER": (telescope.DriverVersion, "Telescope driver version"),
+            "TELDRV": (str(telescope.DriverInfo), "Telescope driver name"),
+            "TELINTF": (telescope.InterfaceVersion, "Telescope interface version"),
+            "TELDESC": (telescope.Description, "Telescope description"),
             "TELAPAR": (None, "Telescope aperture area [m^2]"),
             "TELDIAM": (None, "Telescope aperture diameter [m]"),
             "TELFOCL": (None, "Telescope focal length [m]"),
@@ -3764,54 +4065,54 @@ class Observatory:
             "TELALN": (None, "Telescope alignment mode"),
             "TELEQSYS": (
                 ["equOther", "equTopocentric", "equJ2000", "equJ2050", "equB1950"][
-                    self.telescope.EquatorialSystem
+                    telescope.EquatorialSystem
                 ],
                 "Telescope equatorial coordinate system",
             ),
-            "TELCANHM": (self.telescope.CanFindHome, "Can telescope find home"),
-            "TELCANPA": (self.telescope.CanPark, "Can telescope park"),
-            "TELCANUN": (self.telescope.CanUnpark, "Can telescope unpark"),
-            "TELCANPP": (self.telescope.CanSetPark, "Can telescope set park position"),
-            # "TELCANPG": (self.telescope.CanPulseGuide, "Can telescope pulse guide"),
+            "TELCANHM": (telescope.CanFindHome, "Can telescope find home"),
+            "TELCANPA": (telescope.CanPark, "Can telescope park"),
+            "TELCANUN": (telescope.CanUnpark, "Can telescope unpark"),
+            "TELCANPP": (telescope.CanSetPark, "Can telescope set park position"),
+            # "TELCANPG": (telescope.CanPulseGuide, "Can telescope pulse guide"),
             "TELCANGR": (
-                self.telescope.CanSetGuideRates,
+                telescope.CanSetGuideRates,
                 "Can telescope set guide rates",
             ),
-            "TELCANTR": (self.telescope.CanSetTracking, "Can telescope set tracking"),
+            "TELCANTR": (telescope.CanSetTracking, "Can telescope set tracking"),
             "TELCANSR": (
-                self.telescope.CanSetRightAscensionRate,
+                telescope.CanSetRightAscensionRate,
                 "Can telescope set RA offset rate",
             ),
             "TELCANSD": (
-                self.telescope.CanSetDeclinationRate,
+                telescope.CanSetDeclinationRate,
                 "Can telescope set DEC offset rate",
             ),
-            "TELCANSP": (self.telescope.CanSetPierSide, "Can telescope set pier side"),
+            "TELCANSP": (telescope.CanSetPierSide, "Can telescope set pier side"),
             "TELCANSL": (
-                self.telescope.CanSlew,
+                telescope.CanSlew,
                 "Can telescope slew to equatorial coordinates",
             ),
             "TELCNSLA": (
-                self.telescope.CanSlewAsync,
+                telescope.CanSlewAsync,
                 "Can telescope slew asynchronously",
             ),
             "TELCANSF": (
-                self.telescope.CanSlewAltAz,
+                telescope.CanSlewAltAz,
                 "Can telescope slew to alt-azimuth coordinates",
             ),
             "TELCNSFA": (
-                self.telescope.CanSlewAltAzAsync,
+                telescope.CanSlewAltAzAsync,
                 "Can telescope slew to alt-azimuth coordinates asynchronously",
             ),
             "TELCANSY": (
-                self.telescope.CanSync,
+                telescope.CanSync,
                 "Can telescope sync to equatorial coordinates",
             ),
             "TELCNSYA": (
-                self.telescope.CanSyncAltAz,
+                telescope.CanSyncAltAz,
                 "Can telescope sync to alt-azimuth coordinates",
             ),
-            "TELTRCKS": (str(self.telescope.TrackingRates), "Telescope tracking rates"),
+            "TELTRCKS": (str(telescope.TrackingRates), "Telescope tracking rates"),
             "TELSUPAC": (
                 None,
                 "Telescope supported actions",
@@ -3828,169 +4129,133 @@ class Observatory:
             info["TELDRV"][1],
         )
         try:
-            info["TELALT"] = (self.telescope.Altitude, info["TELALT"][1])
+            info["TELALT"] = (telescope.Altitude, info["TELALT"][1])
         except:
             pass
         try:
-            info["TELAZ"] = (self.telescope.Azimuth, info["TELAZ"][1])
+            info["TELAZ"] = (telescope.Azimuth, info["TELAZ"][1])
         except:
             pass
         try:
-            info["TARGRA"] = (self.telescope.TargetRightAscension, info["TARGRA"][1])
+            info["TARGRA"] = (telescope.TargetRightAscension, info["TARGRA"][1])
         except:
             pass
         try:
-            info["TARGDEC"] = (self.telescope.TargetDeclination, info["TARGDEC"][1])
+            info["TARGDEC"] = (telescope.TargetDeclination, info["TARGDEC"][1])
         except:
             pass
         obj = self.get_current_object()
+        t = self.observatory_time
+        obj_alt, obj_az = self.ephemerides.altaz(obj, t)
         info["TELRAIC"] = (obj.ra.to_string(unit=u.hour), info["TELRAIC"][1])
         info["TELDECIC"] = (obj.dec.to_string(unit=u.degree), info["TELDECIC"][1])
-        info["OBJCTALT"] = (
-            obj.transform_to(
-                coord.AltAz(
-                    obstime=self.observatory_time, location=self.observatory_location
-                )
-            )
-            .alt.to(u.degree)
-            .value,
-            info["OBJCTALT"][1],
-        )
-        info["OBJCTAZ"] = (
-            obj.transform_to(
-                coord.AltAz(
-                    obstime=self.observatory_time, location=self.observatory_location
-                )
-            )
-            .az.to(u.degree)
-            .value,
-            info["OBJCTAZ"][1],
-        )
-        info["OBJCTHA"] = ((self.lst() - obj.ra).value, info["OBJCTHA"][1])
-        info["AIRMASS"] = (
-            airmass(
-                obj.transform_to(
-                    coord.AltAz(
-                        obstime=self.observatory_time,
-                        location=self.observatory_location,
-                    )
-                )
-                .alt.to(u.rad)
-                .value
-            ),
-            info["AIRMASS"][1],
-        )
+        info["OBJCTALT"] = (obj_alt, info["OBJCTALT"][1])
+        info["OBJCTAZ"] = (obj_az, info["OBJCTAZ"][1])
+        info["OBJCTHA"] = ((self.lst(t) - obj.ra).value, info["OBJCTHA"][1])
+        info["AIRMASS"] = (airmass(np.radians(obj_alt)), info["AIRMASS"][1])
         info["MOONANGL"] = (
-            coord.get_body(
-                "moon", self.observatory_time, location=self.observatory_location
-            )
-            .separation(obj)
-            .to(u.degree)
-            .value,
+            self.ephemerides.moon_separation(obj, t),
             info["MOONANGL"][1],
         )
-        info["MOONPHAS"] = (
-            self.moon_illumination(self.observatory_time),
-            info["MOONPHAS"][1],
-        )
+        info["MOONPHAS"] = (self.moon_illumination(t), info["MOONPHAS"][1])
         try:
-            info["TELSLEW"] = (self.telescope.Slewing, info["TELSLEW"][1])
+            info["TELSLEW"] = (telescope.Slewing, info["TELSLEW"][1])
         except:
             pass
         try:
-            info["TELSETT"] = (self.telescope.SlewSettleTime, info["TELSETT"][1])
+            info["TELSETT"] = (telescope.SlewSettleTime, info["TELSETT"][1])
         except:
             pass
         try:
             info["TELPIER"] = (
-                ["pierEast", "pierWest", "pierUnknown"][self.telescope.SideOfPier],
+                ["pierEast", "pierWest", "pierUnknown"][telescope.SideOfPier],
                 info["TELPIER"][1],
             )
         except:
             pass
         try:
-            info["TELTRACK"] = (self.telescope.Tracking, info["TELTRACK"][1])
+            info["TELTRACK"] = (telescope.Tracking, info["TELTRACK"][1])
         except:
             pass
         try:
             info["TELTRKRT"] = (
-                self.telescope.TrackingRates[self.telescope.TrackingRate],
+                telescope.TrackingRates[telescope.TrackingRate],
                 info["TELTRKRT"][1],
             )
         except:
             pass
         try:
-            info["TELOFFRA"] = (self.telescope.RightAscensionRate, info["TELOFFRA"][1])
+            info["TELOFFRA"] = (telescope.RightAscensionRate, info["TELOFFRA"][1])
         except:
             pass
         try:
-            info["TELOFFDC"] = (self.telescope.DeclinationRate, info["TELOFFDC"][1])
+            info["TELOFFDC"] = (telescope.DeclinationRate, info["TELOFFDC"][1])
         except:
             pass
         try:
-            info["TELPULSE"] = (self.telescope.IsPulseGuiding, info["TELPULSE"][1])
+            info["TELPULSE"] = (telescope.IsPulseGuiding, info["TELPULSE"][1])
         except:
             pass
         try:
             info["TELGUIDR"] = (
-                self.telescope.GuideRateRightAscension,
+                telescope.GuideRateRightAscension,
                 info["TELGUIDR"][1],
             )
         except:
             pass
         try:
             info["TELGUIDD"] = (
-                self.telescope.GuideRateDeclination,
+                telescope.GuideRateDeclination,
                 info["TELGUIDD"][1],
             )
         except:
             pass
         try:
-            info["TELDOREF"] = (self.telescope.DoesRefraction, info["TELDOREF"][1])
+            info["TELDOREF"] = (telescope.DoesRefraction, info["TELDOREF"][1])
         except:
             pass
         try:
             info["TELUT"] = (
-                # self.telescope.UTCDate.strftime("%Y-%m-%dT%H:%M:%S"),
+                # telescope.UTCDate.strftime("%Y-%m-%dT%H:%M:%S"),
                 self.observatory_time.strftime("%Y-%m-%dT%H:%M:%S"),
                 info["TELUT"][1],
             )
         except:
             pass
         try:
-            info["TELAPAR"] = (self.telescope.ApertureArea, info["TELAPAR"][1])
+            info["TELAPAR"] = (telescope.ApertureArea, info["TELAPAR"][1])
         except:
             pass
         try:
-            info["TELDIAM"] = (self.telescope.ApertureDiameter, info["TELDIAM"][1])
+            info["TELDIAM"] = (telescope.ApertureDiameter, info["TELDIAM"][1])
         except:
             pass
         try:
-            info["TELFOCL"] = (self.telescope.FocalLength, info["TELFOCL"][1])
+            info["TELFOCL"] = (telescope.FocalLength, info["TELFOCL"][1])
         except:
             pass
         try:
-            info["TELELEV"] = (self.telescope.SiteElevation, info["TELELEV"][1])
+            info["TELELEV"] = (telescope.SiteElevation, info["TELELEV"][1])
         except:
             pass
         try:
-            info["TELLAT"] = (self.telescope.SiteLatitude, info["TELLAT"][1])
+            info["TELLAT"] = (telescope.SiteLatitude, info["TELLAT"][1])
         except:
             pass
         try:
-            info["TELLONG"] = (self.telescope.SiteLongitude, info["TELLONG"][1])
+            info["TELLONG"] = (telescope.SiteLongitude, info["TELLONG"][1])
         except:
             pass
         try:
             info["TELALN"] = (
-                ["AltAz", "Polar", "GermanPolar"][self.telescope.AlignmentMode],
+                ["AltAz", "Polar", "GermanPolar"][telescope.AlignmentMode],
                 info["TELALN"][1],
             )
         except:
             pass
         try:
             info["TELSUPAC"] = (
-                str(self.telescope.SupportedActions),
+                str(telescope.SupportedActions),
                 info["TELSUPAC"][1],
             )
         except:
@@ -4016,13 +4281,30 @@ class Observatory:
         }
         return info
 
+    @property
+    def snapshot_timings(self):
+        """Time in seconds taken to read each device by the last call to
+        `generate_header_dict`"""
+        logger.debug("Observatory.snapshot_timings() called")
+        return dict(self._snapshot_timings)
+
     @property
     def observatory_location(self):
         """Returns the EarthLocation object for the observatory"""
         logger.debug("Observatory.observatory_location() called")
-        return coord.EarthLocation(
-            lat=self.latitude, lon=self.longitude, height=self.elevation
-        )
+        if self._location is None:
+            self._location = coord.EarthLocation(
+                lat=self.latitude, lon=self.longitude, height=self.elevation
+            )
+        return self._location
+
+    @property
+    def ephemerides(self):
+        """Returns the `EphemerisCache` of the observatory location"""
+        logger.debug("Observatory.ephemerides() called")
+        if self._ephemerides is None:
+            self._ephemerides = EphemerisCache(self.observatory_location)
+        return self._ephemerides
 
     @property
     def observatory_time(self):
@@ -4096,6 +4378,8 @@ class Observatory:
     @latitude.setter
     def latitude(self, value):
         logger.debug(f"Observatory.latitude = {value} called")
+        self._location = None
+        self._ephemerides = None
         self._latitude = (
             coord.Latitude(value) if value is not None or value != "" else None
         )
@@ -4120,6 +4404,8 @@ class Observatory:
     @longitude.setter
     def longitude(self, value):
         logger.debug(f"Observatory.longitude = {value} called")
+        self._location = None
+        self._ephemerides = None
         self._longitude = (
             coord.Longitude(value, wrap_angle=180 * u.deg)
             if value is not None or value != ""
@@ -4145,6 +4431,8 @@ class Observatory:
     @elevation.setter
     def elevation(self, value):
         logger.debug(f"Observatory.elevation = {value} called")
+        self._location = None
+        self._ephemerides = None
         self._elevation = (
             max(float(value), 0) if value is not None or value != "" else None
         )
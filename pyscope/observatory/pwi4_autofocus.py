@@ -23,7 +23,7 @@ class PWI4Autofocus(Autofocus):
         """
         self._host = host
         self._port = port
-        self._app = _PWI4(host=self._host, port=self._port)
+        self._app = _PWI4.shared(host=self._host, port=self._port)
 
     def Run(self, *args, **kwargs):
         """
@@ -44,6 +44,7 @@ class PWI4Autofocus(Autofocus):
         """
         logger.debug("Starting autofocus in PWI4Autofocus")
         self._app.request("/autofocus/start")
+        self._app.invalidate_status()
         logger.info("Autofocus started")
         time.sleep(1)
         while self._app.status().autofocus.is_running:
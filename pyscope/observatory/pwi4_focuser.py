@@ -25,7 +25,7 @@ class PWI4Focuser(Focuser):
         """
         self._host = host
         self._port = port
-        self._app = _PWI4(host=self._host, port=self._port)
+        self._app = _PWI4.shared(host=self._host, port=self._port)
 
     def Enabled(self):
         logger.debug("Checking if focuser is enabled in PWI4Focuser")
@@ -131,11 +131,9 @@ class PWI4Focuser(Focuser):
     def Connected(self):
         """Whether the focuser is connected and enabled. (`bool`)"""
         logger.debug("PWI4Focuser.Connected() called")
-        if self._app.status().focuser.exists:
-            return (
-                self._app.status().focuser.is_connected
-                and self._app.status().focuser.is_enabled
-            )
+        focuser = self._app.status().focuser
+        if focuser.exists:
+            return focuser.is_connected and focuser.is_enabled
         else:
             return False
 
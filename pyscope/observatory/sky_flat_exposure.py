@@ -0,0 +1,285 @@
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SkyFlatExposure:
+    def __init__(
+        self,
+        target_counts,
+        tolerance=0.25,
+        min_exposure=1,
+        max_exposure=60,
+        bias_level=0,
+        slope=0.4,
+        slope_weight=1,
+    ):
+        """
+        Predicts the exposure times of flat frames from a model of the
+        brightness of the twilight sky.
+
+        The sky brightness changes by orders of magnitude during twilight,
+        roughly exponentially with the altitude of the Sun, so scaling the
+        last exposure time by the ratio of the target and measured counts
+        lags behind it. Here the logarithm of the count rate of each frame
+        is recorded against the altitude of the Sun at the middle of its
+        exposure, and fitted by a line, whose slope is regularized towards
+        the typical `slope` so that a single frame suffices. The exposure
+        time of the next frame integrates the predicted count rate over the
+        change of the altitude of the Sun during the exposure.
+
+        For flats of a calibrator panel, whose brightness is constant, use
+        `slope=0` with a large `slope_weight`: the prediction is then the
+        target counts over the mean count rate of the previous frames.
+
+        Parameters
+        ----------
+        target_counts : `float`
+            Target mean counts of the flat frames, including the bias level.
+        tolerance : `float`, default : 0.25, optional
+            Accepted relative difference of the mean counts to the target.
+        min_exposure : `float`, default : 1, optional
+            Shortest exposure time in seconds, e.g. to avoid the shadow of
+            the shutter.
+        max_exposure : `float`, default : 60, optional
+            Longest exposure time in seconds.
+        bias_level : `float`, default : 0, optional
+            Counts of the bias level, which do not scale with the exposure.
+        slope : `float`, default : 0.4, optional
+            Typical change of the logarithm (base 10) of the sky brightness
+            per degree of altitude of the Sun during twilight.
+        slope_weight : `float`, default : 1, optional
+            Weight of `slope` in the fit, relative to a frame one degree of
+            altitude of the Sun away from the others.
+        """
+        self._target_counts = target_counts
+        self._tolerance = tolerance
+        self._min_exposure = min_exposure
+        self._max_exposure = max_exposure
+        self._bias_level = bias_level
+        self._prior_slope = slope
+        self._slope_weight = slope_weight
+
+        self._altitudes = []
+        self._log_rates = []
+        self._fit = None
+
+    @property
+    def frames(self):
+        """Number of recorded frames."""
+        return len(self._altitudes)
+
+    @property
+    def min_exposure(self):
+        """Shortest exposure time in seconds."""
+        return self._min_exposure
+
+    @property
+    def max_exposure(self):
+        """Longest exposure time in seconds."""
+        return self._max_exposure
+
+    @property
+    def slope(self):
+        """Fitted change of the logarithm of the sky brightness per degree
+        of altitude of the Sun."""
+        if self._fit is None:
+            return self._prior_slope
+        return self._fit[1]
+
+    @staticmethod
+    def statistic(data, step=4):
+        """
+        Robust mean counts of a frame, the median of a subsample of its
+        pixels, which is insensitive to stars.
+
+        Parameters
+        ----------
+        data : `~numpy.ndarray`
+            The frame.
+        step : `int`, default : 4, optional
+            Only every `step`-th pixel of every `step`-th row is used.
+
+        Returns
+        -------
+        `float`
+        """
+        return float(np.median(data[::step, ::step]))
+
+    def accept(self, counts):
+        """Whether the mean counts of a frame are within the tolerance of
+        the target."""
+        return (
+            abs(counts - self._target_counts)
+            <= self._tolerance * self._target_counts
+        )
+
+    def record(self, exposure, counts, altitude=0, altitude_rate=0):
+        """
+        Records a frame.
+
+        Parameters
+        ----------
+        exposure : `float`
+            Exposure time in seconds.
+        counts : `float`
+            Mean counts of the frame, e.g. from `statistic`.
+        altitude : `float`, default : 0, optional
+            Altitude of the Sun at the start of the exposure in degrees.
+        altitude_rate : `float`, default : 0, optional
+            Change of the altitude of the Sun in degrees per second.
+        """
+        signal = counts - self._bias_level
+        if exposure <= 0 or signal <= 0:
+            logger.warning(
+                f"Cannot record a frame of {exposure} s with {counts} counts"
+            )
+            return
+        self._altitudes.append(altitude + altitude_rate * exposure / 2)
+        self._log_rates.append(math.log10(signal / exposure))
+
+        # Least squares line with a Gaussian prior on the slope
+        h = np.array(self._altitudes)
+        y = np.array(self._log_rates)
+        normal = np.array(
+            [
+                [len(h), h.sum()],
+                [h.sum(), (h**2).sum() + self._slope_weight],
+            ]
+        )
+        right = np.array(
+            [y.sum(), (h * y).sum() + self._slope_weight * self._prior_slope]
+        )
+        self._fit = tuple(np.linalg.solve(normal, right))
+
+    def rate(self, altitude):
+        """
+        Predicted count rate above the bias level per second, or `None`
+        before any frame is recorded.
+
+        Parameters
+        ----------
+        altitude : `float`
+            Altitude of the Sun in degrees.
+        """
+        if self._fit is None:
+            return None
+        intercept, slope = self._fit
+        return 10 ** (intercept + slope * altitude)
+
+    def predict(self, altitude=0, altitude_rate=0):
+        """
+        Predicted exposure time reaching the target counts, or `None` before
+        any frame is recorded.
+
+        Parameters
+        ----------
+        altitude : `float`, default : 0, optional
+            Altitude of the Sun at the start of the exposure in degrees.
+        altitude_rate : `float`, default : 0, optional
+            Change of the altitude of the Sun in degrees per second.
+
+        Returns
+        -------
+        `float` or `None`
+            The exposure time in seconds, which is infinite if the sky
+            darkens too fast to ever reach the target counts. It is not
+            limited to the allowed exposure times.
+        """
+        rate = self.rate(altitude)
+        if rate is None:
+            return None
+        signal = self._target_counts - self._bias_level
+
+        # The rate grows as exp(c t) during the exposure
+        c = self.slope * math.log(10) * altitude_rate
+        if abs(c) * signal / rate < 1e-6:
+            return signal / rate
+        argument = 1 + c * signal / rate
+        if argument <= 0:
+            return math.inf
+        return math.log(argument) / c
+
+    def exposure(self, altitude=0, altitude_rate=0):
+        """
+        Exposure time of the next frame: the predicted exposure time limited
+        to the allowed range, or `None` before any frame is recorded.
+
+        Parameters
+        ----------
+        altitude : `float`, default : 0, optional
+            Altitude of the Sun at the start of the exposure in degrees.
+        altitude_rate : `float`, default : 0, optional
+            Change of the altitude of the Sun in degrees per second.
+        """
+        exposure = self.predict(altitude, altitude_rate)
+        if exposure is None:
+            return None
+        return min(max(exposure, self._min_exposure), self._max_exposure)
+
+    def expected_counts(self, exposure, altitude=0, altitude_rate=0):
+        """
+        Predicted mean counts of a frame, or `None` before any frame is
+        recorded.
+
+        Parameters
+        ----------
+        exposure : `float`
+            Exposure time in seconds.
+        altitude : `float`, default : 0, optional
+            Altitude of the Sun at the start of the exposure in degrees.
+        altitude_rate : `float`, default : 0, optional
+            Change of the altitude of the Sun in degrees per second.
+        """
+        rate = self.rate(altitude)
+        if rate is None:
+            return None
+        c = self.slope * math.log(10) * altitude_rate
+        if abs(c) * exposure < 1e-6:
+            return self._bias_level + rate * exposure
+        return self._bias_level + rate * math.expm1(c * exposure) / c
+
+    def wait_time(self, altitude=0, altitude_rate=0, margin=1.1):
+        """
+        Time until a frame within the allowed exposure times is predicted to
+        reach the target counts within the tolerance.
+
+        Parameters
+        ----------
+        altitude : `float`, default : 0, optional
+            Current altitude of the Sun in degrees.
+        altitude_rate : `float`, default : 0, optional
+            Change of the altitude of the Sun in degrees per second.
+        margin : `float`, default : 1.1, optional
+            Factor by which the predicted exposure time should be within
+            the allowed range after waiting.
+
+        Returns
+        -------
+        `float` or `None`
+            The time in seconds, zero if a frame can be taken now, or `None`
+            if it cannot be taken later either, e.g. when the sky is too
+            faint and darkening, or when nothing was recorded.
+        """
+        exposure = self.exposure(altitude, altitude_rate)
+        if exposure is None:
+            return None
+        if self.accept(
+            self.expected_counts(exposure, altitude, altitude_rate)
+        ):
+            return 0
+        aim = (
+            self._min_exposure * margin
+            if exposure == self._min_exposure
+            else self._max_exposure / margin
+        )
+        if self.slope == 0 or altitude_rate == 0:
+            return None
+        intercept, slope = self._fit
+        signal = self._target_counts - self._bias_level
+        target_altitude = (math.log10(signal / aim) - intercept) / slope
+        wait = (target_altitude - altitude) / altitude_rate
+        return wait if wait > 0 else None
@@ -0,0 +1,318 @@
+import logging
+import warnings
+
+import numpy as np
+from scipy.optimize import OptimizeWarning, curve_fit
+
+logger = logging.getLogger(__name__)
+
+
+def hyperbola(x, x0, width, slope):
+    """
+    Model of the star size as a function of the focuser position.
+
+    Parameters
+    ----------
+    x : `float` or `~numpy.ndarray`
+        Focuser position.
+    x0 : `float`
+        Position of best focus.
+    width : `float`
+        Star size at best focus.
+    slope : `float`
+        Growth of the star size per focuser step far from focus.
+    """
+    return np.sqrt(width**2 + (slope * (x - x0)) ** 2)
+
+
+class VCurveAutofocus:
+    def __init__(
+        self,
+        move,
+        measure,
+        step_size,
+        tolerance=None,
+        max_exposures=10,
+        backlash=0,
+        min_position=None,
+        max_position=None,
+    ):
+        """
+        Finds the best focus position from the V-curve of the star size.
+
+        The star size, like the half-flux diameter, grows linearly with the
+        defocus far from focus and is limited by the seeing near focus,
+        which is modelled by a hyperbola. Instead of measuring a fixed grid
+        of positions, the search first measures a few positions around the
+        starting point and extends them towards the smallest stars until
+        the minimum is bracketed. It then fits the hyperbola to all the
+        measurements and measures the position on the emptier side of the
+        fitted minimum where the stars are twice their size at focus, which
+        constrains the minimum best, until the uncertainty of the fitted
+        minimum is below `tolerance` or `max_exposures` measurements were
+        made.
+
+        Positions are always approached from below: moves to a lower
+        position first go `backlash` steps further and then move up, so
+        that the backlash of the focuser does not offset the measurements.
+
+        Parameters
+        ----------
+        move : callable
+            Function moving the focuser to an absolute position and
+            returning once the move is complete.
+        measure : callable
+            Function taking an exposure and returning the star size, or NaN
+            if no stars were found.
+        step_size : `int`
+            Spacing of the first positions, in focuser steps.
+        tolerance : `float`, optional
+            Uncertainty of the best focus position at which the search
+            stops, in focuser steps. Default is a tenth of `step_size`.
+        max_exposures : `int`, default : 10, optional
+            Maximum number of measurements.
+        backlash : `int`, default : 0, optional
+            Backlash of the focuser in steps.
+        min_position : `int`, optional
+            Lowest position the focuser may be moved to.
+        max_position : `int`, optional
+            Highest position the focuser may be moved to.
+        """
+        self._move = move
+        self._measure = measure
+        self._step_size = step_size
+        self._tolerance = (
+            tolerance if tolerance is not None else step_size / 10
+        )
+        self._max_exposures = max_exposures
+        self._backlash = backlash
+        self._min_position = min_position
+        self._max_position = max_position
+
+        self._position = None
+        self._positions = []
+        self._values = []
+        self._parameters = None
+        self._uncertainty = np.inf
+        self._aborted = False
+
+    @property
+    def positions(self):
+        """The measured positions, in the order of the measurements."""
+        return list(self._positions)
+
+    @property
+    def values(self):
+        """The star sizes measured at `positions`."""
+        return list(self._values)
+
+    @property
+    def exposures(self):
+        """The number of measurements of the last run."""
+        return len(self._positions)
+
+    @property
+    def parameters(self):
+        """
+        The fitted best focus position, star size at best focus and slope
+        of the V-curve, see `hyperbola`, or `None` if the fit failed.
+        """
+        return self._parameters
+
+    @property
+    def uncertainty(self):
+        """The uncertainty of the best focus position in focuser steps."""
+        return self._uncertainty
+
+    def abort(self):
+        """Stops the search after the current measurement."""
+        self._aborted = True
+
+    def _clip(self, position):
+        position = int(round(position))
+        if self._min_position is not None:
+            position = max(position, self._min_position)
+        if self._max_position is not None:
+            position = min(position, self._max_position)
+        return position
+
+    def move(self, position):
+        """
+        Moves the focuser to `position`, from below.
+
+        Parameters
+        ----------
+        position : `int`
+            The target position.
+        """
+        if self._backlash > 0 and (
+            self._position is None or position < self._position
+        ):
+            overshoot = position - self._backlash
+            if self._min_position is not None:
+                overshoot = max(overshoot, self._min_position)
+            logger.debug(f"Moving focuser to {overshoot} for backlash")
+            self._move(overshoot)
+        self._move(position)
+        self._position = position
+
+    def _sample(self, position):
+        """Measures the star size at `position` unless already measured.
+        Returns whether a measurement was made."""
+        position = self._clip(position)
+        if position in self._positions:
+            return False
+        logger.info(f"Moving focuser to {position}...")
+        self.move(position)
+        value = float(self._measure())
+        logger.info(f"Star size at {position} is {value:.2f}")
+        self._positions.append(position)
+        self._values.append(value)
+        return True
+
+    def _valid(self):
+        """Sorted positions and star sizes of the successful measurements."""
+        x = np.array(self._positions, dtype=float)
+        y = np.array(self._values, dtype=float)
+        good = np.isfinite(y) & (y > 0)
+        order = np.argsort(x[good])
+        return x[good][order], y[good][order]
+
+    def _fit(self):
+        """Fits the hyperbola to the measurements, updating `parameters`
+        and `uncertainty`. Returns whether the fit succeeded."""
+        x, y = self._valid()
+        if len(x) < 3:
+            return False
+
+        i = np.argmin(y)
+        spread = max(x[-1] - x[0], 1)
+        slope = (y.max() - y[i]) / max(np.abs(x - x[i]).max(), 1)
+        p0 = [x[i], y[i], max(slope, 1e-6)]
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", OptimizeWarning)
+                popt, pcov = curve_fit(
+                    hyperbola,
+                    x,
+                    y,
+                    p0=p0,
+                    bounds=(
+                        [x[0] - spread, 0, 0],
+                        [x[-1] + spread, np.inf, np.inf],
+                    ),
+                )
+        except (RuntimeError, ValueError) as e:
+            logger.warning(f"Fit of the V-curve failed: {e}")
+            return False
+
+        self._parameters = tuple(float(p) for p in popt)
+        # The errors are estimated from the residuals, which needs a few
+        # more measurements than parameters
+        error = np.sqrt(pcov[0, 0]) if len(x) > 4 else np.inf
+        self._uncertainty = float(error) if np.isfinite(error) else np.inf
+        return True
+
+    def _bracket(self):
+        """Extends the measurements towards the smallest star size until
+        it is between two larger ones."""
+        step = self._step_size
+        while self.exposures < self._max_exposures and not self._aborted:
+            x, y = self._valid()
+            if len(x) == 0:
+                return
+            i = np.argmin(y)
+            if 0 < i < len(x) - 1:
+                return
+            target = x[0] - step if i == 0 else x[-1] + step
+            if not self._sample(target):
+                # At a limit of the focuser
+                return
+            step *= 1.5
+
+    def _refine(self):
+        """Measures the positions constraining the fitted minimum best."""
+        while self.exposures < self._max_exposures and not self._aborted:
+            if not self._fit():
+                return
+            if self._uncertainty <= self._tolerance:
+                return
+            x0, width, slope = self._parameters
+            x, _ = self._valid()
+            # Distance from the minimum where the stars are twice as large
+            distance = np.sqrt(3) * width / slope if slope > 0 else np.inf
+            distance = np.clip(
+                distance, self._tolerance, x[-1] - x[0] + self._step_size
+            )
+            below = np.sum(x < x0)
+            above = np.sum(x > x0)
+            sign = 1 if above < below else -1
+            # If already measured, try closer and then further positions
+            targets = [
+                x0 + side * factor * distance
+                for factor in (1, 0.5, 1.5)
+                for side in (sign, -sign)
+            ]
+            for target in targets + [x0]:
+                target = self._clip(target)
+                if np.all(np.abs(x - target) >= self._tolerance / 2):
+                    break
+            else:
+                return
+            self._sample(target)
+
+    def run(self, midpoint, nsteps=3):
+        """
+        Finds the best focus position.
+
+        The focuser is left at the last measured position.
+
+        Parameters
+        ----------
+        midpoint : `int`
+            The starting position.
+        nsteps : `int`, default : 3, optional
+            Number of the first positions, `step_size` apart and centered
+            on `midpoint`.
+
+        Returns
+        -------
+        `float` or `None`
+            The best focus position, or `None` if no stars were measured.
+        """
+        self._positions = []
+        self._values = []
+        self._parameters = None
+        self._uncertainty = np.inf
+        self._aborted = False
+
+        offsets = self._step_size * (np.arange(nsteps) - (nsteps - 1) / 2)
+        for position in midpoint + offsets:
+            if self.exposures >= self._max_exposures or self._aborted:
+                break
+            self._sample(position)
+
+        self._bracket()
+        self._refine()
+
+        x, y = self._valid()
+        if len(x) == 0:
+            logger.warning("No stars were measured during autofocus")
+            return None
+        if not self._fit():
+            logger.warning("Using the position of the smallest stars")
+            return float(x[np.argmin(y)])
+
+        x0 = self._parameters[0]
+        if not x[0] <= x0 <= x[-1]:
+            logger.warning(
+                f"Best focus position {x0:.0f} is outside of the measured "
+                f"range, using the position of the smallest stars"
+            )
+            return float(x[np.argmin(y)])
+
+        logger.info(
+            f"Best focus position is {x0:.0f} +/- {self._uncertainty:.0f} "
+            f"after {self.exposures} exposures"
+        )
+        return x0
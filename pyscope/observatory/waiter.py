@@ -0,0 +1,212 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Waiter:
+    def __init__(
+        self, min_interval=0.05, max_interval=0.1, backoff=1.5, smoothing=0.3
+    ):
+        """
+        Waits for device operations to complete with few driver round trips.
+
+        Polling a device every 0.1 s costs a driver round trip per check and
+        still notices the end of the operation up to 0.1 s late. The waiter
+        instead polls according to the predicted completion time of the
+        operation: until then, it sleeps half of the remaining time between
+        checks, so that a 10 s exposure needs about ten checks, and after
+        it, polls every `min_interval` seconds, backing off geometrically up
+        to `max_interval` seconds in case the prediction was too early, so
+        that the end of an operation is never noticed later than with plain
+        polling.
+
+        The prediction is the `expected` duration given by the caller, like
+        the exposure time of an image, plus the moving average of the
+        difference between the actual and expected durations of previous
+        waits with the same `key`, like the readout time of the camera.
+        Operations without an `expected` duration, like slews and focuser
+        moves whose durations depend on their distance, are not predicted:
+        polling starts every `min_interval` seconds and backs off.
+
+        Parameters
+        ----------
+        min_interval : `float`, default : 0.05, optional
+            Shortest time between checks in seconds.
+        max_interval : `float`, default : 0.1, optional
+            Longest time between checks after the predicted completion time,
+            or without prediction, in seconds.
+        backoff : `float`, default : 1.5, optional
+            Factor by which the time between checks grows after the
+            predicted completion time.
+        smoothing : `float`, default : 0.3, optional
+            Weight of the last wait in the moving average of the durations.
+        """
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff = backoff
+        self._smoothing = smoothing
+        self._offsets = {}
+        self._polls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def polls(self):
+        """Total number of checks of the waited conditions."""
+        return self._polls
+
+    def predict(self, key, expected=None):
+        """
+        Predicted duration of an operation.
+
+        Parameters
+        ----------
+        key : `str` or `None`
+            Kind of operation.
+        expected : `float`, optional
+            Expected duration given by the caller, in seconds.
+
+        Returns
+        -------
+        `float` or `None`
+            The predicted duration in seconds, or `None` if unknown.
+        """
+        if expected is None:
+            return None
+        with self._lock:
+            offset = self._offsets.get(key)
+        if offset is None:
+            return expected
+        return max(expected + offset, 0)
+
+    def _record(self, key, elapsed, expected):
+        # Only the overhead of operations of known duration is predictable
+        if key is None or expected is None:
+            return
+        offset = elapsed - expected
+        with self._lock:
+            previous = self._offsets.get(key)
+            self._offsets[key] = (
+                offset
+                if previous is None
+                else previous + self._smoothing * (offset - previous)
+            )
+
+    def _delays(self, start, prediction, timeout):
+        """Time to sleep before each next check, or `None` once timed out."""
+        interval = self._min_interval
+        while True:
+            now = time.monotonic()
+            if timeout is not None and now - start >= timeout:
+                yield None
+                return
+            remaining = (
+                None if prediction is None else start + prediction - now
+            )
+            if remaining is not None and remaining > self._min_interval:
+                # Few checks until shortly before the predicted completion
+                delay = remaining / 2
+            else:
+                delay = interval
+                interval = min(interval * self._backoff, self._max_interval)
+            if timeout is not None:
+                delay = min(delay, start + timeout - now)
+            yield max(delay, 0)
+
+    def _timeout(self, description, timeout):
+        return TimeoutError(
+            f"Timed out after {timeout:.1f} seconds waiting for "
+            f"{description or 'a device'}"
+        )
+
+    def wait(
+        self,
+        condition,
+        timeout=None,
+        expected=None,
+        key=None,
+        description=None,
+    ):
+        """
+        Wait until `condition()` is true.
+
+        Parameters
+        ----------
+        condition : callable
+            Function returning whether the operation is complete, typically
+            reading a device property.
+        timeout : `float`, optional
+            Time in seconds after which `TimeoutError` is raised. No timeout
+            if `None`.
+        expected : `float`, optional
+            Expected duration of the operation in seconds.
+        key : `str`, optional
+            Kind of operation, used to learn its overhead over `expected`.
+        description : `str`, optional
+            Description of the operation for the logs.
+
+        Returns
+        -------
+        `float`
+            Time waited in seconds.
+
+        Raises
+        ------
+        `TimeoutError`
+            If the condition is still false after `timeout` seconds.
+        """
+        start = time.monotonic()
+        prediction = self.predict(key, expected)
+        for delay in self._delays(start, prediction, timeout):
+            self._polls += 1
+            if condition():
+                elapsed = time.monotonic() - start
+                self._record(key, elapsed, expected)
+                return elapsed
+            if delay is None:
+                raise self._timeout(description, timeout)
+            time.sleep(delay)
+
+    async def wait_async(
+        self,
+        condition,
+        timeout=None,
+        expected=None,
+        key=None,
+        description=None,
+    ):
+        """
+        Awaitable variant of `wait`.
+
+        `condition` may be a coroutine function. Other functions are called
+        in a worker thread, so that blocking driver calls do not block the
+        event loop.
+
+        Returns
+        -------
+        `float`
+            Time waited in seconds.
+
+        Raises
+        ------
+        `TimeoutError`
+            If the condition is still false after `timeout` seconds.
+        """
+        start = time.monotonic()
+        prediction = self.predict(key, expected)
+        for delay in self._delays(start, prediction, timeout):
+            self._polls += 1
+            if inspect.iscoroutinefunction(condition):
+                done = await condition()
+            else:
+                done = await asyncio.to_thread(condition)
+            if done:
+                elapsed = time.monotonic() - start
+                self._record(key, elapsed, expected)
+                return elapsed
+            if delay is None:
+                raise self._timeout(description, timeout)
+            await asyncio.sleep(delay)
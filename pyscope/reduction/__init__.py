@@ -4,8 +4,11 @@ from .astrometry_net_wcs import astrometry_net_wcs
 from .avg_fits import avg_fits
 from .avg_fits_ccdproc import avg_fits_ccdproc
 from .calib_images import calib_images
-from .ccd_calib import ccd_calib
+from .calib_index import CalibrationIndex, calibration_index
+from .ccd_calib import CCDCalibrator, ccd_calib
+from .fits_index import FitsIndex, fits_index, read_header
 from .fitslist import fitslist
+from .local_wcs import StarIndex, local_wcs
 from .maxim_pinpoint_wcs import maxim_pinpoint_wcs
 
 # from .pinpoint_wcs import pinpoint_wcs
@@ -19,10 +22,18 @@ __all__ = [
     "avg_fits",
     "avg_fits_ccdproc",
     "calib_images",
+    "CalibrationIndex",
+    "calibration_index",
+    "CCDCalibrator",
     "ccd_calib",
+    "FitsIndex",
+    "fits_index",
     "fitslist",
+    "local_wcs",
     "maxim_pinpoint_wcs",
     # "pinpoint_wcs",
+    "read_header",
     "reduce_calibration_set",
+    "StarIndex",
     # "twirl_wcs",
 ]
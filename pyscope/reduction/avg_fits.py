@@ -1,3 +1,4 @@
+import contextlib
 import glob
 import logging
 import os
@@ -11,6 +12,104 @@ from astropy.io import fits
 
 logger = logging.getLogger(__name__)
 
+# Each strip of the stack is held as float64 along with roughly two
+# temporary copies of the same size (sort/partition, rejection masks)
+_STRIP_COPIES = 3
+
+
+def _open_image_hdu(hdul):
+    """Return the first HDU of an open FITS file that contains image data."""
+    for hdu in hdul:
+        if hdu.is_image and hdu.shape:
+            return hdu
+    raise ValueError(f"No image data found in {hdul.filename()}")
+
+
+def _read_rows(hdu, start, stop):
+    """
+    Read rows `start:stop` of a memory-mapped image HDU opened with
+    `do_not_scale_image_data=True`, applying BSCALE/BZERO/BLANK the same
+    way `astropy.io.fits` does when it loads the full image.
+    """
+    raw = hdu.section[start:stop]
+    bscale = hdu.header.get("BSCALE", 1)
+    bzero = hdu.header.get("BZERO", 0)
+    blank = hdu.header.get("BLANK", None)
+    if bscale == 1 and bzero == 0 and blank is None:
+        return raw
+    if raw.dtype.kind in "iu" and raw.dtype.itemsize <= 2:
+        data = raw.astype(np.float32)
+    else:
+        data = raw.astype(np.float64)
+    if bscale != 1:
+        np.multiply(data, bscale, out=data)
+    if bzero != 0:
+        data += bzero
+    if blank is not None and raw.dtype.kind in "iu":
+        data[raw == blank] = np.nan
+    return data
+
+
+def _strip_rows(nimages, shape, memory_limit):
+    """
+    Number of image rows to combine at once so that a strip of the stack
+    fits within `memory_limit` megabytes.
+    """
+    row_bytes = (
+        nimages
+        * int(np.prod(shape[1:]))
+        * np.dtype(np.float64).itemsize
+        * _STRIP_COPIES
+    )
+    rows = int(memory_limit * 1024**2 // max(row_bytes, 1))
+    return min(max(rows, 1), shape[0])
+
+
+def _sigma_clipped_mean(stack, sigma=3.0, maxiters=5):
+    """
+    Iteratively sigma-clipped mean of a stack along the first axis.
+
+    Pixels further than `sigma` standard deviations from the median of
+    their column of the stack are rejected until no more pixels are
+    rejected or `maxiters` is reached.
+    """
+    stack = stack.copy()
+    for _ in range(maxiters):
+        center = np.nanmedian(stack, axis=0)
+        std = np.nanstd(stack, axis=0)
+        clip = np.abs(stack - center) > sigma * std
+        if not np.any(clip):
+            break
+        stack[clip] = np.nan
+    with np.errstate(invalid="ignore"):
+        return np.nanmean(stack, axis=0)
+
+
+def _minmax_rejected_mean(stack, nlow=1, nhigh=1):
+    """
+    Mean of a stack along the first axis after rejecting the `nlow` lowest
+    and `nhigh` highest values of each pixel.
+    """
+    if nlow + nhigh >= stack.shape[0]:
+        raise ValueError(
+            f"Cannot reject {nlow} low and {nhigh} high values from a stack of {stack.shape[0]} images"
+        )
+    stack = np.sort(stack, axis=0)
+    return np.mean(stack[nlow : stack.shape[0] - nhigh], axis=0)
+
+
+def _combine_strip(stack, mode, sigma=3.0, maxiters=5, nlow=1, nhigh=1):
+    """Combine one strip of the stack along the first axis."""
+    if str(mode) == "0":
+        return np.median(stack, axis=0)
+    elif str(mode) == "1":
+        return np.mean(stack, axis=0)
+    elif str(mode) == "2":
+        return _sigma_clipped_mean(stack, sigma=sigma, maxiters=maxiters)
+    elif str(mode) == "3":
+        return _minmax_rejected_mean(stack, nlow=nlow, nhigh=nhigh)
+    raise ValueError(f"Unknown averaging mode: {mode}")
+
 
 @click.command(
     epilog="""Check out the documentation at
@@ -31,11 +130,11 @@ logger = logging.getLogger(__name__)
 @click.option(
     "-m",
     "--mode",
-    type=click.Choice(["0", "1"]),
+    type=click.Choice(["0", "1", "2", "3"]),
     default="0",
     show_choices=True,
     show_default=True,
-    help="Mode to use for averaging images (0 = median, 1 = mean).",
+    help="Mode to use for averaging images (0 = median, 1 = mean, 2 = sigma-clipped mean, 3 = min/max-rejected mean).",
 )
 @click.option(
     "-d",
@@ -63,6 +162,41 @@ logger = logging.getLogger(__name__)
     type=click.Path(),
     help="Path to save averaged image.",
 )
+@click.option(
+    "-M",
+    "--memory-limit",
+    "memory_limit",
+    type=click.FloatRange(min=0, min_open=True),
+    default=1024,
+    show_default=True,
+    help="Approximate memory budget in megabytes. Images are memory-mapped and combined in strips of rows that fit within this budget.",
+)
+@click.option(
+    "-s",
+    "--sigma",
+    type=float,
+    default=3.0,
+    show_default=True,
+    help="Rejection threshold in standard deviations for the sigma-clipped mean (mode 2).",
+)
+@click.option(
+    "-i",
+    "--maxiters",
+    type=int,
+    default=5,
+    show_default=True,
+    help="Maximum number of clipping iterations for the sigma-clipped mean (mode 2).",
+)
+@click.option(
+    "-r",
+    "--reject",
+    "reject",
+    nargs=2,
+    type=int,
+    default=(1, 1),
+    show_default=True,
+    help="Number of lowest and highest values rejected per pixel for the min/max-rejected mean (mode 3).",
+)
 @click.option(
     "-v",
     "--verbose",
@@ -77,12 +211,19 @@ def avg_fits_cli(
     mode="0",
     datatype=np.float32,
     outfile=None,
+    memory_limit=1024,
+    sigma=3.0,
+    maxiters=5,
+    reject=(1, 1),
     verbose=0,
 ):
     """
     Averages a list of FITS images into a single output image.
 
     Averages multiple FITS images into a single output image, with options for pre-normalization, averaging mode, and output data type.
+    The images are memory-mapped and combined in strips of rows, so the memory used is bounded by `memory_limit`
+    rather than by the number of images. Every output pixel only depends on the same pixel of the input images,
+    so the result is identical to combining the whole stack at once.
 
     Parameters
     ----------
@@ -91,11 +232,19 @@ def avg_fits_cli(
     pre_normalize : `bool`, default=`False`
         Normalize each image by its own mean before combining.
     mode : `str`, default=`"0"`
-        Averaging mode: `"0"` for median, `"1"` for mean.
+        Averaging mode: `"0"` for median, `"1"` for mean, `"2"` for sigma-clipped mean, `"3"` for min/max-rejected mean.
     datatype : `str`, default=`"float32"`
         Data type for the averaged image. Defaults to `"float32"` unless pre-normalizing, where `"float64"` is used.
     outfile : `str`, optional
         Output path for the averaged image. Defaults to using the first input file name with `"_avg.fts"` appended.
+    memory_limit : `float`, default=1024
+        Approximate memory budget in megabytes for the stack of image strips being combined.
+    sigma : `float`, default=3.0
+        Rejection threshold in standard deviations for the sigma-clipped mean.
+    maxiters : `int`, default=5
+        Maximum number of clipping iterations for the sigma-clipped mean.
+    reject : `tuple` of `int`, default=(1, 1)
+        Number of lowest and highest values rejected per pixel for the min/max-rejected mean.
     verbose : `int`, default=`0`
         Logging verbosity level. Use `-v` for `INFO` and `-vv` for `DEBUG`.
 
@@ -120,7 +269,7 @@ def avg_fits_cli(
         logging.basicConfig(level=logging.WARNING)
 
     logger.debug(
-        f"Called avg_fits_cli(fname={fnames}, mode={mode}, datatype={datatype}, outfile={outfile}, verbose={verbose})"
+        f"Called avg_fits_cli(fname={fnames}, mode={mode}, datatype={datatype}, outfile={outfile}, memory_limit={memory_limit}, sigma={sigma}, maxiters={maxiters}, reject={reject}, verbose={verbose})"
     )
 
     first_hdr = fits.getheader(fnames[0])
@@ -143,92 +292,133 @@ def avg_fits_cli(
     gain = first_hdr["GAIN"]
     logger.debug(f"GAIN: {gain}")
 
-    # TODO: don't require all images to be in memory at once
-    logger.info("Loading images...")
-    images = []
-    for fname in fnames:
-        image = fits.getdata(fname).astype(np.float64)
-        hdr = fits.getheader(fname)
+    with contextlib.ExitStack() as stack:
+        logger.info("Opening images...")
+        hdus = []
+        pedestals = np.zeros(len(fnames), dtype=np.float64)
+        for i, fname in enumerate(fnames):
+            hdu = _open_image_hdu(
+                stack.enter_context(
+                    fits.open(fname, memmap=True, do_not_scale_image_data=True)
+                )
+            )
+            hdr = hdu.header
 
-        # check for matches in header
-        try:
-            if hdr["FRAMETYP"] != frametyp:
+            # check for matches in header
+            try:
+                if hdr["FRAMETYP"] != frametyp:
+                    logger.warning(
+                        f"FRAMETYP mismatch: {
+                            hdr['FRAMETYP']} != {frametyp}"
+                    )
+            except KeyError:
+                logger.error(
+                    "FRAMETYP keyword not found in header. Trying image type."
+                )
+                if hdr["IMAGETYP"] != frametyp:
+                    logger.warning(
+                        f"IMAGETYP mismatch: {
+                            hdr['IMAGETYP']} != {frametyp}"
+                    )
+            if hdr["XBINNING"] != binx:
                 logger.warning(
-                    f"FRAMETYP mismatch: {
-                        hdr['FRAMETYP']} != {frametyp}"
+                    f"XBINNING mismatch: {hdr['XBINNING']} != {binx}"
                 )
-        except KeyError:
-            logger.error(
-                "FRAMETYP keyword not found in header. Trying image type."
-            )
-            if hdr["IMAGETYP"] != frametyp:
+            if hdr["YBINNING"] != biny:
                 logger.warning(
-                    f"IMAGETYP mismatch: {
-                        hdr['IMAGETYP']} != {frametyp}"
+                    f"YBINNING mismatch: {hdr['YBINNING']} != {biny}"
                 )
-        if hdr["XBINNING"] != binx:
-            logger.warning(f"BINX mismatch: {hdr['BINX']} != {binx}")
-        if hdr["YBINNING"] != biny:
-            logger.warning(f"BINY mismatch: {hdr['BINY']} != {biny}")
-        if hdr["READOUTM"] != readout:
-            logger.warning(
-                f"READOUTM mismatch: {
-                    hdr['READOUTM']} != {readout}"
-            )
-        if hdr["EXPTIME"] != exptime and not pre_normalize:
-            logger.warning(
-                f"EXPTIME mismatch: {
-                    hdr['EXPTIME']} != {exptime} in image {fname}"
+            if hdr["READOUTM"] != readout:
+                logger.warning(
+                    f"READOUTM mismatch: {
+                        hdr['READOUTM']} != {readout}"
+                )
+            if hdr["EXPTIME"] != exptime and not pre_normalize:
+                logger.warning(
+                    f"EXPTIME mismatch: {
+                        hdr['EXPTIME']} != {exptime} in image {fname}"
+                )
+            elif hdr["EXPTIME"] != exptime and pre_normalize:
+                logger.info(
+                    f"EXPTIME mismatch: {
+                        hdr['EXPTIME']} != {exptime} in image {fname}"
+                )
+                logger.info(
+                    "pre_normalize is True so ignoring EXPTIME mismatch."
+                )
+            if hdr["GAIN"] != gain:
+                logger.warning(f"GAIN mismatch: {hdr['GAIN']} != {gain}")
+
+            # check for pedestal
+            if "PEDESTAL" in hdr.keys():
+                logger.info(
+                    f"Found pedestal of {
+                        hdr['PEDESTAL']}. Subtracting pedestal."
+                )
+                pedestals[i] = hdr["PEDESTAL"]
+
+            if hdus and hdu.shape != hdus[0].shape:
+                raise ValueError(
+                    f"Image {fname} has shape {hdu.shape}, expected {hdus[0].shape}"
+                )
+            hdus.append(hdu)
+
+        shape = hdus[0].shape
+        nrows = _strip_rows(len(hdus), shape, memory_limit)
+        logger.info(
+            f"Opened {len(hdus)} images of shape {shape}, combining {nrows} rows at a time"
+        )
+
+        def load_strip(start, stop):
+            strip = np.empty(
+                (len(hdus), stop - start) + shape[1:], dtype=np.float64
             )
-        elif hdr["EXPTIME"] != exptime and pre_normalize:
+            for i, hdu in enumerate(hdus):
+                strip[i] = _read_rows(hdu, start, stop)
+                if pedestals[i]:
+                    strip[i] -= pedestals[i]
+            return strip
+
+        if pre_normalize:
             logger.info(
-                f"EXPTIME mismatch: {
-                    hdr['EXPTIME']} != {exptime} in image {fname}"
+                "pre_normalize is True. Normalizing each image by its own mean before combining."
             )
-            logger.info("pre_normalize is True so ignoring EXPTIME mismatch.")
-        if hdr["GAIN"] != gain:
-            logger.warning(f"GAIN mismatch: {hdr['GAIN']} != {gain}")
+            logger.info("Computing image means...")
+            means = np.empty(len(hdus), dtype=np.float64)
+            for i, hdu in enumerate(hdus):
+                means[i] = np.mean(
+                    np.asarray(_read_rows(hdu, 0, shape[0]), dtype=np.float64)
+                    - pedestals[i]
+                )
+            logger.info("Done!")
+            logger.info("pre_normalize is True so setting datatype to float64")
+            datatype = np.float64
 
-        # check for pedestal
-        if "PEDESTAL" in hdr.keys():
             logger.info(
-                f"Found pedestal of {
-                    hdr['PEDESTAL']}. Subtracting pedestal."
+                "pre-normalized is True, removing pedestal keyword from header."
             )
-            image -= hdr["PEDESTAL"]
-        images.append(image)
-    images = np.array(images)
-    logger.info(f"Loaded {images.shape} images")
+            if "PEDESTAL" in first_hdr:
+                logger.info("Removing PEDESTAL keyword rom header.")
+                del first_hdr["PEDESTAL"]
 
-    if pre_normalize:
-        logger.info(
-            "pre_normalize is True. Normalizing each image by its own mean before combining."
-        )
-        logger.info("Normalizing images...")
-        images = images / np.mean(images, axis=(1, 2))[:, None, None]
-        logger.info("Done!")
-        logger.info("pre_normalize is True so setting datatype to float64")
-        datatype = np.float64
-
-        logger.info(
-            "pre-normalized is True, removing pedestal keyword from header."
-        )
-        if "PEDESTAL" in first_hdr:
-            logger.info("Removing PEDESTAL keyword rom header.")
-            del first_hdr["PEDESTAL"]
-
-    logger.info(f"Averaging images with mode = {mode}...")
-    if str(mode) == "0":
-        logger.debug("Calculating median...")
-        image_avg = np.median(images, axis=0)
-    elif str(mode) == "1":
-        logger.debug("Calculating mean...")
-        image_avg = np.mean(images, axis=0)
+        logger.info(f"Averaging images with mode = {mode}...")
+        image_avg = np.empty(shape, dtype=datatype)
+        for start in tqdm.tqdm(range(0, shape[0], nrows), disable=verbose < 1):
+            stop = min(start + nrows, shape[0])
+            strip = load_strip(start, stop)
+            if pre_normalize:
+                strip = strip / means[:, None, None]
+            image_avg[start:stop] = _combine_strip(
+                strip,
+                mode,
+                sigma=sigma,
+                maxiters=maxiters,
+                nlow=reject[0],
+                nhigh=reject[1],
+            )
+        nimages = len(hdus)
     logger.debug(f"Averaged image mean: {np.mean(image_avg)}")
     logger.debug(f"Averaged image median: {np.median(image_avg)}")
-
-    logger.info(f"Converting data type of averaged image to {datatype}...")
-    image_avg = image_avg.astype(datatype)
     logger.info(f"Data type of averaged image: {image_avg.dtype}")
 
     if outfile is None:
@@ -238,7 +428,7 @@ def avg_fits_cli(
         outfile = f"{fnames[0]}_avg.fts"
 
     logger.info(f"Saving averaged image to {outfile}")
-    first_hdr.add_comment(f"Averaged {len(images)} images using pyscope")
+    first_hdr.add_comment(f"Averaged {nimages} images using pyscope")
     first_hdr.add_comment(f"Average mode: {mode}")
     fits.writeto(outfile, image_avg, first_hdr, overwrite=True)
 
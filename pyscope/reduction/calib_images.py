@@ -1,14 +1,15 @@
 import logging
 import os
 import shutil
-from pathlib import Path
+import time
 
 import click
-from astropy.io import fits
 
 from pyscope.analysis import calc_zmag
 
+from .calib_index import calibration_index
 from .ccd_calib import ccd_calib
+from .fits_index import fits_index, read_header
 
 logger = logging.getLogger(__name__)
 
@@ -86,6 +87,14 @@ logger = logging.getLogger(__name__)
     help="""If given, the zero-point magnitude is calculated for each image with
                 SDSS filters. If not given, the zero-point magnitude is not calculated.""",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of worker processes used to calibrate images in parallel.",
+)
 @click.option(
     "-v",
     "--verbose",
@@ -108,6 +117,7 @@ def calib_images_cli(
     astro_scrappy=(1, 3),
     bad_columns="",
     zmag=False,
+    jobs=1,
     verbose=0,
     fnames=(),
 ):
@@ -151,6 +161,8 @@ def calib_images_cli(
     zmag : `bool`, optional
         If given, the zero-point magnitude is calculated for each image with
         SDSS filters. If not given, the zero-point magnitude is not calculated.
+    jobs : `int`, optional
+        Number of worker processes used to calibrate images in parallel.
     verbose : `int`, optional
         Print verbose output. `1` = verbose, `2` = more verbose.
     fnames : `list` of `str`
@@ -186,16 +198,24 @@ def calib_images_cli(
         logger.info(
             "--image-dir passed, ignoring fnames argument and using all images in directory."
         )
-        fnames = []
-        for ext in (".fts", ".fits", ".fit"):
-            fnames.extend(Path(image_dir).glob(f"*{ext}"))
+        # Images already calibrated are skipped through the directory index
+        # without opening them
+        image_index = fits_index(image_dir, recursive=False)
+        image_index.update()
+        fnames = image_index.query(calibrated=False)
         logger.debug(f"fnames = {fnames}")
 
+    index = calibration_index(calib_dir)
+    index.update()
+
     logger.info(f"Calibrating {len(fnames)} images.")
+    t0 = time.time()
+    tasks = []
+    status = None
     for fname in fnames:
         logger.info(f"Calibrating {fname}")
 
-        hdr = fits.getheader(fname, 0)
+        hdr = read_header(fname)
 
         if raw_archive_dir is not None:
             if not raw_archive_dir.exists():
@@ -212,96 +232,11 @@ def calib_images_cli(
         except KeyError:
             filt = ""
 
-        try:
-            readout = hdr["READOUTM"]
-        except KeyError:
-            readout = hdr["READOUT"]
-
-        try:
-            exptime = round(hdr["EXPTIME"], 3)
-        except KeyError:
-            exptime = round(hdr["EXPOSURE"], 3)
-
-        try:
-            gain = hdr["GAIN"]
-        except KeyError:
-            gain = ""
-
-        try:
-            xbin = hdr["XBINNING"]
-        except KeyError:
-            xbin = hdr["XBIN"]
-
-        try:
-            ybin = hdr["YBINNING"]
-        except KeyError:
-            ybin = hdr["YBIN"]
-
-        flat_frame = None
-        dark_frame = None
-        bias_frame = None
-        flat_dark_frame = None
-        calimages = []
-        for ext in (".fts", ".fits", ".fit"):
-            calimages.extend(Path(calib_dir).rglob(f"*{ext}"))
-
-        for calimg in calimages:
-            # find flat_frame, dark_frame, bias_frame, flat_dark_frame
-            hdrf = fits.getheader(calimg, 0)
-            # if the corresponding header values match, then set the
-            # appropriate frame
-            if (
-                "master_flat" in calimg.name
-                and "master_flat_dark" not in calimg.name
-                and hdrf["FILTER"] == filt
-                and hdrf["READOUTM"] == readout
-                and (gain == "" or hdrf["GAIN"] == gain)
-                and hdrf["XBINNING"] == xbin
-                and hdrf["YBINNING"] == ybin
-                #                and (
-                #                    flat_frame
-                #                    and fits.getval(flat_frame, "DATE-OBS") < hdrf["DATE-OBS"]
-                #                )
-            ):
-                flat_frame = Path(calimg)
-            elif (
-                "master_dark" in calimg.name
-                and hdrf["READOUTM"] == readout
-                and (gain == "" or hdrf["GAIN"] == gain)
-                and (camera_type == "ccd" or hdrf["EXPTIME"] == exptime)
-                and hdrf["XBINNING"] == xbin
-                and hdrf["YBINNING"] == ybin
-                #                and (
-                #                    dark_frame
-                #                    and fits.getval(dark_frame, "DATE-OBS") < hdrf["DATE-OBS"]
-                #                )
-            ):
-                dark_frame = Path(calimg)
-            elif (
-                "master_bias" in calimg.name
-                and hdrf["READOUTM"] == readout
-                and (gain == "" or hdrf["GAIN"] == gain)
-                and hdrf["XBINNING"] == xbin
-                and hdrf["YBINNING"] == ybin
-                #                and (
-                #                    bias_frame
-                #                    and fits.getval(bias_frame, "DATE-OBS") < hdrf["DATE-OBS"]
-                #                )
-            ):
-                bias_frame = Path(calimg)
-            elif (
-                "master_flat_dark" in calimg.name
-                and hdrf["READOUTM"] == readout
-                and (gain == "" or hdrf["GAIN"] == gain)
-                and hdrf["EXPTIME"] == exptime
-                and hdrf["XBINNING"] == xbin
-                and hdrf["YBINNING"] == ybin
-                #                and (
-                #                    flat_dark_frame
-                #                    and fits.getval(flat_dark_frame, "DATE-OBS") < hdrf["DATE-OBS"]
-                #                )
-            ):
-                flat_dark_frame = Path(calimg)
+        masters = index.find_masters(hdr, camera_type=camera_type)
+        flat_frame = masters["flat"]
+        dark_frame = masters["dark"]
+        bias_frame = masters["bias"]
+        flat_dark_frame = masters["flat_dark"]
 
         logger.debug("Found calibration frames:")
         if dark_frame:
@@ -313,23 +248,33 @@ def calib_images_cli(
         if flat_dark_frame:
             logger.debug(f"Flat dark: {flat_dark_frame}")
 
-        print(filt)
         if filt == "HaGrism" or filt == "OGGrism":
             if dark_frame is None or bias_frame is None:
                 logger.exception(
                     "calib-images: Grism image detected: No matching calibration frames found."
                 )
-                return 0
+                status = 0
+                break
         elif dark_frame is None or bias_frame is None or flat_frame is None:
             logger.exception(
                 "calib-images: No matching calibration frames found."
             )
-            return 0
+            status = 0
+            break
 
+        tasks.append((fname, dark_frame, bias_frame, flat_frame))
+
+    # Images sharing the same master frames are calibrated together so that
+    # the masters are only prepared once
+    groups = {}
+    for fname, *frames in tasks:
+        groups.setdefault(tuple(frames), []).append(fname)
+
+    for (dark_frame, bias_frame, flat_frame), group in groups.items():
         # After gethering all the required parameters, run ccd_calib
-        logger.debug("Running ccd_calib...")
+        logger.debug(f"Running ccd_calib on {len(group)} image(s)...")
         ccd_calib(
-            (fname,),
+            group,
             dark_frame=dark_frame,
             bias_frame=bias_frame,
             flat_frame=flat_frame,
@@ -338,17 +283,28 @@ def calib_images_cli(
             bad_columns=bad_columns,
             in_place=in_place,
             verbose=verbose,
+            jobs=jobs,
         )
 
-        logger.debug("Done!")
-
-        if zmag:
+    if zmag:
+        for fname, *_ in tasks:
             logger.info("Calculating zero-point magnitudes...")
             try:
                 calc_zmag.calc_zmag(images=(fname,))
             except BaseException:
                 logger.exception(f"calc-zmag failed with exception on {fname}")
 
+    # Coarse clocks, e.g. on Windows, may not advance for an empty run
+    elapsed = max(time.time() - t0, 1e-9)
+    nbytes = sum(os.path.getsize(fname) for fname, *_ in tasks)
+    logger.info(
+        f"Calibrated {len(tasks)} images ({nbytes / 1024**2:.1f} MB) in {elapsed:.1f} s: "
+        f"{len(tasks) / elapsed:.2f} images/s, {nbytes / 1024**2 / elapsed:.1f} MB/s"
+    )
+
+    if status is not None:
+        return status
+
     logger.info("Done!")
 
 
@@ -0,0 +1,358 @@
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+from .fits_index import FITS_EXTENSIONS, _obstime, read_header
+
+logger = logging.getLogger(__name__)
+
+# Master frame types, in the order they must be tested against file names
+# ("master_flat_dark" also contains "master_flat" and "master_dark")
+FRAME_TYPES = ("flat_dark", "flat", "dark", "bias")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS masters (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    frametype TEXT NOT NULL,
+    filter TEXT,
+    readoutm TEXT,
+    gain REAL,
+    xbinning INTEGER,
+    ybinning INTEGER,
+    exptime REAL,
+    obstime REAL
+);
+CREATE INDEX IF NOT EXISTS masters_lookup ON masters (
+    frametype, readoutm, xbinning, ybinning, gain, filter, exptime, obstime
+);
+"""
+
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def calibration_keys(hdr):
+    """
+    Extract the keywords used to match an image to its master calibration
+    frames from a FITS header.
+
+    Parameters
+    ----------
+    hdr : `~astropy.io.fits.Header`
+        FITS header of the image.
+
+    Returns
+    -------
+    `dict`
+        Dictionary with the keys `filter`, `readoutm`, `gain`, `xbinning`,
+        `ybinning`, `exptime` and `obstime`. `filter` and `gain` are `""` and
+        `obstime` is `None` if the header does not contain them.
+
+    Raises
+    ------
+    `KeyError`
+        If the readout mode, exposure time or binning keywords are missing.
+    """
+    return {
+        "filter": hdr.get("FILTER", ""),
+        "readoutm": hdr["READOUTM"] if "READOUTM" in hdr else hdr["READOUT"],
+        "gain": hdr.get("GAIN", ""),
+        "xbinning": hdr["XBINNING"] if "XBINNING" in hdr else hdr["XBIN"],
+        "ybinning": hdr["YBINNING"] if "YBINNING" in hdr else hdr["YBIN"],
+        "exptime": round(
+            hdr["EXPTIME"] if "EXPTIME" in hdr else hdr["EXPOSURE"], 3
+        ),
+        "obstime": _obstime(hdr.get("DATE-OBS", None)),
+    }
+
+
+def _frametype(fname):
+    """Master frame type of a calibration file from its name, or `None`."""
+    for frametype in FRAME_TYPES:
+        if f"master_{frametype}" in fname:
+            return frametype
+    return None
+
+
+def calibration_index(calib_dir, index_file=None):
+    """
+    Return a shared `CalibrationIndex` for a calibration directory.
+
+    Repeated calls with the same directory return the same instance, so
+    that callers processing images one at a time do not reopen the index.
+
+    Parameters
+    ----------
+    calib_dir : `str` or `~pathlib.Path`
+        Directory containing the master calibration frames.
+    index_file : `str` or `~pathlib.Path`, optional
+        Path of the SQLite index file. See `CalibrationIndex`.
+
+    Returns
+    -------
+    `CalibrationIndex`
+    """
+    key = (
+        str(Path(calib_dir).resolve()),
+        None if index_file is None else str(Path(index_file).resolve()),
+    )
+    with _indices_lock:
+        if key not in _indices:
+            _indices[key] = CalibrationIndex(calib_dir, index_file=index_file)
+        return _indices[key]
+
+
+class CalibrationIndex:
+    def __init__(self, calib_dir, index_file=None):
+        """
+        Persistent index of the master calibration frames in a directory.
+
+        The headers of the master frames are read once and stored in a SQLite
+        table keyed on the file path. Entries are refreshed by `update` when a
+        file's modification time or size changes, and removed when the file
+        disappears. Lookups use an index on the matching keywords and return
+        the master frame nearest in time to the image being calibrated.
+
+        Master frames are classified by name as in `calib_images`:
+        `master_bias*`, `master_dark*`, `master_flat*` and `master_flat_dark*`.
+
+        Parameters
+        ----------
+        calib_dir : `str` or `~pathlib.Path`
+            Directory containing the master calibration frames. It is searched
+            recursively for `.fts`, `.fits` and `.fit` files.
+        index_file : `str` or `~pathlib.Path`, optional
+            Path of the SQLite index file. Defaults to `.calib_index.sqlite`
+            inside `calib_dir`.
+        """
+        self._calib_dir = Path(calib_dir).resolve()
+        if index_file is None:
+            index_file = self._calib_dir / ".calib_index.sqlite"
+        self._index_file = Path(index_file)
+        self._lock = threading.RLock()
+        try:
+            self._conn = sqlite3.connect(
+                self._index_file, check_same_thread=False
+            )
+            self._conn.executescript(_SCHEMA)
+        except sqlite3.Error:
+            logger.warning(
+                f"Could not open calibration index {self._index_file}, "
+                "keeping it in memory"
+            )
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        """Close the connection to the index file."""
+        with self._lock:
+            self._conn.close()
+
+    def update(self):
+        """
+        Synchronize the index with the calibration directory.
+
+        Only the files that are new or whose modification time or size
+        changed since the last update have their headers read.
+
+        Returns
+        -------
+        `int`
+            Number of entries added, refreshed or removed.
+        """
+        with self._lock:
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in self._conn.execute(
+                    "SELECT path, mtime, size FROM masters"
+                )
+            }
+
+            rows = []
+            for ext in FITS_EXTENSIONS:
+                for calimg in self._calib_dir.rglob(f"*{ext}"):
+                    frametype = _frametype(calimg.name)
+                    if frametype is None:
+                        continue
+                    path = str(calimg)
+                    try:
+                        stat = calimg.stat()
+                    except OSError:
+                        continue
+                    if known.pop(path, None) == (stat.st_mtime, stat.st_size):
+                        continue
+                    try:
+                        keys = calibration_keys(read_header(calimg))
+                    except (OSError, KeyError, ValueError):
+                        logger.warning(
+                            f"Could not index calibration frame {calimg}",
+                            exc_info=True,
+                        )
+                        # Drop any stale entry for this file
+                        known[path] = None
+                        continue
+                    logger.debug(f"Indexing {frametype} frame {calimg}")
+                    rows.append(
+                        (
+                            path,
+                            stat.st_mtime,
+                            stat.st_size,
+                            frametype,
+                            keys["filter"],
+                            keys["readoutm"],
+                            None if keys["gain"] == "" else keys["gain"],
+                            keys["xbinning"],
+                            keys["ybinning"],
+                            keys["exptime"],
+                            keys["obstime"],
+                        )
+                    )
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO masters VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.executemany(
+                "DELETE FROM masters WHERE path = ?",
+                [(path,) for path in known],
+            )
+            self._conn.commit()
+
+        if rows or known:
+            logger.info(
+                f"Calibration index updated: {len(rows)} indexed, {len(known)} removed"
+            )
+        return len(rows) + len(known)
+
+    def lookup(
+        self,
+        frametype,
+        readoutm,
+        xbinning,
+        ybinning,
+        gain="",
+        filt=None,
+        exptime=None,
+        obstime=None,
+    ):
+        """
+        Find the master frame of a given type that matches the given keywords.
+
+        Parameters
+        ----------
+        frametype : `str`
+            One of `"bias"`, `"dark"`, `"flat"` or `"flat_dark"`.
+        readoutm : `str`
+            Readout mode.
+        xbinning, ybinning : `int`
+            Binning.
+        gain : `float` or `str`, default : `""`, optional
+            Gain. If `""`, any gain matches.
+        filt : `str`, optional
+            Filter. If `None`, any filter matches.
+        exptime : `float`, optional
+            Exposure time, rounded to milliseconds. If `None`, any exposure
+            time matches.
+        obstime : `float`, optional
+            UTC POSIX timestamp of the observation. The matching master frame
+            nearest in time is returned. If `None`, the most recent one is
+            returned.
+
+        Returns
+        -------
+        `~pathlib.Path` or `None`
+            Path of the best matching master frame, or `None` if there is none.
+        """
+        where = [
+            "frametype = ?",
+            "readoutm = ?",
+            "xbinning = ?",
+            "ybinning = ?",
+        ]
+        params = [frametype, readoutm, xbinning, ybinning]
+        if gain != "":
+            where.append("gain = ?")
+            params.append(gain)
+        if filt is not None:
+            where.append("filter = ?")
+            params.append(filt)
+        if exptime is not None:
+            where.append("exptime = ?")
+            params.append(round(exptime, 3))
+        query = "SELECT path, obstime FROM masters WHERE " + " AND ".join(
+            where
+        )
+
+        with self._lock:
+            if obstime is None:
+                candidates = self._conn.execute(
+                    query + " ORDER BY obstime DESC LIMIT 1", params
+                ).fetchall()
+            else:
+                candidates = self._conn.execute(
+                    query + " AND obstime <= ? ORDER BY obstime DESC LIMIT 1",
+                    params + [obstime],
+                ).fetchall()
+                candidates += self._conn.execute(
+                    query + " AND obstime > ? ORDER BY obstime ASC LIMIT 1",
+                    params + [obstime],
+                ).fetchall()
+                if not candidates:
+                    # Masters without a DATE-OBS
+                    candidates = self._conn.execute(
+                        query + " LIMIT 1", params
+                    ).fetchall()
+
+        if not candidates:
+            return None
+        if obstime is not None and len(candidates) > 1:
+            candidates.sort(key=lambda c: abs(c[1] - obstime))
+        return Path(candidates[0][0])
+
+    def find_masters(self, hdr, camera_type="ccd"):
+        """
+        Find the master frames needed to calibrate an image.
+
+        The matching rules are those of `calib_images`: all masters must match
+        the readout mode, binning and (if present) gain of the image, flats
+        must also match the filter, darks must match the exposure time for
+        CMOS cameras and flat darks must match the exposure time.
+
+        Parameters
+        ----------
+        hdr : `~astropy.io.fits.Header`
+            FITS header of the image to calibrate.
+        camera_type : `str`, default : `"ccd"`, optional
+            Camera type (`"ccd"` or `"cmos"`).
+
+        Returns
+        -------
+        `dict`
+            Dictionary mapping `"bias"`, `"dark"`, `"flat"` and `"flat_dark"`
+            to the path of the matching master frame, or `None`.
+        """
+        keys = calibration_keys(hdr)
+        common = dict(
+            readoutm=keys["readoutm"],
+            xbinning=keys["xbinning"],
+            ybinning=keys["ybinning"],
+            gain=keys["gain"],
+            obstime=keys["obstime"],
+        )
+        return {
+            "bias": self.lookup("bias", **common),
+            "dark": self.lookup(
+                "dark",
+                exptime=keys["exptime"] if camera_type == "cmos" else None,
+                **common,
+            ),
+            "flat": self.lookup("flat", filt=keys["filter"], **common),
+            "flat_dark": self.lookup(
+                "flat_dark", exptime=keys["exptime"], **common
+            ),
+        }
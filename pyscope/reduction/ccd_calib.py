@@ -2,6 +2,7 @@ import glob
 import logging
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import astroscrappy
@@ -9,8 +10,370 @@ import click
 import numpy as np
 from astropy.io import fits
 
+from .calib_index import calibration_keys
+
 logger = logging.getLogger(__name__)
 
+# Calibrator used by the worker processes of CCDCalibrator.calibrate_files
+_worker_calibrator = None
+
+
+def _init_worker(calibrator):
+    global _worker_calibrator
+    _worker_calibrator = calibrator
+
+
+def _calibrate_file_worker(fname, in_place):
+    return _worker_calibrator.calibrate_file(fname, in_place=in_place)
+
+
+def _parse_bad_columns(bad_columns):
+    """Parse a comma-separated string or sequence of bad column indices."""
+    if isinstance(bad_columns, str):
+        return [int(c) for c in bad_columns.split(",") if c.strip()]
+    return [int(c) for c in bad_columns]
+
+
+def _frametyp(hdr):
+    try:
+        return hdr["IMAGETYP"]
+    except KeyError:
+        return ""
+
+
+class CCDCalibrator:
+    def __init__(
+        self,
+        dark_frame=None,
+        bias_frame=None,
+        flat_frame=None,
+        camera_type="ccd",
+        astro_scrappy=(1, 3),
+        bad_columns="",
+        pedestal=1000,
+    ):
+        """
+        Calibrates many images against the same set of master frames.
+
+        The master frames are loaded once and combined into the corrections
+        applied to each image, all in `float32`: the bias, the dark current
+        rate (bias-subtracted dark divided by its exposure time) for CCDs or
+        the dark for CMOS cameras, and the reciprocal of the
+        pedestal-subtracted, mean-normalized flat. The additive correction
+        for a given exposure time is cached, so calibrating an image costs one
+        subtraction and one multiplication done in place on the image.
+
+        Parameters
+        ----------
+        dark_frame : `str`, optional
+            Path to master dark frame. If the camera type is `cmos`, the
+            exposure time of the dark frame should match the exposure time of
+            the target images.
+        bias_frame : `str`, optional
+            Path to master bias frame. Ignored if the camera type is `cmos`.
+        flat_frame : `str`, optional
+            Path to master flat frame. The flat frame is assumed to be bias and
+            dark corrected.
+        camera_type : `str`, default : `"ccd"`, optional
+            Camera type, `ccd` or `cmos`.
+        astro_scrappy : `tuple` of (`int`, `int`), default : `(1, 3)`, optional
+            Number of hot pixel removal iterations and estimated camera read
+            noise.
+        bad_columns : `str` or `list` of `int`, default : `""`, optional
+            Comma-separated list of bad columns to fix by averaging the value
+            of each pixel in the adjacent columns.
+        pedestal : `int`, default : 1000, optional
+            Pedestal value to add to calibrated images.
+        """
+        self.camera_type = camera_type.lower()
+        self.astro_scrappy = astro_scrappy
+        self.bad_columns = _parse_bad_columns(bad_columns)
+        self.pedestal = pedestal
+
+        self.dark_frame = dark_frame
+        self.bias_frame = bias_frame if self.camera_type == "ccd" else None
+        self.flat_frame = flat_frame
+
+        self._masters = {}
+        self._bias = None
+        self._dark = None
+        self._dark_rate = None
+        self._inv_flat = None
+        self._offsets = {}
+
+        logger.info("Loading calibration frames...")
+
+        if self.bias_frame is not None:
+            logger.info(f"Loading bias frame: {self.bias_frame}")
+            self._bias = self._load_master("bias", self.bias_frame)
+
+        if self.dark_frame is not None:
+            logger.info(f"Loading dark frame: {self.dark_frame}")
+            dark = self._load_master("dark", self.dark_frame)
+            if self.camera_type == "ccd":
+                # Bias-subtracted dark current per second of exposure
+                if self._bias is not None:
+                    dark -= self._bias
+                dark /= np.float32(self._masters["dark"][1]["exptime"])
+                self._dark_rate = dark
+            else:
+                self._dark = dark
+
+        if self.flat_frame is not None:
+            logger.info(f"Loading flat frame: {self.flat_frame}")
+            flat = self._load_master("flat", self.flat_frame)
+            flat_hdr = self._masters["flat"][0]
+            if "PEDESTAL" in flat_hdr:
+                logger.info(
+                    f"Subtracting pedestal of {flat_hdr['PEDESTAL']} from flat frame."
+                )
+                flat -= np.float32(flat_hdr["PEDESTAL"])
+            flat_mean = np.mean(flat, dtype=np.float64)
+            logger.info(f"flat_mean: {flat_mean}")
+            with np.errstate(divide="ignore"):
+                np.divide(np.float32(flat_mean), flat, out=flat)
+            self._inv_flat = flat
+
+    def _load_master(self, kind, fname):
+        """Load a master frame as `float32` and record its header keys."""
+        with fits.open(fname) as hdul:
+            hdr = hdul[0].header
+            data = hdul[0].data.astype(np.float32)
+
+        frametyp = _frametyp(hdr)
+        if kind not in frametyp.lower() and not (
+            kind == "flat" and "light" in frametyp.lower()
+        ):
+            logger.warning(
+                f"{kind.capitalize()} frame frametype ({frametyp}) does not match '{kind}'"
+            )
+
+        keys = calibration_keys(hdr)
+        logger.debug(f"{kind.capitalize()} frame frametype: {frametyp}")
+        logger.debug(f"{kind.capitalize()} frame keys: {keys}")
+        self._masters[kind] = (hdr, keys)
+        return data
+
+    def _offset(self, exptime):
+        """
+        The additive correction (bias plus scaled dark) for an exposure
+        time, or `None` if there is none.
+        """
+        if exptime not in self._offsets:
+            if self._dark_rate is not None:
+                offset = self._dark_rate * np.float32(exptime)
+                if self._bias is not None:
+                    offset += self._bias
+            elif self._dark is not None:
+                offset = self._dark
+            else:
+                offset = self._bias
+            self._offsets[exptime] = offset
+        return self._offsets[exptime]
+
+    def _check_header(self, keys):
+        """Log mismatches between an image and the master frames."""
+        checks = {
+            "dark": ("readoutm", "xbinning", "ybinning", "gain"),
+            "flat": ("readoutm", "xbinning", "ybinning", "filter", "gain"),
+            "bias": ("readoutm", "xbinning", "ybinning", "gain"),
+        }
+        for kind, names in checks.items():
+            if kind not in self._masters:
+                continue
+            master_keys = self._masters[kind][1]
+            for name in names:
+                if keys[name] != master_keys[name]:
+                    logger.warning(
+                        f"Image {name} ({keys[name]}) does not match {kind} {name} ({master_keys[name]})"
+                    )
+        if (
+            self.camera_type == "cmos"
+            and "dark" in self._masters
+            and keys["exptime"] != self._masters["dark"][1]["exptime"]
+        ):
+            logger.warning(
+                f"""Image exposure time ({keys['exptime']}) does not match dark exposure time ({self._masters['dark'][1]['exptime']}),
+                recommended for a CMOS camera"""
+            )
+
+    def calibrate(self, image, exptime):
+        """
+        Calibrate an image array.
+
+        Parameters
+        ----------
+        image : `~numpy.ndarray`
+            Raw image. If it is a `float32` array, it is calibrated in place.
+        exptime : `float`
+            Exposure time of the image in seconds.
+
+        Returns
+        -------
+        `~numpy.ndarray`
+            Calibrated `uint16` image.
+        """
+        cal_image = np.asarray(image, dtype=np.float32)
+
+        offset = self._offset(exptime)
+        if offset is not None:
+            logger.info("Applying bias and dark frames...")
+            cal_image -= offset
+
+        if self._inv_flat is not None:
+            logger.info("Applying the flat frame...")
+            cal_image *= self._inv_flat
+
+        logger.info("Flooring the calibrated image...")
+        np.floor(cal_image, out=cal_image)
+
+        logger.info(f"Adding pedestal of {self.pedestal}")
+        cal_image += np.float32(self.pedestal)
+
+        if self.astro_scrappy[0] > 0:
+            logger.info("Removing hot pixels...")
+            mask, cal_image = astroscrappy.detect_cosmics(
+                cal_image,
+                niter=self.astro_scrappy[0],
+                readnoise=self.astro_scrappy[1],
+            )
+
+        if self.bad_columns:
+            logger.info("Fixing bad columns...")
+            for badcol in self.bad_columns:
+                cal_image[:, badcol] = (
+                    cal_image[:, badcol - 1] + cal_image[:, badcol + 1]
+                ) / 2
+
+        logger.info("Clipping to uint16 range...")
+        np.clip(cal_image, 0, 65535, out=cal_image)
+        return cal_image.astype(np.uint16)
+
+    def calibrate_file(self, fname, in_place=False):
+        """
+        Calibrate a FITS image and write the result.
+
+        Parameters
+        ----------
+        fname : `str` or `~pathlib.Path`
+            Path to the raw image.
+        in_place : `bool`, default : `False`, optional
+            If `True`, overwrite the raw image. Otherwise the calibrated image
+            is written next to it with the suffix `_cal`.
+
+        Returns
+        -------
+        `str` or `None`
+            Path of the calibrated image, or `None` if the image was already
+            calibrated.
+        """
+        logger.info(f"Calibrating {fname}...")
+        with fits.open(fname) as hdul:
+            hdr = hdul[0].header
+            image = hdul[0].data.astype(np.float32)
+
+        if "CALSTAT" in hdr.keys():
+            if hdr["CALSTAT"]:
+                logger.warning("Image already calibrated. Skipping...")
+                return None
+
+        image_frametyp = _frametyp(hdr)
+        if (
+            "light" not in image_frametyp.lower()
+            and "flat" not in image_frametyp.lower()
+        ):
+            logger.warning(
+                f"Image frametype ({image_frametyp}) does not match 'light' or 'flat'"
+            )
+
+        keys = calibration_keys(hdr)
+        logger.debug(f"Image keys: {keys}")
+        self._check_header(keys)
+
+        hdr.add_comment(f"Calibrated using pyscope")
+        hdr.add_comment(f"Calibration mode: {self.camera_type}")
+        if self.dark_frame is not None:
+            hdr.add_comment(f"Calibration dark frame: {self.dark_frame}")
+        else:
+            hdr.add_comment(
+                f"Calibration dark frame not provided - dark subtraction NOT performed"
+            )
+        if self.flat_frame is not None:
+            hdr.add_comment(f"Calibration flat frame: {self.flat_frame}")
+        else:
+            hdr.add_comment(
+                f"Calibration flat frame not provided - flat correction NOT performed"
+            )
+        if self.bias_frame is not None:
+            hdr.add_comment(f"Calibration bias frame: {self.bias_frame}")
+        else:
+            hdr.add_comment(
+                f"Calibration bias frame not provided - bias subtraction NOT performed"
+            )
+        hdr.add_comment(f"Calibration astro-scrappy: {self.astro_scrappy}")
+        hdr.add_comment(f"Calibration bad columns: {self.bad_columns}")
+
+        t0 = time.time()
+        cal_image = self.calibrate(image, keys["exptime"])
+        t = time.time() - t0
+        if self.astro_scrappy[0] > 0:
+            hdr.add_comment(
+                f"Removed hot pixels using astroscrappy, {self.astro_scrappy[0]} iterations"
+            )
+        hdr.add_comment("Calibration took %.1f seconds" % t)
+        logger.debug(f"Calibration took {t} seconds")
+
+        hdr["PEDESTAL"] = self.pedestal
+        logger.info("Writing calibrated status to header...")
+        hdr["CALSTAT"] = True
+        if in_place:
+            outfile = str(fname)
+            logger.info(f"Overwriting {fname}")
+        else:
+            outfile = str(fname).split(".")[:-1][0] + "_cal.fts"
+            logger.info(f"Writing calibrated image to {outfile}")
+        fits.writeto(outfile, cal_image, hdr, overwrite=True)
+
+        logger.info("Done!")
+        return outfile
+
+    def calibrate_files(self, fnames, in_place=False, jobs=1):
+        """
+        Calibrate many FITS images.
+
+        Parameters
+        ----------
+        fnames : `list` of `str`
+            Paths to the raw images.
+        in_place : `bool`, default : `False`, optional
+            If `True`, overwrite the raw images.
+        jobs : `int`, default : 1, optional
+            Number of worker processes. The calibrator is sent to each worker
+            once, then files are distributed among them.
+
+        Returns
+        -------
+        `list`
+            Paths of the calibrated images, `None` for images that were
+            skipped because they were already calibrated.
+        """
+        logger.debug(f"Calibrating {len(fnames)} image(s): {fnames}")
+        if jobs <= 1 or len(fnames) <= 1:
+            return [self.calibrate_file(f, in_place=in_place) for f in fnames]
+
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(fnames)),
+            initializer=_init_worker,
+            initargs=(self,),
+        ) as executor:
+            return list(
+                executor.map(
+                    _calibrate_file_worker,
+                    fnames,
+                    [in_place] * len(fnames),
+                )
+            )
+
 
 @click.command(
     epilog="""Check out the documentation at
@@ -74,6 +437,14 @@ logger = logging.getLogger(__name__)
     show_default=True,
     help="Pedestal value to add to calibrated image.",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of worker processes to calibrate images in parallel.",
+)
 @click.option(
     "-v",
     "--verbose",
@@ -96,6 +467,7 @@ def ccd_calib_cli(
     in_place=False,
     verbose=0,
     pedestal=1000,
+    jobs=1,
 ):
     """
     Calibrate astronomical images using master calibration frames.
@@ -104,6 +476,7 @@ def ccd_calib_cli(
     to produce calibrated versions. Calibrated images are saved with the suffix `_cal` appended
     to the original filename unless the `--in-place` option is used, which overwrites the raw files.
     The calibration process supports additional features like hot pixel removal and bad column correction.
+    The master frames are prepared once by a `CCDCalibrator` and applied to every image in `float32`.
 
     Parameters
     ----------
@@ -131,6 +504,8 @@ def ccd_calib_cli(
     pedestal : `int`, optional
         Pedestal value to add to calibrated images after processing to prevent negative
         pixel values. Defaults to `1000`.
+    jobs : `int`, optional
+        Number of worker processes used to calibrate images in parallel. Defaults to `1`.
     verbose : `int`, optional
         Verbosity level for logging output:
         - `0`: Warnings only (default).
@@ -165,422 +540,19 @@ def ccd_calib_cli(
         logging.basicConfig(level=logging.WARNING)
 
     logger.debug(
-        f"""ccd_calib(\n\tcamera_type={camera_type}, \n\tdark_frame={dark_frame}, \n\tflat_frame={flat_frame}, \n\tbias_frame={bias_frame}, \n\tastro_scrappy={astro_scrappy}, \n\tbad_columns={bad_columns}, \n\tin_place={in_place}, \n\tfnames={fnames}, \n\tverbose={verbose}, \n\tpedestal={pedestal}\n)"""
+        f"""ccd_calib(\n\tcamera_type={camera_type}, \n\tdark_frame={dark_frame}, \n\tflat_frame={flat_frame}, \n\tbias_frame={bias_frame}, \n\tastro_scrappy={astro_scrappy}, \n\tbad_columns={bad_columns}, \n\tin_place={in_place}, \n\tfnames={fnames}, \n\tverbose={verbose}, \n\tpedestal={pedestal}, \n\tjobs={jobs}\n)"""
     )
 
-    logger.info("Loading calibration frames...")
-
-    camera_type = camera_type.lower()
-    if camera_type == "ccd":
-        if bias_frame is not None:
-            logger.info(f"Loading bias frame: {bias_frame}")
-            bias, bias_hdr = fits.getdata(bias_frame).astype(
-                np.float64
-            ), fits.getheader(bias_frame)
-
-            try:
-                bias_frametyp = bias_hdr["IMAGETYP"]
-            except KeyError:
-                bias_frametyp = ""
-            if "bias" not in bias_frametyp.lower():
-                logger.warning(
-                    f"Bias frame frametype ({bias_frametyp}) does not match 'bias'"
-                )
-
-            try:
-                bias_readout_mode = bias_hdr["READOUTM"]
-            except KeyError:
-                bias_readout_mode = bias_hdr["READOUT"]
-
-            try:
-                bias_exptime = round(bias_hdr["EXPTIME"], 3)
-            except KeyError:
-                bias_exptime = round(bias_hdr["EXPOSURE"], 3)
-
-            try:
-                bias_xbin = bias_hdr["XBINNING"]
-            except BaseException:
-                bias_xbin = bias_hdr["XBIN"]
-
-            try:
-                bias_ybin = bias_hdr["YBINNING"]
-            except BaseException:
-                bias_ybin = bias_hdr["YBIN"]
-
-            try:
-                bias_gain = bias_hdr["GAIN"]
-            except BaseException:
-                bias_gain = ""
-
-            logger.debug(f"Bias frame frametype: {bias_frametyp}")
-            logger.debug(f"Bias frame readout mode: {bias_readout_mode}")
-            logger.debug(f"Bias gain: {bias_gain}")
-            logger.debug(f"Bias frame exposure time: {bias_exptime}")
-            logger.debug(f"Bias frame X binning: {bias_xbin}")
-            logger.debug(f"Bias frame Y binning: {bias_ybin}")
-
-    if dark_frame is not None:
-        logger.info(f"Loading dark frame: {dark_frame}")
-        dark, dark_hdr = fits.getdata(dark_frame).astype(
-            np.float64
-        ), fits.getheader(dark_frame)
-
-        try:
-            dark_frametyp = dark_hdr["IMAGETYP"]
-        except KeyError:
-            dark_frametyp = ""
-        if "dark" not in dark_frametyp.lower():
-            logger.warning(
-                f"Dark frame frametype ({dark_frametyp}) does not match 'dark'"
-            )
-
-        try:
-            dark_readout_mode = dark_hdr["READOUTM"]
-        except KeyError:
-            dark_readout_mode = dark_hdr["READOUT"]
-
-        try:
-            dark_exptime = round(dark_hdr["EXPTIME"], 3)
-        except KeyError:
-            dark_exptime = round(dark_hdr["EXPOSURE"], 3)
-
-        try:
-            dark_xbin = dark_hdr["XBINNING"]
-        except BaseException:
-            dark_xbin = dark_hdr["XBIN"]
-
-        try:
-            dark_ybin = dark_hdr["YBINNING"]
-        except BaseException:
-            dark_ybin = dark_hdr["YBIN"]
-
-        try:
-            dark_gain = dark_hdr["GAIN"]
-        except BaseException:
-            dark_gain = ""
-
-        logger.debug(f"Dark frame frametype: {dark_frametyp}")
-        logger.debug(f"Dark frame readout mode: {dark_readout_mode}")
-        logger.debug(f"Dark gain: {dark_gain}")
-        logger.debug(f"Dark frame exposure time: {dark_exptime}")
-        logger.debug(f"Dark frame X binning: {dark_xbin}")
-        logger.debug(f"Dark frame Y binning: {dark_ybin}")
-
-    if flat_frame is not None:
-        logger.info(f"Loading flat frame: {flat_frame}")
-        flat, flat_hdr = fits.getdata(flat_frame).astype(
-            np.float64
-        ), fits.getheader(flat_frame)
-
-        try:
-            flat_frametyp = flat_hdr["IMAGETYP"]
-        except KeyError:
-            flat_frametyp = ""
-        if (
-            "flat" not in flat_frametyp.lower()
-            and "light" not in flat_frametyp.lower()
-        ):
-            logger.warning(
-                f"Flat frame frametype ({flat_frametyp}) does not match 'flat'"
-            )
-
-        try:
-            flat_filter = flat_hdr["FILTER"]
-        except KeyError:
-            flat_filter = ""
-
-        try:
-            flat_readout_mode = flat_hdr["READOUTM"]
-        except KeyError:
-            flat_readout_mode = flat_hdr["READOUT"]
-
-        try:
-            flat_exptime = round(flat_hdr["EXPTIME"], 3)
-        except KeyError:
-            flat_exptime = round(flat_hdr["EXPOSURE"], 3)
-
-        try:
-            flat_xbin = flat_hdr["XBINNING"]
-        except BaseException:
-            flat_xbin = flat_hdr["XBIN"]
-
-        try:
-            flat_ybin = flat_hdr["YBINNING"]
-        except BaseException:
-            flat_ybin = flat_hdr["YBIN"]
-
-        try:
-            flat_gain = flat_hdr["GAIN"]
-        except BaseException:
-            flat_gain = ""
-
-        try:
-            flat_pedestal = flat_hdr["PEDESTAL"]
-        except BaseException:
-            flat_pedestal = 0
-
-        logger.debug(f"Flat frame frametype: {flat_frametyp}")
-        logger.debug(f"Flat frame readout mode: {flat_readout_mode}")
-        logger.debug(f"Flat gain: {flat_gain}")
-        logger.debug(f"Flat frame exposure time: {flat_exptime}")
-        logger.debug(f"Flat frame X binning: {flat_xbin}")
-        logger.debug(f"Flat frame Y binning: {flat_ybin}")
-        logger.debug(f"Flat pedestal: {flat_pedestal}")
-
-    logger.debug(f"Calibrating {len(fnames)} image(s): {fnames}")
-
-    for fname in fnames:
-        logger.info(f"Calibrating {fname}...")
-        image, hdr = fits.getdata(fname).astype(np.float64), fits.getheader(
-            fname
-        )
-
-        if "CALSTAT" in hdr.keys():
-            if hdr["CALSTAT"]:
-                logger.warning("Image already calibrated. Skipping...")
-                continue
-
-        try:
-            image_frametyp = hdr["IMAGETYP"]
-        except KeyError:
-            image_frametyp = ""
-        if (
-            "light" not in image_frametyp.lower()
-            and "flat" not in image.frametyp.lower()
-        ):
-            logger.warning(
-                f"Image frametype ({image_frametyp}) does not match 'light' or 'flat'"
-            )
-
-        try:
-            image_filter = hdr["FILTER"]
-        except KeyError:
-            image_filter = ""
-
-        try:
-            image_readout_mode = hdr["READOUTM"]
-        except KeyError:
-            image_readout_mode = hdr["READOUT"]
-
-        try:
-            image_exptime = round(hdr["EXPTIME"], 3)
-        except KeyError:
-            image_exptime = round(hdr["EXPOSURE"], 3)
-
-        try:
-            image_xbin = hdr["XBINNING"]
-        except BaseException:
-            image_xbin = hdr["XBIN"]
-
-        try:
-            image_ybin = hdr["YBINNING"]
-        except BaseException:
-            image_ybin = hdr["YBIN"]
-
-        try:
-            image_gain = hdr["GAIN"]
-        except BaseException:
-            image_gain = ""
-
-        logger.debug(f"Image readout mode: {image_readout_mode}")
-        logger.debug(f"Image gain: {image_gain}")
-        logger.debug(f"Image exposure time: {image_exptime}")
-        logger.debug(f"Image X binning: {image_xbin}")
-        logger.debug(f"Image Y binning: {image_ybin}")
-
-        if dark_frame is not None:
-            if image_readout_mode != dark_readout_mode:
-                logger.warning(
-                    f"Image readout mode ({image_readout_mode}) does not match dark readout mode ({dark_readout_mode})"
-                )
-
-            if image_xbin != dark_xbin:
-                logger.warning(
-                    f"Image X binning ({image_xbin}) does not match dark X binning ({dark_xbin})"
-                )
-
-            if image_ybin != dark_ybin:
-                logger.warning(
-                    f"Image Y binning ({image_ybin}) does not match dark Y binning ({dark_ybin})"
-                )
-
-            if image_gain != dark_gain:
-                logger.warning(
-                    f"Image gain ({image_gain}) does not match dark gain ({dark_gain})"
-                )
-
-        if flat_frame is not None:
-            if image_readout_mode != flat_readout_mode:
-                logger.warning(
-                    f"Image readout mode ({image_readout_mode}) does not match flat readout mode ({flat_readout_mode})"
-                )
-
-            if image_xbin != flat_xbin:
-                logger.warning(
-                    f"Image X binning ({image_xbin}) does not match flat X binning ({flat_xbin})"
-                )
-
-            if image_ybin != flat_ybin:
-                logger.warning(
-                    f"Image Y binning ({image_ybin}) does not match flat Y binning ({flat_ybin})"
-                )
-
-            if image_filter != flat_filter:
-                logger.warning(
-                    f"Image filter ({image_filter}) does not match flat filter ({flat_filter})"
-                )
-
-            if image_gain != flat_gain:
-                logger.warning(
-                    f"Image gain ({image_gain}) does not match flat gain ({flat_gain})"
-                )
-
-        if camera_type == "cmos":
-            if image_exptime != dark_exptime:
-                logger.warning(
-                    f"""Image exposure time ({image_exptime}) does not match dark exposure time ({dark_exptime}),
-                    recommended for a CMOS camera"""
-                )
-
-        elif camera_type == "ccd":
-            if image_readout_mode != bias_readout_mode:
-                logger.warning(
-                    f"Image readout mode ({image_readout_mode}) does not match bias readout mode ({bias_readout_mode})"
-                )
-
-            if image_xbin != bias_xbin:
-                logger.warning(
-                    f"Image X binning ({image_xbin}) does not match bias X binning ({bias_xbin})"
-                )
-
-            if image_ybin != bias_ybin:
-                logger.warning(
-                    f"Image Y binning ({image_ybin}) does not match bias Y binning ({bias_ybin})"
-                )
-
-            if image_gain != bias_gain:
-                logger.warning(
-                    f"Image gain ({image_gain}) does not match bias gain ({bias_gain})"
-                )
-
-        hdr.add_comment(f"Calibrated using pyscope")
-        hdr.add_comment(f"Calibration mode: {camera_type}")
-        if dark_frame is not None:
-            hdr.add_comment(f"Calibration dark frame: {dark_frame}")
-        else:
-            hdr.add_comment(
-                f"Calibration dark frame not provided - dark subtraction NOT performed"
-            )
-        if flat_frame is not None:
-            hdr.add_comment(f"Calibration flat frame: {flat_frame}")
-        else:
-            hdr.add_comment(
-                f"Calibration flat frame not provided - flat correction NOT performed"
-            )
-        if bias_frame is not None:
-            hdr.add_comment(f"Calibration bias frame: {bias_frame}")
-        else:
-            hdr.add_comment(
-                f"Calibration bias frame not provided - bias subtraction NOT performed"
-            )
-        hdr.add_comment(f"Calibration astro-scrappy: {astro_scrappy}")
-        hdr.add_comment(f"Calibration bad columns: {bad_columns}")
-
-        cal_image = image.copy()
-        if camera_type == "ccd":
-            if bias_frame is not None:
-                logger.info("Applying bias frame (CCD selected)...")
-                cal_image = np.subtract(cal_image, bias)
-
-            if dark_frame is not None:
-                logger.info(
-                    """Applying the dark frame. CCD selected so a bias-subtracted
-                            dark frame is scaled by the ratio of the image exposure time over
-                            the dark exposure time then subtracted from the image."""
-                )
-
-                cal_image = np.subtract(
-                    cal_image, (dark - bias) * (image_exptime / dark_exptime)
-                )
-
-        elif camera_type == "cmos":
-            if dark_frame is not None:
-                logger.info(
-                    """Applying the dark frame. CMOS selected so a dark
-                            is subtracted from the image with no bias and no exposure time scaling."""
-                )
-                cal_image = np.subtract(cal_image, dark)
-
-        if flat_frame is not None:
-            logger.info("Checking if flat frame has a pedestal...")
-            if "PEDESTAL" in flat_hdr:
-                logger.info(
-                    f"Pedestal keyword found, value: {
-                        flat_hdr['PEDESTAL']}"
-                )
-                flat_pedestal = flat_hdr["PEDESTAL"]
-                logger.info(
-                    f"Subtracting pedestal of {flat_pedestal} from flat frame."
-                )
-                flat = np.subtract(flat, flat_pedestal)
-
-            logger.info(
-                "Normalizing the flat frame by the mean of the entire image."
-            )
-            flat_mean = np.mean(flat)
-            logger.info(f"flat_mean: {flat_mean}")
-            flat = np.divide(flat, flat_mean)
-
-            logger.info("Applying the flat frame...")
-            cal_image = np.divide(cal_image, flat)
-
-        logger.info("Flooring the calibrated image...")
-        cal_image = np.floor(cal_image)
-
-        logger.info(f"Adding pedestal of {pedestal}")
-        hdr["PEDESTAL"] = pedestal
-        cal_image += pedestal
-
-        if astro_scrappy[0] > 0:
-            logger.info("Removing hot pixels...")
-            t0 = time.time()
-            mask, cal_image = astroscrappy.detect_cosmics(
-                cal_image, niter=astro_scrappy[0], readnoise=astro_scrappy[1]
-            )
-            t = time.time() - t0
-            hdr.add_comment(
-                f"Removed hot pixels using astroscrappy, {
-                    astro_scrappy[0]} iterations"
-            )
-            hdr.add_comment("Hot pixel removal took %.1f seconds" % t)
-            logger.debug(f"Hot pixel removal took {t} seconds")
-
-        if len(bad_columns) > 0:
-            logger.info("Fixing bad columns...")
-            for badcol in bad_columns:
-                cal_image[:, badcol] = (
-                    cal_image[:, badcol - 1] + cal_image[:, badcol + 1]
-                ) / 2
-
-        logger.info("Clipping to uint16 range...")
-        cal_image = np.clip(cal_image, 0, 65535)
-        cal_image = cal_image.astype(np.uint16)
-
-        logger.info("Writing calibrated status to header...")
-        hdr["CALSTAT"] = True
-        if in_place:
-            logger.info(f"Overwriting {fname}")
-            fits.writeto(fname, cal_image, hdr, overwrite=True)
-        else:
-            logger.info(f"Writing calibrated image to {fname}")
-            fits.writeto(
-                str(fname).split(".")[:-1][0] + "_cal.fts",
-                cal_image,
-                hdr,
-                overwrite=True,
-            )
-
-        logger.info("Done!")
+    calibrator = CCDCalibrator(
+        dark_frame=dark_frame,
+        bias_frame=bias_frame,
+        flat_frame=flat_frame,
+        camera_type=camera_type,
+        astro_scrappy=astro_scrappy,
+        bad_columns=bad_columns,
+        pedestal=pedestal,
+    )
+    calibrator.calibrate_files(fnames, in_place=in_place, jobs=jobs)
 
 
 ccd_calib = ccd_calib_cli.callback
@@ -0,0 +1,495 @@
+import datetime as dt
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from astropy.io import fits
+
+logger = logging.getLogger(__name__)
+
+FITS_EXTENSIONS = (".fts", ".fits", ".fit")
+
+_BLOCK_SIZE = 2880
+_CARD_SIZE = 80
+_END_CARD = b"END" + b" " * 77
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS headers (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    header BLOB NOT NULL,
+    imagetyp TEXT,
+    object TEXT,
+    filter TEXT,
+    readoutm TEXT,
+    xbinning INTEGER,
+    ybinning INTEGER,
+    exptime REAL,
+    obstime REAL,
+    calibrated INTEGER
+);
+CREATE INDEX IF NOT EXISTS headers_obstime ON headers (obstime);
+CREATE INDEX IF NOT EXISTS headers_setup ON headers (
+    imagetyp, filter, readoutm, xbinning, ybinning, exptime
+);
+"""
+
+# Indexed columns that can be used in FitsIndex.query
+COLUMNS = (
+    "imagetyp",
+    "object",
+    "filter",
+    "readoutm",
+    "xbinning",
+    "ybinning",
+    "exptime",
+    "obstime",
+    "calibrated",
+)
+
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def read_header(fname):
+    """
+    Read the primary header of a FITS file.
+
+    Only the header blocks are read: reading stops at the block that contains
+    the `END` card, whatever the size of the data that follows.
+
+    Parameters
+    ----------
+    fname : `str` or `~pathlib.Path`
+        Path to the FITS file.
+
+    Returns
+    -------
+    `~astropy.io.fits.Header`
+
+    Raises
+    ------
+    `OSError`
+        If the file is not a FITS file or its header is truncated.
+    """
+    raw = _read_header_bytes(fname)
+    return fits.Header.fromstring(raw.decode("ascii", errors="replace"))
+
+
+def _read_header_bytes(fname):
+    """Raw bytes of the primary header of a FITS file, up to the `END` card."""
+    blocks = []
+    with open(fname, "rb") as f:
+        while True:
+            block = f.read(_BLOCK_SIZE)
+            if len(block) < _BLOCK_SIZE:
+                raise OSError(f"{fname} is not a FITS file or is truncated")
+            if not blocks and not block.startswith(b"SIMPLE"):
+                raise OSError(f"{fname} is not a FITS file")
+            blocks.append(block)
+            for i in range(0, _BLOCK_SIZE, _CARD_SIZE):
+                if block[i : i + _CARD_SIZE] == _END_CARD:
+                    return b"".join(blocks)[
+                        : (len(blocks) - 1) * _BLOCK_SIZE + i
+                    ]
+
+
+def _obstime(date_obs):
+    """Convert a DATE-OBS string to a UTC POSIX timestamp."""
+    if not date_obs:
+        return None
+    try:
+        return (
+            dt.datetime.fromisoformat(str(date_obs).strip())
+            .replace(tzinfo=dt.timezone.utc)
+            .timestamp()
+        )
+    except ValueError:
+        logger.warning(f"Could not parse DATE-OBS {date_obs}")
+        return None
+
+
+def _first(hdr, *keys):
+    """Value of the first of `keys` present in a header, or `None`."""
+    for key in keys:
+        if key in hdr:
+            return hdr[key]
+    return None
+
+
+def _header_row(hdr):
+    """Values of the indexed columns of a header."""
+    exptime = _first(hdr, "EXPTIME", "EXPOSURE")
+    return (
+        _first(hdr, "IMAGETYP"),
+        _first(hdr, "OBJECT", "OBJNAME"),
+        _first(hdr, "FILTER", "FILT"),
+        _first(hdr, "READOUTM", "READOUT"),
+        _first(hdr, "XBINNING", "XBIN"),
+        _first(hdr, "YBINNING", "YBIN"),
+        None if exptime is None else float(exptime),
+        _obstime(hdr.get("DATE-OBS", None)),
+        int("CALSTAT" in hdr),
+    )
+
+
+def fits_index(root, index_file=None, recursive=True):
+    """
+    Return a shared `FitsIndex` for a directory.
+
+    Repeated calls with the same arguments return the same instance, so that
+    long-running processes and callers processing images one at a time do
+    not reopen the index.
+
+    Parameters
+    ----------
+    root : `str` or `~pathlib.Path`
+        Directory containing the FITS files.
+    index_file : `str` or `~pathlib.Path`, optional
+        Path of the SQLite index file. See `FitsIndex`.
+    recursive : `bool`, default : `True`, optional
+        Whether to index the subdirectories of `root`.
+
+    Returns
+    -------
+    `FitsIndex`
+    """
+    key = (
+        str(Path(root).resolve()),
+        None if index_file is None else str(Path(index_file).resolve()),
+        recursive,
+    )
+    with _indices_lock:
+        if key not in _indices:
+            _indices[key] = FitsIndex(
+                root, index_file=index_file, recursive=recursive
+            )
+        return _indices[key]
+
+
+class FitsIndex:
+    def __init__(self, root, index_file=None, recursive=True):
+        """
+        Persistent index of the headers of the FITS files in a directory.
+
+        The primary header of each file is read once and stored in a SQLite
+        table keyed on the file path, together with a few commonly searched
+        keywords (image type, object, filter, readout mode, binning, exposure
+        time, observation time and whether the image is calibrated). `update`
+        only rereads the files whose modification time or size changed, so
+        that listing or searching a large archive after the first scan does
+        not touch the FITS files at all.
+
+        Parameters
+        ----------
+        root : `str` or `~pathlib.Path`
+            Directory containing the FITS files (`.fts`, `.fits` and `.fit`).
+        index_file : `str` or `~pathlib.Path`, optional
+            Path of the SQLite index file. Defaults to `.fits_index.sqlite`
+            inside `root`. If the file cannot be created, the index is kept
+            in memory.
+        recursive : `bool`, default : `True`, optional
+            Whether to index the subdirectories of `root`.
+        """
+        self._root = Path(root).resolve()
+        self._recursive = recursive
+        if index_file is None:
+            index_file = self._root / (
+                ".fits_index.sqlite"
+                if recursive
+                else ".fits_index_flat.sqlite"
+            )
+        self._lock = threading.RLock()
+        try:
+            self._conn = sqlite3.connect(index_file, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        except sqlite3.Error:
+            logger.warning(
+                f"Could not open FITS index {index_file}, keeping it in memory"
+            )
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    @property
+    def root(self):
+        """Indexed directory."""
+        return self._root
+
+    def close(self):
+        """Close the connection to the index file."""
+        with self._lock:
+            self._conn.close()
+
+    def _scan(self):
+        """Paths and stat results of the FITS files under the root."""
+        stack = [self._root]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if self._recursive and not entry.name.startswith(
+                                "."
+                            ):
+                                stack.append(entry.path)
+                        elif entry.name.endswith(FITS_EXTENSIONS):
+                            yield entry.path, entry.stat()
+                    except OSError:
+                        continue
+
+    @staticmethod
+    def _read(path, stat):
+        """Index row of a file, or `None` if its header cannot be read."""
+        try:
+            raw = _read_header_bytes(path)
+            hdr = fits.Header.fromstring(raw.decode("ascii", errors="replace"))
+            row = _header_row(hdr)
+        except (OSError, ValueError, TypeError):
+            logger.warning(f"Could not index {path}", exc_info=True)
+            return None
+        return (path, stat.st_mtime, stat.st_size, zlib.compress(raw)) + row
+
+    def update(self, jobs=8):
+        """
+        Synchronize the index with the directory.
+
+        Only the files that are new or whose modification time or size
+        changed since the last update have their header read. The headers are
+        read in parallel.
+
+        Parameters
+        ----------
+        jobs : `int`, default : 8, optional
+            Number of threads reading headers.
+
+        Returns
+        -------
+        `int`
+            Number of entries added, refreshed or removed.
+        """
+        with self._lock:
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in self._conn.execute(
+                    "SELECT path, mtime, size FROM headers"
+                )
+            }
+
+            changed = []
+            for path, stat in self._scan():
+                if known.pop(path, None) != (stat.st_mtime, stat.st_size):
+                    changed.append((path, stat))
+
+            if len(changed) > 1 and jobs > 1:
+                with ThreadPoolExecutor(max_workers=jobs) as executor:
+                    rows = list(
+                        executor.map(lambda c: self._read(*c), changed)
+                    )
+            else:
+                rows = [self._read(*c) for c in changed]
+
+            # Unreadable files (e.g. still being written) are dropped and
+            # retried on the next update
+            removed = list(known) + [
+                path for (path, _), row in zip(changed, rows) if row is None
+            ]
+            rows = [row for row in rows if row is not None]
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO headers VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.executemany(
+                "DELETE FROM headers WHERE path = ?",
+                [(path,) for path in removed],
+            )
+            self._conn.commit()
+
+        if rows or removed:
+            logger.info(
+                f"FITS index of {self._root} updated: {len(rows)} indexed, "
+                f"{len(removed)} removed"
+            )
+        return len(rows) + len(removed)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM headers"
+            ).fetchone()[0]
+
+    def __contains__(self, path):
+        return self._get(path) is not None
+
+    def _get(self, path):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT mtime, size, header FROM headers WHERE path = ?",
+                (str(Path(path).resolve()),),
+            ).fetchone()
+
+    def header(self, path):
+        """
+        Primary header of a file.
+
+        The indexed header is returned if the file did not change since it
+        was indexed. Otherwise the header is read from the file and the index
+        entry is refreshed.
+
+        Parameters
+        ----------
+        path : `str` or `~pathlib.Path`
+            Path to the FITS file.
+
+        Returns
+        -------
+        `~astropy.io.fits.Header`
+
+        Raises
+        ------
+        `OSError`
+            If the file does not exist or its header cannot be read.
+        """
+        path = str(Path(path).resolve())
+        stat = os.stat(path)
+        entry = self._get(path)
+        if entry is not None and entry[:2] == (stat.st_mtime, stat.st_size):
+            raw = zlib.decompress(entry[2])
+        else:
+            row = self._read(path, stat)
+            if row is None:
+                raise OSError(f"Could not read the header of {path}")
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO headers VALUES "
+                    "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+                self._conn.commit()
+            raw = zlib.decompress(row[3])
+        return fits.Header.fromstring(raw.decode("ascii", errors="replace"))
+
+    def headers(self, paths=None, order_by="path", **criteria):
+        """
+        Primary headers of several files.
+
+        Parameters
+        ----------
+        paths : `list` of `str` or `~pathlib.Path`, optional
+            Paths to the FITS files. Files that are not indexed or changed
+            since they were indexed are read from disk. If `None`, the headers
+            of the indexed files matching `criteria` are returned.
+        order_by : `str`, default : `"path"`, optional
+            Sort order if `paths` is `None`, see `query`.
+        **criteria
+            Search criteria if `paths` is `None`, see `query`.
+
+        Returns
+        -------
+        `dict`
+            Dictionary mapping the paths to their headers, in the order of
+            `paths` or of `order_by`.
+        """
+        if paths is not None:
+            return {path: self.header(path) for path in paths}
+        with self._lock:
+            rows = self._select("path, header", order_by, criteria)
+        return {
+            path: fits.Header.fromstring(
+                zlib.decompress(raw).decode("ascii", errors="replace")
+            )
+            for path, raw in rows
+        }
+
+    def query(self, order_by="path", columns=None, **criteria):
+        """
+        Paths of the indexed files matching the given criteria.
+
+        Parameters
+        ----------
+        order_by : `str`, default : `"path"`, optional
+            Column to sort the results by: `"path"` or one of the indexed
+            columns.
+        **criteria
+            Values of the indexed columns (`imagetyp`, `object`, `filter`,
+            `readoutm`, `xbinning`, `ybinning`, `exptime`, `obstime` and
+            `calibrated`). A value can be a single value to match exactly, a
+            `list` of values to match any of, or a `tuple` `(low, high)` to
+            match a range (either bound can be `None`). `obstime` is a UTC
+            POSIX timestamp and `calibrated` is `True` for images with a
+            `CALSTAT` keyword.
+        columns : `str` or `tuple` of `str`, optional
+            Indexed columns to return along with the paths.
+
+        Returns
+        -------
+        `list` of `str` or `list` of `tuple`
+            Paths of the matching files, or tuples of the path and the values
+            of `columns` if `columns` is given.
+
+        Raises
+        ------
+        `ValueError`
+            If a criterion, `order_by` or one of `columns` is not an indexed
+            column.
+        """
+        if columns is None:
+            with self._lock:
+                return [
+                    path
+                    for (path,) in self._select("path", order_by, criteria)
+                ]
+
+        if isinstance(columns, str):
+            columns = (columns,)
+        for column in columns:
+            if column not in COLUMNS:
+                raise ValueError(f"{column} is not an indexed column")
+        with self._lock:
+            return self._select(
+                ", ".join(("path",) + tuple(columns)), order_by, criteria
+            )
+
+    def _select(self, columns, order_by, criteria):
+        """Run a SELECT of `columns` over the entries matching `criteria`."""
+        if order_by != "path" and order_by not in COLUMNS:
+            raise ValueError(f"Cannot order by {order_by}")
+
+        where = []
+        params = []
+        for column, value in criteria.items():
+            if column not in COLUMNS:
+                raise ValueError(f"{column} is not an indexed column")
+            if isinstance(value, tuple):
+                low, high = value
+                if low is not None:
+                    where.append(f"{column} >= ?")
+                    params.append(low)
+                if high is not None:
+                    where.append(f"{column} <= ?")
+                    params.append(high)
+            elif isinstance(value, list):
+                where.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif value is None:
+                where.append(f"{column} IS NULL")
+            else:
+                where.append(f"{column} = ?")
+                params.append(int(value) if isinstance(value, bool) else value)
+
+        query = f"SELECT {columns} FROM headers"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += f" ORDER BY {order_by}"
+        return self._conn.execute(query, params).fetchall()
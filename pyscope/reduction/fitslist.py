@@ -7,9 +7,10 @@ import click
 import numpy as np
 from astropy import coordinates as coord  # can have as part of astropy table
 from astropy import time
-from astropy.io import fits
 from astropy.table import Table
 
+from .fits_index import fits_index, read_header
+
 logger = logging.getLogger(__name__)
 
 # --- Constants ---
@@ -229,25 +230,25 @@ def fitslist_cli(
                 target={target}, verbose={verbose}, fnames={fnames}"""
     )
 
-    # Get list of files
-    ftsfiles = []
-    original_names = {}
+    # Get the headers from the directory index, only new or modified files
+    # are read
     if os.path.isdir(fnames):  # Check if fnames is a directory
-        files = os.listdir(fnames)
-        for file in files:
-            if file.endswith((".fits", ".fts", ".fit")):
-                filename = fnames + "/" + file
-                ftsfiles.append(filename)
-                original_names[filename] = file
+        index = fits_index(fnames, recursive=False)
+        index.update()
+        headers = index.headers()
     else:
-        ftsfiles.append(fnames)
+        headers = {}
+        try:
+            headers[fnames] = read_header(fnames)
+        except OSError:
+            logger.warning(f"Could not open {fnames}.")
 
-    if len(ftsfiles) == 0:
+    if len(headers) == 0:
         click.echo("No FITS files found in the specified directory.")
         return  # Return if no FITS files are found
 
     logger.debug(f"fnames={fnames}")
-    logger.debug(f"Found {len(fnames)} files.")
+    logger.debug(f"Found {len(headers)} files.")
 
     if len(add_keys) == 0:
         extra_keys = []
@@ -257,13 +258,7 @@ def fitslist_cli(
     extra_keys = [x.upper() for x in extra_keys]
 
     print_rows = []
-    for ftsfile in ftsfiles:
-        try:
-            header = fits.getheader(ftsfile)
-        except BaseException:
-            logger.warning(f"Could not open {ftsfile}.")
-            continue
-
+    for ftsfile, header in headers.items():
         # Get properties
         date = time.Time(header["DATE-OBS"], format="fits", scale="utc")
 
@@ -424,7 +419,7 @@ def fitslist_cli(
 
         print_rows.append(
             [
-                original_names[ftsfile],
+                os.path.basename(ftsfile),
                 target_name,
                 date.jd,
                 date.iso,
@@ -0,0 +1,318 @@
+import contextlib
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .fits_index import FITS_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+
+class LandingWatcher:
+    def __init__(self, landing_dir, seen_file=None, max_attempts=2):
+        """
+        Discover new FITS files arriving in a landing directory.
+
+        The directory is polled with a single `os.scandir` call, which only
+        reads the directory entries and never opens the files. A file is
+        reported once it is stable, i.e. its size and modification time did
+        not change between two polls, so that images still being written are
+        not picked up.
+
+        Reported files are recorded in a seen-set persisted to `seen_file`,
+        together with the number of times they were reported. A file is not
+        reported twice unless it changes, with one exception: files of the
+        seen-set that are still in the landing directory when the watcher is
+        created, because the daemon stopped while processing them, are
+        reported again unless they were already reported `max_attempts`
+        times. Entries of files that left the landing directory are dropped.
+
+        Parameters
+        ----------
+        landing_dir : `str` or `~pathlib.Path`
+            Directory where new images arrive. Subdirectories are ignored.
+        seen_file : `str` or `~pathlib.Path`, optional
+            JSON file persisting the seen-set. Defaults to
+            `.ingest_seen.json` inside `landing_dir`.
+        max_attempts : `int`, default : 2, optional
+            Maximum number of times a file is reported.
+        """
+        self._landing_dir = Path(landing_dir)
+        if seen_file is None:
+            seen_file = self._landing_dir / ".ingest_seen.json"
+        self._seen_file = Path(seen_file)
+        self._max_attempts = max_attempts
+        self._pending = {}
+        self._seen = {}
+        if self._seen_file.exists():
+            try:
+                self._seen = json.loads(self._seen_file.read_text())
+            except (OSError, ValueError):
+                logger.warning(
+                    f"Could not read {self._seen_file}, starting afresh"
+                )
+        self._retry = set(self._seen)
+
+    def _save(self):
+        tmp = self._seen_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._seen))
+        os.replace(tmp, self._seen_file)
+
+    def poll(self, limit=None):
+        """
+        Return the stable files that were not reported yet.
+
+        Parameters
+        ----------
+        limit : `int`, optional
+            Maximum number of files to return. The remaining ready files are
+            returned by the next polls, oldest first.
+
+        Returns
+        -------
+        `list` of `~pathlib.Path`
+        """
+        present = {}
+        try:
+            with os.scandir(self._landing_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(FITS_EXTENSIONS):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    present[entry.name] = [stat.st_mtime, stat.st_size]
+        except OSError:
+            logger.exception(f"Could not scan {self._landing_dir}")
+            return []
+
+        changed = False
+        for name in list(self._seen):
+            if name not in present:
+                del self._seen[name]
+                changed = True
+
+        ready = []
+        for name, signature in present.items():
+            seen = self._seen.get(name)
+            if seen is not None and seen[:2] == signature:
+                # Reported before the daemon was restarted and still here:
+                # its processing was interrupted
+                if name in self._retry and seen[2] < self._max_attempts:
+                    ready.append((signature[0], name))
+            elif self._pending.get(name) == signature:
+                ready.append((signature[0], name))
+        self._retry.clear()
+        self._pending = {
+            name: signature
+            for name, signature in present.items()
+            if name not in self._seen or self._seen[name][:2] != signature
+        }
+
+        ready.sort()
+        if limit is not None:
+            ready = ready[: max(limit, 0)]
+        for _, name in ready:
+            seen = self._seen.get(name)
+            attempts = (
+                0 if seen is None or seen[:2] != present[name] else seen[2]
+            )
+            self._seen[name] = present[name] + [attempts + 1]
+            self._pending.pop(name, None)
+            changed = True
+
+        if changed:
+            try:
+                self._save()
+            except OSError:
+                logger.warning(f"Could not save {self._seen_file}")
+        return [self._landing_dir / name for _, name in ready]
+
+
+class RetentionIndex:
+    def __init__(self, maxage, maxmtime):
+        """
+        In-memory index of archived images and of when they may be deleted.
+
+        An image may be deleted once it has not been modified for `maxmtime`
+        seconds and the start of the UTC day of its observation is more than
+        `maxage` seconds ago. The images are kept in a heap ordered by the
+        earliest time they may be deleted, so that `expire` only looks at the
+        images that are due instead of reading the headers of the whole
+        archive.
+
+        Parameters
+        ----------
+        maxage : `float`
+            Maximum age of an image since the start of its observation day,
+            in seconds.
+        maxmtime : `float`
+            Minimum time since the last modification of an image before it
+            may be deleted, in seconds.
+        """
+        self._maxage = maxage
+        self._maxmtime = maxmtime
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, path, obstime):
+        """
+        Add an image to the index.
+
+        Parameters
+        ----------
+        path : `str` or `~pathlib.Path`
+            Path to the image.
+        obstime : `float`
+            UTC POSIX timestamp of the observation (`DATE-OBS`).
+        """
+        if obstime is None:
+            return
+        path = Path(path)
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return
+        day_start = obstime - obstime % 86400
+        due = max(day_start + self._maxage, mtime + self._maxmtime)
+        with self._lock:
+            heapq.heappush(self._heap, (due, str(path), day_start))
+
+    def expire(self, now=None):
+        """
+        Delete the images that are due.
+
+        Images modified since they were added are rescheduled.
+
+        Parameters
+        ----------
+        now : `float`, optional
+            Current POSIX time. Defaults to `time.time()`.
+
+        Returns
+        -------
+        `list` of `~pathlib.Path`
+            Deleted images.
+        """
+        now = time.time() if now is None else now
+        deleted = []
+        with self._lock:
+            while self._heap and self._heap[0][0] < now:
+                _, path, day_start = heapq.heappop(self._heap)
+                path = Path(path)
+                try:
+                    mtime = path.stat().st_mtime
+                except OSError:
+                    continue
+                if now - mtime <= self._maxmtime:
+                    heapq.heappush(
+                        self._heap,
+                        (
+                            max(
+                                day_start + self._maxage,
+                                mtime + self._maxmtime,
+                            ),
+                            str(path),
+                            day_start,
+                        ),
+                    )
+                    continue
+                try:
+                    path.unlink()
+                except OSError:
+                    logger.exception(f"Could not delete {path}")
+                    continue
+                logger.info(f"Deleted {path}")
+                deleted.append(path)
+        return deleted
+
+
+class StageMetrics:
+    def __init__(self, maxlen=10000):
+        """
+        Thread-safe latency statistics of the stages of a pipeline.
+
+        Parameters
+        ----------
+        maxlen : `int`, default : 10000, optional
+            Number of most recent samples kept per stage for the percentiles.
+        """
+        self._maxlen = maxlen
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        """
+        Record the duration of one run of a stage.
+
+        Parameters
+        ----------
+        stage : `str`
+            Name of the stage.
+        seconds : `float`
+            Duration in seconds.
+        """
+        with self._lock:
+            samples = self._samples.setdefault(stage, [])
+            samples.append(seconds)
+            if len(samples) > self._maxlen:
+                del samples[: len(samples) - self._maxlen]
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        """Context manager recording the duration of its block as `stage`."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - t0)
+
+    def summary(self):
+        """
+        Latency statistics of each stage.
+
+        Returns
+        -------
+        `dict`
+            Dictionary mapping each stage to a dictionary with the total
+            `count` of runs and the `mean`, `p50`, `p95` and `max` of the
+            recent durations, in seconds.
+        """
+        with self._lock:
+            samples = {
+                stage: np.array(s) for stage, s in self._samples.items()
+            }
+            counts = dict(self._counts)
+        return {
+            stage: {
+                "count": counts[stage],
+                "mean": float(np.mean(s)),
+                "p50": float(np.percentile(s, 50)),
+                "p95": float(np.percentile(s, 95)),
+                "max": float(np.max(s)),
+            }
+            for stage, s in samples.items()
+        }
+
+    def log(self, level=logging.INFO):
+        """Log the latency statistics of each stage."""
+        for stage, s in self.summary().items():
+            logger.log(
+                level,
+                f"{stage}: n={s['count']} mean={s['mean']:.2f}s "
+                f"p50={s['p50']:.2f}s p95={s['p95']:.2f}s max={s['max']:.2f}s",
+            )
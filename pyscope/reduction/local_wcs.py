@@ -0,0 +1,759 @@
+import logging
+import os
+import threading
+from pathlib import Path
+
+import click
+import numpy as np
+from astropy import coordinates as coord
+from astropy import units as u
+from astropy import wcs as astropywcs
+from astropy.io import fits
+from astropy.table import Table
+from scipy import ndimage
+from scipy.spatial import cKDTree
+
+logger = logging.getLogger(__name__)
+
+_indices = {}
+_indices_lock = threading.Lock()
+
+# Header keywords holding the approximate pointing of an image, in order of
+# preference. String values are sexagesimal hours for the right ascension.
+_HINT_KEYS = (
+    ("TELRAIC", "TELDECIC"),
+    ("OBJCTRA", "OBJCTDEC"),
+    ("RA", "DEC"),
+    ("CRVAL1", "CRVAL2"),
+)
+
+# Keywords of a previous WCS solution, removed before writing a new one
+_WCS_KEYS = ("CTYPE", "CUNIT", "CRVAL", "CRPIX", "CDELT", "CROTA")
+_WCS_MATRIX_KEYS = ("CD", "PC")
+
+
+def default_index_path():
+    """Default path of the star index used by `local_wcs`."""
+    return (
+        Path(os.path.expanduser("~"))
+        / ".pyscope"
+        / "catalogs"
+        / "local_wcs_index.npz"
+    )
+
+
+def star_index(path=None):
+    """
+    Return a shared `StarIndex` loaded from disk.
+
+    The index is read once per process and reloaded only when the file
+    changes, so that consecutive solves do not read it again.
+
+    Parameters
+    ----------
+    path : `str` or `~pathlib.Path`, optional
+        Path of the index file. Defaults to `default_index_path`.
+
+    Returns
+    -------
+    `StarIndex`
+    """
+    path = Path(default_index_path() if path is None else path).resolve()
+    mtime = path.stat().st_mtime
+    with _indices_lock:
+        index = _indices.get(path)
+        if index is None or index[0] != mtime:
+            _indices[path] = (mtime, StarIndex.load(path))
+        return _indices[path][1]
+
+
+class StarIndex:
+    def __init__(self, ra, dec, mag, zone_height=1.0):
+        """
+        Reference stars bucketed by declination zone for fast cone searches.
+
+        The stars are sorted by zone, then by right ascension within each
+        zone, so that the stars around a position are found with a binary
+        search in the few zones overlapping the cone instead of a scan of
+        the whole catalog.
+
+        Parameters
+        ----------
+        ra : `~numpy.ndarray`
+            ICRS right ascension of the stars in degrees.
+        dec : `~numpy.ndarray`
+            ICRS declination of the stars in degrees.
+        mag : `~numpy.ndarray`
+            Magnitude of the stars, used to select the brightest ones.
+        zone_height : `float`, default : 1.0, optional
+            Height of the declination zones in degrees.
+        """
+        ra = np.mod(np.asarray(ra, dtype=float), 360)
+        dec = np.asarray(dec, dtype=float)
+        mag = np.asarray(mag, dtype=np.float32)
+        self.zone_height = float(zone_height)
+        self._n_zones = int(np.ceil(180 / self.zone_height))
+        zone = self._zone(dec)
+        order = np.lexsort((ra, zone))
+        self.ra, self.dec, self.mag = ra[order], dec[order], mag[order]
+        self._zone_start = np.searchsorted(
+            zone[order], np.arange(self._n_zones + 1)
+        )
+
+    def __len__(self):
+        return len(self.ra)
+
+    def _zone(self, dec):
+        return np.clip(
+            ((np.asarray(dec) + 90) // self.zone_height).astype(int),
+            0,
+            self._n_zones - 1,
+        )
+
+    @classmethod
+    def build(
+        cls,
+        catalog,
+        path=None,
+        ra_col="ra",
+        dec_col="dec",
+        mag_col="mag",
+        max_mag=None,
+        zone_height=1.0,
+    ):
+        """
+        Build an index from a reference catalog and save it to disk.
+
+        Parameters
+        ----------
+        catalog : `~astropy.table.Table`, `str` or `~pathlib.Path`
+            The catalog, or the path to a file readable by
+            `~astropy.table.Table.read`.
+        path : `str` or `~pathlib.Path`, optional
+            Path of the index file. Defaults to `default_index_path`.
+        ra_col : `str`, default : `"ra"`, optional
+            Name of the right ascension column, in degrees.
+        dec_col : `str`, default : `"dec"`, optional
+            Name of the declination column, in degrees.
+        mag_col : `str`, default : `"mag"`, optional
+            Name of the magnitude column.
+        max_mag : `float`, optional
+            Faintest magnitude kept in the index.
+        zone_height : `float`, default : 1.0, optional
+            Height of the declination zones in degrees.
+
+        Returns
+        -------
+        `StarIndex`
+        """
+        if not isinstance(catalog, Table):
+            logger.info(f"Reading reference catalog {catalog}")
+            catalog = Table.read(catalog)
+        mag = np.ma.filled(
+            np.ma.asarray(catalog[mag_col], dtype=float), np.nan
+        )
+        keep = np.isfinite(mag)
+        if max_mag is not None:
+            keep &= mag <= max_mag
+        index = cls(
+            np.asarray(catalog[ra_col], dtype=float)[keep],
+            np.asarray(catalog[dec_col], dtype=float)[keep],
+            mag[keep],
+            zone_height=zone_height,
+        )
+        index.save(default_index_path() if path is None else path)
+        return index
+
+    def save(self, path):
+        """Save the index to a `.npz` file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                ra=self.ra,
+                dec=self.dec,
+                mag=self.mag,
+                zone_height=self.zone_height,
+            )
+        logger.info(f"Saved a star index of {len(self)} stars to {path}")
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with `save`."""
+        logger.info(f"Loading star index from {path}")
+        with np.load(path) as data:
+            return cls(
+                data["ra"],
+                data["dec"],
+                data["mag"],
+                zone_height=float(data["zone_height"]),
+            )
+
+    def query(self, ra, dec, radius, max_stars=None):
+        """
+        Stars within `radius` degrees of a position, brightest first.
+
+        Parameters
+        ----------
+        ra : `float`
+            Right ascension of the center in degrees.
+        dec : `float`
+            Declination of the center in degrees.
+        radius : `float`
+            Radius of the cone in degrees.
+        max_stars : `int`, optional
+            Maximum number of stars returned.
+
+        Returns
+        -------
+        `tuple` of `~numpy.ndarray`
+            Right ascension, declination and magnitude of the stars.
+        """
+        ra = ra % 360
+        dec_min, dec_max = max(dec - radius, -90), min(dec + radius, 90)
+        max_cos = np.cos(np.radians(max(abs(dec_min), abs(dec_max))))
+        half_width = (
+            360 if max_cos * 180 <= radius else radius / max_cos
+        )  # right ascension half width of the cone
+        ranges = [(ra - half_width, ra + half_width)]
+        if half_width >= 180:
+            ranges = [(0, 360)]
+        elif ranges[0][0] < 0:
+            ranges = [(0, ra + half_width), (ra - half_width + 360, 360)]
+        elif ranges[0][1] > 360:
+            ranges = [(ra - half_width, 360), (0, ra + half_width - 360)]
+
+        rows = []
+        for zone in range(self._zone(dec_min), self._zone(dec_max) + 1):
+            start, stop = self._zone_start[zone], self._zone_start[zone + 1]
+            zone_ra = self.ra[start:stop]
+            for low, high in ranges:
+                rows.append(
+                    np.arange(
+                        start + np.searchsorted(zone_ra, low, "left"),
+                        start + np.searchsorted(zone_ra, high, "right"),
+                    )
+                )
+        rows = np.concatenate(rows) if rows else np.array([], dtype=int)
+        rows = rows[
+            _separation(ra, dec, self.ra[rows], self.dec[rows]) <= radius
+        ]
+        rows = rows[np.argsort(self.mag[rows], kind="stable")][:max_stars]
+        return self.ra[rows], self.dec[rows], self.mag[rows]
+
+
+def _separation(ra0, dec0, ra, dec):
+    """Angular separation in degrees."""
+    ra0, dec0, ra, dec = map(np.radians, (ra0, dec0, ra, dec))
+    cos_sep = np.sin(dec0) * np.sin(dec) + np.cos(dec0) * np.cos(dec) * np.cos(
+        ra - ra0
+    )
+    return np.degrees(np.arccos(np.clip(cos_sep, -1, 1)))
+
+
+def _project(ra0, dec0, ra, dec):
+    """Gnomonic projection about `(ra0, dec0)`, in degrees."""
+    ra0, dec0, ra, dec = map(np.radians, (ra0, dec0, ra, dec))
+    cos_c = np.sin(dec0) * np.sin(dec) + np.cos(dec0) * np.cos(dec) * np.cos(
+        ra - ra0
+    )
+    xi = np.cos(dec) * np.sin(ra - ra0) / cos_c
+    eta = (
+        np.cos(dec0) * np.sin(dec)
+        - np.sin(dec0) * np.cos(dec) * np.cos(ra - ra0)
+    ) / cos_c
+    return np.degrees(np.column_stack([xi, eta]))
+
+
+def find_stars(data, max_stars=50, threshold=5, min_pixels=3):
+    """
+    Quickly locate the brightest stars of an image.
+
+    The background and noise are estimated from a subsample of the image,
+    the image is smoothed with a 3x3 box, and the groups of at least
+    `min_pixels` connected pixels above `threshold` times the noise are
+    kept, brightest first.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        The image.
+    max_stars : `int`, default : 50, optional
+        Maximum number of stars returned.
+    threshold : `float`, default : 5, optional
+        Detection threshold in units of the background noise.
+    min_pixels : `int`, default : 3, optional
+        Minimum number of connected pixels of a star, to reject hot pixels
+        and cosmic rays.
+
+    Returns
+    -------
+    `tuple` of `~numpy.ndarray`
+        The zero-based `(x, y)` centroids of the stars, of shape `(n, 2)`,
+        and their background-subtracted fluxes.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    step = max(min(data.shape) // 512, 1)
+    sample = data[::step, ::step]
+    background = np.median(sample)
+    noise = 1.4826 * np.median(np.abs(sample - background))
+    if noise <= 0:
+        noise = np.std(sample) or 1.0
+    data = data - background
+
+    # The noise of a 3x3 mean is a third of the pixel noise
+    mask = ndimage.uniform_filter(data, 3) > threshold * noise / 3
+    labels, n = ndimage.label(mask)
+    if n == 0:
+        return np.empty((0, 2)), np.empty(0)
+    index = np.arange(1, n + 1)
+    npix = np.bincount(labels.ravel(), minlength=n + 1)[1:]
+    flux = ndimage.sum_labels(data, labels, index)
+    keep = npix >= min_pixels
+    order = np.argsort(flux[keep])[::-1][:max_stars]
+    index, flux = index[keep][order], flux[keep][order]
+    if len(index) == 0:
+        return np.empty((0, 2)), np.empty(0)
+    centroids = ndimage.center_of_mass(np.clip(data, 0, None), labels, index)
+    return np.array(centroids)[:, ::-1], flux
+
+
+def _triangles(xy, min_side, max_side):
+    """
+    Triangles of a set of points, with their vertices ordered by the length
+    of the opposite side, and their invariant shape.
+
+    Returns the vertex indices, the two ratios of the shortest sides to the
+    longest one, and the longest side.
+    """
+    n = len(xy)
+    # Pairs of points that can be the side of a triangle, then triangles
+    # completing them with a later point
+    i, j = np.triu_indices(n, 1)
+    distance = np.hypot(*(xy[i] - xy[j]).T)
+    side = (distance >= min_side) & (distance <= max_side)
+    i, j = i[side], j[side]
+    counts = n - 1 - j
+    starts = np.cumsum(counts) - counts
+    k = np.arange(counts.sum()) - np.repeat(starts - j - 1, counts)
+    vertices = np.column_stack([np.repeat(i, counts), np.repeat(j, counts), k])
+    p = xy[vertices]
+    # Side opposite to each vertex
+    sides = np.column_stack(
+        [
+            np.hypot(*(p[:, 1] - p[:, 2]).T),
+            np.hypot(*(p[:, 0] - p[:, 2]).T),
+            np.hypot(*(p[:, 0] - p[:, 1]).T),
+        ]
+    )
+    order = np.argsort(sides, axis=1)
+    sides = np.take_along_axis(sides, order, axis=1)
+    vertices = np.take_along_axis(vertices, order, axis=1)
+    # Skip small triangles, whose shape is dominated by centroid errors, and
+    # flat ones
+    keep = (
+        (sides[:, 0] >= min_side)
+        & (sides[:, 2] <= max_side)
+        & (sides[:, 0] + sides[:, 1] > 1.05 * sides[:, 2])
+    )
+    sides = sides[keep]
+    return (
+        vertices[keep],
+        sides[:, :2] / sides[:, 2:],
+        sides[:, 2],
+    )
+
+
+def _fit_affine(src, dst):
+    """Least squares affine transform mapping `src` to `dst`, as a 2x3
+    matrix."""
+    design = np.column_stack([src, np.ones(len(src))])
+    return np.linalg.lstsq(design, dst, rcond=None)[0].T
+
+
+def _apply(transform, xy):
+    return xy @ transform[:, :2].T + transform[:, 2]
+
+
+def _match(transform, xy, tree, tolerance):
+    """Pairs of image and catalog stars closer than `tolerance` once the
+    image stars are transformed."""
+    distance, nearest = tree.query(_apply(transform, xy))
+    matched = distance <= tolerance
+    return np.flatnonzero(matched), nearest[matched]
+
+
+def solve_xy(
+    xy,
+    ra,
+    dec,
+    scale,
+    image_shape,
+    index=None,
+    radius=None,
+    scale_err=0.1,
+    tolerance=3,
+    min_matches=6,
+    max_catalog_stars=150,
+    max_candidates=2000,
+):
+    """
+    Match star positions to a star index and fit a TAN WCS.
+
+    The stars of the index around the hint position are projected onto the
+    detector using the known pixel scale. Triangles of image and catalog
+    stars with the same shape and size give candidate transforms, from the
+    most similar pairs of triangles down, and the first transform matching
+    many stars is refined by least squares.
+
+    Parameters
+    ----------
+    xy : `~numpy.ndarray`
+        Zero-based pixel coordinates of the image stars, brightest first, of
+        shape `(n, 2)`.
+    ra : `float`
+        Approximate right ascension of the image in degrees.
+    dec : `float`
+        Approximate declination of the image in degrees.
+    scale : `float`
+        Pixel scale in arcseconds per pixel.
+    image_shape : `tuple` of `int`
+        Shape of the image, `(ny, nx)`.
+    index : `StarIndex`, optional
+        The star index. Defaults to the index at `default_index_path`.
+    radius : `float`, optional
+        Radius in degrees searched around the hint position. Defaults to half
+        the diagonal of the image.
+    scale_err : `float`, default : 0.1, optional
+        Relative uncertainty of the pixel scale.
+    tolerance : `float`, default : 3, optional
+        Maximum distance in pixels between matched stars.
+    min_matches : `int`, default : 6, optional
+        Minimum number of matched stars of a solution.
+    max_catalog_stars : `int`, default : 150, optional
+        Maximum number of catalog stars matched.
+    max_candidates : `int`, default : 2000, optional
+        Maximum number of candidate transforms tested.
+
+    Returns
+    -------
+    `~astropy.wcs.WCS` or `None`
+        The solution, with the number of matched stars and the RMS residual
+        in arcseconds in its `matches` and `rms` attributes, or `None` if no
+        solution was found.
+    """
+    if index is None:
+        index = star_index()
+    xy = np.asarray(xy, dtype=float)
+    ny, nx = image_shape
+    diagonal = np.hypot(nx, ny) * scale / 3600
+    if radius is None:
+        radius = diagonal / 2
+
+    # Keep about as many catalog stars per unit area as detected in the image
+    area_ratio = (np.pi * (radius + diagonal / 2) ** 2) / (
+        nx * ny * (scale / 3600) ** 2
+    )
+    cat_ra, cat_dec, _ = index.query(
+        ra,
+        dec,
+        radius + diagonal / 2,
+        max_stars=int(
+            min(max(2 * len(xy) * area_ratio, 20), max_catalog_stars)
+        ),
+    )
+    if len(xy) < min_matches or len(cat_ra) < min_matches:
+        logger.info(
+            f"Not enough stars to solve: {len(xy)} detected, "
+            f"{len(cat_ra)} in the index"
+        )
+        return None
+    # Catalog positions in pixels, east and north
+    cat_xy = _project(ra, dec, cat_ra, cat_dec) * 3600 / scale
+    tree = cKDTree(cat_xy)
+
+    min_side = max(10 * tolerance, 0.05 * min(nx, ny))
+    max_side = np.hypot(nx, ny)
+    img_tri, img_shape, img_size = _triangles(xy, min_side, max_side)
+    cat_tri, cat_shape, cat_size = _triangles(
+        cat_xy, min_side * (1 - scale_err), max_side * (1 + scale_err)
+    )
+    if len(img_tri) == 0 or len(cat_tri) == 0:
+        return None
+
+    # Pairs of triangles with the same shape and size, most similar first.
+    # The features are scaled so that both tolerances are a unit distance.
+    shape_tolerance = tolerance / (2 * min_side)
+    size_tolerance = np.log1p(scale_err)
+
+    def features(shape, size):
+        return np.column_stack(
+            [shape / shape_tolerance, np.log(size) / size_tolerance]
+        )
+
+    pairs = cKDTree(features(img_shape, img_size)).sparse_distance_matrix(
+        cKDTree(features(cat_shape, cat_size)), 1, output_type="ndarray"
+    )
+    pairs = pairs[np.argsort(pairs["v"], kind="stable")][:max_candidates]
+
+    best, best_matches = None, np.empty(0, dtype=int)
+    target = max(2 * min_matches, len(xy) // 2)
+    for i, j in zip(pairs["i"], pairs["j"]):
+        transform = _fit_affine(xy[img_tri[i]], cat_xy[cat_tri[j]])
+        # The transform must be a rotation, possibly mirrored, at the
+        # expected scale
+        singular = np.linalg.svd(transform[:, :2], compute_uv=False)
+        if np.any(np.abs(singular - 1) > scale_err):
+            continue
+        matches, _ = _match(transform, xy, tree, tolerance)
+        if len(matches) > len(best_matches):
+            best, best_matches = transform, matches
+            if len(matches) >= target:
+                break
+    if best is None or len(best_matches) < min_matches:
+        logger.info("No local WCS solution found")
+        return None
+
+    # Refine on all matched stars, then about the center of the image
+    center = np.array([(nx - 1) / 2, (ny - 1) / 2])
+    crval = (ra, dec)
+    transform = best
+    for _ in range(3):
+        matches, nearest = _match(transform, xy, tree, tolerance)
+        transform = _fit_affine(xy[matches], cat_xy[nearest])
+        w = _tan_wcs(transform, scale, crval)
+        crval = tuple(float(v) for v in w.wcs_pix2world([center], 0)[0])
+        cat_xy = _project(*crval, cat_ra, cat_dec) * 3600 / scale
+        tree = cKDTree(cat_xy)
+        transform = _fit_affine(xy[matches], cat_xy[nearest])
+
+    matches, nearest = _match(transform, xy, tree, tolerance)
+    if len(matches) < min_matches:
+        logger.info("No local WCS solution found")
+        return None
+    transform = _fit_affine(xy[matches], cat_xy[nearest])
+    w = _tan_wcs(transform, scale, crval)
+    residuals = _apply(transform, xy[matches]) - cat_xy[nearest]
+    w.matches = len(matches)
+    w.rms = float(np.sqrt(np.mean(np.sum(residuals**2, axis=1)))) * scale
+    logger.info(
+        f"Local WCS solution matched {w.matches} stars, "
+        f"RMS residual {w.rms:.2f} arcsec"
+    )
+    return w
+
+
+def _tan_wcs(transform, scale, crval):
+    """TAN WCS of an affine transform from pixels to projected pixels about
+    `crval`."""
+    matrix, offset = transform[:, :2], transform[:, 2]
+    w = astropywcs.WCS(naxis=2)
+    w.wcs.ctype = ["RA---TAN", "DEC--TAN"]
+    w.wcs.cunit = ["deg", "deg"]
+    w.wcs.radesys = "ICRS"
+    w.wcs.equinox = 2000
+    w.wcs.crval = crval
+    w.wcs.crpix = np.linalg.solve(matrix, -offset) + 1
+    w.wcs.cd = matrix * scale / 3600
+    return w
+
+
+def _header_hint(hdr):
+    """Approximate ICRS pointing of an image from its header, in degrees."""
+    for ra_key, dec_key in _HINT_KEYS:
+        if hdr.get(ra_key) is None or hdr.get(dec_key) is None:
+            continue
+        ra_unit = u.hourangle if isinstance(hdr[ra_key], str) else u.deg
+        try:
+            return (
+                coord.Angle(hdr[ra_key], unit=ra_unit).deg,
+                coord.Angle(hdr[dec_key], unit=u.deg).deg,
+            )
+        except (ValueError, u.UnitsError):
+            logger.debug(f"Could not parse {ra_key} and {dec_key}")
+    return None
+
+
+def _header_scale(hdr):
+    """Binned pixel scale of an image from its header, in arcseconds."""
+    if hdr.get("XPIXSCAL") is None:
+        return None
+    return float(hdr["XPIXSCAL"]) * float(hdr.get("XBINNING", 1) or 1)
+
+
+def _update_header(hdr, w):
+    for key in list(hdr.keys()):
+        if key.startswith(_WCS_KEYS) or (
+            key.startswith(_WCS_MATRIX_KEYS) and key[2:3].isdigit()
+        ):
+            del hdr[key]
+    hdr.update(w.to_header())
+    hdr["WCSMATCH"] = (w.matches, "Number of stars matched by local_wcs")
+    hdr["WCSRMS"] = (round(w.rms, 3), "[arcsec] RMS residual of local_wcs")
+
+
+@click.command(
+    epilog="""Check out the documentation at
+                https://pyscope.readthedocs.io/ for more
+                information."""
+)
+@click.argument("filepath", type=click.Path(exists=True))
+@click.option(
+    "-i",
+    "--index",
+    type=click.Path(exists=True),
+    default=None,
+    help="""Path to the star index. Defaults to
+    ~/.pyscope/catalogs/local_wcs_index.npz.""",
+)
+@click.option(
+    "--ra",
+    type=float,
+    default=None,
+    help="""Approximate right ascension of the image in degrees. Read from the
+    header if not given.""",
+)
+@click.option(
+    "--dec",
+    type=float,
+    default=None,
+    help="""Approximate declination of the image in degrees. Read from the
+    header if not given.""",
+)
+@click.option(
+    "-s",
+    "--scale",
+    type=float,
+    default=None,
+    help="""Pixel scale in arcseconds per pixel. Read from the header
+    (XPIXSCAL and XBINNING) if not given.""",
+)
+@click.option(
+    "-r",
+    "--radius",
+    type=float,
+    default=None,
+    help="""Radius in degrees searched around the approximate position.
+    Defaults to half the diagonal of the image.""",
+)
+@click.option(
+    "--scale-err",
+    type=float,
+    default=0.1,
+    show_default=True,
+    help="""Relative uncertainty of the pixel scale.""",
+)
+@click.option(
+    "--max-stars",
+    type=int,
+    default=40,
+    show_default=True,
+    help="""Maximum number of image stars matched.""",
+)
+@click.option(
+    "--min-matches",
+    type=int,
+    default=6,
+    show_default=True,
+    help="""Minimum number of matched stars of a solution.""",
+)
+@click.version_option()
+def local_wcs_cli(
+    filepath,
+    index=None,
+    ra=None,
+    dec=None,
+    scale=None,
+    radius=None,
+    scale_err=0.1,
+    max_stars=40,
+    min_matches=6,
+):
+    """
+    Platesolve images offline against a local star index.
+
+    The brightest stars of the image are matched to the stars of an index
+    built with `StarIndex.build` around the approximate position of the
+    image, using the known pixel scale. No network access nor external
+    solver is needed, and a solution is found in a fraction of a second
+    when the hint is within `radius` of the true position. The WCS solution
+    is written back to the image's header.
+
+    Parameters
+    ----------
+    filepath : `str`
+        Path to the image file to be platesolved.
+    index : `str`, optional
+        Path to the star index. Defaults to `default_index_path`.
+    ra : `float`, optional
+        Approximate right ascension of the image in degrees. Read from the
+        `TELRAIC`, `OBJCTRA`, `RA` or `CRVAL1` keywords if not given.
+    dec : `float`, optional
+        Approximate declination of the image in degrees. Read from the
+        `TELDECIC`, `OBJCTDEC`, `DEC` or `CRVAL2` keywords if not given.
+    scale : `float`, optional
+        Pixel scale in arcseconds per pixel. Read from the `XPIXSCAL` and
+        `XBINNING` keywords if not given.
+    radius : `float`, optional
+        Radius in degrees searched around the approximate position. Defaults
+        to half the diagonal of the image.
+    scale_err : `float`, default : 0.1, optional
+        Relative uncertainty of the pixel scale.
+    max_stars : `int`, default : 40, optional
+        Maximum number of image stars matched.
+    min_matches : `int`, default : 6, optional
+        Minimum number of matched stars of a solution.
+
+    Returns
+    -------
+    `bool`
+        `True` if the WCS was successfully updated in the image header,
+        `False` otherwise.
+
+    Raises
+    ------
+    `OSError`
+        Raised if the input file or the index cannot be read, or the input
+        file cannot be updated.
+    """
+    with fits.open(filepath, mode="update") as hdul:
+        hdr = hdul[0].header
+        if ra is None or dec is None:
+            hint = _header_hint(hdr)
+            if hint is None:
+                logger.warning(
+                    f"No position found in the header of {filepath}"
+                )
+                return False
+            ra = hint[0] if ra is None else ra
+            dec = hint[1] if dec is None else dec
+        if scale is None:
+            scale = _header_scale(hdr)
+            if scale is None:
+                logger.warning(
+                    f"No pixel scale found in the header of {filepath}"
+                )
+                return False
+
+        data = hdul[0].data
+        xy, _ = find_stars(data, max_stars=max_stars)
+        logger.info(f"Found {len(xy)} stars in {filepath}")
+        w = solve_xy(
+            xy,
+            ra,
+            dec,
+            scale,
+            data.shape,
+            index=star_index(index),
+            radius=radius,
+            scale_err=scale_err,
+            min_matches=min_matches,
+        )
+        if w is None:
+            return False
+        _update_header(hdr, w)
+    return True
+
+
+local_wcs = local_wcs_cli.callback
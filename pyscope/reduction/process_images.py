@@ -20,18 +20,26 @@ WantedBy=multi-user.target
 
 """
 
-import datetime as dt
 import logging
 import os
 import shutil
+import signal
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
 from astropy.io import fits
 
 from pyscope.reduction.calib_images import calib_images
+from pyscope.reduction.fits_index import _obstime, fits_index
+from pyscope.reduction.ingest import (
+    LandingWatcher,
+    RetentionIndex,
+    StageMetrics,
+)
 
 # observatory home - TODO get from environment?
 OBSERVATORY_HOME = Path("/usr/local/telescope/rlmt")
@@ -51,6 +59,18 @@ MAXAGE = 7 * 3600 * 24
 # maximum time since modification in seconds
 MAXMTIME = 1 * 3600 * 24
 
+# subdirectories of LANDING_DIR where processed images are kept until MAXAGE
+ARCHIVE_DIRS = ("raw_archive", "reduced", "failed")
+
+# number of images processed in parallel
+WORKERS = 2
+
+# seconds between two polls of LANDING_DIR
+POLL_INTERVAL = 2
+
+# seconds between two logs of the processing latencies
+METRICS_INTERVAL = 3600
+
 # configure the logger - >INFO to log, >DEBUG to console
 logger = logging.getLogger(__name__)
 
@@ -115,6 +135,7 @@ def sort_image(img, dest):
         dest.mkdir(mode=0o775, parents=True)
     target = dest / img.name
     shutil.copy(img, target)
+    return target
 
 
 def store_image(img, dest, update_db=False):
@@ -152,7 +173,7 @@ def store_image(img, dest, update_db=False):
             return True
 
 
-def process_image(img):
+def process_image(img, metrics=None):
     """
     Processes a single FITS image by calibrating and classifying it based on the outcome.
 
@@ -167,96 +188,173 @@ def process_image(img):
     ----------
     img : `pathlib.Path`
         Path to the FITS image file to process.
+    metrics : `~pyscope.reduction.ingest.StageMetrics`, optional
+        If given, the duration of each processing stage is recorded.
+
+    Returns
+    -------
+    `float` or `None`
+        UTC POSIX timestamp of the observation, `None` if unknown.
+    `list` of `pathlib.Path`
+        Copies of the image left in the landing directory tree
+        (`raw_archive`, `reduced` or `failed`).
 
     Raises
     ------
     Exception
         If the image is corrupt or calibration fails.
     """
+    if metrics is None:
+        metrics = StageMetrics()
+
     logger.info(f"Processing {img}...")
+    copies = []
     try:
-        data, hdr = fits.getdata(img), fits.getheader(img, 0)
+        with metrics.time("read"):
+            data, hdr = fits.getdata(img), fits.getheader(img, 0)
     except BaseException:
-        sort_image(img, img.parent / "failed")
+        copies.append(sort_image(img, img.parent / "failed"))
         logger.exception(f"Corrupt FITS file {img}")
         img.unlink()
-        return
+        return None, copies
 
-    img_isodate = fits.getval(img, "DATE-OBS")[:10]
+    img_isodate = hdr["DATE-OBS"][:10]
+    obstime = _obstime(hdr["DATE-OBS"])
 
-    if not isCalibrated(img):
-        fil = fits.getval(img, "FILTER").strip().lower()
+    if "CALSTART" not in hdr:
+        fil = hdr["FILTER"].strip().lower()
 
         # store a copy of the raw image in long-term storage
-        store_image(img, STORAGE_ROOT / "rawimage" / img_isodate)
+        with metrics.time("store_raw"):
+            store_image(img, STORAGE_ROOT / "rawimage" / img_isodate)
 
         # send this single image to calib_images
         try:
-            calib_images(
-                camera_type="ccd",
-                image_dir=None,
-                calib_dir=CALIB_DIR,
-                raw_archive_dir=LANDING_DIR / "raw_archive",
-                in_place=True,
-                zmag=False,
-                verbose=0,
-                fnames=(img,),
-            )
+            with metrics.time("calibrate"):
+                calib_images(
+                    camera_type="ccd",
+                    image_dir=None,
+                    calib_dir=CALIB_DIR,
+                    raw_archive_dir=LANDING_DIR / "raw_archive",
+                    in_place=True,
+                    zmag=False,
+                    verbose=0,
+                    fnames=(img,),
+                )
         except BaseException:
-            sort_image(img, img.parent / "failed")
+            copies.append(sort_image(img, img.parent / "failed"))
             logger.exception(
                 f"calib_images failed on image {img}: no matching calibration frames maybe?"
             )
             img.unlink()
-            return
+            return obstime, copies
+        copies.append(LANDING_DIR / "raw_archive" / img.name)
 
         # calculate fwhm assuming we're still doing this..
         if fil not in ("lrg", "hrg"):
-            runcmd(f"fwhm -ow {img}")
+            with metrics.time("fwhm"):
+                runcmd(f"fwhm -ow {img}")
 
     if isSuccessfullyCalibrated(img):
-        sort_image(img, img.parent / "reduced")
-        store_image(img, STORAGE_ROOT / "reduced" / img_isodate)
+        with metrics.time("store_reduced"):
+            copies.append(sort_image(img, img.parent / "reduced"))
+            store_image(img, STORAGE_ROOT / "reduced" / img_isodate)
 
     else:
-        sort_image(img, img.parent / "failed")
+        copies.append(sort_image(img, img.parent / "failed"))
         logger.warning(f"Calibration failed on {img}")
 
     img.unlink()
+    return obstime, copies
 
 
-if __name__ == "__main__":
+def _ingest(img, ready_time, metrics):
+    """Process an image handed out by the watcher and record its latencies."""
+    metrics.record("queue", time.time() - ready_time)
+    with metrics.time("total"):
+        return process_image(img, metrics=metrics)
 
+
+def main(workers=WORKERS, poll_interval=POLL_INTERVAL):
+    """
+    Run the ingest daemon.
+
+    New images are discovered by polling the landing directory (see
+    `~pyscope.reduction.ingest.LandingWatcher`) and processed by a pool of
+    `workers` threads. At most `2 * workers` images are queued at a time.
+    Archived copies are deleted after `MAXAGE` through an in-memory
+    `~pyscope.reduction.ingest.RetentionIndex`, which is seeded once at
+    startup from the FITS header index of the landing directory. The
+    latency of each processing stage is logged every `METRICS_INTERVAL`
+    seconds and at exit.
+
+    Parameters
+    ----------
+    workers : `int`, optional
+        Number of images processed in parallel.
+    poll_interval : `float`, optional
+        Time between two polls of the landing directory, in seconds.
+    """
     os.umask(0o002)
 
-    while True:
-        fresh = []
-        done = []
-        for ext in (".fts", ".fits", ".fit"):
-            fresh.extend(LANDING_DIR.glob(f"*{ext}"))
-            for d in ("raw_archive", "reduced", "failed"):
-                done.extend((LANDING_DIR / d).rglob(f"*{ext}"))
-
-        time.sleep(5)
-
-        for img in fresh:
-            process_image(img)
-
-        for img in done:
-            # if the image has not been modified in MAXTIME seconds and has a
-            # date older than MAXAGE, remove it
-            if img.exists() and time.time() - img.stat().st_mtime > MAXMTIME:
-                try:
-                    img_isodate = fits.getval(img, "DATE-OBS")[:10]
-                except BaseException:
-                    continue
-                yyyy, mm, dd = [int(s) for s in img_isodate.split("-")]
-                age = (
-                    time.time()
-                    - dt.datetime(
-                        yyyy, mm, dd, tzinfo=dt.timezone.utc
-                    ).timestamp()
-                )
-                if age > MAXAGE:
-                    img.unlink()
-                    logger.info(f"Deleted {img}")
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+
+    metrics = StageMetrics()
+    watcher = LandingWatcher(LANDING_DIR)
+
+    # Seed the retention index from the archived images found at startup,
+    # later additions come from the workers
+    retention = RetentionIndex(MAXAGE, MAXMTIME)
+    index = fits_index(LANDING_DIR)
+    index.update()
+    for path, obstime in index.query(columns="obstime"):
+        if Path(path).relative_to(index.root).parts[0] in ARCHIVE_DIRS:
+            retention.add(path, obstime)
+    logger.info(f"Tracking {len(retention)} archived images for retention")
+
+    inflight = {}
+    last_report = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            while not stop.is_set():
+                for img in watcher.poll(limit=2 * workers - len(inflight)):
+                    future = executor.submit(
+                        _ingest, img, time.time(), metrics
+                    )
+                    inflight[future] = img
+
+                if inflight:
+                    done, _ = wait(
+                        inflight,
+                        timeout=poll_interval,
+                        return_when=FIRST_COMPLETED,
+                    )
+                else:
+                    done = ()
+                    stop.wait(poll_interval)
+
+                for future in done:
+                    img = inflight.pop(future)
+                    try:
+                        obstime, copies = future.result()
+                    except BaseException:
+                        logger.exception(f"Processing {img} failed")
+                        continue
+                    for copy in copies:
+                        retention.add(copy, obstime)
+
+                retention.expire()
+
+                if time.time() - last_report > METRICS_INTERVAL:
+                    metrics.log()
+                    last_report = time.time()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            logger.info(f"Stopping, waiting for {len(inflight)} image(s)")
+            metrics.log()
+
+
+if __name__ == "__main__":
+    main()
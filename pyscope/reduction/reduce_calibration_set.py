@@ -2,6 +2,8 @@ import glob
 import logging
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import click
@@ -12,6 +14,9 @@ from .ccd_calib import ccd_calib
 logger = logging.getLogger(__name__)
 
 
+_COMBINE_MODES = {"median": "0", "average": "1"}
+
+
 def custom_exit(status=0):
     try:
         sys.exit(status)
@@ -21,6 +26,100 @@ def custom_exit(status=0):
         # Optionally re-raise or do nothing, which could just print a message
 
 
+def _set_size(fnames):
+    """Number of images and total size in bytes of a list of files."""
+    return len(fnames), sum(os.path.getsize(f) for f in fnames)
+
+
+def _run_tasks(tasks, jobs):
+    """
+    Run a list of `(function, args)` tasks, in a process pool if `jobs` is
+    greater than one, and return their results in order.
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        return [func(*args) for func, args in tasks]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        futures = [executor.submit(func, *args) for func, args in tasks]
+        return [future.result() for future in futures]
+
+
+def _reduce_bias_set(bias_set, calibration_set, mode):
+    logger.info(f"Reducing bias set: {bias_set}")
+    fnames = glob.glob(str(bias_set) + "/*.fts")
+    avg_fits(
+        fnames,
+        mode=mode,
+        outfile=calibration_set
+        / (str(bias_set.name).replace("biases", "master_bias") + ".fts"),
+    )
+    return _set_size(fnames)
+
+
+def _reduce_dark_set(dark_set, calibration_set, mode):
+    logger.info(f"Reducing dark set: {dark_set}")
+    fnames = glob.glob(str(dark_set) + "/*.fts")
+    avg_fits(
+        fnames,
+        mode=mode,
+        outfile=calibration_set
+        / (str(dark_set.name).replace("darks", "master_dark") + ".fts"),
+    )
+    return _set_size(fnames)
+
+
+def _reduce_flat_set(flat_set, calibration_set, mode, camera, pre_normalize):
+    logger.info(f"Reducing flat set: {flat_set}")
+    flat_set_list = glob.glob(str(flat_set) + "/*.fts")
+
+    # flats _ filt _ binxbin _ Readout1 _ texp
+    name_str = str(flat_set.name).split("_")
+
+    if camera == "ccd":
+        matching_dark = list(
+            calibration_set.glob(
+                f"master_dark_{name_str[2]}_{name_str[3]}*.fts"
+            )
+        )
+        matching_dark = matching_dark[0] if matching_dark else None
+        matching_bias = list(
+            calibration_set.glob(
+                f"master_bias_{name_str[2]}_{name_str[3]}*.fts"
+            )
+        )
+        matching_bias = matching_bias[0] if matching_bias else None
+
+        ccd_calib(
+            flat_set_list,
+            matching_dark,
+            bias_frame=matching_bias,
+            camera_type=camera,
+        )
+
+    elif camera == "cmos":
+        matching_dark = list(
+            calibration_set.glob(
+                f"master_dark_{name_str[2]}_{name_str[3]}_{name_str[4]}*.fts"
+            )
+        )
+        matching_dark = matching_dark[0] if matching_dark else None
+
+        ccd_calib(
+            flat_set_list,
+            matching_dark,
+            camera_type=camera,
+        )
+
+    cal_flat_set = str(flat_set) + "/*_cal.fts"
+    avg_fits(
+        glob.glob(str(cal_flat_set)),
+        mode=mode,
+        pre_normalize=pre_normalize,
+        outfile=calibration_set
+        / (str(flat_set.name).replace("flats", "master_flat") + ".fts"),
+    )
+    return _set_size(flat_set_list)
+
+
 @click.command(
     epilog="""Check out the documentation at
                 https://pyscope.readthedocs.io/ for more
@@ -54,6 +153,14 @@ def custom_exit(status=0):
     show_default=True,
     help="Pre-normalize flat images before combining. Useful for sky flats.",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of worker processes used to reduce calibration sets in parallel.",
+)
 @click.option(
     "-v",
     "--verbose",
@@ -66,6 +173,7 @@ def reduce_calibration_set_cli(
     camera="ccd",
     mode="0",
     pre_normalize=True,
+    jobs=1,
     verbose=0,
 ):
     """
@@ -88,6 +196,9 @@ def reduce_calibration_set_cli(
     pre_normalize : `bool`, optional
         Pre-normalize flat images before combining. This option is useful
         for sky flats. Defaults to `True`.
+    jobs : `int`, optional
+        Number of worker processes. Bias and dark sets are reduced in parallel,
+        then flat sets are reduced in parallel. Defaults to `1`.
     verbose : `int`, optional
         Level of verbosity for output logs. Use higher values for more detailed output.
         Defaults to `0`.
@@ -134,99 +245,35 @@ def reduce_calibration_set_cli(
     dark_sets = calibration_set.glob("darks*")
     flat_sets = calibration_set.glob("flats*")
 
-    for bias_set in bias_sets:
-        logger.info(f"Reducing bias set: {bias_set}")
-        avg_fits(
-            glob.glob(str(bias_set) + "/*.fts"),
-            mode=mode,
-            outfile=calibration_set
-            / (str(bias_set.name).replace("biases", "master_bias") + ".fts"),
-        )
-
-    for dark_set in dark_sets:
-        logger.info(f"Reducing dark set: {dark_set}")
-        avg_fits(
-            glob.glob(str(dark_set) + "/*.fts"),
-            mode=mode,
-            outfile=calibration_set
-            / (str(dark_set.name).replace("darks", "master_dark") + ".fts"),
-        )
-
-    for flat_set in flat_sets:
-        logger.info(f"Reducing flat set: {flat_set}")
+    mode = _COMBINE_MODES.get(mode, mode)
 
-        if camera == "ccd":
-            # flats _ filt _ binxbin _ Readout1 _ texp
-            name_str = str(flat_set.name).split("_")
+    t0 = time.time()
+    nimages = 0
+    nbytes = 0
 
-            matching_dark = list(
-                calibration_set.glob(
-                    f"master_dark_{
-                        name_str[2]}_{
-                        name_str[3]}*.fts"
-                )
-            )
-            matching_dark = matching_dark[0] if matching_dark else None
-            matching_bias = list(
-                calibration_set.glob(
-                    f"master_bias_{
-                        name_str[2]}_{
-                        name_str[3]}*.fts"
-                )
-            )
-            matching_bias = matching_bias[0] if matching_bias else None
-
-            if os.path.isdir(flat_set):
-                flat_set_list = glob.glob(str(flat_set) + "/*.fts")
-
-            ccd_calib(
-                flat_set_list,
-                matching_dark,
-                bias_frame=matching_bias,
-                camera_type=camera,
-            )
-
-            cal_flat_set = str(flat_set) + "/*_cal.fts"
-            avg_fits(
-                glob.glob(str(cal_flat_set)),
-                mode=mode,
-                pre_normalize=pre_normalize,
-                outfile=calibration_set
-                / (
-                    str(flat_set.name).replace("flats", "master_flat") + ".fts"
-                ),
+    # Flats are calibrated with the master biases and darks, so those are
+    # built first
+    for tasks in (
+        [(_reduce_bias_set, (s, calibration_set, mode)) for s in bias_sets]
+        + [(_reduce_dark_set, (s, calibration_set, mode)) for s in dark_sets],
+        [
+            (
+                _reduce_flat_set,
+                (s, calibration_set, mode, camera, pre_normalize),
             )
+            for s in flat_sets
+        ],
+    ):
+        for n, size in _run_tasks(tasks, jobs):
+            nimages += n
+            nbytes += size
 
-        elif camera == "cmos":
-            # flats _ filt _ binxbin _ Readout1 _ texp
-            name_str = str(flat_set.name).split("_")
-
-            matching_dark = list(
-                calibration_set.glob(
-                    f"master_dark_{
-                        name_str[2]}_{
-                        name_str[3]}_{
-                        name_str[4]}*.fts"
-                )
-            )
-            matching_dark = matching_dark[0] if matching_dark else None
-
-            ccd_calib(
-                flat_set,
-                matching_dark,
-                camera_type=camera,
-            )
-
-            cal_flat_set = str(flat_set) + "/*_cal.fts"
-            avg_fits(
-                glob.glob(str(cal_flat_set)),
-                mode=mode,
-                pre_normalize=pre_normalize,
-                outfile=calibration_set
-                / (
-                    str(flat_set.name).replace("flats", "master_flat") + ".fts"
-                ),
-            )
+    # Coarse clocks, e.g. on Windows, may not advance for an empty run
+    elapsed = max(time.time() - t0, 1e-9)
+    logger.info(
+        f"Reduced {nimages} images ({nbytes / 1024**2:.1f} MB) in {elapsed:.1f} s: "
+        f"{nimages / elapsed:.2f} images/s, {nbytes / 1024**2 / elapsed:.1f} MB/s"
+    )
 
     logger.info("Calibration set reduction complete.")
 
@@ -16,8 +16,16 @@ from .telrun_exception import TelrunException
 from .init_telrun_dir import init_telrun_dir
 from .rst import rst
 from . import sch, schedtab, reports
+from .constraint_grid import (
+    ConstraintGrid,
+    GridConstraint,
+    SeparationTransitioner,
+)
 from .schedtel import schedtel, plot_schedule_gantt, plot_schedule_sky
 from .startup import start_telrun_operator
+from .image_writer import ImageWriter
+from .plate_solve_executor import PlateSolveExecutor
+from .schedule_watcher import ScheduleWatcher
 from .telrun_operator import TelrunOperator
 
 __all__ = [
@@ -30,9 +38,15 @@ __all__ = [
     "sch",
     "schedtab",
     "reports",
+    "ConstraintGrid",
+    "GridConstraint",
+    "SeparationTransitioner",
     "schedtel",
     "plot_schedule_gantt",
     "plot_schedule_sky",
     "start_telrun_operator",
+    "ImageWriter",
+    "PlateSolveExecutor",
+    "ScheduleWatcher",
     "TelrunOperator",
 ]
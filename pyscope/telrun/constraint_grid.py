@@ -0,0 +1,419 @@
+import logging
+
+import astroplan
+import numpy as np
+from astroplan.utils import time_grid_from_range
+from astropy import coordinates as coord
+from astropy import units as u
+
+logger = logging.getLogger(__name__)
+
+
+class ConstraintGrid:
+    def __init__(
+        self,
+        observer,
+        start_time,
+        end_time,
+        time_resolution,
+        ephemeris_resolution=5 * u.minute,
+    ):
+        """
+        Ephemerides of a schedule precomputed on the scheduler's time grid.
+
+        `astroplan` evaluates each global constraint on a grid of all
+        targets and all times of the schedule by transforming every
+        target to the alt/az frame at every time, and recomputes the Sun
+        and Moon ephemerides for every group of blocks. The grid instead
+        computes the local apparent sidereal time and the Sun and Moon
+        positions once on a coarse grid, interpolated to the time grid. The altitudes of all unique
+        targets are then one broadcast array computed from their apparent
+        coordinates and the hour angle, and the Moon separations are dot
+        products of unit vectors.
+
+        The targets are precessed to the true equator and equinox of the
+        middle of the schedule, so the altitudes and separations agree with
+        `astroplan` to a few arcseconds over schedules of several nights,
+        much less than the motion of a target over one time step of the
+        scheduler. Refraction is ignored, as it is by `astroplan` for an
+        observer without a pressure.
+
+        Parameters
+        ----------
+        observer : `~astroplan.Observer`
+            The observer of the schedule.
+        start_time : `~astropy.time.Time`
+            Start of the schedule.
+        end_time : `~astropy.time.Time`
+            End of the schedule.
+        time_resolution : `~astropy.units.Quantity`
+            Time resolution of the scheduler.
+        ephemeris_resolution : `~astropy.units.Quantity`, default : 5 min, optional
+            Time resolution of the sidereal time and of the Sun and Moon
+            ephemerides.
+        """
+        self.observer = observer
+        self.times = time_grid_from_range(
+            (start_time, end_time), time_resolution=time_resolution
+        )
+        self._mid_time = start_time + (end_time - start_time) / 2
+        self._latitude = observer.location.lat.to_value(u.rad)
+
+        logger.info(
+            f"Precomputing ephemerides on a grid of {len(self.times)} times"
+        )
+        # The sidereal time and the Sun and Moon positions vary smoothly
+        # enough to be interpolated linearly over a few minutes
+        coarse_times = time_grid_from_range(
+            (start_time, end_time + ephemeris_resolution),
+            time_resolution=ephemeris_resolution,
+        )
+        days = self.times.jd - coarse_times[0].jd
+        coarse_days = coarse_times.jd - coarse_times[0].jd
+
+        last = coarse_times.sidereal_time(
+            "apparent", longitude=observer.location.lon
+        ).to_value(u.rad)
+        self.last = np.interp(days, coarse_days, np.unwrap(last))
+
+        sun = coord.get_sun(coarse_times).transform_to(
+            coord.TETE(obstime=coarse_times)
+        )
+        sun = _interpolate(days, coarse_days, _unit_vectors(sun.ra, sun.dec))
+        self.sun_altitude = self._altitude(
+            np.arctan2(sun[:, 1], sun[:, 0]), np.arcsin(sun[:, 2])
+        )
+
+        moon = coord.get_body("moon", coarse_times, location=observer.location)
+        self._moon = _interpolate(
+            days, coarse_days, _unit_vectors(moon.ra, moon.dec)
+        )
+        self._moon_frame = coord.GCRS(
+            obstime=self._mid_time,
+            obsgeoloc=observer.location.get_gcrs_posvel(self._mid_time)[0],
+        )
+
+        self._targets_key = None
+        self._cache = {}
+
+    def matches(self, times):
+        """
+        Whether `times` is the time grid of the schedule.
+
+        Parameters
+        ----------
+        times : `~astropy.time.Time`
+
+        Returns
+        -------
+        `bool`
+        """
+        if times.shape != self.times.shape or len(times) == 0:
+            return False
+        return bool(
+            abs(times[0].jd - self.times[0].jd) < 1e-9
+            and abs(times[-1].jd - self.times[-1].jd) < 1e-9
+        )
+
+    def _targets(self, targets):
+        """Unique targets of a list of targets and their indices, caching the
+        ephemerides of the previous list of targets."""
+        position = targets.data
+        key = (
+            position.lon.to_value(u.deg).tobytes(),
+            position.lat.to_value(u.deg).tobytes(),
+            targets.frame.name,
+        )
+        if key != self._targets_key:
+            self._targets_key = key
+            self._cache = {}
+            positions = np.stack(
+                [
+                    position.lon.to_value(u.deg).ravel(),
+                    position.lat.to_value(u.deg).ravel(),
+                ],
+                axis=1,
+            )
+            unique, inverse = np.unique(positions, axis=0, return_inverse=True)
+            self._cache["unique"] = coord.SkyCoord(
+                targets.frame.realize_frame(
+                    coord.UnitSphericalRepresentation(
+                        unique[:, 0] * u.deg, unique[:, 1] * u.deg
+                    )
+                )
+            )
+            self._cache["inverse"] = inverse.ravel()
+        return self._cache["unique"], self._cache["inverse"]
+
+    def altitude(self, targets):
+        """
+        Altitudes of targets on the time grid.
+
+        Parameters
+        ----------
+        targets : `~astropy.coordinates.SkyCoord`
+            Targets, of any shape.
+
+        Returns
+        -------
+        `~numpy.ndarray`
+            Altitudes in degrees, with the targets, flattened, along the
+            first axis and the times along the second.
+        """
+        unique, inverse = self._targets(targets)
+        if "altitude" not in self._cache:
+            apparent = unique.transform_to(coord.TETE(obstime=self._mid_time))
+            self._cache["altitude"] = self._altitude(
+                apparent.ra.to_value(u.rad)[:, np.newaxis],
+                apparent.dec.to_value(u.rad)[:, np.newaxis],
+            ).astype(np.float32)
+        return self._cache["altitude"][inverse]
+
+    def _altitude(self, ra, dec):
+        """Altitude in degrees on the time grid of apparent positions in
+        radians, broadcast against the times."""
+        sin_alt = np.sin(self._latitude) * np.sin(dec) + np.cos(
+            self._latitude
+        ) * np.cos(dec) * np.cos(self.last - ra)
+        return np.degrees(np.arcsin(np.clip(sin_alt, -1, 1)))
+
+    def moon_separation(self, targets):
+        """
+        Angular separations between targets and the Moon on the time grid.
+
+        Parameters
+        ----------
+        targets : `~astropy.coordinates.SkyCoord`
+            Targets, of any shape.
+
+        Returns
+        -------
+        `~numpy.ndarray`
+            Separations in degrees, with the targets, flattened, along the
+            first axis and the times along the second.
+        """
+        unique, inverse = self._targets(targets)
+        if "moon_separation" not in self._cache:
+            apparent = unique.transform_to(self._moon_frame)
+            cos_sep = _unit_vectors(apparent.ra, apparent.dec) @ self._moon.T
+            self._cache["moon_separation"] = np.degrees(
+                np.arccos(np.clip(cos_sep, -1, 1))
+            ).astype(np.float32)
+        return self._cache["moon_separation"][inverse]
+
+    def wrap(self, constraints):
+        """
+        Wrap constraints so that they are evaluated on the grid.
+
+        Parameters
+        ----------
+        constraints : `list` of `~astroplan.Constraint`
+
+        Returns
+        -------
+        `list` of `GridConstraint`
+            The wrapped constraints. Constraints appended to the list later,
+            like the horizon constraint that `astroplan.PriorityScheduler`
+            adds, are wrapped as well.
+        """
+        return _GridConstraintList(self, constraints)
+
+
+class GridConstraint(astroplan.Constraint):
+    def __init__(self, constraint, grid):
+        """
+        A constraint evaluated from the ephemerides of a `ConstraintGrid`.
+
+        Altitude, airmass, night and Moon separation constraints evaluated on
+        the time grid of `grid` are computed from its ephemerides. Other
+        constraints, and evaluations at other times, are delegated to the
+        wrapped constraint.
+
+        Parameters
+        ----------
+        constraint : `~astroplan.Constraint`
+            The wrapped constraint.
+        grid : `ConstraintGrid`
+            The precomputed ephemerides.
+        """
+        self.constraint = constraint
+        self.grid = grid
+
+    def __repr__(self):
+        return f"GridConstraint({self.constraint!r})"
+
+    def compute_constraint(self, times, observer, targets):
+        constraint = self.constraint
+        grid = self.grid
+        if (
+            observer is not grid.observer
+            or not grid.matches(times)
+            # Scalar targets or targets gridded against the times
+            or targets is None
+            or not (targets.isscalar or targets.shape[1:] == (1,))
+        ):
+            return constraint.compute_constraint(times, observer, targets)
+
+        if type(constraint) is astroplan.AtNightConstraint:
+            return grid.sun_altitude <= constraint.max_solar_altitude.to_value(
+                u.deg
+            )
+
+        if type(constraint) in (
+            astroplan.AltitudeConstraint,
+            astroplan.AirmassConstraint,
+        ):
+            if observer.pressure is not None and observer.pressure != 0:
+                return constraint.compute_constraint(times, observer, targets)
+            result = self._altitude_constraint(grid.altitude(targets))
+        elif (
+            type(constraint) is astroplan.MoonSeparationConstraint
+            and constraint.ephemeris is None
+        ):
+            separation = grid.moon_separation(targets)
+            result = np.ones(separation.shape, dtype=bool)
+            if constraint.min is not None:
+                result &= separation >= constraint.min.to_value(u.deg)
+            if constraint.max is not None:
+                result &= separation <= constraint.max.to_value(u.deg)
+        else:
+            return constraint.compute_constraint(times, observer, targets)
+
+        # One row per target, shaped like the targets broadcast against the
+        # times
+        return result.reshape(targets.shape[:-1] + (-1,))
+
+    def _altitude_constraint(self, altitude):
+        """Altitude or airmass constraint from the altitudes of the targets,
+        as computed by astroplan."""
+        constraint = self.constraint
+        if type(constraint) is astroplan.AltitudeConstraint:
+            amin = constraint.min.to_value(u.deg)
+            amax = constraint.max.to_value(u.deg)
+            if constraint.boolean_constraint:
+                return (amin <= altitude) & (altitude <= amax)
+            return astroplan.constraints.max_best_rescale(
+                altitude.astype(float), amin, amax, greater_than_max=0
+            )
+
+        with np.errstate(divide="ignore"):
+            secz = 1 / np.sin(np.radians(altitude, dtype=float))
+        if constraint.boolean_constraint:
+            mask = np.ones(secz.shape, dtype=bool)
+            if constraint.min is None and constraint.max is None:
+                raise ValueError(
+                    "No max and/or min specified in AirmassConstraint."
+                )
+            if constraint.min is not None:
+                mask &= constraint.min <= secz
+            if constraint.max is not None:
+                mask &= secz <= constraint.max
+            return mask
+        if constraint.max is None:
+            raise ValueError(
+                "Cannot have a float AirmassConstraint if max is None."
+            )
+        return astroplan.constraints.min_best_rescale(
+            secz,
+            1 if constraint.min is None else constraint.min,
+            constraint.max,
+            less_than_min=0,
+        )
+
+
+class SeparationTransitioner(astroplan.Transitioner):
+    def __init__(self, slew_rate=None, instrument_reconfig_times=None):
+        """
+        A `~astroplan.Transitioner` computing slew times from the angular
+        separation of the targets.
+
+        `~astroplan.Transitioner` transforms both targets to the alt/az frame
+        at the start of every transition it evaluates to measure their
+        separation, which is the same in any frame. This transitioner
+        computes it from the unit vectors of the targets, cached by target,
+        so evaluating a transition no longer transforms coordinates.
+
+        Parameters
+        ----------
+        slew_rate : `~astropy.units.Quantity`, optional
+            The slew rate of the telescope.
+        instrument_reconfig_times : `dict`, optional
+            Instrument reconfiguration times, see `~astroplan.Transitioner`.
+        """
+        super().__init__(
+            slew_rate=slew_rate,
+            instrument_reconfig_times=instrument_reconfig_times,
+        )
+        self._vectors = {}
+
+    def _vector(self, target):
+        key = id(target)
+        if key not in self._vectors:
+            position = getattr(target, "coord", target).icrs
+            # The target is kept so that its id is not reused
+            self._vectors[key] = (
+                target,
+                _unit_vectors(position.ra, position.dec)[0],
+            )
+        return self._vectors[key][1]
+
+    def __call__(self, oldblock, newblock, start_time, observer):
+        components = {}
+        if (
+            self.slew_rate is not None
+            and oldblock is not None
+            and newblock is not None
+            and oldblock.target != newblock.target
+        ):
+            cos_sep = np.dot(
+                self._vector(oldblock.target), self._vector(newblock.target)
+            )
+            sep = np.degrees(np.arccos(np.clip(cos_sep, -1, 1))) * u.deg
+            if sep / self.slew_rate > 1 * u.second:
+                components["slew_time"] = sep / self.slew_rate
+
+        if self.instrument_reconfig_times is not None:
+            components.update(
+                self.compute_instrument_transitions(oldblock, newblock)
+            )
+
+        if components:
+            return astroplan.TransitionBlock(components, start_time)
+        return None
+
+
+class _GridConstraintList(list):
+    """List of constraints wrapping every constraint added to it."""
+
+    def __init__(self, grid, constraints=()):
+        self.grid = grid
+        super().__init__(self._wrap(c) for c in constraints)
+
+    def _wrap(self, constraint):
+        if isinstance(constraint, GridConstraint):
+            return constraint
+        return GridConstraint(constraint, self.grid)
+
+    def append(self, constraint):
+        super().append(self._wrap(constraint))
+
+    def extend(self, constraints):
+        super().extend(self._wrap(c) for c in constraints)
+
+
+def _interpolate(x, xp, vectors):
+    """Linear interpolation of unit vectors, one row per position."""
+    vectors = np.stack(
+        [np.interp(x, xp, vectors[:, i]) for i in range(3)], axis=1
+    )
+    return vectors / np.linalg.norm(vectors, axis=1)[:, np.newaxis]
+
+
+def _unit_vectors(ra, dec):
+    """Cartesian unit vectors of positions, one row per position."""
+    ra = np.ravel(ra.to_value(u.rad))
+    dec = np.ravel(dec.to_value(u.rad))
+    return np.stack(
+        [np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)],
+        axis=1,
+    )
@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ImageWriter:
+    def __init__(self, maxsize=2):
+        """
+        Background thread writing images while the camera exposes the next
+        ones.
+
+        Jobs run one at a time, in the order they were submitted. At most
+        `maxsize` jobs may be pending: `submit` blocks until a job completes
+        when the writer falls behind, so that a slow disk applies
+        back-pressure to the exposure loop instead of filling the memory
+        with images.
+
+        Parameters
+        ----------
+        maxsize : `int`, default : 2, optional
+            Maximum number of pending jobs, including the running one.
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="image_writer"
+        )
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._futures = []
+        self._wait_time = 0
+        self._busy_time = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self, func, args, kwargs):
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._busy_time += time.perf_counter() - t0
+            self._slots.release()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue `func(*args, **kwargs)`, waiting for a free slot if the queue
+        is full.
+
+        Returns
+        -------
+        `~concurrent.futures.Future`
+        """
+        if not self._slots.acquire(blocking=False):
+            logger.info("Image writer is behind, waiting for a free slot...")
+            t0 = time.perf_counter()
+            self._slots.acquire()
+            self._wait_time += time.perf_counter() - t0
+        future = self._executor.submit(self._run, func, args, kwargs)
+        self._futures.append(future)
+        return future
+
+    def close(self):
+        """
+        Wait for the pending jobs and stop the writer.
+
+        Exceptions raised by jobs are logged.
+
+        Returns
+        -------
+        `list` of `Exception`
+            Exceptions raised by the jobs.
+        """
+        self._executor.shutdown(wait=True)
+        errors = []
+        for future in self._futures:
+            error = future.exception()
+            if error is not None:
+                logger.error(f"Image writer job failed: {error}")
+                errors.append(error)
+        self._futures = []
+        return errors
+
+    @property
+    def wait_time(self):
+        """Total time `submit` spent waiting for a free slot, in seconds."""
+        return self._wait_time
+
+    @property
+    def busy_time(self):
+        """Total time spent running jobs, in seconds."""
+        with self._lock:
+            return self._busy_time
@@ -0,0 +1,304 @@
+import collections
+import itertools
+import logging
+import multiprocessing
+import queue
+import shutil
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _solve(solver, image_path):
+    if callable(solver):
+        return solver(image_path)
+    elif solver.lower() == "astrometry_net_wcs":
+        from ..reduction import astrometry_net_wcs
+
+        return astrometry_net_wcs(image_path, solve_timeout=60)
+    elif solver.lower() == "local_wcs":
+        from ..reduction import local_wcs
+
+        return local_wcs(image_path)
+    elif solver.lower() == "maxim_pinpoint_wcs":
+        from ..reduction import maxim_pinpoint_wcs
+
+        return maxim_pinpoint_wcs(image_path)
+    raise ValueError(f"Unknown WCS solver {solver}")
+
+
+def _solve_loop(solver, conn):
+    """Plate solve the images received from `conn` in a worker process and
+    send back the results, until `None` is received."""
+    while True:
+        image_path = conn.recv()
+        if image_path is None:
+            break
+        try:
+            conn.send((bool(_solve(solver, image_path)), None))
+        except Exception as e:
+            conn.send((False, repr(e)))
+    conn.close()
+
+
+class PlateSolveExecutor:
+    def __init__(self, solver, workers=2, timeout=None, history=100):
+        """
+        Pool of worker processes plate solving images in the background.
+
+        Each worker runs its jobs in a separate process, so that solves
+        neither hold the GIL of the control loop nor outlive their timeout:
+        the process of a job still running after `timeout` seconds is killed,
+        and replaced for the next job. Jobs are queued by priority, lower
+        values first, and in submission order for equal priorities.
+
+        The outcome of the most recent jobs is kept with their latency, the
+        time from submission to completion.
+
+        Parameters
+        ----------
+        solver : `str` or callable
+            The WCS solver, `astrometry_net_wcs`, `local_wcs` or
+            `maxim_pinpoint_wcs`, or a picklable function taking the path to an
+            image and returning whether it was solved.
+        workers : `int`, default : 2, optional
+            Number of jobs running at the same time.
+        timeout : `float`, optional
+            Default time in seconds after which a job is killed. No timeout if
+            `None`.
+        history : `int`, default : 100, optional
+            Number of most recent jobs kept in `history`.
+        """
+        self._solver = solver
+        self._timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._history = collections.deque(maxlen=history)
+        self._totals = collections.Counter()
+        self._running = 0
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(
+                target=self._worker,
+                daemon=True,
+                name=f"plate_solve_worker_{i}",
+            )
+            for i in range(max(int(workers), 1))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def solver(self):
+        """The WCS solver."""
+        return self._solver
+
+    @property
+    def workers(self):
+        """Number of jobs running at the same time."""
+        return len(self._threads)
+
+    @property
+    def status(self):
+        """`Solving` while jobs are running, `Idle` otherwise."""
+        return "Solving" if self._running > 0 else "Idle"
+
+    def submit(self, image_path, target_path=None, priority=0, timeout=None):
+        """
+        Queue an image to be plate solved.
+
+        Parameters
+        ----------
+        image_path : `str`
+            Path to the image. The WCS solution is written to its header.
+        target_path : `str`, optional
+            Path the image is moved to once the job is complete, whether it
+            was solved or not.
+        priority : `float`, default : 0, optional
+            Priority of the job, lower values first.
+        timeout : `float`, optional
+            Time in seconds after which the job is killed. Defaults to the
+            timeout of the executor.
+
+        Returns
+        -------
+        `int`
+            Identifier of the job.
+        """
+        job_id = next(self._counter)
+        job = {
+            "id": job_id,
+            "image_path": str(image_path),
+            "target_path": target_path,
+            "priority": priority,
+            "timeout": self._timeout if timeout is None else timeout,
+            "submitted": time.time(),
+        }
+        self._queue.put((priority, job_id, job))
+        logger.debug(f"Queued plate solve job {job_id}: {image_path}")
+        return job_id
+
+    def _worker(self):
+        worker = None
+        try:
+            while True:
+                _, _, job = self._queue.get()
+                try:
+                    if job is None:
+                        return
+                    worker = self._run(job, worker)
+                finally:
+                    self._queue.task_done()
+        finally:
+            if worker is not None:
+                self._stop_process(*worker)
+
+    def _start_process(self):
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_solve_loop,
+            args=(self._solver, child_conn),
+            daemon=True,
+            name="plate_solve_worker",
+        )
+        process.start()
+        child_conn.close()
+        return process, conn
+
+    @staticmethod
+    def _stop_process(process, conn, kill=False):
+        if not kill:
+            try:
+                conn.send(None)
+                process.join(5)
+            except (OSError, ValueError):
+                pass
+        if process.is_alive():
+            process.kill()
+            process.join()
+        conn.close()
+
+    def _run(self, job, worker):
+        with self._lock:
+            self._running += 1
+        job["started"] = time.time()
+        try:
+            if worker is None:
+                worker = self._start_process()
+            job["status"], job["error"], worker = self._solve_in_process(
+                job, *worker
+            )
+        except Exception as e:
+            logger.exception(f"Plate solve job {job['id']} failed")
+            job["status"], job["error"] = "error", repr(e)
+            if worker is not None:
+                self._stop_process(*worker, kill=True)
+                worker = None
+
+        if job["target_path"] is not None:
+            try:
+                shutil.move(job["image_path"], job["target_path"])
+                logger.info(
+                    "File %s to %s" % (job["image_path"], job["target_path"])
+                )
+            except OSError:
+                logger.exception(f"Could not move {job['image_path']}")
+        job["finished"] = time.time()
+        logger.info(
+            f"Plate solve job {job['id']} {job['status']} in "
+            f"{job['finished'] - job['started']:.1f} seconds"
+        )
+        with self._lock:
+            self._running -= 1
+            self._totals[job["status"]] += 1
+            self._history.append(job)
+        return worker
+
+    def _solve_in_process(self, job, process, conn):
+        """Returns the status and error of the job, and the worker process
+        and connection to reuse, if any."""
+        conn.send(job["image_path"])
+        if not conn.poll(job["timeout"]):
+            logger.warning(
+                f"Plate solve job {job['id']} timed out after "
+                f"{job['timeout']:.1f} seconds, killing its worker"
+            )
+            self._stop_process(process, conn, kill=True)
+            return "timeout", None, None
+        try:
+            solved, error = conn.recv()
+        except EOFError:
+            process.join()
+            error = f"Worker exited with code {process.exitcode}"
+            self._stop_process(process, conn, kill=True)
+            return "error", error, None
+        return ("solved" if solved else "failed"), error, (process, conn)
+
+    @property
+    def history(self):
+        """The most recent jobs, as dictionaries, oldest first."""
+        with self._lock:
+            return [dict(job) for job in self._history]
+
+    def summary(self):
+        """
+        Statistics of the executor.
+
+        Returns
+        -------
+        `dict`
+            Dictionary with the number of `queued` and `running` jobs, the
+            total number of jobs `solved`, `failed`, timed out (`timeout`) or
+            that crashed (`error`), and the `latency_mean`, `latency_p95`
+            and `solve_mean` times of the recent jobs, in seconds.
+        """
+        with self._lock:
+            jobs = list(self._history)
+            summary = {
+                "queued": self._queue.qsize(),
+                "running": self._running,
+                **{
+                    status: self._totals[status]
+                    for status in ("solved", "failed", "timeout", "error")
+                },
+            }
+        latency = np.array([j["finished"] - j["submitted"] for j in jobs])
+        solve = np.array([j["finished"] - j["started"] for j in jobs])
+        summary["latency_mean"] = float(latency.mean()) if len(jobs) else None
+        summary["latency_p95"] = (
+            float(np.percentile(latency, 95)) if len(jobs) else None
+        )
+        summary["solve_mean"] = float(solve.mean()) if len(jobs) else None
+        return summary
+
+    def join(self):
+        """Wait until all queued jobs are complete."""
+        self._queue.join()
+
+    def shutdown(self, wait=True, cancel=False):
+        """
+        Stop the workers.
+
+        Parameters
+        ----------
+        wait : `bool`, default : `True`, optional
+            Whether to wait for the workers to stop.
+        cancel : `bool`, default : `False`, optional
+            Whether to drop the queued jobs instead of completing them.
+        """
+        if cancel:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
+        for _ in self._threads:
+            self._queue.put((float("inf"), next(self._counter), None))
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -1,4 +1,6 @@
+import glob
 import logging
+import os
 
 import click
 import markdown
@@ -6,9 +8,8 @@ import numpy as np
 from astropy import coordinates as coord
 from astropy import table
 from astropy import time as astrotime
-from astropy.io import fits
 
-from ..reduction import fitslist
+from ..reduction import fits_index, fitslist
 
 logger = logging.getLogger(__name__)
 
@@ -154,14 +155,17 @@ def summary_report_cli(
 
     # Check images all exist
     fnames = []
-    headers = []
     for row in schedule:
         for fname in row["configuration"]["filename"].split(","):
             if not os.path.exists(os.path.join(images_dir, fname)):
                 raise click.BadOptionUsage(f"Image {fname} does not exist.")
             else:
                 fnames.append(os.path.join(images_dir, fname))
-                headers.append(fits.getheader(fnames[-1]))
+
+    # Headers come from the images directory index, only new or modified
+    # images are read
+    index = fits_index(images_dir)
+    headers = [index.header(fname) for fname in fnames]
 
     tbl = table.Table(
         [
@@ -1,4 +1,5 @@
 import configparser
+import inspect
 import itertools
 import logging
 import os
@@ -12,10 +13,50 @@ from astropy import units as u
 
 logger = logging.getLogger(__name__)
 
+# ObservingBlock.__init__ without the quantity_input wrapper, which dominates
+# the cost of building blocks from a table and only checks that the duration
+# is a time, which table_to_blocks guarantees
+_observing_block_init = inspect.unwrap(astroplan.ObservingBlock.__init__)
+
+
+# Configuration columns of a schedule table, in order, with the value used
+# for blocks without a target (transition blocks and empty slots)
+_CONFIGURATION_COLUMNS = (
+    ("observer", [""]),
+    ("code", ""),
+    ("title", ""),
+    ("filename", ""),
+    ("type", ""),
+    ("backend", ""),
+    ("filter", ""),
+    ("exposure", 0),
+    ("nexp", 0),
+    ("repositioning", (0, 0)),
+    ("shutter_state", False),
+    ("readout", 0),
+    ("binning", (1, 1)),
+    ("frame_position", (0, 0)),
+    ("frame_size", (0, 0)),
+)
+
+_TRAILING_COLUMNS = (
+    ("comment", ""),
+    ("sch", ""),
+    ("status", ""),
+    ("message", ""),
+)
+
+_ARCSEC_PER_HOUR = u.arcsec / u.hour
+
 
 def blocks_to_table(observing_blocks):
     """Convert a list of observing blocks to an astropy table.
 
+    The blocks are read in a single pass that gathers each column into a
+    list or a preallocated array, and every column is then converted at
+    once. Target coordinates are copied numerically and constraints shared
+    between blocks are only serialized once.
+
     Parameters
     ----------
     observing_blocks : `list`
@@ -27,523 +68,418 @@ def blocks_to_table(observing_blocks):
         An astropy table containing the observing blocks.
     """
 
-    t = table.Table(masked=True)
-
-    unscheduled_blocks_mask = np.array(
-        [
-            hasattr(block, "target") and block.start_time is None
-            for block in observing_blocks
-        ]
-    )
-
-    open_slots_mask = np.array(
-        [not hasattr(block, "target") for block in observing_blocks]
-    )
-
-    t["ID"] = np.ma.array(
-        [
-            (
-                block.configuration["ID"]
-                if hasattr(block, "target")
-                else astrotime.Time.now().mjd
-            )
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
+    n = len(observing_blocks)
+    now = astrotime.Time.now().mjd
+
+    open_slots_mask = np.zeros(n, dtype=bool)
+    unscheduled_blocks_mask = np.zeros(n, dtype=bool)
+    start_time = np.zeros(n)
+    end_time = np.zeros(n)
+    ra = np.zeros(n)
+    dec = np.full(n, -90.0)
+    pm_ra_cosdec = np.zeros(n)
+    pm_dec = np.zeros(n)
+    sched_time = np.zeros(n)
+    ids = []
+    names = []
+    priorities = []
+    configuration = {key: [] for key, _ in _CONFIGURATION_COLUMNS}
+    trailing = {key: [] for key, _ in _TRAILING_COLUMNS}
+    block_constraints = []
+
+    # Conversions shared between blocks
+    coordinates = {}
+    factors = {}
+    serialized = {}
+
+    for i, block in enumerate(observing_blocks):
+        if type(block) is astroplan.Slot:
+            start_time[i] = _mjd(block.start)
+            end_time[i] = _mjd(block.end)
+        else:
+            if block.start_time is not None:
+                start_time[i] = _mjd(block.start_time)
+            if type(block) is astroplan.TransitionBlock:
+                # The end time of a transition block is a property adding its
+                # duration to its start time
+                if block.start_time is not None:
+                    end_time[i] = start_time[i] + block.duration.to_value(
+                        u.day
+                    )
+            elif block.end_time is not None:
+                end_time[i] = _mjd(block.end_time)
 
-    # Populate simple columns
-    t["name"] = [
-        (
-            block.name
-            if hasattr(block, "target")
-            else (
+        if not hasattr(block, "target"):
+            open_slots_mask[i] = True
+            ids.append(now)
+            names.append(
                 "TransitionBlock"
                 if type(block) is not astroplan.Slot
                 else "EmptyBlock"
             )
-        )
-        for block in observing_blocks
-    ]
-
-    t["start_time"] = astrotime.Time(
-        np.ma.array(
-            [
-                (
-                    block.start.mjd
-                    if type(block) is astroplan.Slot
-                    else (
-                        0 if block.start_time is None else block.start_time.mjd
-                    )
-                )
-                for block in observing_blocks
-            ],
-            mask=unscheduled_blocks_mask,
-        ),
-        format="mjd",
-    )
-
-    t["end_time"] = astrotime.Time(
-        np.ma.array(
-            [
-                (
-                    block.end.mjd
-                    if type(block) is astroplan.Slot
-                    else 0 if block.end_time is None else block.end_time.mjd
-                )
-                for block in observing_blocks
-            ],
-            mask=unscheduled_blocks_mask,
-        ),
-        format="mjd",
-    )
-    # print(f"Target to hmsdms: {block.target.to_string('hmsdms')}")
-    t["target"] = coord.SkyCoord(
-        [
-            (
-                block.target.to_string("hmsdms")
-                if hasattr(block, "target")
-                else "0h0m0.0s -90d0m0.0s"
+            priorities.append(0)
+            for key, default in _CONFIGURATION_COLUMNS:
+                configuration[key].append(default)
+            for key, default in _TRAILING_COLUMNS:
+                trailing[key].append(default)
+            block_constraints.append(())
+            continue
+
+        unscheduled_blocks_mask[i] = block.start_time is None
+        config = block.configuration
+        ids.append(config["ID"])
+        names.append(block.name)
+        priorities.append(block.priority)
+        for key, _ in _CONFIGURATION_COLUMNS:
+            configuration[key].append(config[key])
+        for key, _ in _TRAILING_COLUMNS:
+            trailing[key].append(config[key])
+
+        # Targets are usually SkyCoord but blocks read back from a table
+        # hold a FixedTarget
+        target = block.target
+        key = id(target)
+        if key not in coordinates:
+            if isinstance(target, astroplan.FixedTarget):
+                target = target.coord
+            # The coordinates are read from the frame data, in the frame of
+            # the target, which avoids a representation conversion
+            position = target.data
+            if not hasattr(position, "lat"):
+                position = target.spherical
+            coordinates[key] = (
+                position.lon.to_value(u.deg),
+                position.lat.to_value(u.deg),
             )
-            for block in observing_blocks
-        ]
-    )
-
-    t["priority"] = np.ma.array(
-        [
-            block.priority if hasattr(block, "target") else 0
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
-
-    temp_list = [
-        block.configuration["observer"] if hasattr(block, "target") else [""]
-        for block in observing_blocks
-    ]
-    t["observer"] = np.ma.array(
-        temp_list, mask=_mask_expander(temp_list, open_slots_mask)
-    )
+        ra[i], dec[i] = coordinates[key]
+
+        pm_ra_cosdec[i] = _to_arcsec_per_hour(config["pm_ra_cosdec"], factors)
+        pm_dec[i] = _to_arcsec_per_hour(config["pm_dec"], factors)
+        sched_time[i] = (
+            _mjd(config["sched_time"])
+            if isinstance(config["sched_time"], astrotime.Time)
+            else config["sched_time"]
+        )
 
-    t["code"] = np.ma.array(
-        [
-            block.configuration["code"] if hasattr(block, "target") else ""
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
+        if block.constraints is None:
+            block_constraints.append(())
+        else:
+            dicts = []
+            for constraint in block.constraints:
+                key = id(constraint)
+                if key not in serialized:
+                    serialized[key] = _constraint_to_dict(constraint)
+                if serialized[key] is not None:
+                    dicts.append(serialized[key])
+            block_constraints.append(dicts)
 
-    t["title"] = np.ma.array(
-        [
-            block.configuration["title"] if hasattr(block, "target") else ""
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
+    t = table.Table(masked=True)
 
-    t["filename"] = np.ma.array(
-        [
-            block.configuration["filename"] if hasattr(block, "target") else ""
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
+    t["ID"] = np.ma.array(ids, mask=open_slots_mask)
+    t["name"] = names
+    t["start_time"] = astrotime.Time(
+        np.ma.array(start_time, mask=unscheduled_blocks_mask), format="mjd"
     )
-
-    t["type"] = np.ma.array(
-        [
-            block.configuration["type"] if hasattr(block, "target") else ""
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
+    t["end_time"] = astrotime.Time(
+        np.ma.array(end_time, mask=unscheduled_blocks_mask), format="mjd"
     )
+    t["target"] = coord.SkyCoord(ra=ra * u.deg, dec=dec * u.deg)
+    t["priority"] = np.ma.array(priorities, mask=open_slots_mask)
 
-    t["backend"] = np.ma.array(
-        [
-            block.configuration["backend"] if hasattr(block, "target") else ""
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
+    for key, _ in _CONFIGURATION_COLUMNS:
+        t[key] = _masked_column(configuration[key], open_slots_mask)
 
-    t["filter"] = np.ma.array(
-        [
-            block.configuration["filter"] if hasattr(block, "target") else ""
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
+    t["pm_ra_cosdec"] = np.ma.array(pm_ra_cosdec, mask=open_slots_mask)
+    t["pm_dec"] = np.ma.array(pm_dec, mask=open_slots_mask)
 
-    t["exposure"] = np.ma.array(
-        [
-            block.configuration["exposure"] if hasattr(block, "target") else 0
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
+    for key, _ in _TRAILING_COLUMNS:
+        t[key] = np.ma.array(trailing[key], mask=open_slots_mask)
 
-    t["nexp"] = np.ma.array(
-        [
-            block.configuration["nexp"] if hasattr(block, "target") else 0
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
+    t["sched_time"] = np.ma.array(sched_time, mask=open_slots_mask)
 
-    temp_list = [
-        (
-            block.configuration["repositioning"]
-            if hasattr(block, "target")
-            else (0, 0)
-        )
-        for block in observing_blocks
-    ]
-    t["repositioning"] = np.ma.array(
-        temp_list, mask=_mask_expander(temp_list, open_slots_mask)
+    # Constraints are stored as an array of dicts, padded with empty dicts
+    # to the largest number of constraints of a block
+    width = max((len(c) for c in block_constraints), default=0)
+    constraints = np.full((n, width), dict())
+    for block_num, dicts in enumerate(block_constraints):
+        for constraint_num, constraint_dict in enumerate(dicts):
+            constraints[block_num, constraint_num] = constraint_dict
+    t["constraints"] = np.ma.array(
+        constraints,
+        mask=np.repeat(open_slots_mask[:, np.newaxis], width, axis=1),
     )
 
-    t["shutter_state"] = np.ma.array(
-        [
-            (
-                block.configuration["shutter_state"]
-                if hasattr(block, "target")
-                else False
-            )
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
+    t.add_index("ID", unique=True)
 
-    t["readout"] = np.ma.array(
-        [
-            block.configuration["readout"] if hasattr(block, "target") else 0
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
+    # TODO: Change string columns to handle arbitrary length strings instead
+    # of truncating
 
-    temp_list = [
-        block.configuration["binning"] if hasattr(block, "target") else (1, 1)
-        for block in observing_blocks
-    ]
-    t["binning"] = np.ma.array(
-        temp_list, mask=_mask_expander(temp_list, open_slots_mask)
-    )
+    return t
 
-    temp_list = [
-        (
-            block.configuration["frame_position"]
-            if hasattr(block, "target")
-            else (0, 0)
-        )
-        for block in observing_blocks
-    ]
-    t["frame_position"] = np.ma.array(
-        temp_list, mask=_mask_expander(temp_list, open_slots_mask)
-    )
 
-    temp_list = [
-        (
-            block.configuration["frame_size"]
-            if hasattr(block, "target")
-            else (0, 0)
-        )
-        for block in observing_blocks
-    ]
-    t["frame_size"] = np.ma.array(
-        temp_list, mask=_mask_expander(temp_list, open_slots_mask)
+def _masked_column(values, mask):
+    """Masked array of per-block values, masking every element of the
+    blocks in `mask`."""
+    values = np.array(values)
+    if values.ndim > 1:
+        mask = np.repeat(mask[:, np.newaxis], values.shape[1], axis=1)
+    return np.ma.array(values, mask=mask)
+
+
+def _mjd(time):
+    """MJD of a scalar time, read from its internal two-part JD without a
+    format conversion."""
+    return (time.jd1 - 2400000.5) + time.jd2
+
+
+def _to_arcsec_per_hour(value, factors):
+    """Convert a proper motion to arcsec/hour, caching the conversion factor
+    of each unit. Plain numbers are assumed to be in arcsec/hour already."""
+    unit = getattr(value, "unit", None)
+    if unit is None:
+        return value
+    # Units are usually built per block, and comparing two of them is itself
+    # a conversion, so they are keyed by their decomposition into named units
+    key = (
+        getattr(unit, "scale", 1),
+        tuple(getattr(unit, "bases", (unit,))),
+        tuple(getattr(unit, "powers", (1,))),
     )
-
-    t["pm_ra_cosdec"] = np.ma.array(
-        [
-            (
-                block.configuration["pm_ra_cosdec"].to(u.arcsec / u.hour).value
-                if hasattr(block, "target")
+    if key not in factors:
+        factors[key] = unit.to(_ARCSEC_PER_HOUR)
+    return value.value * factors[key]
+
+
+def _constraint_to_dict(constraint):
+    """Serialize an astroplan constraint for the constraints column, or
+    return `None` if it is not supported."""
+    if type(constraint) is astroplan.TimeConstraint:
+        return {
+            "type": "TimeConstraint",
+            "min": (
+                constraint.min.isot if constraint.min is not None else None
+            ),
+            "max": (
+                constraint.max.isot if constraint.max is not None else None
+            ),
+        }
+    elif type(constraint) is astroplan.AtNightConstraint:
+        return {
+            "type": "AtNightConstraint",
+            "max_solar_altitude": (
+                constraint.max_solar_altitude.to(u.deg).value
+                if constraint.max_solar_altitude is not None
                 else 0
-            )
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
-
-    t["pm_dec"] = np.ma.array(
-        [
-            (
-                block.configuration["pm_dec"].to(u.arcsec / u.hour).value
-                if hasattr(block, "target")
+            ),
+        }
+    elif type(constraint) is astroplan.AltitudeConstraint:
+        return {
+            "type": "AltitudeConstraint",
+            "min": (
+                constraint.min.to(u.deg).value
+                if constraint.min is not None
                 else 0
-            )
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
-
-    t["comment"] = np.ma.array(
-        [
-            block.configuration["comment"] if hasattr(block, "target") else ""
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
-
-    t["sch"] = np.ma.array(
-        [
-            block.configuration["sch"] if hasattr(block, "target") else ""
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
-
-    t["status"] = np.ma.array(
-        [
-            block.configuration["status"] if hasattr(block, "target") else ""
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
-
-    t["message"] = np.ma.array(
-        [
-            block.configuration["message"] if hasattr(block, "target") else ""
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
-
-    t["sched_time"] = np.ma.array(
-        [
-            (
-                block.configuration["sched_time"].mjd
-                if hasattr(block, "target")
+            ),
+            "max": (
+                constraint.max.to(u.deg).value
+                if constraint.max is not None
+                else 90
+            ),
+            "boolean_constraint": constraint.boolean_constraint,
+        }
+    elif type(constraint) is astroplan.AirmassConstraint:
+        return {
+            "type": "AirmassConstraint",
+            "min": (constraint.min if constraint.min is not None else 0),
+            "max": (constraint.max if constraint.max is not None else 100),
+            "boolean_constraint": (
+                constraint.boolean_constraint
+                if constraint.boolean_constraint is not None
+                else False
+            ),
+        }
+    elif type(constraint) is astroplan.MoonSeparationConstraint:
+        return {
+            "type": "MoonSeparationConstraint",
+            "min": (
+                constraint.min.to(u.deg).value
+                if constraint.min is not None
                 else 0
-            )
-            for block in observing_blocks
-        ],
-        mask=open_slots_mask,
-    )
-
-    # Turn the constraints into a list of dicts
-    constraints = np.full(
-        (
-            len(observing_blocks),
-            np.max(
-                [
-                    (
-                        len(block.constraints)
-                        if hasattr(block, "target")
-                        and block.constraints is not None
-                        else 0
-                    )
-                    for block in observing_blocks
-                ]
             ),
-        ),
-        dict(),
-    )
-    for block_num, block in enumerate(observing_blocks):
-        constraint_list = np.full(
-            np.max(
-                [
-                    (
-                        len(block.constraints)
-                        if hasattr(block, "target")
-                        and block.constraints is not None
-                        else 0
-                    )
-                    for block in observing_blocks
-                ]
+            "max": (
+                constraint.max.to(u.deg).value
+                if constraint.max is not None
+                else 360
             ),
-            dict(),
+        }
+    elif constraint is None:
+        return None
+    else:
+        logger.warning(
+            f"Constraint {constraint} is not supported and will be ignored"
         )
-        if hasattr(block, "target") and block.constraints is not None:
-            for constraint_num, constraint in enumerate(block.constraints):
-                if type(constraint) is astroplan.TimeConstraint:
-                    constraint_dict = {
-                        "type": "TimeConstraint",
-                        "min": (
-                            constraint.min.isot
-                            if constraint.min is not None
-                            else None
-                        ),
-                        "max": (
-                            constraint.max.isot
-                            if constraint.max is not None
-                            else None
-                        ),
-                    }
-                elif type(constraint) is astroplan.AtNightConstraint:
-                    constraint_dict = {
-                        "type": "AtNightConstraint",
-                        "max_solar_altitude": (
-                            constraint.max_solar_altitude.to(u.deg).value
-                            if constraint.max_solar_altitude is not None
-                            else 0
-                        ),
-                    }
-                elif type(constraint) is astroplan.AltitudeConstraint:
-                    constraint_dict = {
-                        "type": "AltitudeConstraint",
-                        "min": (
-                            constraint.min.to(u.deg).value
-                            if constraint.min is not None
-                            else 0
-                        ),
-                        "max": (
-                            constraint.max.to(u.deg).value
-                            if constraint.max is not None
-                            else 90
-                        ),
-                        "boolean_constraint": constraint.boolean_constraint,
-                    }
-                elif type(constraint) is astroplan.AirmassConstraint:
-                    constraint_dict = {
-                        "type": "AirmassConstraint",
-                        "min": (
-                            constraint.min if constraint.min is not None else 0
-                        ),
-                        "max": (
-                            constraint.max
-                            if constraint.max is not None
-                            else 100
-                        ),
-                        "boolean_constraint": (
-                            constraint.boolean_constraint
-                            if constraint.boolean_constraint is not None
-                            else False
-                        ),
-                    }
-                elif type(constraint) is astroplan.MoonSeparationConstraint:
-                    constraint_dict = {
-                        "type": "MoonSeparationConstraint",
-                        "min": (
-                            constraint.min.to(u.deg).value
-                            if constraint.min is not None
-                            else 0
-                        ),
-                        "max": (
-                            constraint.max.to(u.deg).value
-                            if constraint.max is not None
-                            else 360
-                        ),
-                    }
-                elif constraint is None:
-                    continue
-                else:
-                    logger.warning(
-                        f"Constraint {constraint} is not supported and will be ignored"
-                    )
-                    continue
-                constraint_list[constraint_num] = constraint_dict
-        constraints[block_num] = constraint_list
+        return None
 
-    t["constraints"] = np.ma.array(
-        constraints, mask=_mask_expander(constraints, open_slots_mask)
-    )
 
-    t.add_index("ID", unique=True)
+def _dict_to_constraint(constraint):
+    """Build the astroplan constraint of a constraints column entry, or
+    return `False` if its type is not supported."""
+    if constraint["type"] == "TimeConstraint":
+        return astroplan.TimeConstraint(
+            min=astrotime.Time(constraint["min"]),
+            max=astrotime.Time(constraint["max"]),
+        )
+    elif constraint["type"] == "AtNightConstraint":
+        return astroplan.AtNightConstraint(
+            max_solar_altitude=constraint["max_solar_altitude"] * u.deg
+        )
+    elif constraint["type"] == "AltitudeConstraint":
+        return astroplan.AltitudeConstraint(
+            min=constraint["min"] * u.deg,
+            max=constraint["max"] * u.deg,
+            boolean_constraint=constraint["boolean_constraint"],
+        )
+    elif constraint["type"] == "AirmassConstraint":
+        return astroplan.AirmassConstraint(
+            min=constraint["min"],
+            max=constraint["max"],
+            boolean_constraint=constraint["boolean_constraint"],
+        )
+    elif constraint["type"] == "MoonSeparationConstraint":
+        return astroplan.MoonSeparationConstraint(
+            min=constraint["min"] * u.deg,
+            max=constraint["max"] * u.deg,
+        )
+    else:
+        logger.warning("Only time constraints are currently supported")
+        return False
 
-    # TODO: Change string columns to handle arbitrary length strings instead
-    # of truncating
 
-    return t
+def table_to_blocks(table):
+    """Convert an astropy table of observing blocks back to a list of
+    observing blocks.
 
+    The columns are read once instead of row by row, the targets are built
+    from the numeric coordinates and identical constraints are only built
+    once and shared between blocks.
 
-def table_to_blocks(table):
+    Parameters
+    ----------
+    table : astropy.table.Table
+        An astropy table containing the observing blocks, as returned by
+        `blocks_to_table`.
+
+    Returns
+    -------
+    observing_blocks : `list`
+        A list of observing blocks.
+    """
+    n = len(table)
+    configuration_keys = [
+        key for key, _ in _CONFIGURATION_COLUMNS + _TRAILING_COLUMNS
+    ] + ["pm_ra_cosdec", "pm_dec", "ID", "sched_time"]
+    columns = {
+        key: _column_values(table[key])
+        for key in configuration_keys + ["name", "priority"]
+    }
+    constraints_data = np.ma.getdata(table["constraints"])
+    constraints_mask = np.ma.getmaskarray(table["constraints"])
+
+    targets = table["target"]
+
+    built = {}
     blocks = []
-    for row in table:
+    for i in range(n):
         # parse the constraints
         constraints = []
-        for constraint in row["constraints"]:
+        for constraint, masked in zip(
+            constraints_data[i], constraints_mask[i]
+        ):
             try:
-                if constraint["type"] == "TimeConstraint":
-                    constraints.append(
-                        astroplan.TimeConstraint(
-                            min=astrotime.Time(constraint["min"]),
-                            max=astrotime.Time(constraint["max"]),
-                        )
-                    )
-                elif constraint["type"] == "AtNightConstraint":
-                    constraints.append(
-                        astroplan.AtNightConstraint(
-                            max_solar_altitude=constraint["max_solar_altitude"]
-                            * u.deg
-                        )
-                    )
-                elif constraint["type"] == "AltitudeConstraint":
-                    constraints.append(
-                        astroplan.AltitudeConstraint(
-                            min=constraint["min"] * u.deg,
-                            max=constraint["max"] * u.deg,
-                            boolean_constraint=constraint[
-                                "boolean_constraint"
-                            ],
-                        )
-                    )
-                elif constraint["type"] == "AirmassConstraint":
-                    constraints.append(
-                        astroplan.AirmassConstraint(
-                            min=constraint["min"],
-                            max=constraint["max"],
-                            boolean_constraint=constraint[
-                                "boolean_constraint"
-                            ],
-                        )
-                    )
-                elif constraint["type"] == "MoonSeparationConstraint":
-                    constraints.append(
-                        astroplan.MoonSeparationConstraint(
-                            min=constraint["min"] * u.deg,
-                            max=constraint["max"] * u.deg,
-                        )
-                    )
-                else:
-                    logger.warning(
-                        "Only time constraints are currently supported"
-                    )
-                    continue
+                key = repr(sorted(constraint.items()))
             except BaseException:
+                masked = True
+            if masked:
                 constraints.append(None)
-
-        if row["ID"] is None:
-            row["ID"] = astrotime.Time.now().mjd
-
-        blocks.append(
-            astroplan.ObservingBlock(
-                target=astroplan.FixedTarget(row["target"]),
-                duration=(row["exposure"] * row["nexp"] + 5) * u.second,
-                priority=row["priority"],
-                name=row["name"],
-                configuration={
-                    "observer": row["observer"],
-                    "code": row["code"],
-                    "title": row["title"],
-                    "filename": row["filename"],
-                    "type": row["type"],
-                    "backend": row["backend"],
-                    "filter": row["filter"],
-                    "exposure": row["exposure"],
-                    "nexp": row["nexp"],
-                    "repositioning": row["repositioning"],
-                    "shutter_state": row["shutter_state"],
-                    "readout": row["readout"],
-                    "binning": row["binning"],
-                    "frame_position": row["frame_position"],
-                    "frame_size": row["frame_size"],
-                    "pm_ra_cosdec": row["pm_ra_cosdec"],
-                    "pm_dec": row["pm_dec"],
-                    "comment": row["comment"],
-                    "sch": row["sch"],
-                    "ID": row["ID"],
-                    "status": row["status"],
-                    "message": row["message"],
-                    "sched_time": row["sched_time"],
-                },
-                constraints=constraints,
-            )
+                continue
+            if key not in built:
+                try:
+                    built[key] = _dict_to_constraint(constraint)
+                except BaseException:
+                    built[key] = None
+            if built[key] is not False:
+                constraints.append(built[key])
+
+        if columns["ID"][i] is None:
+            columns["ID"][i] = table["ID"][i] = astrotime.Time.now().mjd
+
+        configuration = {key: columns[key][i] for key in configuration_keys}
+        block = astroplan.ObservingBlock.__new__(astroplan.ObservingBlock)
+        _observing_block_init(
+            block,
+            target=astroplan.FixedTarget(targets[i]),
+            duration=u.Quantity(
+                configuration["exposure"] * configuration["nexp"] + 5,
+                u.second,
+            ),
+            priority=columns["priority"][i],
+            name=columns["name"][i],
+            configuration={
+                key: configuration[key]
+                for key in (
+                    "observer",
+                    "code",
+                    "title",
+                    "filename",
+                    "type",
+                    "backend",
+                    "filter",
+                    "exposure",
+                    "nexp",
+                    "repositioning",
+                    "shutter_state",
+                    "readout",
+                    "binning",
+                    "frame_position",
+                    "frame_size",
+                    "pm_ra_cosdec",
+                    "pm_dec",
+                    "comment",
+                    "sch",
+                    "ID",
+                    "status",
+                    "message",
+                    "sched_time",
+                )
+            },
+            constraints=constraints,
         )
+        blocks.append(block)
 
     return blocks
 
 
+def _column_values(column):
+    """Per-row values of a table column, as returned by indexing a row."""
+    if isinstance(column, np.ma.MaskedArray):
+        data = np.ma.getdata(column)
+        mask = np.ma.getmaskarray(column)
+        if data.ndim > 1:
+            # Same as column[i], without the overhead of Column indexing
+            rows = []
+            for values, masks in zip(data, mask):
+                row = values.view(np.ma.MaskedArray)
+                row._mask = masks
+                rows.append(row)
+            return rows
+        # Masked elements are returned as np.ma.masked, like Row access
+        return [
+            np.ma.masked if masked else value
+            for value, masked in zip(data, mask)
+        ]
+    return [column[i] for i in range(len(column))]
+
+
 def validate(schedule_table, observatory=None):
     logger.info("Validating the schedule table")
 
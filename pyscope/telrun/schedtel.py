@@ -24,6 +24,7 @@ from matplotlib import ticker
 from .. import utils
 from ..observatory import Observatory
 from . import sch, schedtab
+from .constraint_grid import ConstraintGrid, SeparationTransitioner
 
 logger = logging.getLogger(__name__)
 
@@ -204,6 +205,17 @@ C = completed
     show_default=True,
     help="""The time resolution of the schedule [seconds].""",
 )
+@click.option(
+    "-pc/-npc",
+    "--precompute/--no-precompute",
+    "precompute",
+    default=True,
+    show_default=True,
+    help="""Precompute the Sun and Moon ephemerides and the altitudes of
+    all targets once on the time grid of the schedule to evaluate the
+    global constraints and the slew times, instead of letting the scheduler
+    compute them for every group of blocks and every transition.""",
+)
 @click.option(
     "-nf",
     "--name-format",
@@ -293,6 +305,7 @@ def schedtel_cli(
     scheduler=("", ""),
     gap_time=60,
     resolution=5,
+    precompute=True,
     name_format="{code}_{target}_{filter}_{exposure}s_{start_time}",
     filename=None,
     telrun=False,
@@ -341,6 +354,11 @@ def schedtel_cli(
         Maximum transition time between observation blocks in seconds. Defaults to `60`.
     resolution : `float`, optional
         Time resolution for scheduling in seconds. Defaults to `5`.
+    precompute : `bool`, optional
+        If True, evaluates the global constraints from ephemerides
+        precomputed once on the time grid of the schedule (see
+        `ConstraintGrid`) and the slew times from the separations of the
+        targets (see `SeparationTransitioner`). Defaults to `True`.
     name_format : `str`, optional
         Format string for scheduled image names. Defaults to
         `"{code}_{target}_{filter}_{exposure}s_{start_time}"`.
@@ -387,6 +405,7 @@ def schedtel_cli(
     logger.debug(f"scheduler: {scheduler}")
     logger.debug(f"gap_time: {gap_time}")
     logger.debug(f"resolution: {resolution}")
+    logger.debug(f"precompute: {precompute}")
     logger.debug(f"filename: {filename}")
     logger.debug(f"telrun: {telrun}")
     logger.debug(f"plot: {plot}")
@@ -632,6 +651,12 @@ def schedtel_cli(
         astroplan.AirmassConstraint(max=airmass, boolean_constraint=False),
         astroplan.MoonSeparationConstraint(min=moon_separation * u.deg),
     ]
+    if precompute:
+        logger.info("Precomputing ephemerides for the global constraints")
+        constraint_grid = ConstraintGrid(
+            observatory, t0, t1, resolution * u.second
+        )
+        global_constraints = constraint_grid.wrap(global_constraints)
 
     # Transitioner
     logger.info("Defining transitioner")
@@ -655,9 +680,14 @@ def schedtel_cli(
         logger.debug(
             f"Updated instrument reconfiguration times {instrument_reconfig_times}"
         )
-    transitioner = astroplan.Transitioner(
-        slew_rate, instrument_reconfig_times=instrument_reconfig_times
-    )
+    if precompute:
+        transitioner = SeparationTransitioner(
+            slew_rate, instrument_reconfig_times=instrument_reconfig_times
+        )
+    else:
+        transitioner = astroplan.Transitioner(
+            slew_rate, instrument_reconfig_times=instrument_reconfig_times
+        )
 
     # Scheduler
     if scheduler == ("", ""):
@@ -694,6 +724,13 @@ def schedtel_cli(
     logger.info("Scheduling ObservingBlocks")
     for i in tqdm.tqdm(range(len(block_groups))):
         logger.debug("Block group %i of %i" % (i + 1, len(block_groups)))
+        # astroplan.PriorityScheduler appends a horizon constraint to the
+        # constraints at every call
+        schedule_handler.constraints = (
+            constraint_grid.wrap(global_constraints)
+            if precompute
+            else list(global_constraints)
+        )
         schedule_handler(block_groups[i], schedule)
 
     # Flatten block_groups for comparison with scheduled ObservingBlocks
@@ -0,0 +1,160 @@
+import datetime
+import fnmatch
+import logging
+import os
+from pathlib import Path
+
+from astropy import table
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleWatcher:
+    def __init__(
+        self,
+        path,
+        pattern="telrun_????-??-??T??-??-??.ecsv",
+        time_format="telrun_%Y-%m-%dT%H-%M-%S.ecsv",
+    ):
+        """
+        Watches a directory for the schedule to execute.
+
+        Schedules are named after their start time. The directory is only
+        listed when its modification time or inode changes, i.e. when files
+        are added, removed or renamed, and schedules are only parsed when
+        their path or modification time changes, so that polling costs two
+        `os.stat` calls while nothing changes.
+
+        Parameters
+        ----------
+        path : `str` or `~pathlib.Path`
+            The directory containing the schedules.
+        pattern : `str`, default : "telrun_????-??-??T??-??-??.ecsv", optional
+            The glob pattern of the schedule filenames.
+        time_format : `str`, default : "telrun_%Y-%m-%dT%H-%M-%S.ecsv", optional
+            The `~datetime.datetime.strptime` format of the schedule
+            filenames, giving their start time in UTC.
+        """
+        self._path = Path(path)
+        self._pattern = pattern
+        self._time_format = time_format
+
+        self._directory_key = None
+        self._schedules = []
+        self._table_key = None
+        self._table = None
+        self._current = None
+
+    @property
+    def path(self):
+        """The directory containing the schedules."""
+        return self._path
+
+    @property
+    def schedules(self):
+        """
+        The start times and paths of the schedules, sorted by start time.
+
+        Returns
+        -------
+        `list` of `tuple` of (`~datetime.datetime`, `~pathlib.Path`)
+        """
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            self._directory_key = None
+            self._schedules = []
+            return self._schedules
+        key = (stat.st_ino, stat.st_mtime_ns)
+        if key != self._directory_key:
+            logger.debug("Schedule directory changed, listing schedules...")
+            schedules = []
+            with os.scandir(self._path) as entries:
+                for entry in entries:
+                    if not fnmatch.fnmatch(entry.name, self._pattern):
+                        continue
+                    try:
+                        start_time = datetime.datetime.strptime(
+                            entry.name, self._time_format
+                        )
+                    except ValueError:
+                        logger.warning(
+                            f"Cannot read the start time of {entry.name}"
+                        )
+                        continue
+                    schedules.append((start_time, Path(entry.path)))
+            schedules.sort()
+            self._directory_key = key
+            self._schedules = schedules
+        return self._schedules
+
+    def newest(self, now=None):
+        """
+        Returns the path of the schedule with the latest start time before
+        `now`, or `None`.
+
+        Parameters
+        ----------
+        now : `~datetime.datetime`, optional
+            The current UTC time, by default the time of the call.
+        """
+        if now is None:
+            now = datetime.datetime.now(datetime.timezone.utc).replace(
+                tzinfo=None
+            )
+        newest = None
+        for start_time, path in self.schedules:
+            if start_time > now:
+                break
+            newest = path
+        return newest
+
+    def read(self, path):
+        """
+        Reads a schedule, from the cache if it was not modified since it was
+        last read.
+
+        Returns
+        -------
+        `~astropy.table.Table`
+            The schedule. It must not be modified, since it is cached.
+        """
+        stat = os.stat(path)
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        if key != self._table_key:
+            logger.debug(f"Reading schedule {path}...")
+            self._table = table.Table.read(path, format="ascii.ecsv")
+            self._table_key = key
+        return self._table
+
+    def poll(self, now=None):
+        """
+        Returns the path of the newest schedule if it was not returned
+        before, or was modified since, and is not empty. Returns `None`
+        otherwise.
+
+        Parameters
+        ----------
+        now : `~datetime.datetime`, optional
+            The current UTC time, by default the time of the call.
+        """
+        path = self.newest(now)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        current = (path, stat.st_mtime_ns, stat.st_size)
+        if current == self._current:
+            return None
+        self._current = current
+        try:
+            schedule = self.read(path)
+        except Exception as e:
+            logger.exception(f"Cannot read schedule {path}: {e}")
+            return None
+        if len(schedule) < 1:
+            logger.warning(f"Schedule {path} is empty, ignoring it")
+            return None
+        return path
@@ -1,10 +1,8 @@
 import atexit
 import configparser
-import glob
 import json
 import logging
 import os
-import shutil
 import threading
 import time
 import tkinter as tk
@@ -23,6 +21,9 @@ from astroquery import mpc
 
 from ..observatory import Observatory
 from . import TelrunException, init_telrun_dir, schedtab
+from .image_writer import ImageWriter
+from .plate_solve_executor import PlateSolveExecutor
+from .schedule_watcher import ScheduleWatcher
 
 logger = logging.getLogger(__name__)
 
@@ -122,7 +123,7 @@ class TelrunOperator:
         self._gui = gui
         self._execution_thread = None
         self._status_log_thread = None
-        self._wcs_threads = []
+        self._wcs_executor = None
         self._execution_event = threading.Event()
         self._status_event = threading.Event()
         self._status_log_update_event = threading.Event()
@@ -138,6 +139,8 @@ class TelrunOperator:
         self._images_path = self._telhome / "images"
         self._logs_path = self._telhome / "logs"
         self._temp_path = self._telhome / "tmp"
+        self._schedule_watcher = ScheduleWatcher(self._schedules_path)
+        self._schedule_poll_interval = 0.25
 
         save_at_end = False
         if not self._config_path.exists():
@@ -190,6 +193,8 @@ class TelrunOperator:
         self._max_block_late_time = -600
         self._preslew_time = 60
         self._hardware_timeout = 120
+        self._pipeline_exposures = True
+        self._image_write_queue_size = 2
         self._autofocus_filters = None
         self._autofocus_interval = 3600
         self._autofocus_initial = True
@@ -215,7 +220,8 @@ class TelrunOperator:
         self._repositioning_binning = 1
         self._wcs_solver = "astrometry_net_wcs"
         self._wcs_filters = None
-        self._wcs_timeout = 30
+        self._wcs_timeout = 300
+        self._wcs_workers = 2
 
         # Load config file if there
         if (self._config_path / "telrun.cfg").exists():
@@ -293,6 +299,16 @@ class TelrunOperator:
             self._hardware_timeout = self._config.getfloat(
                 "telrun", "hardware_timeout", fallback=self._hardware_timeout
             )
+            self._pipeline_exposures = self._config.getboolean(
+                "telrun",
+                "pipeline_exposures",
+                fallback=self._pipeline_exposures,
+            )
+            self._image_write_queue_size = self._config.getint(
+                "telrun",
+                "image_write_queue_size",
+                fallback=self._image_write_queue_size,
+            )
             self._autofocus_filters = [
                 f.strip()
                 for f in self._config.get(
@@ -422,6 +438,9 @@ class TelrunOperator:
             self._wcs_timeout = self._config.getfloat(
                 "wcs", "wcs_timeout", fallback=self._wcs_timeout
             )
+            self._wcs_workers = self._config.getint(
+                "wcs", "wcs_workers", fallback=self._wcs_workers
+            )
         else:
             self._config["telrun"] = {}
             self._config["autofocus"] = {}
@@ -538,6 +557,12 @@ class TelrunOperator:
         self.hardware_timeout = kwargs.get(
             "hardware_timeout", self._hardware_timeout
         )
+        self.pipeline_exposures = kwargs.get(
+            "pipeline_exposures", self._pipeline_exposures
+        )
+        self.image_write_queue_size = kwargs.get(
+            "image_write_queue_size", self._image_write_queue_size
+        )
         self.autofocus_interval = kwargs.get(
             "autofocus_interval", self._autofocus_interval
         )
@@ -616,6 +641,7 @@ class TelrunOperator:
         self.wcs_solver = kwargs.get("wcs_solver", self._wcs_solver)
         self.wcs_filters = kwargs.get("wcs_filters", self._wcs_filters)
         self.wcs_timeout = kwargs.get("wcs_timeout", self._wcs_timeout)
+        self.wcs_workers = kwargs.get("wcs_workers", self._wcs_workers)
 
         # Set filters up if None
         if self.autofocus_filters is None:
@@ -716,70 +742,13 @@ class TelrunOperator:
             logger.info("Started.")
 
         logger.info("Starting main operation loop...")
-        init_load = True
         while True:
-            # Check for new schedule
-            logger.debug("Checking for new schedule...")
-            potential_schedules = glob.glob(
-                self.schedules_path + "telrun_????-??-??T??-??-??.ecsv"
-            )
-            if len(potential_schedules) < 1:
-                logger.debug(
-                    "No schedules in schedule directory. Waiting for new schedule..."
-                )
-                time.sleep(1)
+            # Check for a new schedule, which only lists the directory or
+            # reads the schedule when they change
+            schedule_path = self._schedule_watcher.poll()
+            if schedule_path is None:
+                time.sleep(self._schedule_poll_interval)
                 continue
-            potential_times = astrotime.Time(
-                [
-                    f.split("/")[-1]
-                    .split("telrun_")[1]
-                    .split(".")[0]
-                    .strptime("%Y-%m-%dT%H-%M-%S")
-                    for f in potential_schedules
-                ],
-                format="datetime",
-            )
-            potential_times = potential_times[
-                potential_times < astrotime.Time.now()
-            ]
-            potential_times.sort()
-            if len(potential_times) < 1:
-                logger.debug(
-                    "No schedules with start times before current time. Waiting for new schedule..."
-                )
-                time.sleep(1)
-                continue
-            fname = (
-                "telrun_"
-                + potential_times[-1].strftime("%Y-%m-%d_%H-%M-%S")
-                + ".ecsv"
-            )
-            logger.debug("Newest schedule: %s" % fname)
-
-            # Compare to current schedule filename
-            if not os.path.exists(self.schedules_path + fname):
-                logger.exception(
-                    "Schedule file error, waiting for new schedule..."
-                )
-                time.sleep(1)
-                continue
-            schedule = table.Table.read(
-                self.schedules_path + fname, format="ascii.ecsv"
-            )
-            if len(schedule) < 1:
-                logger.exception(
-                    "Schedule file empty, waiting for new schedule..."
-                )
-                time.sleep(1)
-                continue
-            if self.schedules_path / fname == self._schedule_fname:
-                logger.debug(
-                    "Schedule already loaded, waiting for new schedule..."
-                )
-                time.sleep(1)
-                continue
-            else:
-                init_load = False
             logger.info("New schedule detected!")
 
             if self._execution_thread is not None:
@@ -793,7 +762,7 @@ class TelrunOperator:
             logger.info("Starting new schedule execution thread...")
             self._execution_thread = threading.Thread(
                 target=self.execute_schedule,
-                args=(self.schedules_path / fname,),
+                args=(schedule_path,),
                 daemon=True,
                 name="Telrun Schedule Execution Thread",
             )
@@ -1651,8 +1620,7 @@ class TelrunOperator:
                 )
                 self._focuser_status = "Moving"
                 self.observatory.focuser.Move(self.autofocus_midpoint)
-                while self.observatory.focuser.IsMoving:
-                    time.sleep(0.1)
+                self.observatory.wait_for_focuser()
                 self._focuser_status = "Idle"
 
             logger.info("Starting autofocus, ensuring tracking is on...")
@@ -2237,43 +2205,50 @@ class TelrunOperator:
         # Derotation
         if self.observatory.rotator is not None:
             logger.info("Waiting for rotator motion to complete...")
-            while self.observatory.rotator.IsMoving:
-                time.sleep(0.1)
+            self.observatory.waiter.wait(
+                lambda: not self.observatory.rotator.IsMoving,
+                key="rotator",
+                description="the rotator",
+            )
             logger.info("Starting derotation...")
             self._rotator_status = "Derotating"
             self.observatory.start_derotation_thread()
 
         # Wait for any motion to complete
         logger.info("Waiting for telescope motion to complete...")
-        while self.observatory.telescope.Slewing and centered is None:
-            time.sleep(0.1)
-        else:
-            # Settle time
-            logger.info(
-                "Waiting for settle time of %.1f seconds..."
-                % self.observatory.settle_time
-            )
-            self._telescope_status = "Settling"
-            time.sleep(self.observatory.settle_time)
-            self._telescope_status = "Tracking"
+        if centered is None:
+            self.observatory.wait_for_slew()
+
+        # Settle time
+        logger.info(
+            "Waiting for settle time of %.1f seconds..."
+            % self.observatory.settle_time
+        )
+        self._telescope_status = "Settling"
+        time.sleep(self.observatory.settle_time)
+        self._telescope_status = "Tracking"
 
         # Wait for focuser, dome motion to complete
         if (
             self.observatory.focuser is not None
             and self.observatory.dome is not None
         ):
-            condition = True
             logger.info("Waiting for focuser or dome motion to complete...")
-            while condition:
-                if self.observatory.focuser is not None:
-                    condition = self.observatory.focuser.IsMoving
-                    if not condition:
-                        self._focuser_status = "Idle"
-                if self.observatory.dome is not None:
-                    if not self.observatory.dome.Slewing:
-                        self._dome_status = "Idle"
-                    condition = condition or self.observatory.dome.Slewing
-                time.sleep(0.1)
+
+            def motion_complete():
+                focuser_moving = self.observatory.focuser.IsMoving
+                if not focuser_moving:
+                    self._focuser_status = "Idle"
+                dome_slewing = self.observatory.dome.Slewing
+                if not dome_slewing:
+                    self._dome_status = "Idle"
+                return not (focuser_moving or dome_slewing)
+
+            self.observatory.waiter.wait(
+                motion_complete,
+                key="focuser_dome",
+                description="the focuser and dome",
+            )
 
         # Get previous, current, next block info and add to custom header
         custom_header = self.block_info(block)
@@ -2309,41 +2284,49 @@ class TelrunOperator:
         # add centered flag to custom header
         custom_header["CENTERED"] = (centered, "Telescope was centered")
 
-        # Start exposures
-        for i in range(block["nexp"]):
-            logger.info("Beginning exposure %i of %i" % (i + 1, block["nexp"]))
-            logger.info("Starting %.4g second exposure..." % block["exposure"])
-            self._camera_status = "Exposing"
-            t0 = time.time()
-            self.observatory.camera.StartExposure(
-                block["exposure"],
-                block["shutter_state"],
-            )
-            logger.info("Waiting for image...")
-            while (
-                not self.observatory.camera.ImageReady
-                and time.time()
-                < t0 + block["exposure"] + self.hardware_timeout
-            ):
-                time.sleep(0.1)
-            self._camera_status = "Idle"
-
-            # Append integer to filename if multiple exposures
-            if block["nexp"] > 1:
-                fname = Path(block["filename"] + "_%i" % i)
-            else:
-                fname = Path(block["filename"])
+        # Start exposures. With several exposures, each image is written by
+        # a background writer while the camera exposes the next one
+        writer = None
+        if self.pipeline_exposures and block["nexp"] > 1:
+            writer = ImageWriter(maxsize=self.image_write_queue_size)
+        t_block = time.time()
+        try:
+            for i in range(block["nexp"]):
+                logger.info(
+                    "Beginning exposure %i of %i" % (i + 1, block["nexp"])
+                )
+                logger.info(
+                    "Starting %.4g second exposure..." % block["exposure"]
+                )
+                self._camera_status = "Exposing"
+                self.observatory.camera.StartExposure(
+                    block["exposure"],
+                    block["shutter_state"],
+                )
+                logger.info("Waiting for image...")
+                try:
+                    self.observatory.wait_for_image(
+                        block["exposure"],
+                        timeout=block["exposure"] + self.hardware_timeout,
+                    )
+                except TimeoutError as e:
+                    logger.warning(e)
+                self._camera_status = "Idle"
 
-            # WCS thread cleanup
-            logger.info("Cleaning up WCS threads...")
-            self._wcs_threads = [t for t in self._wcs_threads if t.is_alive()]
+                # Append integer to filename if multiple exposures
+                if block["nexp"] > 1:
+                    fname = Path(block["filename"] + "_%i" % i)
+                else:
+                    fname = Path(block["filename"])
 
-            tempImageFilePath = str(self._temp_path / fname) + ".fts"
-            finalImageFilePath = str(self._images_path / fname) + ".fts"
+                tempImageFilePath = str(self._temp_path / fname) + ".fts"
+                finalImageFilePath = str(self._images_path / fname) + ".fts"
 
-            # Save image, do WCS if filter in wcs_filters
-            if self.observatory.filter_wheel is not None:
-                if (
+                # Save image, do WCS if filter in wcs_filters
+                if self.observatory.filter_wheel is None:
+                    logger.info("No filter wheel, attempting WCS solve...")
+                    do_wcs = True
+                elif (
                     self.observatory.filters[
                         self.observatory.filter_wheel.Position
                     ]
@@ -2352,86 +2335,53 @@ class TelrunOperator:
                     logger.info(
                         f"Current selected filter is among WCS filters: attempting WCS solve on image {tempImageFilePath}..."
                     )
-                    hist = str_output.getvalue().split("\n")
+                    do_wcs = True
+                else:
+                    logger.info(
+                        "Current filter not in wcs filters, skipping WCS solve..."
+                    )
+                    do_wcs = False
+                image_path = (
+                    tempImageFilePath if do_wcs else finalImageFilePath
+                )
+                wcs_args = (
+                    (tempImageFilePath, finalImageFilePath, block["priority"])
+                    if do_wcs
+                    else None
+                )
+
+                hist = str_output.getvalue().split("\n")
+                if writer is None:
                     save_success = self.observatory.save_last_image(
-                        tempImageFilePath,
+                        image_path,
                         frametyp=block["shutter_state"],
                         custom_header=custom_header,
                         history=hist,
                         overwrite=True,
                     )
-                    # if the length of _wcs_threads exceeds 7, join the first
-                    # thread in the list
-                    if len(self._wcs_threads) > 7:
-                        logger.info(
-                            "Main thread + 7 wcs threads currently running, waiting for the first wcs thread to finish before continuing..."
-                        )
-                        self._wcs_threads[0].join()
-                        self._wcs_threads = self._wcs_threads[1:]
-                        logger.info(
-                            "Main thread + 6 wcs threads currently running, continuing..."
-                        )
-                    self._wcs_threads.append(
-                        threading.Thread(
-                            target=self._async_wcs_solver,
-                            args=(
-                                tempImageFilePath,
-                                block["target"].ra.deg,
-                                block["target"].dec.deg,
-                                finalImageFilePath,
-                            ),
-                            daemon=True,
-                            name="wcs_threads",
-                        )
-                    )
-                    self._wcs_threads[-1].start()
+                    if save_success and do_wcs:
+                        self._submit_wcs_job(*wcs_args)
                 else:
-                    logger.info(
-                        "Current filter not in wcs filters, skipping WCS solve..."
-                    )
-                    hist = str_output.getvalue().split("\n")
-                    save_success = self.observatory.save_last_image(
-                        finalImageFilePath,
+                    # Only the readout must complete before the next exposure
+                    hdu = self.observatory.read_last_image(
+                        image_path,
                         frametyp=block["shutter_state"],
                         custom_header=custom_header,
                         history=hist,
-                        overwrite=True,  # Added during initial pyscope telrun debugging 4-27-2024 PEG
-                    )
-            else:
-                logger.info("No filter wheel, attempting WCS solve...")
-                hist = str_output.getvalue().split("\n")
-                save_success = self.observatory.save_last_image(
-                    tempImageFilePath,
-                    frametyp=block["shutter_state"],
-                    custom_header=custom_header,
-                    history=hist,
-                    overwrite=True,
-                )
-                # if the length of _wcs_threads exceeds 7, join the first
-                # thread in the list
-                if len(self._wcs_threads) > 7:
-                    logger.info(
-                        "Main thread + 7 wcs threads currently running, waiting for the first wcs thread to finish before continuing..."
-                    )
-                    self._wcs_threads[0].join()
-                    self._wcs_threads = self._wcs_threads[1:]
-                    logger.info(
-                        "Main thread + 6 wcs threads currently running, continuing..."
-                    )
-                self._wcs_threads.append(
-                    threading.Thread(
-                        target=self._async_wcs_solver,
-                        args=(
-                            tempImageFilePath,
-                            block["target"].ra.deg,
-                            block["target"].dec.deg,
-                            finalImageFilePath,
-                        ),
-                        daemon=True,
-                        name="wcs_threads",
                     )
+                    if hdu is not None:
+                        writer.submit(
+                            self._write_image, hdu, image_path, wcs_args
+                        )
+        finally:
+            if writer is not None:
+                writer.close()
+                elapsed = time.time() - t_block
+                logger.info(
+                    "Image writer busy for %.1f of %.1f seconds, exposures "
+                    "waited %.1f seconds for it"
+                    % (writer.busy_time, elapsed, writer.wait_time)
                 )
-                self._wcs_threads[-1].start()
 
         """ # If multiple exposures, update filename as a list
         if block["nexp"] > 1:
@@ -2696,6 +2646,8 @@ class TelrunOperator:
             ),
             "MAXLATE": (self.max_block_late_time, "Max block late time"),
             "PRESLEW": (self.preslew_time, "Preslew time"),
+            "PIPEEXP": (self.pipeline_exposures, "Pipelined exposures"),
+            "WRITEQ": (self.image_write_queue_size, "Image write queue size"),
             "AUTOINT": (self.autofocus_interval, "Autofocus interval"),
             "AUTOEXPO": (self.autofocus_exposure, "Autofocus exposure"),
             "AUTOMID": (self.autofocus_midpoint, "Autofocus midpoint"),
@@ -2751,57 +2703,51 @@ class TelrunOperator:
             "WCSSOLV": (self.wcs_solver, "WCS solver"),
             "WCSFILT": (self.wcs_filters, "WCS filters"),
             "WCSTIME": (self.wcs_timeout, "WCS timeout"),
+            "WCSWORK": (self.wcs_workers, "WCS workers"),
         }
+        if self._wcs_executor is not None:
+            wcs_summary = self._wcs_executor.summary()
+            info.update(
+                {
+                    "WCSQUEUE": (wcs_summary["queued"], "WCS jobs queued"),
+                    "WCSRUN": (wcs_summary["running"], "WCS jobs running"),
+                    "WCSNSOL": (wcs_summary["solved"], "WCS jobs solved"),
+                    "WCSNFAIL": (wcs_summary["failed"], "WCS jobs failed"),
+                    "WCSNTIME": (
+                        wcs_summary["timeout"],
+                        "WCS jobs timed out",
+                    ),
+                    "WCSNERR": (wcs_summary["error"], "WCS jobs crashed"),
+                    "WCSLAT": (
+                        wcs_summary["latency_mean"],
+                        "WCS mean latency [seconds]",
+                    ),
+                    "WCSLAT95": (
+                        wcs_summary["latency_p95"],
+                        "WCS 95th percentile latency [seconds]",
+                    ),
+                    "WCSSOLT": (
+                        wcs_summary["solve_mean"],
+                        "WCS mean solve time [seconds]",
+                    ),
+                }
+            )
 
         return info
 
-    def _async_wcs_solver(
-        self,
-        image_path,
-        center_ra,
-        center_dec,
-        target_path=None,
-    ):
-        logger.info("Attempting a plate solution...")
-        self._wcs_status = "Solving"
-
-        logger.info("Searching for a WCS solution...")
-        if self.wcs_solver.lower() == "astrometry_net_wcs":
-            from ..reduction import astrometry_net_wcs
-
-            solution_found = astrometry_net_wcs(
-                image_path,
-                # center_ra=center_ra,
-                # center_dec=center_dec,
-                # radius=1.0,
-                # scale_units="arcsecperpix",
-                # scale_type="ev",
-                # scale_est=0.8,  # self.observatory.pixel_scale[0],
-                # scale_err=0.1,  # self.observatory.pixel_scale[0] * 0.2,
-                # parity=2,
-                # tweak_order=3,
-                # crpix_center=True,
-                solve_timeout=60,
-            )
-        elif self.wcs_solver.lower() == "maxim_pinpoint_wcs":
-            from ..reduction import maxim_pinpoint_wcs
-
-            solution_found = maxim_pinpoint_wcs(image_path)
-        else:
-            solution_found = False
-            logger.error("Unknown WCS solver, skipping...")
-
-        if not solution_found:
-            logger.warning("WCS solution not found.")
-        else:
-            logger.info("WCS solution found.")
+    def _write_image(self, hdu, image_path, wcs_args=None):
+        self.observatory.write_image(hdu, image_path, overwrite=True)
+        if wcs_args is not None:
+            self._submit_wcs_job(*wcs_args)
 
-        if target_path is not None:
-            logger.info("Moving file to images directory...")
-            shutil.move(image_path, target_path)
-            logger.info("File %s to %s" % (image_path, target_path))
-        logger.info("WCS solve complete.")
-        self._wcs_status = "Idle"
+    def _submit_wcs_job(self, image_path, target_path=None, priority=0):
+        logger.info(f"Queueing WCS solve of {image_path}...")
+        self.wcs_executor.submit(
+            image_path,
+            target_path=target_path,
+            priority=priority,
+            timeout=self.wcs_timeout,
+        )
 
     def _is_process_complete(self, timeout, event):
         t0 = time.time()
@@ -2842,6 +2788,8 @@ class TelrunOperator:
             time.sleep(interval)
 
     def _terminate(self):
+        if self._wcs_executor is not None:
+            self._wcs_executor.shutdown(wait=False, cancel=True)
         self.observatory.shutdown()
 
     @property
@@ -2938,6 +2886,8 @@ class TelrunOperator:
 
     @property
     def wcs_status(self):
+        if self._wcs_status in ("", "Idle") and self._wcs_executor is not None:
+            return self._wcs_executor.status
         return self._wcs_status
 
     @property
@@ -3102,6 +3052,28 @@ class TelrunOperator:
             self._hardware_timeout
         )
 
+    @property
+    def pipeline_exposures(self):
+        return self._pipeline_exposures
+
+    @pipeline_exposures.setter
+    def pipeline_exposures(self, value):
+        self._pipeline_exposures = bool(value)
+        self._config["telrun"]["pipeline_exposures"] = str(
+            self._pipeline_exposures
+        )
+
+    @property
+    def image_write_queue_size(self):
+        return self._image_write_queue_size
+
+    @image_write_queue_size.setter
+    def image_write_queue_size(self, value):
+        self._image_write_queue_size = max(int(value), 1)
+        self._config["telrun"]["image_write_queue_size"] = str(
+            self._image_write_queue_size
+        )
+
     @property
     def autofocus_filters(self):
         return self._autofocus_filters
@@ -3428,6 +3400,31 @@ class TelrunOperator:
         self._wcs_timeout = float(value)
         self._config["wcs"]["wcs_timeout"] = str(self._wcs_timeout)
 
+    @property
+    def wcs_workers(self):
+        return self._wcs_workers
+
+    @wcs_workers.setter
+    def wcs_workers(self, value):
+        self._wcs_workers = max(int(value), 1)
+        self._config["wcs"]["wcs_workers"] = str(self._wcs_workers)
+
+    @property
+    def wcs_executor(self):
+        """The `PlateSolveExecutor` solving the images, created when the
+        first image is submitted and replaced when the solver or the number
+        of workers change."""
+        if self._wcs_executor is None or (
+            self._wcs_executor.solver != self.wcs_solver
+            or self._wcs_executor.workers != self.wcs_workers
+        ):
+            if self._wcs_executor is not None:
+                self._wcs_executor.shutdown(wait=False)
+            self._wcs_executor = PlateSolveExecutor(
+                self.wcs_solver, workers=self.wcs_workers
+            )
+        return self._wcs_executor
+
 
 class _TelrunGUI(ttk.Frame):
     def __init__(self, parent, TelrunOperator):
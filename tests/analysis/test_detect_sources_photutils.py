@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import photutils.background as photbackground
+from astropy import convolution
+from astropy.io import fits
+from photutils.segmentation import make_2dgaussian_kernel
+
+from pyscope.analysis import detect_sources_photutils
+from pyscope.analysis.detect_sources_photutils import (
+    _background,
+    _convolve_gaussian,
+)
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "reduction"))
+import image_sim as imsim  # noqa: E402
+
+
+def make_image(path, shape=(1000, 1200)):
+    image = np.zeros(shape)
+    image += imsim.bias(image, 1100)
+    image += imsim.read_noise(image, 5)
+    image += imsim.sky_background(image, 20)
+    image += imsim.stars(image, 50, max_counts=2000, fwhm=2)
+    fits.PrimaryHDU(image.astype(np.float32)).writeto(path)
+    return image
+
+
+def test_fast_path(monkeypatch):
+    rng = np.random.default_rng(0)
+    image = rng.normal(0, 1, (700, 400)).astype(np.float32)
+    for size in (5, 31):
+        expected = convolution.convolve(
+            image, make_2dgaussian_kernel(3, size=size)
+        )
+        convolved = _convolve_gaussian(image, 3, size)
+        assert convolved.dtype == np.float32
+        assert np.abs(convolved - expected).max() < 1e-5
+
+    # Background estimated in bands
+    image = image + np.linspace(0, 100, 400)[None, :]
+    image += np.linspace(0, 50, 700)[:, None]
+    background, rms = _background(image, 50)
+
+    shapes = []
+    background2d = photbackground.Background2D
+
+    def record(data, *args, **kwargs):
+        shapes.append(data.shape)
+        return background2d(data, *args, **kwargs)
+
+    monkeypatch.setattr(photbackground, "Background2D", record)
+    banded_background, banded_rms = _background(image, 50, nthreads=2)
+    assert len(shapes) > 1
+    assert all(shape[0] < image.shape[0] for shape in shapes)
+    assert banded_background.shape == image.shape
+    assert np.abs(banded_background - background).max() < 0.05
+    assert np.abs(banded_rms - rms).max() < 0.05
+
+
+def test_detect_sources_photutils(tmp_path):
+    make_image(tmp_path / "image.fts")
+
+    catalog = detect_sources_photutils(
+        [tmp_path / "image.fts"], progress_bar=False
+    )
+    fast_catalog = detect_sources_photutils(
+        [tmp_path / "image.fts"],
+        fast=True,
+        nthreads=2,
+        deblend_min_density=1000,
+        progress_bar=False,
+    )
+
+    assert abs(len(fast_catalog) - len(catalog)) <= 2
+    assert len(catalog) >= 40
+    distance = np.hypot(
+        catalog.xcentroid[:, None] - fast_catalog.xcentroid[None, :],
+        catalog.ycentroid[:, None] - fast_catalog.ycentroid[None, :],
+    )
+    assert np.median(distance.min(axis=1)) < 0.05
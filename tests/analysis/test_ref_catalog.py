@@ -0,0 +1,40 @@
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import SkyCoord
+from astropy.table import Table
+
+from pyscope.analysis import ReferenceCatalog
+
+
+def test_ref_catalog(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 500
+    table = Table()
+    table["ra"] = 150 + rng.uniform(-0.2, 0.2, n)
+    table["dec"] = 2 + rng.uniform(-0.2, 0.2, n)
+    table["clean"] = np.ones(n, dtype=bool)
+    table["r"] = rng.uniform(12, 20, n).astype(np.float32)
+    table["clean"][0] = False
+    table["r"][1] = 25
+    table.write(tmp_path / "catalog.ecsv")
+
+    catalog = ReferenceCatalog.from_file(tmp_path / "catalog.ecsv")
+    assert len(catalog) == n
+
+    # Sources offset by 1 arcsec from catalog stars, plus one with no match
+    sources = SkyCoord(
+        ra=np.append(table["ra"][:10], 151) * u.deg,
+        dec=np.append(table["dec"][:10] + 1 / 3600, 3) * u.deg,
+    )
+    mags = catalog.crossmatch(sources, "r", max_sep=3 * u.arcsec)
+    assert np.isnan(mags[0])  # not clean
+    assert np.isnan(mags[1])  # too faint
+    assert np.allclose(mags[2:10], table["r"][2:10])
+    assert np.isnan(mags[10])
+
+    # A cached cone is reused for fields that lie inside it
+    table.write(tmp_path / "sdss_150.00000_+2.00000_30.000.fits")
+    cached = ReferenceCatalog.from_sdss(
+        SkyCoord(150.05 * u.deg, 2 * u.deg), 10 * u.arcmin, cache_dir=tmp_path
+    )
+    assert len(cached) == n
@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+from astropy.stats import gaussian_sigma_to_fwhm
+
+from pyscope.analysis import extract_stars, median_fwhm, median_hfd
+
+
+def make_image(shape=(1000, 1500), n=80, sigma=2.0, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(20, shape[1] - 20, n)
+    y = rng.uniform(20, shape[0] - 20, n)
+    amplitude = rng.uniform(500, 20000, n)
+    image = rng.normal(1000, 10, shape)
+    for xi, yi, ai in zip(x, y, amplitude):
+        x0, y0 = int(xi), int(yi)
+        yy, xx = np.mgrid[y0 - 15 : y0 + 16, x0 - 15 : x0 + 16]
+        image[yy, xx] += ai * np.exp(
+            -((xx - xi) ** 2 + (yy - yi) ** 2) / (2 * sigma**2)
+        )
+    return image.astype(np.uint16), x, y
+
+
+def test_extract_stars():
+    image, x, y = make_image()
+    image[100, 100] = image[500, 700] = 30000
+
+    stars = extract_stars(image, max_stars=50)
+    assert len(stars) == 50
+    assert np.all(np.diff(stars["flux"]) <= 0)
+
+    distance = np.hypot(
+        stars["x"][:, None] - x[None, :], stars["y"][:, None] - y[None, :]
+    ).min(axis=1)
+    assert np.median(distance) < 0.05
+    assert np.all(distance < 1)
+    assert np.allclose(stars["fwhm"], 2.0 * gaussian_sigma_to_fwhm, rtol=0.05)
+
+    # Hot pixels
+    assert not np.any(np.hypot(stars["x"] - 100, stars["y"] - 100) < 2)
+    assert not np.any(np.hypot(stars["x"] - 700, stars["y"] - 500) < 2)
+
+
+def test_saturation():
+    image, _, _ = make_image()
+    stars = extract_stars(image, saturation=5000)
+    assert np.all(stars["peak"] + 1000 < 5000)
+
+
+def test_median_fwhm():
+    for sigma in (1.5, 3):
+        image, _, _ = make_image(sigma=sigma)
+        assert np.isclose(
+            median_fwhm(image), sigma * gaussian_sigma_to_fwhm, rtol=0.03
+        )
+    assert np.isnan(median_fwhm(np.full((100, 100), 1000.0)))
+
+
+def test_median_hfd():
+    # The half-flux diameter of a Gaussian is its FWHM
+    for sigma in (1.5, 3):
+        image, _, _ = make_image(sigma=sigma)
+        assert np.isclose(
+            median_hfd(image, box_size=21),
+            sigma * gaussian_sigma_to_fwhm,
+            rtol=0.03,
+        )
+    assert np.isnan(median_hfd(np.full((100, 100), 1000.0)))
+
+
+def test_speed():
+    image, _, _ = make_image(shape=(2000, 3000), n=150)
+    start = time.perf_counter()
+    extract_stars(image)
+    assert time.perf_counter() - start < 2
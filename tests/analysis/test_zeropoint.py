@@ -0,0 +1,53 @@
+import numpy as np
+from astropy.io import fits
+
+from pyscope.analysis import solve_zero_points, write_zero_points
+
+
+def test_solve_zero_points(tmp_path):
+    rng = np.random.default_rng(1)
+    nimages, nstars = 6, 200
+    airmass = np.linspace(1.0, 2.0, nimages)
+    true_zmag = 22.0 - 0.15 * airmass
+    color_term = 0.08
+
+    image_index = np.repeat(np.arange(nimages), nstars)
+    color = rng.uniform(-0.5, 1.5, image_index.size)
+    err = np.full(image_index.size, 0.02)
+    delta_mag = (
+        true_zmag[image_index]
+        + color_term * color
+        + rng.normal(0, 0.02, image_index.size)
+    )
+    # Outliers (blends, variables) that must be clipped
+    delta_mag[::50] += 1.0
+
+    solution = solve_zero_points(
+        image_index,
+        delta_mag,
+        delta_mag_err=err,
+        color=color,
+        airmass=airmass,
+    )
+    assert not np.any(solution["used"][::50])
+    assert np.allclose(solution["zmag"], true_zmag, atol=0.01)
+    assert np.all(solution["zmag_err"] < 0.01)
+    assert abs(solution["color_term"] - color_term) < 0.01
+    assert abs(solution["extinction"] - 0.15) < 0.02
+    assert abs(solution["zmag0"] - 22.0) < 0.02
+
+    # An image without stars gets no zero point
+    solution = solve_zero_points(image_index, delta_mag, nimages=nimages + 1)
+    assert np.isnan(solution["zmag"][-1])
+    assert solution["nstars"][-1] == 0
+
+    fnames = []
+    for i in range(nimages + 1):
+        fname = tmp_path / f"image_{i}.fits"
+        fits.writeto(fname, np.zeros((4, 4), dtype=np.uint16))
+        fnames.append(fname)
+    write_zero_points(fnames, solution)
+    hdr = fits.getheader(fnames[0])
+    assert np.isclose(hdr["ZMAG"], solution["zmag"][0])
+    assert np.isclose(hdr["ZMAGERR"], solution["zmag_err"][0])
+    assert "ZMAG" not in fits.getheader(fnames[-1])
@@ -0,0 +1,140 @@
+import threading
+import time
+
+import numpy as np
+from astropy.io import fits
+
+from pyscope.observatory import Observatory, plan_calibration_set
+from pyscope.observatory.calibration_plan import calibration_frame_path
+
+
+def test_plan_calibration_set(tmp_path):
+    frames = plan_calibration_set(
+        tmp_path, [10, 0, 1], [0, 1], ["1x1", "2x2"], repeat=3
+    )
+    assert len(frames) == 3 * 2 * 2 * 3
+
+    # Each mode is set once
+    modes = [(f.readout, f.binning) for f in frames]
+    changes = sum(a != b for a, b in zip(modes, modes[1:]))
+    assert changes == 3
+
+    bias = [f for f in frames if f.exposure == 0][0]
+    assert bias.frametyp == "Bias"
+    assert bias.path == (
+        tmp_path / "biases_1x1_Readout0_0s" / "bias_1x1_Readout0_0s_0.fts"
+    )
+    assert calibration_frame_path(tmp_path, 0.1, 2, "1x1", 4) == (
+        tmp_path / "darks_1x1_Readout2_0p1s" / "dark_1x1_Readout2_0p1s_4.fts"
+    )
+
+
+def test_resume(tmp_path):
+    frames = plan_calibration_set(tmp_path, [1], [0], ["1x1"], repeat=4)
+    for frame in frames[:3]:
+        frame.path.parent.mkdir(exist_ok=True)
+        fits.PrimaryHDU(np.zeros((100, 100), dtype=np.uint16)).writeto(
+            frame.path
+        )
+    # Interrupted while writing the data
+    with open(frames[1].path, "r+b") as f:
+        f.truncate(2880 * 2)
+    # Interrupted while writing the header
+    with open(frames[2].path, "r+b") as f:
+        f.truncate(100)
+
+    remaining = plan_calibration_set(
+        tmp_path, [1], [0], ["1x1"], repeat=4, skip_existing=True
+    )
+    assert [f.index for f in remaining] == [1, 2, 3]
+    # No index file is left in the calibration set
+    assert not list(tmp_path.glob("**/*.sqlite"))
+
+
+def test_resume_long_header(tmp_path):
+    frames = plan_calibration_set(tmp_path, [1], [0], ["1x1"], repeat=2)
+    header = fits.Header({f"KEY{i}": i for i in range(300)})
+    for frame in frames:
+        frame.path.parent.mkdir(exist_ok=True)
+        fits.PrimaryHDU(
+            np.zeros((100, 100), dtype=np.uint16), header=header
+        ).writeto(frame.path)
+    # A header of 9 blocks and data of 7 blocks, of which 3 are missing
+    with open(frames[1].path, "r+b") as f:
+        f.truncate(2880 * (9 + 4))
+
+    remaining = plan_calibration_set(
+        tmp_path, [1], [0], ["1x1"], repeat=2, skip_existing=True
+    )
+    assert [f.index for f in remaining] == [1]
+
+
+class FakeCamera:
+    def __init__(self, exposure_overhead):
+        self.exposure_overhead = exposure_overhead
+        self.ReadoutMode = 0
+        self.BinX = 1
+        self.BinY = 1
+        self.CanSetCCDTemperature = False
+        self.mode_changes = 0
+
+    def __setattr__(self, name, value):
+        if name == "ReadoutMode" and hasattr(self, "mode_changes"):
+            self.mode_changes += 1
+        super().__setattr__(name, value)
+
+    def StartExposure(self, exposure, light):
+        self.end = time.monotonic() + exposure + self.exposure_overhead
+
+
+class FakeObservatory:
+    def __init__(self, write_time):
+        self.camera = FakeCamera(write_time)
+        self.cooler_setpoint = None
+        self.write_time = write_time
+        self.written = []
+        self.lock = threading.Lock()
+
+    def wait_for_image(self, exposure):
+        time.sleep(max(self.camera.end - time.monotonic(), 0))
+
+    def read_last_image(self, filename, frametyp=None):
+        return fits.PrimaryHDU(np.zeros((10, 10), dtype=np.uint16))
+
+    def write_image(self, hdu, filename, overwrite=False):
+        time.sleep(self.write_time)
+        hdu.writeto(filename, overwrite=overwrite)
+        with self.lock:
+            self.written.append(filename)
+
+
+def test_take_darks(tmp_path):
+    observatory = FakeObservatory(write_time=0.1)
+    start = time.monotonic()
+    Observatory.take_darks(
+        observatory,
+        exposures=[0, 0.001],
+        readouts=[0, 1],
+        binnings=["1x1"],
+        repeat=3,
+        save_path=tmp_path,
+    )
+    elapsed = time.monotonic() - start
+
+    # Writing overlaps the next exposure
+    assert len(observatory.written) == 12
+    assert elapsed < 12 * 0.1 * 1.6
+    assert observatory.camera.mode_changes == 2
+
+    # Resuming takes nothing
+    observatory.written = []
+    Observatory.take_darks(
+        observatory,
+        exposures=[0, 0.001],
+        readouts=[0, 1],
+        binnings=["1x1"],
+        repeat=3,
+        save_path=tmp_path,
+        skip_existing=True,
+    )
+    assert observatory.written == []
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from pyscope.observatory import DeviceSnapshot
+
+
+class CountingDevice:
+    def __init__(self):
+        self.reads = {}
+        self._connected = False
+
+    def _read(self, name, value):
+        self.reads[name] = self.reads.get(name, 0) + 1
+        return value
+
+    @property
+    def Connected(self):
+        return self._read("Connected", self._connected)
+
+    @Connected.setter
+    def Connected(self, value):
+        self.reads["set Connected"] = self.reads.get("set Connected", 0) + 1
+        self._connected = value
+
+    @property
+    def Name(self):
+        return self._read("Name", "Simulator")
+
+    @property
+    def Position(self):
+        return self._read("Position", 100)
+
+    @property
+    def Temperature(self):
+        return self._read("Temperature", 10.0)
+
+    @property
+    def StepSize(self):
+        self._read("StepSize", None)
+        raise NotImplementedError("StepSize")
+
+    def SensorDescription(self, name):
+        return self._read(f"SensorDescription {name}", name.lower())
+
+
+def test_device_snapshot():
+    device = CountingDevice()
+    snapshot = DeviceSnapshot(device, ttl={"Temperature": 0.2})
+    assert snapshot.device is device
+
+    # Static properties and methods are read once
+    for _ in range(3):
+        assert snapshot.Name == "Simulator"
+        assert snapshot.SensorDescription("Humidity") == "humidity"
+        with pytest.raises(NotImplementedError):
+            snapshot.StepSize
+    assert device.reads["Name"] == 1
+    assert device.reads["SensorDescription Humidity"] == 1
+    assert device.reads["StepSize"] == 1
+
+    # Dynamic properties are read every time, except within a snapshot
+    snapshot.Position
+    snapshot.Position
+    assert device.reads["Position"] == 2
+    with snapshot.snapshot():
+        snapshot.Position
+        snapshot.Position
+    assert device.reads["Position"] == 3
+    assert snapshot.last_duration >= 0
+
+    # or while their TTL has not expired
+    snapshot.Temperature
+    snapshot.Temperature
+    assert device.reads["Temperature"] == 1
+    time.sleep(0.25)
+    snapshot.Temperature
+    assert device.reads["Temperature"] == 2
+
+    # Setting a property to its cached value does not reach the device
+    snapshot.Connected = True
+    snapshot.Connected = True
+    assert device.reads["set Connected"] == 1
+    assert snapshot.Connected is True
+    assert "Connected" not in device.reads
+
+    snapshot.invalidate("Name")
+    snapshot.Name
+    assert device.reads["Name"] == 2
+    snapshot.invalidate()
+    snapshot.Connected = True
+    assert device.reads["set Connected"] == 2
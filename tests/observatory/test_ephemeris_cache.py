@@ -0,0 +1,81 @@
+import numpy as np
+from astropy import coordinates as coord
+from astropy import time as astrotime
+from astropy import units as u
+
+from pyscope.observatory import EphemerisCache
+
+
+def separation(alt, az, altaz):
+    """Separation in arcseconds between an altitude and azimuth in degrees
+    and an AltAz coordinate."""
+    return (
+        coord.SkyCoord(alt=alt * u.deg, az=az * u.deg, frame="altaz")
+        .separation(coord.SkyCoord(alt=altaz.alt, az=altaz.az, frame="altaz"))
+        .to_value(u.arcsec)
+    )
+
+
+def test_ephemeris_cache():
+    location = coord.EarthLocation(
+        lat=41.66 * u.deg, lon=-91.53 * u.deg, height=200 * u.m
+    )
+    cache = EphemerisCache(location)
+    target = coord.SkyCoord(ra=83.8 * u.deg, dec=-5.4 * u.deg)
+    galactic = coord.SkyCoord(l=10 * u.deg, b=20 * u.deg, frame="galactic")
+
+    times = (
+        astrotime.Time("2024-03-10T18:00:00") + np.linspace(0, 1, 4) * u.day
+    )
+    for t in times:
+        frame = coord.AltAz(obstime=t, location=location)
+        lst = t.sidereal_time("apparent", longitude=location.lon)
+        # 10 ms of sidereal time
+        assert (
+            abs((cache.lst(t) - lst).wrap_at(12 * u.hourangle))
+            < 0.15 * u.arcsec
+        )
+
+        sun = coord.get_sun(t)
+        moon = coord.get_body("moon", t)
+        assert separation(*cache.sun_altaz(t), sun.transform_to(frame)) < 1
+        assert separation(*cache.moon_altaz(t), moon.transform_to(frame)) < 1
+
+        elongation = sun.separation(moon)
+        phase_angle = np.arctan2(
+            sun.distance * np.sin(elongation),
+            moon.distance - sun.distance * np.cos(elongation),
+        )
+        illumination = (1.0 + np.cos(phase_angle.value)) / 2.0
+        assert abs(cache.moon_illumination(t) - illumination) < 1e-6
+
+        for obj in (target, galactic):
+            assert cache.cacheable(obj, t)
+            assert (
+                separation(*cache.altaz(obj, t), obj.transform_to(frame)) < 1
+            )
+        moon_angle = (
+            coord.get_body("moon", t, location=location)
+            .separation(target)
+            .to_value(u.arcsec)
+        )
+        assert abs(cache.moon_separation(target, t) * 3600 - moon_angle) < 1
+
+        # Apparent places round trip
+        tete = target.transform_to(coord.TETE(obstime=t))
+        ra, dec = cache.apparent(target, t)
+        assert abs(ra - tete.ra.deg) * 3600 < 1
+        assert abs(dec - tete.dec.deg) * 3600 < 1
+        ra, dec = cache.icrs(ra, dec, t)
+        assert abs(ra - target.ra.deg) * 3600 < 0.01
+        assert abs(dec - target.dec.deg) * 3600 < 0.01
+
+    # Arrays of times across several buckets
+    alt, az = cache.sun_altaz(times)
+    assert alt.shape == az.shape == (4,)
+    assert np.allclose(alt[2], cache.sun_altaz(times[2])[0])
+    assert not cache.cacheable(target, times)
+    assert not cache.cacheable(
+        coord.SkyCoord(alt=10 * u.deg, az=10 * u.deg, frame="altaz"), times[0]
+    )
+    assert cache.altaz_frame(times[0]) is cache.altaz_frame(times[0])
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from pyscope.observatory.fits_writer import SavedImage, write_fits
+
+
+@pytest.mark.parametrize("dtype", ["u2", ">u2", "u4", "i1", ">i2", "f4"])
+def test_write_fits(tmp_path, dtype):
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 127, (301, 207)).astype(dtype)
+    header = fits.Header({"OBJECT": "test"})
+    # Contiguous, transposed and strided arrays
+    for array in (data, data.T, data[::2]):
+        hdu = fits.PrimaryHDU(array, header=header)
+        write_fits(tmp_path / "fast.fts", hdu, overwrite=True, chunk_size=4096)
+        hdu.writeto(tmp_path / "astropy.fts", overwrite=True)
+        assert (tmp_path / "fast.fts").read_bytes() == (
+            tmp_path / "astropy.fts"
+        ).read_bytes()
+
+    with pytest.raises(OSError):
+        write_fits(tmp_path / "fast.fts", hdu)
+
+
+def test_write_saved_image(tmp_path, monkeypatch):
+    # As for the images saved by MaxIm DL
+    data = np.arange(40000, 40012, dtype=np.uint16).reshape(3, 4)
+    fits.PrimaryHDU(data).writeto(tmp_path / "image.fts")
+    header = fits.getheader(tmp_path / "image.fts")
+    for i in range(50):
+        header[f"KEY{i}"] = i
+    image = SavedImage(tmp_path / "image.fts", header)
+
+    # A copy keeps the original file
+    write_fits(tmp_path / "copy.fts", image)
+    assert fits.getheader(tmp_path / "image.fts").get("KEY49") is None
+    with pytest.raises(OSError):
+        write_fits(tmp_path / "copy.fts", image)
+
+    # The pixel data is never read to update the header in place
+    monkeypatch.setattr(fits, "getdata", None)
+    write_fits(tmp_path / "image.fts", image, overwrite=True)
+    monkeypatch.undo()
+
+    for name in ("image.fts", "copy.fts"):
+        with fits.open(tmp_path / name) as hdul:
+            assert hdul[0].header["KEY49"] == 49
+            np.testing.assert_array_equal(hdul[0].data, data)
+    np.testing.assert_array_equal(image.data, data)
+    # The file is closed after reading the data
+    (tmp_path / "image.fts").unlink()
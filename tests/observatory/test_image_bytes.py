@@ -0,0 +1,110 @@
+import json
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from pyscope.observatory import ObservatoryException
+from pyscope.observatory._image_bytes import read_image_array
+
+
+def image_bytes(array, element_type=8, error_number=0, message=b""):
+    """ImageBytes response for an array indexed like the ASCOM ImageArray"""
+    header = struct.pack(
+        "<11i",
+        1,
+        error_number,
+        0,
+        0,
+        44,
+        2,
+        element_type,
+        array.ndim,
+        *(array.shape + (0,) * (3 - array.ndim)),
+    )
+    return header + (message if error_number else array.tobytes())
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        if "imagebytes" in self.headers.get("Accept", "") and server.bytes:
+            body, content_type = server.bytes, "application/imagebytes"
+        else:
+            body, content_type = server.json, "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def serve(server, array, **kwargs):
+    server.bytes = image_bytes(array, **kwargs)
+    server.json = json.dumps(
+        {"Type": 2, "Rank": 2, "Value": array.tolist(), "ErrorNumber": 0}
+    ).encode()
+    return f"127.0.0.1:{server.server_address[1]}"
+
+
+def test_read_image_array(server):
+    rng = np.random.default_rng(0)
+    array = rng.integers(0, 65535, (300, 200), dtype=np.uint16)
+    address = serve(server, array)
+
+    result = read_image_array(address)
+    assert result.dtype == np.uint16
+    assert result.flags.writeable
+    np.testing.assert_array_equal(result, array)
+
+    # Colour images and other element types
+    color = rng.integers(0, 255, (30, 20, 3)).astype(np.int32)
+    server.bytes = image_bytes(color, element_type=2)
+    np.testing.assert_array_equal(read_image_array(address), color)
+
+    # Alpaca errors
+    server.bytes = image_bytes(array, error_number=0x407, message=b"No image")
+    with pytest.raises(ObservatoryException, match="No image"):
+        read_image_array(address)
+
+    # Servers without ImageBytes support
+    server.bytes = None
+    np.testing.assert_array_equal(read_image_array(address), array)
+
+
+def test_image_bytes_speed(server):
+    rng = np.random.default_rng(1)
+    array = rng.integers(0, 65535, (1500, 1000), dtype=np.uint16)
+    address = serve(server, array)
+
+    t0 = time.perf_counter()
+    image = read_image_array(address).T
+    image_bytes_time = time.perf_counter() - t0
+    np.testing.assert_array_equal(image, array.T)
+
+    # Previous transfer: JSON decoded, converted and transposed
+    server.bytes = None
+    t0 = time.perf_counter()
+    image = np.transpose(np.array(read_image_array(address), dtype=np.uint16))
+    json_time = time.perf_counter() - t0
+    np.testing.assert_array_equal(image, array.T)
+
+    assert image_bytes_time * 10 < json_time
@@ -0,0 +1,95 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pyscope.observatory import PWI4Focuser
+from pyscope.observatory._pwi4 import _PWI4
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.connections.add(self.client_address)
+            if self.path.startswith("/focuser/goto"):
+                server.position = int(self.path.split("target=")[1])
+        if self.path.startswith("/command/notfound"):
+            self.send_error(404)
+            return
+        body = (
+            "pwi4.version=4.0.99\n"
+            "focuser.exists=true\n"
+            "focuser.is_connected=true\n"
+            "focuser.is_enabled=true\n"
+            "focuser.is_moving=false\n"
+            f"focuser.position={server.position}\n"
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.connections = set()
+    server.position = 1000
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_pwi4_status_cache(server):
+    port = server.server_address[1]
+    focuser = PWI4Focuser(host="127.0.0.1", port=port)
+    assert focuser._app is _PWI4.shared(host="127.0.0.1", port=port)
+    focuser._app.status_ttl = 10
+
+    assert focuser.Connected
+    assert focuser.Position == 1000
+    assert not focuser.IsMoving
+    assert server.requests == ["/status?"]
+
+    # Commands refresh the cached status
+    focuser.Move(2000)
+    assert focuser.Position == 2000
+    assert len(server.requests) == 2
+
+    # Concurrent readers share one request on one connection per thread
+    focuser._app.invalidate_status()
+    threads = [
+        threading.Thread(target=lambda: focuser.Position) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(server.requests) == 3
+
+    app = _PWI4(host="127.0.0.1", port=port, status_ttl=0)
+    for _ in range(5):
+        app.status()
+    assert len(server.requests) == 8
+    assert len(server.connections) <= 4
+
+    with pytest.raises(Exception, match="Command not found"):
+        app.test_command_not_found()
+    app.status()
+    assert len(server.requests) == 10
+
+    # Both request paths report errors alike
+    app.comm.keep_alive = False
+    with pytest.raises(Exception, match="Command not found"):
+        app.test_command_not_found()
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from pyscope.observatory import SkyFlatExposure
+
+BIAS = 1000
+TARGET = 30000
+
+
+def sky_rate(altitude):
+    # Counts per second of the twilight sky
+    return 2000 * 10 ** (0.45 * (altitude + 4))
+
+
+def expose(altitude, altitude_rate, exposure, rng):
+    t = np.linspace(0, exposure, 200)
+    signal = np.trapezoid(sky_rate(altitude + altitude_rate * t), t)
+    return BIAS + signal * (1 + 0.01 * rng.normal())
+
+
+def twilight(evening, predictive, duration=3600, overhead=10):
+    """Takes flats through a twilight, returning the numbers of good and
+    taken flats."""
+    rng = np.random.default_rng(0)
+    altitude_rate = (-1 if evening else 1) * 0.25 / 60
+    altitude = -2.0 if evening else -12.0
+    controller = SkyFlatExposure(TARGET, bias_level=BIAS)
+    exposure = 5.0
+    elapsed = good = taken = 0
+    while elapsed < duration:
+        if predictive and controller.frames > 0:
+            wait = controller.wait_time(altitude, altitude_rate)
+            if wait is None:
+                break
+            if wait > 0:
+                elapsed += wait
+                altitude += altitude_rate * wait
+                continue
+            exposure = controller.exposure(altitude, altitude_rate)
+        exposure = min(max(exposure, 1), 60)
+        counts = expose(altitude, altitude_rate, exposure, rng)
+        taken += 1
+        good += controller.accept(counts)
+        if predictive:
+            controller.record(exposure, counts, altitude, altitude_rate)
+        else:
+            exposure *= TARGET / counts
+        elapsed += exposure + overhead
+        altitude += altitude_rate * (exposure + overhead)
+    return good, taken
+
+
+@pytest.mark.parametrize("evening", [True, False])
+def test_twilight(evening):
+    good, taken = twilight(evening, predictive=True)
+    ratio_good, ratio_taken = twilight(evening, predictive=False)
+    assert good >= ratio_good
+    assert taken - good <= 2
+    assert taken < ratio_taken
+
+
+def test_prediction():
+    rng = np.random.default_rng(1)
+    controller = SkyFlatExposure(TARGET, bias_level=BIAS)
+    assert controller.predict(-5) is None
+    assert controller.wait_time(-5) is None
+
+    altitude_rate = -0.25 / 60
+    controller.record(5, expose(-5, altitude_rate, 5, rng), -5, altitude_rate)
+    assert controller.slope == pytest.approx(0.4)
+    exposure = controller.predict(-5.1, altitude_rate)
+    counts = expose(-5.1, altitude_rate, exposure, rng)
+    assert counts == pytest.approx(TARGET, rel=0.1)
+    assert controller.expected_counts(
+        exposure, -5.1, altitude_rate
+    ) == pytest.approx(TARGET)
+
+    # Too faint and darkening
+    assert controller.predict(-12, altitude_rate) > 60
+    assert controller.wait_time(-12, altitude_rate) is None
+
+    # Too bright and darkening
+    wait = controller.wait_time(0, altitude_rate)
+    assert wait > 0
+    assert controller.predict(wait * altitude_rate, altitude_rate) >= 1
+
+
+def test_panel():
+    controller = SkyFlatExposure(
+        TARGET, bias_level=BIAS, slope=0, slope_weight=1e6
+    )
+    controller.record(2, BIAS + 2 * 10000)
+    controller.record(3, BIAS + 3 * 10000, altitude=5)
+    assert controller.predict() == pytest.approx(2.9, rel=1e-3)
+    assert controller.wait_time() == 0
+
+
+def test_statistic():
+    data = np.full((100, 100), 20000.0)
+    data[10:20, 10:20] = 60000
+    assert SkyFlatExposure.statistic(data) == 20000
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from pyscope.analysis import median_hfd
+from pyscope.observatory import VCurveAutofocus
+from pyscope.observatory.vcurve_autofocus import hyperbola
+
+
+class SimulatedFocuser:
+    """Focuser whose optics lag `backlash` steps behind when the direction
+    of the moves reverses, imaging stars whose size follows a V-curve."""
+
+    def __init__(self, best, backlash=0, noise=0.03, seed=0):
+        self.best = best
+        self.backlash = backlash
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+        self.optics = 0
+        self.moves = 0
+
+    def move(self, position):
+        self.moves += 1
+        if position > self.position:
+            self.optics = max(self.optics, position)
+        else:
+            self.optics = min(self.optics, position + self.backlash)
+        self.position = position
+
+    def size(self):
+        return hyperbola(self.optics, self.best, 3.0, 0.01)
+
+    def measure(self):
+        return self.size() * (1 + self.noise * self.rng.normal())
+
+    def image(self, shape=(300, 400), n=20):
+        # Defocused stars are rings, sharper stars are Gaussians
+        size = self.size()
+        image = self.rng.normal(1000, 10, shape)
+        yy, xx = np.mgrid[: shape[0], : shape[1]]
+        for x, y in self.rng.uniform(30, np.array(shape[::-1]) - 30, (n, 2)):
+            r = np.hypot(xx - x, yy - y)
+            gaussian = np.exp(-(r**2) / (2 * (3.0 / 2.3548) ** 2))
+            ring = (r < size / 1.58) & (r > size / 3.16)
+            image += 5000 * (gaussian if size < 6 else ring / ring.sum() * 20)
+        return image
+
+
+def test_vcurve_autofocus():
+    errors = []
+    exposures = []
+    for seed in range(20):
+        best = 10000 + np.random.default_rng(seed).uniform(-1500, 1500)
+        focuser = SimulatedFocuser(best, backlash=80, seed=seed)
+        autofocus = VCurveAutofocus(
+            focuser.move, focuser.measure, 500, backlash=100
+        )
+        result = autofocus.run(10000)
+        errors.append(result - best)
+        exposures.append(autofocus.exposures)
+
+        # Measurements are always approached from below
+        assert focuser.optics == focuser.position
+        assert autofocus.uncertainty < 100
+        assert autofocus.parameters[1] == pytest.approx(3.0, rel=0.2)
+
+    # As accurate as a fit to a fixed grid of 9 positions, with fewer
+    # exposures
+    assert np.std(errors) < 25
+    assert np.all(np.abs(errors) < 75)
+    assert np.mean(exposures) < 6
+    assert max(exposures) <= 10
+
+
+def test_vcurve_autofocus_limits():
+    focuser = SimulatedFocuser(100, noise=0.01)
+    autofocus = VCurveAutofocus(
+        focuser.move,
+        focuser.measure,
+        500,
+        min_position=0,
+        max_position=20000,
+        max_exposures=6,
+    )
+    result = autofocus.run(1000)
+    assert min(autofocus.positions) == 0
+    assert autofocus.exposures <= 6
+    assert abs(result - 100) < 50
+
+    # No stars
+    autofocus = VCurveAutofocus(focuser.move, lambda: np.nan, 500)
+    assert autofocus.run(1000) is None
+
+
+def test_vcurve_autofocus_images():
+    focuser = SimulatedFocuser(5200, noise=0)
+    autofocus = VCurveAutofocus(
+        focuser.move,
+        lambda: median_hfd(focuser.image(), box_size=31),
+        500,
+        tolerance=25,
+        backlash=100,
+    )
+    result = autofocus.run(5000)
+    assert abs(result - 5200) < 50
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import pytest
+
+from pyscope.observatory import Waiter
+
+
+def test_waiter():
+    waiter = Waiter(min_interval=0.01, max_interval=0.05)
+
+    # Without prediction, polling backs off
+    end = time.monotonic() + 0.3
+    elapsed = waiter.wait(lambda: time.monotonic() >= end, key="slew")
+    assert 0.3 <= elapsed < 0.4
+    assert waiter.polls < 15
+
+    # Durations of operations without expected duration are not learnt, so
+    # a short one after a long one is still noticed within max_interval
+    assert waiter.predict("slew") is None
+    end = time.monotonic() + 0.02
+    elapsed = waiter.wait(lambda: time.monotonic() >= end, key="slew")
+    assert 0.02 <= elapsed < 0.02 + 0.05 + 0.02
+
+    # The expected duration is offset by the learnt overhead
+    end = time.monotonic() + 0.25
+    waiter.wait(lambda: time.monotonic() >= end, expected=0.2, key="camera")
+    assert 1.05 <= waiter.predict("camera", expected=1) < 1.12
+
+    # A long exposure needs far fewer checks than polling every 0.1 s
+    waiter = Waiter()
+    end = time.monotonic() + 2
+    elapsed = waiter.wait(
+        lambda: time.monotonic() >= end, expected=2, key="camera"
+    )
+    assert 2 <= elapsed < 2 + 0.1 + 0.05
+    assert waiter.polls < 2 / 0.1 / 2
+
+    with pytest.raises(TimeoutError):
+        waiter.wait(lambda: False, timeout=0.1, description="a test")
+
+
+def test_waiter_async():
+    waiter = Waiter(min_interval=0.01)
+    end = time.monotonic() + 0.1
+
+    async def ready():
+        return time.monotonic() >= end
+
+    async def main():
+        return await asyncio.gather(
+            waiter.wait_async(ready),
+            waiter.wait_async(lambda: time.monotonic() >= end),
+        )
+
+    assert all(0.1 <= elapsed < 0.2 for elapsed in asyncio.run(main()))
+    with pytest.raises(TimeoutError):
+        asyncio.run(waiter.wait_async(lambda: False, timeout=0.05))
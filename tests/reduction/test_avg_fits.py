@@ -5,6 +5,7 @@ import shutil
 import numpy as np
 import pytest
 from astropy.io import fits
+from astropy.stats import sigma_clip
 
 from pyscope.reduction import avg_fits
 
@@ -83,5 +84,69 @@ def test_avg_fits(tmp_path):
     return
 
 
+def test_avg_fits_strips(tmp_path):
+    """
+    Tests that combining in strips under a small memory budget matches
+    combining the full stack, and the rejection modes.
+    """
+    rng = np.random.default_rng(0)
+    fnames = []
+    for i in range(7):
+        hdr = fits.Header()
+        hdr["FRAMETYP"] = "Bias"
+        hdr["XBINNING"] = 1
+        hdr["YBINNING"] = 1
+        hdr["READOUTM"] = "Normal"
+        hdr["EXPTIME"] = 0.0
+        hdr["GAIN"] = 1
+        hdr["PEDESTAL"] = 100
+        data = rng.integers(100, 60000, (37, 23)).astype(np.uint16)
+        fnames.append(str(tmp_path / f"avg_fits_strips_{i}.fts"))
+        fits.writeto(fnames[-1], data, hdr, overwrite=True)
+    images = np.array(
+        [fits.getdata(fname).astype(np.float64) - 100 for fname in fnames]
+    )
+    outfile = str(tmp_path / "avg_fits_strips.fts")
+
+    avg_fits(fnames, mode="0", outfile=outfile, memory_limit=0.001)
+    assert np.array_equal(
+        fits.getdata(outfile), np.median(images, axis=0).astype(np.float32)
+    )
+
+    avg_fits(
+        fnames,
+        mode="1",
+        outfile=outfile,
+        datatype="float64",
+        memory_limit=0.001,
+    )
+    assert np.array_equal(fits.getdata(outfile), np.mean(images, axis=0))
+
+    avg_fits(
+        fnames,
+        mode="3",
+        outfile=outfile,
+        datatype="float64",
+        memory_limit=0.001,
+    )
+    assert np.array_equal(
+        fits.getdata(outfile), np.sort(images, axis=0)[1:-1].mean(axis=0)
+    )
+
+    images[3, 5, 5] = 1e6
+    fits.writeto(
+        fnames[3],
+        (images[3] + 100).astype(np.float64),
+        fits.getheader(fnames[3]),
+        overwrite=True,
+    )
+    avg_fits(fnames, mode="2", outfile=outfile, datatype="float64", sigma=2)
+    expected = sigma_clip(
+        images, sigma=2, maxiters=5, axis=0, cenfunc="median", stdfunc="std"
+    ).mean(axis=0)
+    assert np.allclose(fits.getdata(outfile), expected)
+    assert fits.getdata(outfile)[5, 5] < 60000
+
+
 # if __name__ == "__main__":
 #     test_avg_fits(os.path.join(os.getcwd(), "tmp_dir"))
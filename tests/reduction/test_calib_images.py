@@ -0,0 +1,63 @@
+import numpy as np
+from astropy.io import fits
+
+from pyscope.reduction import calib_images
+
+
+def test_calib_images(tmp_path):
+    rng = np.random.default_rng(0)
+    shape = (32, 32)
+    keys = dict(READOUTM="Normal", GAIN=1, XBINNING=1, YBINNING=1)
+    calib_dir = tmp_path / "masters"
+    image_dir = tmp_path / "images"
+    calib_dir.mkdir()
+    image_dir.mkdir()
+
+    fits.writeto(
+        calib_dir / "master_bias.fts",
+        np.full(shape, 1000, dtype=np.float32),
+        fits.Header(dict(IMAGETYP="Bias", EXPTIME=0.0, **keys)),
+    )
+    fits.writeto(
+        calib_dir / "master_dark.fts",
+        np.full(shape, 1060, dtype=np.float32),
+        fits.Header(dict(IMAGETYP="Dark", EXPTIME=60.0, **keys)),
+    )
+    for filt in ("r", "g"):
+        fits.writeto(
+            calib_dir / f"master_flat_{filt}.fts",
+            np.full(shape, 20000, dtype=np.float32),
+            fits.Header(
+                dict(IMAGETYP="Flat", EXPTIME=1.0, FILTER=filt, **keys)
+            ),
+        )
+
+    for i, filt in enumerate(("r", "g", "r", "g")):
+        fits.writeto(
+            image_dir / f"image_{i}.fts",
+            rng.integers(2000, 3000, shape).astype(np.uint16),
+            fits.Header(
+                dict(IMAGETYP="Light", EXPTIME=30.0, FILTER=filt, **keys)
+            ),
+        )
+
+    calib_images(
+        image_dir=image_dir,
+        calib_dir=calib_dir,
+        astro_scrappy=(0, 3),
+        jobs=2,
+    )
+
+    for i in range(4):
+        raw = fits.getdata(image_dir / f"image_{i}.fts").astype(np.float64)
+        cal, hdr = fits.getdata(image_dir / f"image_{i}_cal.fts", header=True)
+        assert hdr["CALSTAT"]
+        assert np.array_equal(cal, raw - 1000 - 30 + hdr["PEDESTAL"])
+
+
+def test_calib_images_empty(tmp_path, monkeypatch):
+    (tmp_path / "images").mkdir()
+    (tmp_path / "masters").mkdir()
+    # A clock which does not advance, as coarse clocks may
+    monkeypatch.setattr("time.time", lambda: 1e9)
+    calib_images(image_dir=tmp_path / "images", calib_dir=tmp_path / "masters")
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+from astropy.io import fits
+
+from pyscope.reduction import CalibrationIndex
+
+
+def _write_master(path, date_obs, exptime=0.0, filt="r"):
+    hdr = fits.Header()
+    hdr["FILTER"] = filt
+    hdr["READOUTM"] = "Normal"
+    hdr["GAIN"] = 1
+    hdr["XBINNING"] = 1
+    hdr["YBINNING"] = 1
+    hdr["EXPTIME"] = exptime
+    hdr["DATE-OBS"] = date_obs
+    fits.writeto(path, np.zeros((4, 4), dtype=np.float32), hdr)
+    return hdr
+
+
+def test_calib_index(tmp_path):
+    _write_master(tmp_path / "master_bias_1.fts", "2024-01-01T00:00:00")
+    _write_master(tmp_path / "master_bias_2.fts", "2024-01-05T00:00:00")
+    _write_master(tmp_path / "master_dark_1.fts", "2024-01-02T00:00:00", 60)
+    _write_master(tmp_path / "master_flat_r.fts", "2024-01-03T00:00:00")
+    _write_master(
+        tmp_path / "master_flat_g.fts", "2024-01-03T00:00:00", filt="g"
+    )
+
+    index = CalibrationIndex(tmp_path)
+    assert index.update() == 5
+    assert index.update() == 0
+
+    hdr = fits.Header()
+    hdr["FILTER"] = "g"
+    hdr["READOUTM"] = "Normal"
+    hdr["GAIN"] = 1
+    hdr["XBINNING"] = 1
+    hdr["YBINNING"] = 1
+    hdr["EXPTIME"] = 30.0
+    hdr["DATE-OBS"] = "2024-01-04T12:00:00"
+
+    masters = index.find_masters(hdr)
+    assert masters["bias"].name == "master_bias_2.fts"
+    assert masters["dark"].name == "master_dark_1.fts"
+    assert masters["flat"].name == "master_flat_g.fts"
+    assert masters["flat_dark"] is None
+    assert index.find_masters(hdr, camera_type="cmos")["dark"] is None
+
+    hdr["DATE-OBS"] = "2024-01-01T12:00:00"
+    assert index.find_masters(hdr)["bias"].name == "master_bias_1.fts"
+
+    os.remove(tmp_path / "master_bias_1.fts")
+    assert index.update() == 1
+    assert index.find_masters(hdr)["bias"].name == "master_bias_2.fts"
+    index.close()
+
+    # The index persists between instances
+    index = CalibrationIndex(tmp_path)
+    assert index.update() == 0
+    index.close()
+
+    # An index file which cannot be written is kept in memory
+    index = CalibrationIndex(
+        tmp_path, index_file=tmp_path / "missing" / "index.sqlite"
+    )
+    assert index.update() == 4
+    assert index.find_masters(hdr)["bias"].name == "master_bias_2.fts"
+    index.close()
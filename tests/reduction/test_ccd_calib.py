@@ -16,6 +16,7 @@ from astropy.io import fits
 from convenience_functions import show_image
 
 from pyscope.reduction import ccd_calib
+from pyscope.reduction.ccd_calib import CCDCalibrator
 
 
 def test_ccd_calib(tmp_path):
@@ -479,6 +480,73 @@ def test_ccd_calib(tmp_path):
     return
 
 
+def test_ccd_calibrator(tmp_path):
+    rng = np.random.default_rng(0)
+    shape = (64, 48)
+    keys = dict(READOUTM="Normal", GAIN=1, XBINNING=1, YBINNING=1)
+
+    bias = 1000 + rng.normal(0, 5, shape)
+    dark = bias + rng.uniform(0, 60, shape)
+    flat = 1000 + 20000 * rng.uniform(0.8, 1.2, shape)
+    fits.writeto(
+        tmp_path / "master_bias.fts",
+        bias,
+        fits.Header(dict(IMAGETYP="Bias", EXPTIME=0.0, **keys)),
+    )
+    fits.writeto(
+        tmp_path / "master_dark.fts",
+        dark,
+        fits.Header(dict(IMAGETYP="Dark", EXPTIME=60.0, **keys)),
+    )
+    fits.writeto(
+        tmp_path / "master_flat.fts",
+        flat,
+        fits.Header(
+            dict(
+                IMAGETYP="Flat", EXPTIME=1.0, FILTER="r", PEDESTAL=1000, **keys
+            )
+        ),
+    )
+
+    fnames = []
+    for i, exptime in enumerate((30.0, 60.0, 30.0)):
+        raw = rng.integers(2000, 10000, shape).astype(np.uint16)
+        fnames.append(str(tmp_path / f"raw_{i}.fts"))
+        fits.writeto(
+            fnames[-1],
+            raw,
+            fits.Header(
+                dict(IMAGETYP="Light", EXPTIME=exptime, FILTER="r", **keys)
+            ),
+        )
+
+    calibrator = CCDCalibrator(
+        dark_frame=tmp_path / "master_dark.fts",
+        bias_frame=tmp_path / "master_bias.fts",
+        flat_frame=tmp_path / "master_flat.fts",
+        astro_scrappy=(0, 3),
+        pedestal=100,
+    )
+    outfiles = calibrator.calibrate_files(fnames, jobs=2)
+
+    for fname, outfile in zip(fnames, outfiles):
+        raw, hdr = fits.getdata(fname, header=True)
+        norm_flat = (flat - 1000) / np.mean(flat - 1000)
+        expected = (
+            raw - bias - (dark - bias) * (hdr["EXPTIME"] / 60.0)
+        ) / norm_flat
+        expected = np.clip(np.floor(expected) + 100, 0, 65535)
+
+        cal, cal_hdr = fits.getdata(outfile, header=True)
+        assert cal_hdr["CALSTAT"]
+        assert cal_hdr["PEDESTAL"] == 100
+        # float32 arithmetic may move a pixel across an integer boundary
+        assert np.max(np.abs(cal.astype(np.float64) - expected)) <= 1
+
+    # Already calibrated images are skipped
+    assert calibrator.calibrate_file(outfiles[0]) is None
+
+
 if __name__ == "__main__":
     test_ccd_calib(os.path.join(os.getcwd(), "tmp_dir"))
     print("test passed, removing temp directory...")
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+from astropy.io import fits
+
+from pyscope.reduction import FitsIndex, read_header
+
+
+def _write_image(path, date_obs, filt="r", exptime=10.0, ncards=0):
+    hdr = fits.Header()
+    hdr["IMAGETYP"] = "Light Frame"
+    hdr["FILTER"] = filt
+    hdr["EXPTIME"] = exptime
+    hdr["DATE-OBS"] = date_obs
+    # Enough cards to spread the header over several blocks
+    for i in range(ncards):
+        hdr[f"EXTRA{i}"] = i
+    fits.writeto(path, np.zeros((64, 64), dtype=np.uint16), hdr)
+    return hdr
+
+
+def test_read_header(tmp_path):
+    hdr = _write_image(
+        tmp_path / "image.fts", "2024-01-01T00:00:00", ncards=80
+    )
+    header = read_header(tmp_path / "image.fts")
+    assert header == fits.getheader(tmp_path / "image.fts")
+    assert all(header[key] == value for key, value in hdr.items())
+
+
+def test_fits_index(tmp_path):
+    (tmp_path / "night").mkdir()
+    _write_image(tmp_path / "a.fts", "2024-01-01T00:00:00")
+    _write_image(tmp_path / "b.fits", "2024-01-02T00:00:00", filt="g")
+    _write_image(
+        tmp_path / "night" / "c.fit", "2024-01-03T00:00:00", exptime=60
+    )
+    (tmp_path / "notes.txt").write_text("not a FITS file")
+
+    index = FitsIndex(tmp_path)
+    assert index.update(jobs=2) == 3
+    assert index.update() == 0
+    assert len(index) == 3
+    assert len(FitsIndex(tmp_path, recursive=False).query()) == 0
+    flat = FitsIndex(tmp_path, recursive=False)
+    flat.update()
+    assert len(flat) == 2
+
+    assert index.query(filter="g") == [str(tmp_path / "b.fits")]
+    assert index.query(exptime=(30, None)) == [
+        str(tmp_path / "night" / "c.fit")
+    ]
+    assert len(index.query(filter=["r", "g"], order_by="obstime")) == 3
+    assert index.query(columns="filter", filter="g") == [
+        (str(tmp_path / "b.fits"), "g")
+    ]
+    headers = index.headers(filter="r")
+    assert [hdr["DATE-OBS"] for hdr in headers.values()] == [
+        "2024-01-01T00:00:00",
+        "2024-01-03T00:00:00",
+    ]
+
+    # Modified files are reread, deleted files are dropped
+    with fits.open(tmp_path / "a.fts", mode="update") as hdul:
+        hdul[0].header["CALSTAT"] = "BDF"
+    os.utime(tmp_path / "a.fts", (0, 0))
+    os.remove(tmp_path / "b.fits")
+    assert index.update() == 2
+    assert index.query(calibrated=True) == [str(tmp_path / "a.fts")]
+    assert index.header(tmp_path / "a.fts")["CALSTAT"] == "BDF"
+
+    # The index persists across instances
+    index.close()
+    assert len(FitsIndex(tmp_path)) == 2
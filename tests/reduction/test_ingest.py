@@ -0,0 +1,84 @@
+import os
+import time
+
+import pytest
+
+from pyscope.reduction.ingest import (
+    LandingWatcher,
+    RetentionIndex,
+    StageMetrics,
+)
+
+
+def test_landing_watcher(tmp_path):
+    watcher = LandingWatcher(tmp_path)
+    (tmp_path / "a.fts").write_bytes(b"0" * 2880)
+    (tmp_path / "notes.txt").write_text("not an image")
+
+    # Files are reported once they are stable between two polls
+    assert watcher.poll() == []
+    assert watcher.poll() == [tmp_path / "a.fts"]
+    assert watcher.poll() == []
+
+    # A file still being written is held back
+    (tmp_path / "b.fts").write_bytes(b"0" * 2880)
+    assert watcher.poll() == []
+    (tmp_path / "b.fts").write_bytes(b"0" * 5760)
+    (tmp_path / "c.fts").write_bytes(b"0" * 2880)
+    os.utime(tmp_path / "c.fts", (0, 0))
+    assert watcher.poll() == []
+    # Oldest files first
+    assert watcher.poll(limit=1) == [tmp_path / "c.fts"]
+    assert watcher.poll() == [tmp_path / "b.fts"]
+
+    # After a restart, files left in the landing directory are retried once
+    os.remove(tmp_path / "c.fts")
+    watcher = LandingWatcher(tmp_path)
+    assert sorted(watcher.poll()) == [tmp_path / "a.fts", tmp_path / "b.fts"]
+    assert watcher.poll() == []
+    watcher = LandingWatcher(tmp_path)
+    assert watcher.poll() == []
+
+
+def test_retention_index(tmp_path):
+    day = 86400
+    now = time.time()
+    old = tmp_path / "old.fts"
+    recent = tmp_path / "recent.fts"
+    touched = tmp_path / "touched.fts"
+    for path in (old, recent, touched):
+        path.write_bytes(b"0")
+    os.utime(old, (now - 3 * day, now - 3 * day))
+    os.utime(recent, (now - 3 * day, now - 3 * day))
+
+    retention = RetentionIndex(maxage=5 * day, maxmtime=day)
+    retention.add(old, now - 10 * day)
+    retention.add(recent, now)
+    retention.add(touched, now - 10 * day)
+    retention.add(tmp_path / "missing.fts", now - 10 * day)
+    assert len(retention) == 3
+
+    assert retention.expire(now) == [old]
+    assert retention.expire(now + 1.5 * day) == [touched]
+    assert recent.exists()
+    assert retention.expire(now + 6 * day) == [recent]
+
+
+def test_stage_metrics():
+    metrics = StageMetrics(maxlen=100)
+    for seconds in range(1, 201):
+        metrics.record("calibrate", seconds / 100)
+    with metrics.time("solve"):
+        pass
+
+    summary = metrics.summary()
+    assert set(summary) == {"calibrate", "solve"}
+    # Counts are totals, percentiles are over the most recent samples
+    calibrate = summary["calibrate"]
+    assert calibrate["count"] == 200
+    assert calibrate["mean"] == pytest.approx(1.505)
+    assert calibrate["p50"] == pytest.approx(1.505)
+    assert calibrate["p95"] == pytest.approx(1.9505)
+    assert calibrate["max"] == pytest.approx(2.0)
+    assert summary["solve"]["count"] == 1
+    assert 0 <= summary["solve"]["max"] < 0.1
@@ -0,0 +1,102 @@
+import numpy as np
+from astropy import wcs
+from astropy.io import fits
+from astropy.table import Table
+
+from pyscope.reduction import StarIndex, local_wcs
+from pyscope.reduction.local_wcs import star_index
+
+
+def make_image(path, catalog, true_wcs, shape, header):
+    rng = np.random.default_rng(0)
+    x, y = true_wcs.all_world2pix(catalog["ra"], catalog["dec"], 0)
+    data = rng.normal(1000, 10, shape).astype(np.float32)
+    yy, xx = np.mgrid[: shape[0], : shape[1]]
+    for xi, yi, mag in zip(x, y, catalog["mag"]):
+        if not (0 <= xi < shape[1] and 0 <= yi < shape[0]):
+            continue
+        flux = 10 ** (-0.4 * (mag - 20))
+        data += (
+            flux
+            / (2 * np.pi * 4)
+            * np.exp(-((xx - xi) ** 2 + (yy - yi) ** 2) / 8)
+        )
+    fits.PrimaryHDU(data, header).writeto(path)
+
+
+def test_star_index(tmp_path):
+    rng = np.random.default_rng(1)
+    ra = rng.uniform(0, 360, 20000)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, 20000)))
+    catalog = Table({"ra": ra, "dec": dec, "mag": rng.uniform(5, 15, 20000)})
+    StarIndex.build(catalog, tmp_path / "index.npz", zone_height=0.5)
+    index = star_index(tmp_path / "index.npz")
+    assert len(index) == 20000
+    assert star_index(tmp_path / "index.npz") is index
+
+    # Cones across RA = 0 and around the poles
+    for center_ra, center_dec, radius in ((359.5, -20, 3), (100, 88.5, 3)):
+        found_ra, _, found_mag = index.query(center_ra, center_dec, radius)
+        cos_sep = np.sin(np.radians(center_dec)) * np.sin(
+            np.radians(dec)
+        ) + np.cos(np.radians(center_dec)) * np.cos(np.radians(dec)) * np.cos(
+            np.radians(ra - center_ra)
+        )
+        expected = ra[cos_sep >= np.cos(np.radians(radius))]
+        assert sorted(found_ra) == sorted(expected)
+        assert np.all(np.diff(found_mag) >= 0)
+
+
+def test_local_wcs(tmp_path):
+    rng = np.random.default_rng(2)
+    catalog = Table(
+        {
+            "ra": rng.uniform(80, 90, 20000),
+            "dec": rng.uniform(-5, 5, 20000),
+            "mag": rng.uniform(8, 17, 20000),
+        }
+    )
+    StarIndex.build(catalog, tmp_path / "index.npz")
+
+    # Rotated and mirrored field, 1.5 arcsec per binned pixel
+    true_wcs = wcs.WCS(naxis=2)
+    true_wcs.wcs.ctype = ["RA---TAN", "DEC--TAN"]
+    true_wcs.wcs.crval = [85.3, 1.2]
+    true_wcs.wcs.crpix = [512.5, 400.5]
+    angle = np.radians(30)
+    true_wcs.wcs.cd = (
+        1.5
+        / 3600
+        * np.array(
+            [
+                [-np.cos(angle), np.sin(angle)],
+                [np.sin(angle), np.cos(angle)],
+            ]
+        )
+    )
+    header = fits.Header()
+    # The telescope points 5 arcminutes away from the center of the image
+    header["TELRAIC"] = "5h41m30s"
+    header["TELDECIC"] = "1d17m00s"
+    header["XPIXSCAL"] = 0.75
+    header["XBINNING"] = 2
+    make_image(tmp_path / "image.fts", catalog, true_wcs, (800, 1024), header)
+
+    assert local_wcs(tmp_path / "image.fts", index=tmp_path / "index.npz")
+    solved = fits.getheader(tmp_path / "image.fts")
+    assert solved["WCSMATCH"] >= 10
+    assert solved["WCSRMS"] < 1
+    pixels = np.array([[0, 0], [1023, 799], [500, 300]])
+    error = np.abs(
+        wcs.WCS(solved).all_pix2world(pixels, 0)
+        - true_wcs.all_pix2world(pixels, 0)
+    )
+    assert error.max() * 3600 < 2
+
+    # No solution far from the hint
+    assert not local_wcs(
+        tmp_path / "image.fts",
+        index=tmp_path / "index.npz",
+        ra=70,
+        dec=20,
+    )
@@ -0,0 +1,155 @@
+import astroplan
+import numpy as np
+from astroplan.scheduling import Schedule, Scorer
+from astropy import coordinates as coord
+from astropy import time as astrotime
+from astropy import units as u
+
+from pyscope.telrun import (
+    ConstraintGrid,
+    GridConstraint,
+    SeparationTransitioner,
+)
+
+
+def test_constraint_grid():
+    observer = astroplan.Observer(
+        location=coord.EarthLocation(lon=-91.5 * u.deg, lat=41.7 * u.deg)
+    )
+    rng = np.random.default_rng(0)
+    targets = coord.SkyCoord(
+        rng.uniform(0, 360, 30) * u.deg, rng.uniform(-30, 85, 30) * u.deg
+    )
+    # Repeated targets are computed once
+    blocks = [
+        astroplan.ObservingBlock(
+            astroplan.FixedTarget(targets[i % 30]), 60 * u.second, 1
+        )
+        for i in range(40)
+    ]
+    t0 = astrotime.Time("2024-03-10T18:00:00")
+    t1 = t0 + 1 * u.day
+    schedule = Schedule(t0, t1)
+    constraints = [
+        astroplan.AtNightConstraint(max_solar_altitude=-12 * u.deg),
+        astroplan.AltitudeConstraint(min=30 * u.deg),
+        astroplan.AirmassConstraint(max=3, boolean_constraint=False),
+        astroplan.MoonSeparationConstraint(min=30 * u.deg),
+        astroplan.TimeConstraint(min=t0 + 2 * u.hour),
+    ]
+
+    grid = ConstraintGrid(observer, t0, t1, 5 * u.minute)
+    wrapped = grid.wrap(constraints)
+    assert all(type(c) is GridConstraint for c in wrapped)
+    wrapped.append(astroplan.AltitudeConstraint(min=0 * u.deg))
+    assert type(wrapped[-1]) is GridConstraint
+
+    for constraint, grid_constraint in zip(constraints, wrapped):
+        expected = Scorer(
+            blocks, observer, schedule, global_constraints=[constraint]
+        ).create_score_array(5 * u.minute)
+        result = Scorer(
+            blocks, observer, schedule, global_constraints=[grid_constraint]
+        ).create_score_array(5 * u.minute)
+        assert result.shape == expected.shape
+        # Only times at the limits of the constraints may differ
+        assert np.mean(np.abs(result - expected) > 1e-3) < 1e-3
+
+    # Single targets and other times are supported too
+    assert np.array_equal(
+        wrapped[1](observer, targets[0], times=grid.times),
+        constraints[1](observer, targets[0], times=grid.times),
+    )
+    times = t0 + [1, 2, 3] * u.hour
+    assert np.array_equal(
+        wrapped[1](
+            observer, targets[:3], times=times, grid_times_targets=True
+        ),
+        constraints[1](
+            observer, targets[:3], times=times, grid_times_targets=True
+        ),
+    )
+
+    # The ephemerides agree with astroplan to a few arcseconds
+    altitude = observer.altaz(
+        grid.times, targets[:5], grid_times_targets=True
+    ).alt
+    assert np.max(np.abs(altitude.deg - grid.altitude(targets[:5]))) < 3e-3
+
+
+def test_scheduler_with_constraint_grid():
+    observer = astroplan.Observer(
+        location=coord.EarthLocation(lon=-91.5 * u.deg, lat=41.7 * u.deg)
+    )
+    t0 = astrotime.Time("2024-03-10T18:00:00")
+    t1 = t0 + 1 * u.day
+    blocks = [
+        astroplan.ObservingBlock(
+            astroplan.FixedTarget(
+                coord.SkyCoord(ra * u.deg, 40 * u.deg), name=f"target{ra}"
+            ),
+            300 * u.second,
+            1,
+        )
+        for ra in range(0, 360, 30)
+    ]
+    grid = ConstraintGrid(observer, t0, t1, 60 * u.second)
+    scheduler = astroplan.PriorityScheduler(
+        constraints=grid.wrap(
+            [
+                astroplan.AtNightConstraint(max_solar_altitude=-12 * u.deg),
+                astroplan.AltitudeConstraint(min=30 * u.deg),
+            ]
+        ),
+        observer=observer,
+        transitioner=astroplan.Transitioner(1 * u.deg / u.second),
+        time_resolution=60 * u.second,
+    )
+    schedule = Schedule(t0, t1)
+    scheduler(blocks, schedule)
+
+    scheduled = [
+        slot.block for slot in schedule.slots if hasattr(slot.block, "target")
+    ]
+    assert len(scheduled) > 0
+    for block in scheduled:
+        altitude = observer.altaz(block.start_time, block.target).alt
+        assert altitude > 29.9 * u.deg
+        assert observer.sun_altaz(block.start_time).alt < -11.9 * u.deg
+
+
+def test_separation_transitioner():
+    observer = astroplan.Observer(
+        location=coord.EarthLocation(lon=-91.5 * u.deg, lat=41.7 * u.deg)
+    )
+    start_time = astrotime.Time("2024-03-11T06:00:00")
+    blocks = [
+        astroplan.ObservingBlock(
+            astroplan.FixedTarget(coord.SkyCoord(ra * u.deg, 40 * u.deg)),
+            60 * u.second,
+            1,
+            configuration={"filter": filt},
+        )
+        for ra, filt in ((150, "r"), (170, "g"))
+    ]
+    reconfig_times = {"filter": {"default": 5 * u.second}}
+    expected = astroplan.Transitioner(
+        1 * u.deg / u.second, instrument_reconfig_times=reconfig_times
+    )(blocks[0], blocks[1], start_time, observer)
+    transition = SeparationTransitioner(
+        1 * u.deg / u.second, instrument_reconfig_times=reconfig_times
+    )(blocks[0], blocks[1], start_time, observer)
+    assert (
+        abs(
+            transition.components["slew_time"]
+            - expected.components["slew_time"]
+        )
+        < 0.01 * u.second
+    )
+    assert transition.components["filter:r to g"] == 5 * u.second
+    assert (
+        SeparationTransitioner(1 * u.deg / u.second)(
+            blocks[0], blocks[0], start_time, observer
+        )
+        is None
+    )
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from pyscope.telrun import ImageWriter
+
+
+def test_image_writer():
+    written = []
+    writer = ImageWriter(maxsize=2)
+    for i in range(5):
+        writer.submit(written.append, i)
+    assert writer.close() == []
+    # Jobs run in order
+    assert written == list(range(5))
+
+    # Errors are collected
+    writer = ImageWriter()
+    writer.submit(int, "not a number")
+    writer.submit(written.append, 5)
+    errors = writer.close()
+    assert len(errors) == 1 and isinstance(errors[0], ValueError)
+    assert written[-1] == 5
+
+
+def test_image_writer_back_pressure():
+    release = threading.Event()
+    writer = ImageWriter(maxsize=2)
+    writer.submit(release.wait)
+    writer.submit(release.wait)
+
+    # A third job waits for a free slot
+    submitted = threading.Event()
+    threading.Thread(
+        target=lambda: (writer.submit(time.sleep, 0), submitted.set())
+    ).start()
+    assert not submitted.wait(0.2)
+    release.set()
+    assert submitted.wait(1)
+    writer.close()
+    assert writer.wait_time > 0.1
+
+
+def test_image_writer_overlap():
+    # Each write only completes once the acquisition loop started the next
+    # exposure, which it could not if writes blocked the loop
+    exposing = [threading.Event() for _ in range(4)]
+    overlapped = []
+
+    def write(i):
+        overlapped.append(exposing[i + 1].wait(5))
+
+    writer = ImageWriter()
+    for i in range(3):
+        exposing[i].set()
+        writer.submit(write, i)
+    exposing[3].set()
+    assert writer.close() == []
+    assert overlapped == [True, True, True]
@@ -0,0 +1,61 @@
+import os
+import time
+
+from pyscope.telrun import PlateSolveExecutor
+
+
+def fake_solver(image_path):
+    name = os.path.basename(image_path)
+    if name.startswith("slow"):
+        time.sleep(5)
+    elif name.startswith("crash"):
+        os._exit(3)
+    elif name.startswith("wait"):
+        time.sleep(1)
+    return not name.startswith("bad")
+
+
+def test_plate_solve_executor(tmp_path):
+    for name in ("wait", "low", "high", "bad", "slow", "crash"):
+        (tmp_path / f"{name}.fts").write_bytes(b"")
+    (tmp_path / "final").mkdir()
+
+    executor = PlateSolveExecutor(fake_solver, workers=1, timeout=30)
+    # Later jobs are queued while the first one runs
+    executor.submit(tmp_path / "wait.fts")
+    executor.submit(tmp_path / "low.fts", priority=5)
+    executor.submit(
+        tmp_path / "high.fts", target_path=tmp_path / "final", priority=1
+    )
+    executor.submit(tmp_path / "bad.fts", priority=5)
+    executor.submit(tmp_path / "slow.fts", priority=5, timeout=1)
+    executor.submit(tmp_path / "crash.fts", priority=5)
+    executor.join()
+
+    history = executor.history
+    assert [os.path.basename(job["image_path"]) for job in history] == [
+        "wait.fts",
+        "high.fts",
+        "low.fts",
+        "bad.fts",
+        "slow.fts",
+        "crash.fts",
+    ]
+    assert [job["status"] for job in history] == [
+        "solved",
+        "solved",
+        "solved",
+        "failed",
+        "timeout",
+        "error",
+    ]
+    assert (tmp_path / "final" / "high.fts").exists()
+    assert history[4]["finished"] - history[4]["started"] < 4
+
+    summary = executor.summary()
+    assert summary["queued"] == summary["running"] == 0
+    assert summary["solved"] == 3
+    assert summary["timeout"] == summary["error"] == summary["failed"] == 1
+    assert summary["latency_p95"] >= summary["solve_mean"] > 0
+    assert executor.status == "Idle"
+    executor.shutdown()
@@ -0,0 +1,137 @@
+import time
+
+import astroplan
+import numpy as np
+from astropy import coordinates as coord
+from astropy import time as astrotime
+from astropy import units as u
+
+from pyscope.telrun import schedtab
+
+
+def _make_blocks(n):
+    """A schedule of `n` blocks: targets, some unscheduled, with shared
+    constraints, plus transition blocks and empty slots."""
+    rng = np.random.default_rng(0)
+    t0 = astrotime.Time("2024-01-01T00:00:00")
+    constraints = [
+        astroplan.TimeConstraint(min=t0, max=t0 + 1 * u.day),
+        astroplan.AtNightConstraint(max_solar_altitude=-12 * u.deg),
+        astroplan.AltitudeConstraint(min=30 * u.deg),
+        astroplan.AirmassConstraint(max=2.5, boolean_constraint=True),
+        astroplan.MoonSeparationConstraint(min=20 * u.deg),
+    ]
+    blocks = []
+    for i in range(n):
+        start_time = t0 + i * u.min
+        if i % 10 == 8:
+            blocks.append(
+                astroplan.TransitionBlock(
+                    {"slew_time": 30 * u.second}, start_time=start_time
+                )
+            )
+            continue
+        if i % 10 == 9:
+            blocks.append(astroplan.Slot(start_time, start_time + 1 * u.min))
+            continue
+        block = astroplan.ObservingBlock(
+            target=coord.SkyCoord(
+                rng.uniform(0, 360) * u.deg, rng.uniform(-30, 80) * u.deg
+            ),
+            duration=60 * u.second,
+            priority=i % 4 + 1,
+            name=f"target{i}",
+            configuration={
+                "observer": ["Jane Doe"],
+                "code": "abc",
+                "title": "Program",
+                "filename": f"file_{i}.fts",
+                "type": "light",
+                "backend": 0,
+                "filter": "rgi"[i % 3],
+                "exposure": float(i % 7 + 1),
+                "nexp": i % 3 + 1,
+                "repositioning": (0, 0) if i % 2 else (512, 512),
+                "shutter_state": bool(i % 4),
+                "readout": 0,
+                "binning": (1, 1) if i % 5 else (2, 2),
+                "frame_position": (0, 0),
+                "frame_size": (0, 0),
+                "pm_ra_cosdec": (i % 3) * u.arcsec / u.s,
+                "pm_dec": 0 * u.arcsec / u.hour,
+                "comment": "",
+                "sch": "test",
+                "ID": 60000 + i / 1e5,
+                "status": "S",
+                "message": "Scheduled",
+                "sched_time": t0,
+            },
+            constraints=constraints[: i % 6],
+        )
+        if i % 10 < 6:
+            block.start_time = start_time
+            block.end_time = start_time + 60 * u.second
+        blocks.append(block)
+    return blocks
+
+
+def test_blocks_to_table():
+    blocks = _make_blocks(40)
+    table = schedtab.blocks_to_table(blocks)
+
+    assert len(table) == 40
+    assert table["name"][8] == "TransitionBlock"
+    assert table["name"][9] == "EmptyBlock"
+    assert table["ID"].mask[8] and table["ID"].mask[9]
+    assert table["start_time"].mask[6] and not table["start_time"].mask[5]
+    assert np.isclose(
+        (table["end_time"][8] - table["start_time"][8]).to_value(u.s), 30
+    )
+    assert table["target"][0].separation(blocks[0].target) < 1e-6 * u.arcsec
+    assert table["target"][8].dec == -90 * u.deg
+    assert table["binning"].shape == (40, 2)
+    assert table["pm_ra_cosdec"][1] == 3600
+    assert table["sched_time"][0] == blocks[0].configuration["sched_time"].mjd
+    assert table["constraints"].shape == (40, 5)
+    assert table["constraints"][5, 4]["type"] == "MoonSeparationConstraint"
+    assert table["constraints"][4, 4] == {}
+
+
+def test_table_round_trip():
+    blocks = _make_blocks(40)
+    table = schedtab.blocks_to_table(blocks)
+    read_blocks = schedtab.table_to_blocks(table)
+
+    assert len(read_blocks) == 40
+    block = read_blocks[5]
+    assert block.name == "target5"
+    assert block.duration == (6 * 3 + 5) * u.second
+    assert type(block.target) is astroplan.FixedTarget
+    assert [type(c) for c in block.constraints] == [
+        type(c) for c in blocks[5].constraints
+    ]
+    assert block.configuration["binning"].tolist() == [2, 2]
+    assert block.configuration["filter"] == "i"
+
+    # Tables of blocks read back from a table are identical
+    table2 = schedtab.blocks_to_table(read_blocks[:8])
+    for name in ("name", "exposure", "binning", "pm_ra_cosdec"):
+        assert np.all(table2[name] == table[name][:8])
+    assert np.all(
+        table2["target"].separation(table["target"][:8]) < 1e-6 * u.arcsec
+    )
+
+
+if __name__ == "__main__":
+    # Benchmark of the schedule table conversions
+    for n in (1000, 10000, 100000):
+        blocks = _make_blocks(n)
+        t0 = time.perf_counter()
+        table = schedtab.blocks_to_table(blocks)
+        t1 = time.perf_counter()
+        schedtab.table_to_blocks(table)
+        t2 = time.perf_counter()
+        print(
+            f"{n:>6} blocks: blocks_to_table {t1 - t0:.2f} s, "
+            f"table_to_blocks {t2 - t1:.2f} s"
+        )
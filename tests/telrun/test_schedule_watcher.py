@@ -0,0 +1,48 @@
+import datetime
+import os
+
+from astropy import table
+
+from pyscope.telrun import ScheduleWatcher
+
+
+def write_schedule(path, rows=1):
+    table.Table({"name": ["target"] * rows}).write(
+        path, format="ascii.ecsv", overwrite=True
+    )
+
+
+def test_schedule_watcher(tmp_path):
+    watcher = ScheduleWatcher(tmp_path)
+    now = datetime.datetime(2024, 3, 10, 12)
+    assert watcher.poll(now) is None
+
+    write_schedule(tmp_path / "telrun_2024-03-10T11-00-00.ecsv")
+    write_schedule(tmp_path / "telrun_2024-03-10T13-00-00.ecsv")
+    (tmp_path / "notes.txt").write_text("not a schedule")
+    assert len(watcher.schedules) == 2
+
+    first = watcher.poll(now)
+    assert first == tmp_path / "telrun_2024-03-10T11-00-00.ecsv"
+    assert watcher.poll(now) is None
+
+    # Unchanged directory and schedule are neither listed nor read again
+    schedules = watcher.schedules
+    schedule = watcher.read(first)
+    assert watcher.poll(now) is None
+    assert watcher.schedules is schedules
+    assert watcher.read(first) is schedule
+
+    # A schedule modified in place is picked up again
+    write_schedule(first, rows=2)
+    os.utime(first, ns=(0, os.stat(first).st_mtime_ns + 10**9))
+    assert watcher.poll(now) == first
+    assert len(watcher.read(first)) == 2
+
+    # The next schedule once its start time has passed
+    later = datetime.datetime(2024, 3, 10, 14)
+    assert watcher.poll(later) == tmp_path / "telrun_2024-03-10T13-00-00.ecsv"
+
+    # Empty schedules are ignored
+    write_schedule(tmp_path / "telrun_2024-03-10T13-30-00.ecsv", rows=0)
+    assert watcher.poll(later) is None